@@ -0,0 +1,83 @@
+import random
+from time import monotonic
+from typing import List
+
+from blspy import G2Element
+
+from chives.consensus.cost_calculator import NPCResult
+from chives.consensus.default_constants import DEFAULT_CONSTANTS
+from chives.full_node.mempool import Mempool
+from chives.types.blockchain_format.program import SerializedProgram
+from chives.types.mempool_item import MempoolItem
+from chives.types.spend_bundle import SpendBundle
+from chives.util.ints import uint64
+from utils import rand_hash
+
+# number of transactions offered to the full mempool
+NUM_ITERS = 5000
+
+# we need seeded random, to have reproducible benchmark runs
+random.seed(123456789)
+
+EMPTY_PROGRAM = SerializedProgram.from_bytes(b"\x80")
+
+
+def make_item(min_cost: int = 5000000, max_cost: int = 50000000, max_fee_per_cost: int = 10) -> MempoolItem:
+    cost = uint64(random.randint(min_cost, max_cost))
+    fee = uint64(random.randint(0, max_fee_per_cost * 1000) * cost // 1000)
+    return MempoolItem(
+        SpendBundle([], G2Element()),
+        fee,
+        NPCResult(None, None, cost),
+        cost,
+        rand_hash(),
+        [],
+        [],
+        EMPTY_PROGRAM,
+    )
+
+
+def run_mempool_benchmark() -> None:
+    max_size_in_cost = DEFAULT_CONSTANTS.MAX_BLOCK_COST_CLVM * DEFAULT_CONSTANTS.MEMPOOL_BLOCK_BUFFER
+    mempool = Mempool(max_size_in_cost)
+
+    print(f"Filling mempool to {max_size_in_cost} cost")
+    start = monotonic()
+    while not mempool.at_full_capacity(50000000):
+        mempool.add_to_pool(make_item())
+    stop = monotonic()
+    print(f"{stop - start:0.4f}s, added {len(mempool.spends)} items")
+
+    incoming: List[MempoolItem] = [make_item() for _ in range(NUM_ITERS)]
+
+    start = monotonic()
+    for item in incoming:
+        mempool.get_min_fee_rate(item.cost)
+    stop = monotonic()
+    print(f"{stop - start:0.4f}s, {NUM_ITERS} get_min_fee_rate() calls on a full mempool")
+
+    added = 0
+    start = monotonic()
+    for item in incoming:
+        # this is what the mempool manager does for every transaction when the mempool is full
+        if item.fee_per_cost > mempool.get_min_fee_rate(item.cost):
+            mempool.add_to_pool(item)
+            added += 1
+    stop = monotonic()
+    print(f"{stop - start:0.4f}s, offered {NUM_ITERS} items to a full mempool, {added} added by evicting others")
+
+    # large, low fee transactions would have to evict many of the items at the bottom of the mempool, most of them
+    # are rejected but every one of them needs a minimum fee rate lookup
+    spam: List[MempoolItem] = [make_item(1000000000, 5000000000, 1) for _ in range(NUM_ITERS)]
+    added = 0
+    start = monotonic()
+    for item in spam:
+        if item.fee_per_cost > mempool.get_min_fee_rate(item.cost):
+            mempool.add_to_pool(item)
+            added += 1
+    stop = monotonic()
+    print(f"{stop - start:0.4f}s, offered {NUM_ITERS} large low fee items to a full mempool, {added} added")
+
+
+if __name__ == "__main__":
+    run_mempool_benchmark()
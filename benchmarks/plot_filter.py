@@ -0,0 +1,63 @@
+import random
+from pathlib import Path
+from time import monotonic
+from typing import Dict
+
+from blspy import G1Element
+
+from chives.consensus.default_constants import DEFAULT_CONSTANTS
+from chives.plotting.plot_filter_index import PlotFilterIndex
+from chives.plotting.util import PlotInfo
+from chives.types.blockchain_format.proof_of_space import ProofOfSpace
+from chives.types.blockchain_format.sized_bytes import bytes32
+from utils import rand_hash
+
+NUM_PLOTS = 100000
+NUM_SIGNAGE_POINTS = 10
+
+# we need seeded random, to have reproducible benchmark runs
+random.seed(123456789)
+
+
+class FakeProver:
+    def __init__(self, plot_id: bytes32):
+        self.plot_id = plot_id
+
+    def get_id(self) -> bytes32:
+        return self.plot_id
+
+
+def run_plot_filter_benchmark() -> None:
+    plots: Dict[Path, PlotInfo] = {
+        Path(f"plot-{i}.plot"): PlotInfo(FakeProver(rand_hash()), None, None, G1Element(), 0, 0)
+        for i in range(NUM_PLOTS)
+    }
+    signage_points = [(rand_hash(), rand_hash()) for _ in range(NUM_SIGNAGE_POINTS)]
+
+    passed = 0
+    start = monotonic()
+    for challenge_hash, sp_hash in signage_points:
+        for plot_info in plots.values():
+            if ProofOfSpace.passes_plot_filter(DEFAULT_CONSTANTS, plot_info.prover.get_id(), challenge_hash, sp_hash):
+                passed += 1
+    stop = monotonic()
+    print(f"{stop - start:0.4f}s, passes_plot_filter() on {NUM_PLOTS} plots for {NUM_SIGNAGE_POINTS} signage points")
+
+    start = monotonic()
+    index = PlotFilterIndex(plots)
+    stop = monotonic()
+    print(f"{stop - start:0.4f}s, building the plot filter index")
+
+    index_passed = 0
+    start = monotonic()
+    for challenge_hash, sp_hash in signage_points:
+        index_passed += len(
+            index.passing_plots(DEFAULT_CONSTANTS.NUMBER_ZERO_BITS_PLOT_FILTER, challenge_hash, sp_hash)
+        )
+    stop = monotonic()
+    print(f"{stop - start:0.4f}s, plot filter index on {NUM_PLOTS} plots for {NUM_SIGNAGE_POINTS} signage points")
+    assert passed == index_passed
+
+
+if __name__ == "__main__":
+    run_plot_filter_benchmark()
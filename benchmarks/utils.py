@@ -18,6 +18,7 @@ from pathlib import Path
 from datetime import datetime
 import aiosqlite
 import click
+import io
 import os
 import subprocess
 import sys
@@ -123,6 +124,7 @@ def rand_full_block() -> FullBlock:
         rand_g2(),
         rand_hash(),
         rand_hash(),
+        rand_hash(),
     )
 
     foliage = Foliage(
@@ -165,7 +167,8 @@ def rand_full_block() -> FullBlock:
         foliage,
         foliage_transaction_block,
         transactions_info,
-        SerializedProgram.from_bytes(clvm_generator),
+        # clvm_generator.bin has data after the program, which wouldn't survive a round trip
+        SerializedProgram.parse(io.BytesIO(clvm_generator)),
         [],
     )
 
@@ -22,6 +22,7 @@ from chives.consensus.full_block_to_block_record import block_to_block_record
 from chives.consensus.multiprocess_validation import (
     PreValidationResult,
     _run_generator,
+    ValidationWorkers,
     pre_validate_blocks_multiprocessing,
 )
 from chives.full_node.block_height_map import BlockHeightMap
@@ -70,6 +71,8 @@ class ReceiveBlockResult(Enum):
 class Blockchain(BlockchainInterface):
     constants: ConsensusConstants
     constants_json: Dict
+    # What the processes of the pool already have for validating blocks
+    validation_workers: ValidationWorkers
 
     # peak of the blockchain
     _peak_height: Optional[uint32]
@@ -136,6 +139,7 @@ class Blockchain(BlockchainInterface):
         self.coin_store = coin_store
         self.block_store = block_store
         self.constants_json = recurse_jsonify(dataclasses.asdict(self.constants))
+        self.validation_workers = ValidationWorkers(self.constants_json)
         self._shut_down = False
         await self._load_chain_from_store(blockchain_dir)
         self._seen_compact_proofs = set()
@@ -284,6 +288,7 @@ class Blockchain(BlockchainInterface):
                     await self.__height_map.maybe_flush()
             except BaseException as e:
                 self.block_store.rollback_cache_block(header_hash)
+                self.coin_store.clear_cache()
                 log.error(
                     f"Error while adding block {block.header_hash} height {block.height},"
                     f" rolling back: {traceback.format_exc()} {e}"
@@ -640,6 +645,7 @@ class Blockchain(BlockchainInterface):
             batch_size,
             wp_summaries,
             validate_signatures=validate_signatures,
+            workers=self.validation_workers,
         )
 
     async def run_generator(self, unfinished_block: bytes, generator: BlockGenerator, height: uint32) -> NPCResult:
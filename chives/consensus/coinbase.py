@@ -3,11 +3,11 @@ from blspy import G1Element
 from chives.types.blockchain_format.coin import Coin
 from chives.types.blockchain_format.sized_bytes import bytes32
 from chives.util.ints import uint32, uint64
-from chives.wallet.puzzles.p2_delegated_puzzle_or_hidden_puzzle import puzzle_for_pk
+from chives.wallet.puzzles.p2_delegated_puzzle_or_hidden_puzzle import puzzle_hash_for_pk
 
 
 def create_puzzlehash_for_pk(pub_key: G1Element) -> bytes32:
-    return puzzle_for_pk(pub_key).get_tree_hash()
+    return puzzle_hash_for_pk(pub_key)
 
 
 def pool_parent_id(block_height: uint32, genesis_challenge: bytes32) -> bytes32:
@@ -30,8 +30,8 @@ def create_pool_coin(block_height: uint32, puzzle_hash: bytes32, reward: uint64,
 def create_farmer_coin(block_height: uint32, puzzle_hash: bytes32, reward: uint64, genesis_challenge: bytes32):
     parent_id = farmer_parent_id(block_height, genesis_challenge)
     return Coin(parent_id, puzzle_hash, reward)
-    
-    
+
+
 def create_community_coin(block_height: uint32, puzzle_hash: bytes32, reward: uint64, genesis_challenge: bytes32):
     parent_id = community_parent_id(block_height, genesis_challenge)
     return Coin(parent_id, puzzle_hash, reward)
@@ -1,9 +1,11 @@
 import asyncio
+import json
 import logging
+import os
 import traceback
 from concurrent.futures import Executor
 from dataclasses import dataclass
-from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 from blspy import AugSchemeMPL, G1Element
 
@@ -29,11 +31,22 @@ from chives.util.block_cache import BlockCache
 from chives.util.condition_tools import pkm_pairs
 from chives.util.errors import Err, ValidationError
 from chives.util.generator_tools import get_block_header, tx_removals_and_additions
+from chives.util.hash import std_hash
 from chives.util.ints import uint16, uint32, uint64
+from chives.util.lru_cache import LRUCache
 from chives.util.streamable import Streamable, dataclass_from_dict, streamable
 
 log = logging.getLogger(__name__)
 
+# The number of block records every validation worker keeps between batches. The recent blocks of a batch (up to the
+# previous sub-epoch) fit many times, so while syncing only the records of the new blocks have to be sent to a worker.
+WORKER_BLOCK_RECORDS_CACHE_SIZE = 5000
+
+# The state a validation worker process keeps between batches: the consensus constants by their key, and the block
+# records by header hash (a header hash always has the same block record).
+_worker_constants: Dict[bytes32, ConsensusConstants] = {}
+_worker_block_records = LRUCache(WORKER_BLOCK_RECORDS_CACHE_SIZE)
+
 
 @streamable
 @dataclass(frozen=True)
@@ -44,8 +57,88 @@ class PreValidationResult(Streamable):
     validated_signature: bool
 
 
+class ValidationWorkers:
+    """
+    Keeps track of the constants and block records the validation worker processes of a pool already have, so
+    `pre_validate_blocks_multiprocessing` only sends them what they are missing. The pool decides which worker runs a
+    batch, so an item is sent until every worker that reported back has it. A worker that doesn't have everything a
+    batch needs reports what's missing, and the batch is sent again with everything.
+    """
+
+    def __init__(self, constants_json: Dict, max_known_items: int = WORKER_BLOCK_RECORDS_CACHE_SIZE // 2):
+        self.constants_json = constants_json
+        self.constants_key: bytes32 = std_hash(json.dumps(constants_json, sort_keys=True).encode())
+        # Less than a worker caches, so that the items a worker was sent are most likely still there
+        self.max_known_items = max_known_items
+        self._known_items: Dict[int, Set[bytes32]] = {}  # worker process id: the constants key and header hashes
+        self._serialized_records = LRUCache(WORKER_BLOCK_RECORDS_CACHE_SIZE)  # header hash: bytes(BlockRecord)
+
+    def _serialize(self, record: BlockRecord) -> bytes:
+        serialized: Optional[bytes] = self._serialized_records.get(record.header_hash)
+        if serialized is None:
+            serialized = bytes(record)
+            self._serialized_records.put(record.header_hash, serialized)
+        return serialized
+
+    def items_to_send(
+        self, block_records: Dict[bytes32, BlockRecord], send_all: bool = False
+    ) -> Tuple[Optional[Dict], Dict[bytes, bytes]]:
+        """
+        Returns the constants (None if all workers have them) and the serialized block records to send with a batch.
+        """
+        known: Set[bytes32] = set()
+        if not send_all and len(self._known_items) > 0:
+            known = set.intersection(*self._known_items.values())
+        constants_dict = None if self.constants_key in known else self.constants_json
+        return constants_dict, {
+            bytes(header_hash): self._serialize(record)
+            for header_hash, record in block_records.items()
+            if header_hash not in known
+        }
+
+    def batch_done(self, worker_id: int, header_hashes: Iterable[bytes32], missing: List[bytes32]) -> None:
+        known = self._known_items.setdefault(worker_id, set())
+        if len(known) > self.max_known_items:
+            known.clear()
+        known.add(self.constants_key)
+        known.update(header_hashes)
+        known.difference_update(missing)
+
+
+def _get_worker_state(
+    constants_key: bytes32,
+    constants_dict: Optional[Dict],
+    block_record_hashes: List[bytes32],
+    blocks_pickled: Dict[bytes, bytes],
+) -> Tuple[Optional[ConsensusConstants], Dict[bytes32, BlockRecord], List[bytes32]]:
+    """
+    Returns the constants and block records of a batch, from what the worker kept of earlier batches and what it was
+    sent, and the items (constants key or header hashes) it doesn't have.
+    """
+    missing: List[bytes32] = []
+    if constants_dict is not None and constants_key not in _worker_constants:
+        _worker_constants[constants_key] = dataclass_from_dict(ConsensusConstants, constants_dict)
+    constants: Optional[ConsensusConstants] = _worker_constants.get(constants_key)
+    if constants is None:
+        missing.append(constants_key)
+
+    for k, v in blocks_pickled.items():
+        if k not in _worker_block_records.cache:
+            _worker_block_records.put(bytes32(k), BlockRecord.from_bytes(v))
+    blocks: Dict[bytes32, BlockRecord] = {}
+    for header_hash in block_record_hashes:
+        record: Optional[BlockRecord] = _worker_block_records.get(header_hash)
+        if record is None:
+            missing.append(header_hash)
+        else:
+            blocks[header_hash] = record
+    return constants, blocks, missing
+
+
 def batch_pre_validate_blocks(
-    constants_dict: Dict,
+    constants_key: bytes32,
+    constants_dict: Optional[Dict],
+    block_record_hashes: List[bytes32],
     blocks_pickled: Dict[bytes, bytes],
     full_blocks_pickled: Optional[List[bytes]],
     header_blocks_pickled: Optional[List[bytes]],
@@ -55,12 +148,20 @@ def batch_pre_validate_blocks(
     expected_difficulty: List[uint64],
     expected_sub_slot_iters: List[uint64],
     validate_signatures: bool,
-) -> List[bytes]:
-    blocks: Dict[bytes32, BlockRecord] = {}
-    for k, v in blocks_pickled.items():
-        blocks[bytes32(k)] = BlockRecord.from_bytes(v)
+) -> Tuple[int, List[bytes32], List[bytes]]:
+    """
+    Validates a batch of blocks in a worker process. `block_record_hashes` are the recent block records the batch
+    needs, of which the ones in `blocks_pickled` are sent along, the worker is expected to have the others from earlier
+    batches (see `ValidationWorkers`). Returns the id of the worker process, the items it was missing (in which case
+    nothing was validated) and the results.
+    """
+    constants_or_none, blocks, missing = _get_worker_state(
+        constants_key, constants_dict, block_record_hashes, blocks_pickled
+    )
+    if len(missing) > 0 or constants_or_none is None:
+        return os.getpid(), missing, []
+    constants: ConsensusConstants = constants_or_none
     results: List[PreValidationResult] = []
-    constants: ConsensusConstants = dataclass_from_dict(ConsensusConstants, constants_dict)
     if full_blocks_pickled is not None and header_blocks_pickled is not None:
         assert ValueError("Only one should be passed here")
 
@@ -158,7 +259,7 @@ def batch_pre_validate_blocks(
                 error_stack = traceback.format_exc()
                 log.error(f"Exception: {error_stack}")
                 results.append(PreValidationResult(uint16(Err.UNKNOWN.value), None, None, False))
-    return [bytes(r) for r in results]
+    return os.getpid(), [], [bytes(r) for r in results]
 
 
 async def pre_validate_blocks_multiprocessing(
@@ -174,6 +275,7 @@ async def pre_validate_blocks_multiprocessing(
     wp_summaries: Optional[List[SubEpochSummary]] = None,
     *,
     validate_signatures: bool = True,
+    workers: Optional[ValidationWorkers] = None,
 ) -> List[PreValidationResult]:
     """
     This method must be called under the blockchain lock
@@ -189,7 +291,10 @@ async def pre_validate_blocks_multiprocessing(
         blocks: list of full blocks to validate (must be connected to current chain)
         npc_results
         get_block_generator
+        workers: what the worker processes of the pool already have, so that only the rest is sent to them
     """
+    if workers is None:
+        workers = ValidationWorkers(constants_json)
     prev_b: Optional[BlockRecord] = None
     # Collects all the recent blocks (up to the previous sub-epoch)
     recent_blocks: Dict[bytes32, BlockRecord] = {}
@@ -290,19 +395,53 @@ async def pre_validate_blocks_multiprocessing(
         if not block_record_was_present[i]:
             block_records.remove_block_record(block.header_hash)
 
-    recent_sb_compressed_pickled = {bytes(k): bytes(v) for k, v in recent_blocks_compressed.items()}
     npc_results_pickled = {}
     for k, v in npc_results.items():
         npc_results_pickled[k] = bytes(v)
-    futures = []
+
+    async def validate_batch(
+        batch_records: Dict[bytes32, BlockRecord],
+        b_pickled: Optional[List[bytes]],
+        hb_pickled: Optional[List[bytes]],
+        previous_generators: List[Optional[bytes]],
+        expected_difficulty: List[uint64],
+        expected_sub_slot_iters: List[uint64],
+    ) -> List[bytes]:
+        assert workers is not None
+        header_hashes = list(batch_records.keys())
+        # the first attempt only sends what the workers are missing, the second one everything
+        for send_all in (False, True):
+            constants_dict, records_pickled = workers.items_to_send(batch_records, send_all)
+            worker_id, missing, batch_results = await asyncio.get_running_loop().run_in_executor(
+                pool,
+                batch_pre_validate_blocks,
+                workers.constants_key,
+                constants_dict,
+                header_hashes,
+                records_pickled,
+                b_pickled,
+                hb_pickled,
+                previous_generators,
+                npc_results_pickled,
+                check_filter,
+                expected_difficulty,
+                expected_sub_slot_iters,
+                validate_signatures,
+            )
+            workers.batch_done(worker_id, header_hashes, missing)
+            if len(missing) == 0:
+                return batch_results
+        raise RuntimeError("Validation worker is missing block records it was sent")
+
+    tasks: List[asyncio.Task] = []
     # Pool of workers to validate blocks concurrently
     for i in range(0, len(blocks), batch_size):
         end_i = min(i + batch_size, len(blocks))
         blocks_to_validate = blocks[i:end_i]
         if any([len(block.finished_sub_slots) > 0 for block in blocks_to_validate]):
-            final_pickled = {bytes(k): bytes(v) for k, v in recent_blocks.items()}
+            batch_records = recent_blocks
         else:
-            final_pickled = recent_sb_compressed_pickled
+            batch_records = recent_blocks_compressed
         b_pickled: Optional[List[bytes]] = None
         hb_pickled: Optional[List[bytes]] = None
         previous_generators: List[Optional[bytes]] = []
@@ -325,6 +464,8 @@ async def pre_validate_blocks_multiprocessing(
                 try:
                     block_generator: Optional[BlockGenerator] = await get_block_generator(block, prev_blocks_dict)
                 except ValueError:
+                    for task in tasks:
+                        task.cancel()
                     return [
                         PreValidationResult(
                             uint16(Err.FAILED_GETTING_GENERATOR_MULTIPROCESSING.value), None, None, False
@@ -339,26 +480,23 @@ async def pre_validate_blocks_multiprocessing(
                     hb_pickled = []
                 hb_pickled.append(bytes(block))
 
-        futures.append(
-            asyncio.get_running_loop().run_in_executor(
-                pool,
-                batch_pre_validate_blocks,
-                constants_json,
-                final_pickled,
-                b_pickled,
-                hb_pickled,
-                previous_generators,
-                npc_results_pickled,
-                check_filter,
-                [diff_ssis[j][0] for j in range(i, end_i)],
-                [diff_ssis[j][1] for j in range(i, end_i)],
-                validate_signatures,
+        tasks.append(
+            asyncio.create_task(
+                validate_batch(
+                    batch_records,
+                    b_pickled,
+                    hb_pickled,
+                    previous_generators,
+                    [diff_ssis[j][0] for j in range(i, end_i)],
+                    [diff_ssis[j][1] for j in range(i, end_i)],
+                )
             )
         )
+
     # Collect all results into one flat list
     return [
         PreValidationResult.from_bytes(result)
-        for batch_result in (await asyncio.gather(*futures))
+        for batch_result in (await asyncio.gather(*tasks))
         for result in batch_result
     ]
 
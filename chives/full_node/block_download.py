@@ -0,0 +1,217 @@
+import asyncio
+import bisect
+import dataclasses
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from chives.protocols.full_node_protocol import RequestBlocks, RespondBlocks
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.util.ints import uint32
+
+log = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class PeerDownloadStats:
+    # exponential moving average of blocks per second served by this peer
+    blocks_per_second: float = 0.0
+    requests: int = 0
+    responses: int = 0
+    failures: int = 0
+    in_flight: int = 0
+
+
+@dataclasses.dataclass
+class _InFlightRequest:
+    start_height: int
+    end_height: int
+    peer: Any
+    sent_at: float
+
+
+class BlockDownloadScheduler:
+    """
+    Downloads the block range [start_height, end_height] from a set of peers, keeping up to `window`
+    `request_blocks` calls outstanding at the same time, spread over the peers that have the sync target peak.
+
+    Responses can arrive in any order; they are buffered and handed to `batch_queue` strictly by height, so the
+    consumer sees exactly the same sequence of batches as with a sequential download. Ranges whose request fails
+    or times out are re-queued and assigned to another peer, and the range at the head of the line is re-requested
+    from an idle peer if it takes too long, so a single slow peer can not stall the pipeline. Peers are ranked by
+    the throughput they achieved on earlier requests.
+    """
+
+    def __init__(
+        self,
+        start_height: int,
+        end_height: int,
+        batch_size: int,
+        get_peers: Callable[[], List[Any]],
+        window: int = 8,
+        max_in_flight_per_peer: int = 2,
+        request_timeout: int = 30,
+        slow_request_seconds: float = 10,
+        peers_changed: Optional[asyncio.Event] = None,
+    ):
+        assert window > 0 and max_in_flight_per_peer > 0
+        self._get_peers = get_peers
+        self._peers: List[Any] = get_peers()
+        self._peers_changed = peers_changed
+        self._window = window
+        self._max_in_flight_per_peer = max_in_flight_per_peer
+        self._request_timeout = request_timeout
+        self._slow_request_seconds = slow_request_seconds
+
+        # ranges are identified by their start height, the end height is inclusive (like RequestBlocks)
+        self._ranges: Dict[int, int] = {}
+        for range_start in range(start_height, end_height, batch_size):
+            self._ranges[range_start] = min(end_height, range_start + batch_size)
+        self._pending: List[int] = sorted(self._ranges.keys())
+        self._in_flight: Dict[asyncio.Task[Any], _InFlightRequest] = {}
+        self._completed: Dict[int, Tuple[Any, List[Any]]] = {}
+        self._next_height: Optional[int] = self._pending[0] if len(self._pending) > 0 else None
+        self._tried: Dict[int, Set[bytes32]] = {}
+        self.peer_stats: Dict[bytes32, PeerDownloadStats] = {}
+
+    def _stats(self, peer: Any) -> PeerDownloadStats:
+        stats = self.peer_stats.get(peer.peer_node_id)
+        if stats is None:
+            stats = PeerDownloadStats()
+            self.peer_stats[peer.peer_node_id] = stats
+        return stats
+
+    def _refresh_peers(self) -> None:
+        if self._peers_changed is not None and self._peers_changed.is_set():
+            self._peers = self._get_peers()
+            self._peers_changed.clear()
+        self._peers = [peer for peer in self._peers if not peer.closed]
+
+    def _select_peer(self, range_start: int, exclude: Set[bytes32]) -> Optional[Any]:
+        """
+        Returns the best scoring peer that still has capacity and has not already failed this range. Peers we
+        have not measured yet are scored like the best known peer, so they get a chance to prove themselves.
+        """
+        tried = self._tried.get(range_start, set())
+        best_known = max((s.blocks_per_second for s in self.peer_stats.values()), default=0.0)
+        candidates = []
+        for peer in self._peers:
+            if peer.peer_node_id in tried or peer.peer_node_id in exclude:
+                continue
+            stats = self._stats(peer)
+            if stats.in_flight >= self._max_in_flight_per_peer:
+                continue
+            score = stats.blocks_per_second if stats.responses > 0 else best_known
+            # prefer idle peers, and break ties randomly so load spreads over equally good peers
+            candidates.append((stats.in_flight, -score, random.random(), peer))
+        if len(candidates) == 0:
+            return None
+        return min(candidates, key=lambda c: c[:3])[3]
+
+    async def _request(self, peer: Any, range_start: int) -> Any:
+        request = RequestBlocks(uint32(range_start), uint32(self._ranges[range_start]), True)
+        return await peer.request_blocks(request, timeout=self._request_timeout)
+
+    def _dispatch(self, range_start: int, peer: Any) -> None:
+        stats = self._stats(peer)
+        stats.in_flight += 1
+        stats.requests += 1
+        task = asyncio.create_task(self._request(peer, range_start))
+        self._in_flight[task] = _InFlightRequest(range_start, self._ranges[range_start], peer, time.monotonic())
+
+    def _in_flight_starts(self) -> Set[int]:
+        return {req.start_height for req in self._in_flight.values()}
+
+    def _fill_window(self) -> None:
+        while len(self._pending) > 0:
+            # the window counts everything we hold on to, including out of order responses waiting to be consumed
+            if len(self._in_flight_starts()) + len(self._completed) >= self._window:
+                break
+            range_start = self._pending[0]
+            peer = self._select_peer(range_start, set())
+            if peer is None:
+                break
+            self._pending.pop(0)
+            self._dispatch(range_start, peer)
+
+        # if the range that blocks the pipeline is taking too long, also ask another peer for it
+        head = [req for req in self._in_flight.values() if req.start_height == self._next_height]
+        if len(head) != 1 or time.monotonic() - head[0].sent_at < self._slow_request_seconds:
+            return
+        peer = self._select_peer(head[0].start_height, {head[0].peer.peer_node_id})
+        if peer is not None:
+            log.info(f"Re-requesting slow block range {head[0].start_height} to {head[0].end_height} from another peer")
+            self._dispatch(head[0].start_height, peer)
+
+    def _is_done(self, range_start: int) -> bool:
+        assert self._next_height is not None
+        return range_start < self._next_height or range_start in self._completed
+
+    async def _handle_done(self, task: "asyncio.Task[Any]") -> None:
+        req = self._in_flight.pop(task)
+        stats = self._stats(req.peer)
+        stats.in_flight -= 1
+        response: Any = None
+        try:
+            response = task.result()
+        except Exception as e:
+            log.warning(f"Exception fetching {req.start_height} to {req.end_height} from peer: {e}")
+
+        if not isinstance(response, RespondBlocks) or len(response.blocks) == 0:
+            stats.failures += 1
+            stats.blocks_per_second /= 2
+            self._tried.setdefault(req.start_height, set()).add(req.peer.peer_node_id)
+            if not self._is_done(req.start_height) and req.start_height not in self._in_flight_starts():
+                bisect.insort(self._pending, req.start_height)
+            if response is None:
+                # timed out, or the connection failed
+                if req.peer in self._peers:
+                    self._peers.remove(req.peer)
+                await req.peer.close()
+            return
+
+        elapsed = max(time.monotonic() - req.sent_at, 0.001)
+        rate = len(response.blocks) / elapsed
+        stats.responses += 1
+        stats.blocks_per_second = rate if stats.responses == 1 else 0.7 * stats.blocks_per_second + 0.3 * rate
+        if self._is_done(req.start_height):
+            return
+        self._completed[req.start_height] = (req.peer, response.blocks)
+        # the range is done, drop any duplicate (hedged) request for it
+        for other_task, other in list(self._in_flight.items()):
+            if other.start_height == req.start_height:
+                other_task.cancel()
+                self._in_flight.pop(other_task)
+                self._stats(other.peer).in_flight -= 1
+
+    async def fetch(self, batch_queue: "asyncio.Queue[Optional[Tuple[Any, List[Any]]]]") -> bool:
+        """
+        Puts (peer, blocks) tuples on `batch_queue` in height order. Returns False if some range could not be
+        fetched from any peer. A final None is always put on the queue, to signal the consumer to stop.
+        """
+        try:
+            while self._next_height is not None:
+                self._refresh_peers()
+                self._fill_window()
+                if len(self._in_flight) == 0:
+                    log.error(f"failed fetching {self._next_height} to {self._ranges[self._next_height]} from peers")
+                    return False
+                done, _ = await asyncio.wait(self._in_flight.keys(), timeout=1, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task in self._in_flight:
+                        await self._handle_done(task)
+
+                while self._next_height in self._completed:
+                    await batch_queue.put(self._completed.pop(self._next_height))
+                    self._next_height = self._next_range_start(self._next_height)
+            return True
+        finally:
+            for task in self._in_flight.keys():
+                task.cancel()
+            self._in_flight.clear()
+            await batch_queue.put(None)
+
+    def _next_range_start(self, range_start: int) -> Optional[int]:
+        end = self._ranges[range_start]
+        return end if end in self._ranges else None
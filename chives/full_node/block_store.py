@@ -16,11 +16,15 @@ from chives.util.full_block_utils import generator_from_block
 
 log = logging.getLogger(__name__)
 
+# The number of block ranges served to peers that are kept in memory, a range is at most 33 blocks
+RANGE_CACHE_SIZE = 8
+
 
 class BlockStore:
     block_cache: LRUCache
     db_wrapper: DBWrapper2
     ses_challenge_cache: LRUCache
+    range_cache: LRUCache
 
     @classmethod
     async def create(cls, db_wrapper: DBWrapper2):
@@ -106,6 +110,8 @@ class BlockStore:
 
         self.block_cache = LRUCache(1000)
         self.ses_challenge_cache = LRUCache(50)
+        # (start height, end height) -> the main chain blocks returned by get_full_block_bytes_in_range
+        self.range_cache = LRUCache(RANGE_CACHE_SIZE)
         return self
 
     def maybe_from_hex(self, field: Any) -> bytes:
@@ -130,6 +136,9 @@ class BlockStore:
             return FullBlock.from_bytes(block_bytes)
 
     async def rollback(self, height: int) -> None:
+        for start_height, end_height in list(self.range_cache.cache.keys()):
+            if end_height > height:
+                self.range_cache.remove((start_height, end_height))
         if self.db_wrapper.db_version == 2:
             async with self.db_wrapper.write_db() as conn:
                 await conn.execute(
@@ -154,6 +163,9 @@ class BlockStore:
             block_bytes = bytes(block)
 
         self.block_cache.put(header_hash, block)
+        for start_height, end_height in list(self.range_cache.cache.keys()):
+            if start_height <= block.height <= end_height:
+                self.range_cache.remove((start_height, end_height))
 
         async with self.db_wrapper.write_db() as conn:
             await conn.execute(
@@ -257,6 +269,12 @@ class BlockStore:
             # block to the cache yet
             pass
 
+    def rollback_cache_range(self, start_height: uint32, end_height: uint32) -> None:
+        try:
+            self.range_cache.remove((start_height, end_height))
+        except KeyError:
+            pass
+
     async def get_full_block(self, header_hash: bytes32) -> Optional[FullBlock]:
         cached = self.block_cache.get(header_hash)
         if cached is not None:
@@ -306,6 +324,81 @@ class BlockStore:
                     ret.append(self.maybe_decompress(row[0]))
                 return ret
 
+    async def get_header_hashes_at(self, heights: List[uint32]) -> List[Tuple[uint32, bytes32]]:
+        """
+        Returns the (height, header hash) of all blocks at the given heights, including the orphaned ones, in order
+        of height. The blocks themselves are not read.
+        """
+        if len(heights) == 0:
+            return []
+
+        heights_db = tuple(heights)
+        formatted_str = (
+            f"SELECT height, header_hash from full_blocks WHERE height in ({'?,' * (len(heights_db) - 1)}?) "
+            "ORDER BY height"
+        )
+        async with self.db_wrapper.read_db() as conn:
+            async with conn.execute(formatted_str, heights_db) as cursor:
+                return [(uint32(row[0]), bytes32(self.maybe_from_hex(row[1]))) for row in await cursor.fetchall()]
+
+    async def get_full_block_bytes_at(self, heights: List[uint32]) -> List[Tuple[uint32, bytes32, bytes]]:
+        """
+        Returns the (height, header hash, serialized block) of all blocks at the given heights, including the
+        orphaned ones, in order of height. Like `get_full_block_bytes`, the blocks are not parsed.
+        """
+        if len(heights) == 0:
+            return []
+
+        heights_db = tuple(heights)
+        formatted_str = (
+            f"SELECT height, header_hash, block from full_blocks WHERE height in ({'?,' * (len(heights_db) - 1)}?) "
+            "ORDER BY height"
+        )
+        ret: List[Tuple[uint32, bytes32, bytes]] = []
+        async with self.db_wrapper.read_db() as conn:
+            async with conn.execute(formatted_str, heights_db) as cursor:
+                for row in await cursor.fetchall():
+                    block_bytes = zstd.decompress(row[2]) if self.db_wrapper.db_version == 2 else row[2]
+                    ret.append((uint32(row[0]), bytes32(self.maybe_from_hex(row[1])), block_bytes))
+        return ret
+
+    async def get_full_block_bytes_in_range(
+        self, start_height: uint32, end_height: uint32
+    ) -> List[Tuple[uint32, bytes32, bytes]]:
+        """
+        Returns the (height, header hash, serialized block) of the main chain blocks from `start_height` up to and
+        including `end_height`, in order of height, with a single query. The v1 schema does not know which blocks are
+        in the main chain, there the orphaned blocks at these heights are returned as well. Callers that must not
+        serve orphaned blocks compare the header hashes with the height to hash map.
+
+        Complete ranges are cached (v2 only), they stay valid until the chain is rolled back below their end.
+        """
+        cached: Optional[List[Tuple[uint32, bytes32, bytes]]] = self.range_cache.get((start_height, end_height))
+        if cached is not None:
+            return cached
+
+        ret: List[Tuple[uint32, bytes32, bytes]] = []
+        if self.db_wrapper.db_version == 2:
+            async with self.db_wrapper.read_db() as conn:
+                async with conn.execute(
+                    "SELECT height, header_hash, block FROM full_blocks INDEXED BY main_chain "
+                    "WHERE height>=? AND height<=? AND in_main_chain=1 ORDER BY height",
+                    (start_height, end_height),
+                ) as cursor:
+                    for row in await cursor.fetchall():
+                        ret.append((uint32(row[0]), bytes32(row[1]), zstd.decompress(row[2])))
+            if len(ret) == end_height - start_height + 1:
+                self.range_cache.put((start_height, end_height), ret)
+        else:
+            async with self.db_wrapper.read_db() as conn:
+                async with conn.execute(
+                    "SELECT height, header_hash, block FROM full_blocks WHERE height>=? AND height<=? ORDER BY height",
+                    (start_height, end_height),
+                ) as cursor:
+                    for row in await cursor.fetchall():
+                        ret.append((uint32(row[0]), bytes32(bytes.fromhex(row[1])), row[2]))
+        return ret
+
     async def get_generator(self, header_hash: bytes32) -> Optional[SerializedProgram]:
 
         cached = self.block_cache.get(header_hash)
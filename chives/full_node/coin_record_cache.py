@@ -0,0 +1,149 @@
+import dataclasses
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.types.coin_record import CoinRecord
+from chives.util.ints import uint32
+
+# Approximate memory used by one cached coin record, including the coin, its key and the bookkeeping in this class.
+# Measured with tracemalloc on CPython 3.9.
+COIN_RECORD_CACHE_ENTRY_BYTES = 1000
+
+
+@dataclasses.dataclass
+class CoinRecordCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return 0.0 if lookups == 0 else self.hits / lookups
+
+
+class CoinRecordCache:
+    """
+    LRU cache of CoinRecords by coin name, used by the CoinStore to avoid database lookups for recently added or
+    queried coins. Cached records are indexed by the height they were confirmed and spent at, so rolling back the
+    chain only has to touch the records affected by the rollback, rather than scanning the whole cache.
+
+    Every write to the coin store starts a new generation. Records read from the database are only cached with
+    `put_read` if no write happened since the read started, since the read may not have seen that write.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.cache: "OrderedDict[bytes32, CoinRecord]" = OrderedDict()
+        self.stats = CoinRecordCacheStats()
+        self._confirmed_at: Dict[uint32, Set[bytes32]] = {}
+        self._spent_at: Dict[uint32, Set[bytes32]] = {}
+        self.generation = 0
+
+    @classmethod
+    def from_memory_budget(cls, max_bytes: int) -> "CoinRecordCache":
+        return cls(max(0, max_bytes // COIN_RECORD_CACHE_ENTRY_BYTES))
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def _index(self, name: bytes32, record: CoinRecord) -> None:
+        self._confirmed_at.setdefault(record.confirmed_block_index, set()).add(name)
+        if record.spent_block_index != 0:
+            self._spent_at.setdefault(record.spent_block_index, set()).add(name)
+
+    def _unindex(self, name: bytes32, record: CoinRecord) -> None:
+        for index, height in (
+            (self._confirmed_at, record.confirmed_block_index),
+            (self._spent_at, record.spent_block_index),
+        ):
+            names = index.get(height)
+            if names is None:
+                continue
+            names.discard(name)
+            if len(names) == 0:
+                del index[height]
+
+    def peek(self, name: bytes32) -> Optional[CoinRecord]:
+        """
+        Returns the cached record without counting the lookup or refreshing its position in the LRU order.
+        """
+        return self.cache.get(name)
+
+    def get(self, name: bytes32) -> Optional[CoinRecord]:
+        record = self.cache.get(name)
+        if record is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self.cache.move_to_end(name)
+        return record
+
+    def get_many(self, names: Iterable[bytes32]) -> Tuple[Dict[bytes32, CoinRecord], List[bytes32]]:
+        """
+        Returns the cached records, and the names that are not in the cache.
+        """
+        found: Dict[bytes32, CoinRecord] = {}
+        missing: List[bytes32] = []
+        for name in names:
+            record = self.get(name)
+            if record is None:
+                missing.append(name)
+            else:
+                found[name] = record
+        return found, missing
+
+    def put(self, name: bytes32, record: CoinRecord) -> None:
+        if self.capacity <= 0:
+            return
+        old = self.cache.get(name)
+        if old is not None:
+            self._unindex(name, old)
+        self.cache[name] = record
+        self.cache.move_to_end(name)
+        self._index(name, record)
+        while len(self.cache) > self.capacity:
+            evicted_name, evicted = self.cache.popitem(last=False)
+            self._unindex(evicted_name, evicted)
+            self.stats.evictions += 1
+
+    def new_generation(self) -> None:
+        self.generation += 1
+
+    def put_read(self, name: bytes32, record: CoinRecord, generation: Optional[int]) -> None:
+        """
+        Caches a record read from the database by a read that started at `generation`. The record is dropped if the
+        coin store was written to since then, or if `generation` is None.
+        """
+        if generation is not None and generation == self.generation:
+            self.put(name, record)
+
+    def remove(self, name: bytes32) -> None:
+        record = self.cache.pop(name)
+        self._unindex(name, record)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self.cache.clear()
+        self._confirmed_at.clear()
+        self._spent_at.clear()
+
+    def rollback(self, block_index: int) -> None:
+        """
+        Brings the cached records in line with rolling back the chain to `block_index`: coins confirmed after it
+        are dropped, and coins spent after it become unspent again.
+        """
+        self.generation += 1
+        for height in [h for h in self._confirmed_at.keys() if h > block_index]:
+            for name in list(self._confirmed_at.get(height, ())):
+                self.remove(name)
+
+        for height in [h for h in self._spent_at.keys() if h > block_index]:
+            for name in list(self._spent_at.get(height, ())):
+                record = self.cache[name]
+                self._unindex(name, record)
+                record = CoinRecord(
+                    record.coin, record.confirmed_block_index, uint32(0), record.coinbase, record.timestamp
+                )
+                self.cache[name] = record
+                self._index(name, record)
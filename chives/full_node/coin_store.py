@@ -2,13 +2,13 @@ from typing import List, Optional, Set, Dict, Any, Tuple
 
 from aiosqlite import Cursor
 
+from chives.full_node.coin_record_cache import CoinRecordCache
 from chives.protocols.wallet_protocol import CoinState
 from chives.types.blockchain_format.coin import Coin
 from chives.types.blockchain_format.sized_bytes import bytes32
 from chives.types.coin_record import CoinRecord
 from chives.util.db_wrapper import DBWrapper2
 from chives.util.ints import uint32, uint64
-from chives.util.lru_cache import LRUCache
 from chives.util.chunks import chunks
 import time
 import logging
@@ -24,15 +24,28 @@ class CoinStore:
     A cache is maintained for quicker access to recent coins.
     """
 
-    coin_record_cache: LRUCache
+    coin_record_cache: CoinRecordCache
     cache_size: uint32
     db_wrapper: DBWrapper2
 
     @classmethod
-    async def create(cls, db_wrapper: DBWrapper2, cache_size: uint32 = uint32(60000)):
+    async def create(
+        cls,
+        db_wrapper: DBWrapper2,
+        cache_size: uint32 = uint32(60000),
+        cache_memory_budget: Optional[int] = None,
+    ):
+        """
+        The coin record cache holds `cache_size` records, unless `cache_memory_budget` (in bytes) is specified, in
+        which case it's sized to fit in that much memory instead.
+        """
         self = cls()
 
-        self.cache_size = cache_size
+        if cache_memory_budget is not None:
+            self.coin_record_cache = CoinRecordCache.from_memory_budget(cache_memory_budget)
+        else:
+            self.coin_record_cache = CoinRecordCache(cache_size)
+        self.cache_size = uint32(self.coin_record_cache.capacity)
         self.db_wrapper = db_wrapper
 
         async with self.db_wrapper.write_db() as conn:
@@ -81,7 +94,6 @@ class CoinStore:
 
             await conn.execute("CREATE INDEX IF NOT EXISTS coin_parent_index on coin_record(coin_parent)")
 
-        self.coin_record_cache = LRUCache(cache_size)
         return self
 
     async def num_unspent(self) -> int:
@@ -146,8 +158,19 @@ class CoinStore:
             )
             additions.append(reward_coin_r)
 
-        await self._add_coin_records(additions)
-        await self._set_spent(tx_removals, height)
+        # Coins that are created and spent in this same block are inserted as spent right away, instead of
+        # inserting them and then updating them again
+        removals: Set[bytes32] = set(tx_removals)
+        ephemeral: Set[bytes32] = set()
+        records_to_add: List[CoinRecord] = []
+        for record in additions:
+            if record.name in removals:
+                ephemeral.add(record.name)
+                record = CoinRecord(record.coin, height, height, record.coinbase, timestamp)
+            records_to_add.append(record)
+
+        await self._add_coin_records(records_to_add)
+        await self._set_spent([name for name in tx_removals if name not in ephemeral], height)
 
         end = time.monotonic()
         log.log(
@@ -159,12 +182,23 @@ class CoinStore:
 
         return additions
 
+    def _read_generation(self) -> Optional[int]:
+        """
+        The cache generation to pass to `put_read` for a read that starts now, or None if the records read can't be
+        cached. Reads don't see the uncommitted changes of a write transaction of another task (for instance a whole
+        sync batch), so caching what they return could keep a coin unspent in the cache after it was spent.
+        """
+        if self.db_wrapper.writer_in_other_task():
+            return None
+        return self.coin_record_cache.generation
+
     # Checks DB and DiffStores for CoinRecord with coin_name and returns it
     async def get_coin_record(self, coin_name: bytes32) -> Optional[CoinRecord]:
         cached = self.coin_record_cache.get(coin_name)
         if cached is not None:
             return cached
 
+        generation = self._read_generation()
         async with self.db_wrapper.read_db() as conn:
             async with conn.execute(
                 "SELECT confirmed_index, spent_index, coinbase, puzzle_hash, "
@@ -175,7 +209,7 @@ class CoinStore:
                 if row is not None:
                     coin = self.row_to_coin(row)
                     record = CoinRecord(coin, row[0], row[1], row[2], row[6])
-                    self.coin_record_cache.put(record.coin.name(), record)
+                    self.coin_record_cache.put_read(record.coin.name(), record, generation)
                     return record
         return None
 
@@ -268,6 +302,52 @@ class CoinStore:
                     coins.add(CoinRecord(coin, row[0], row[1], row[2], row[6]))
                 return list(coins)
 
+    async def get_coin_records_by_puzzle_hashes_paginated(
+        self,
+        include_spent_coins: bool,
+        puzzle_hashes: List[bytes32],
+        max_items: int,
+        last_id: Optional[Tuple[bytes32, int]] = None,
+        start_height: uint32 = uint32(0),
+        end_height: uint32 = uint32((2 ** 32) - 1),
+    ) -> Tuple[List[CoinRecord], Optional[Tuple[bytes32, int]]]:
+        """
+        Returns up to `max_items` coin records of the puzzle hashes, after `last_id`, and the `last_id` to continue
+        from (None if there are no more records). The records are ordered by puzzle hash, and then by the order they
+        were added in. That is the order of the puzzle hash index, so every page is a range scan of the index, and
+        paging through all coins of a puzzle hash takes linear time in total.
+        """
+        if max_items <= 0:
+            raise ValueError(f"max_items must be positive, got {max_items}")
+        coin_records: List[CoinRecord] = []
+        async with self.db_wrapper.read_db() as conn:
+            for puzzle_hash in sorted(set(puzzle_hashes)):
+                if last_id is not None and puzzle_hash < last_id[0]:
+                    continue
+                # the rowid is the position in the puzzle hash index, after the puzzle hash itself
+                after_rowid = last_id[1] if last_id is not None and puzzle_hash == last_id[0] else -(2 ** 63)
+                async with conn.execute(
+                    f"SELECT rowid, confirmed_index, spent_index, coinbase, puzzle_hash, "
+                    f"coin_parent, amount, timestamp FROM coin_record INDEXED BY coin_puzzle_hash WHERE puzzle_hash=? "
+                    f"AND rowid>? AND confirmed_index>=? AND confirmed_index<? "
+                    f"{'' if include_spent_coins else 'AND spent_index=0'} ORDER BY rowid LIMIT ?",
+                    (
+                        self.maybe_to_hex(puzzle_hash),
+                        after_rowid,
+                        start_height,
+                        end_height,
+                        max_items - len(coin_records),
+                    ),
+                ) as cursor:
+                    rows = list(await cursor.fetchall())
+
+                for row in rows:
+                    coin = self.row_to_coin(row[1:])
+                    coin_records.append(CoinRecord(coin, row[1], row[2], row[3], row[7]))
+                if len(coin_records) >= max_items:
+                    return coin_records, (puzzle_hash, rows[-1][0])
+        return coin_records, None
+
     async def get_coin_records_by_names(
         self,
         include_spent_coins: bool,
@@ -278,26 +358,36 @@ class CoinStore:
         if len(names) == 0:
             return []
 
-        coins = set()
-        names_db: Tuple[Any, ...]
-        if self.db_wrapper.db_version == 2:
-            names_db = tuple(names)
-        else:
-            names_db = tuple([name.hex() for name in names])
+        coins: Set[CoinRecord] = set()
+        cached, names = self.coin_record_cache.get_many(names)
+        for record in cached.values():
+            if start_height <= record.confirmed_block_index < end_height and (include_spent_coins or not record.spent):
+                coins.add(record)
+        if len(names) == 0:
+            return list(coins)
 
+        generation = self._read_generation()
         async with self.db_wrapper.read_db() as conn:
-            async with conn.execute(
-                f"SELECT confirmed_index, spent_index, coinbase, puzzle_hash, "
-                f"coin_parent, amount, timestamp FROM coin_record INDEXED BY sqlite_autoindex_coin_record_1 "
-                f'WHERE coin_name in ({"?," * (len(names) - 1)}?) '
-                f"AND confirmed_index>=? AND confirmed_index<? "
-                f"{'' if include_spent_coins else 'AND spent_index=0'}",
-                names_db + (start_height, end_height),
-            ) as cursor:
+            for batch in chunks(names, MAX_SQLITE_PARAMETERS):
+                names_db: Tuple[Any, ...]
+                if self.db_wrapper.db_version == 2:
+                    names_db = tuple(batch)
+                else:
+                    names_db = tuple([name.hex() for name in batch])
+                async with conn.execute(
+                    f"SELECT confirmed_index, spent_index, coinbase, puzzle_hash, "
+                    f"coin_parent, amount, timestamp FROM coin_record INDEXED BY sqlite_autoindex_coin_record_1 "
+                    f'WHERE coin_name in ({"?," * (len(batch) - 1)}?) '
+                    f"AND confirmed_index>=? AND confirmed_index<? "
+                    f"{'' if include_spent_coins else 'AND spent_index=0'}",
+                    names_db + (start_height, end_height),
+                ) as cursor:
 
-                for row in await cursor.fetchall():
-                    coin = self.row_to_coin(row)
-                    coins.add(CoinRecord(coin, row[0], row[1], row[2], row[6]))
+                    for row in await cursor.fetchall():
+                        coin = self.row_to_coin(row)
+                        record = CoinRecord(coin, row[0], row[1], row[2], row[6])
+                        self.coin_record_cache.put_read(record.name, record, generation)
+                        coins.add(record)
 
         return list(coins)
 
@@ -386,6 +476,20 @@ class CoinStore:
             return []
 
         coins = set()
+        cached, coin_ids = self.coin_record_cache.get_many(coin_ids)
+        for record in cached.values():
+            if record.confirmed_block_index < min_height and record.spent_block_index < min_height:
+                continue
+            if include_spent_coins or not record.spent:
+                coins.add(
+                    CoinState(
+                        record.coin, record.spent_block_index if record.spent else None, record.confirmed_block_index
+                    )
+                )
+        if len(coin_ids) == 0:
+            return list(coins)
+
+        generation = self._read_generation()
         async with self.db_wrapper.read_db() as conn:
             for ids in chunks(coin_ids, MAX_SQLITE_PARAMETERS):
                 coin_ids_db: Tuple[Any, ...]
@@ -401,31 +505,26 @@ class CoinStore:
                     coin_ids_db + (min_height, min_height),
                 ) as cursor:
                     async for row in cursor:
+                        coin = self.row_to_coin(row)
+                        record = CoinRecord(coin, row[0], row[1], row[2], row[6])
+                        self.coin_record_cache.put_read(record.name, record, generation)
                         coins.add(self.row_to_coin_state(row))
         return list(coins)
 
+    def clear_cache(self) -> None:
+        """
+        Drops all cached coin records. Used when a database transaction that modified the coin store is rolled back,
+        and the cache may hold changes that never made it to the database.
+        """
+        self.coin_record_cache.clear()
+
     async def rollback_to_block(self, block_index: int) -> List[CoinRecord]:
         """
         Note that block_index can be negative, in which case everything is rolled back
         Returns the list of coin records that have been modified
         """
         # Update memory cache
-        delete_queue: List[bytes32] = []
-        for coin_name, coin_record in list(self.coin_record_cache.cache.items()):
-            if int(coin_record.spent_block_index) > block_index:
-                new_record = CoinRecord(
-                    coin_record.coin,
-                    coin_record.confirmed_block_index,
-                    uint32(0),
-                    coin_record.coinbase,
-                    coin_record.timestamp,
-                )
-                self.coin_record_cache.put(coin_record.coin.name(), new_record)
-            if int(coin_record.confirmed_block_index) > block_index:
-                delete_queue.append(coin_name)
-
-        for coin_name in delete_queue:
-            self.coin_record_cache.remove(coin_name)
+        self.coin_record_cache.rollback(block_index)
 
         coin_changes: Dict[bytes32, CoinRecord] = {}
         async with self.db_wrapper.write_db() as conn:
@@ -463,6 +562,7 @@ class CoinStore:
 
     # Store CoinRecord in DB and ram cache
     async def _add_coin_records(self, records: List[CoinRecord]) -> None:
+        self.coin_record_cache.new_generation()
 
         if self.db_wrapper.db_version == 2:
             values2 = []
@@ -514,10 +614,11 @@ class CoinStore:
     async def _set_spent(self, coin_names: List[bytes32], index: uint32):
 
         assert len(coin_names) == 0 or index > 0
+        self.coin_record_cache.new_generation()
         # if this coin is in the cache, mark it as spent in there
         updates = []
         for coin_name in coin_names:
-            r = self.coin_record_cache.get(coin_name)
+            r = self.coin_record_cache.peek(coin_name)
             if r is not None:
                 if r.spent_block_index != uint32(0):
                     raise ValueError(f"Coin already spent in cache: {coin_name}")
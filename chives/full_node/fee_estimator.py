@@ -0,0 +1,139 @@
+import math
+from typing import Collection, Dict, List, Optional, Tuple
+
+from chives.full_node.fee_rate_index import FeeRateIndex
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.util.ints import uint32, uint64
+
+# Fee rate buckets, in mojo per cost. The first bucket holds the transactions without fees, the rest are spaced
+# exponentially, so the estimates are accurate to within 20%
+FEE_RATE_BUCKETS: List[float] = [0.0] + [1.2 ** i for i in range(64)]
+
+# The longest confirmation target (in transaction blocks) that is tracked
+MAX_TARGET_BLOCKS = 64
+
+# Every transaction block, the history is multiplied by this factor, so old blocks count less. The half life of a
+# data point is about 350 transaction blocks, or 5 hours
+DECAY = 0.998
+
+# A fee rate is considered sufficient for a target if at least this fraction of the transactions paying at least
+# that much was confirmed within the target
+SUCCESS_THRESHOLD = 0.85
+
+# The minimum (decayed) number of transactions a fee rate range needs before an estimate is based on it
+MIN_SAMPLES = 2.0
+
+# The average time between transaction blocks, until we measured it ourselves
+DEFAULT_TRANSACTION_BLOCK_SECONDS = 52.0
+
+
+def fee_rate_bucket(fee_per_cost: float) -> int:
+    if fee_per_cost < 1.0:
+        return 0
+    return min(len(FEE_RATE_BUCKETS) - 1, 1 + int(math.log(fee_per_cost, 1.2)))
+
+
+class FeeEstimator:
+    """
+    Estimates the fee per cost a transaction needs in order to be included in a block within a target time. It
+    combines two sources:
+     - history: for every fee rate bucket, how many transactions that entered our mempool were confirmed within
+       how many transaction blocks. This is updated with every new peak, and decays over time.
+     - the current mempool: the cost of the transactions that pay more than a fee rate, compared with the cost
+       that fits in the blocks until the target.
+    The estimate for a target is the higher of the two.
+    """
+
+    def __init__(self, block_cost_capacity: int):
+        self.block_cost_capacity = block_cost_capacity
+        self.transaction_block_seconds = DEFAULT_TRANSACTION_BLOCK_SECONDS
+        # spend bundle name -> (fee rate bucket, peak height when it entered the mempool)
+        self._tracked: Dict[bytes32, Tuple[int, uint32]] = {}
+        # decayed number of transactions per fee rate bucket, that were confirmed after waiting i + 1 blocks
+        self._confirmed: List[List[float]] = [[0.0] * MAX_TARGET_BLOCKS for _ in FEE_RATE_BUCKETS]
+        # decayed number of transactions per fee rate bucket, that left the mempool (confirmed or not)
+        self._resolved: List[float] = [0.0] * len(FEE_RATE_BUCKETS)
+        self._last_block: Optional[Tuple[uint32, uint64]] = None
+
+    def add_item(self, name: bytes32, fee_per_cost: float, height: uint32) -> None:
+        if name not in self._tracked:
+            self._tracked[name] = (fee_rate_bucket(fee_per_cost), height)
+
+    def new_block(
+        self,
+        height: uint32,
+        timestamp: uint64,
+        confirmed: Optional[Collection[bytes32]],
+        in_mempool: Collection[bytes32],
+        undetermined: Collection[bytes32] = (),
+    ) -> None:
+        """
+        Called for every new transaction block peak, after the mempool was updated. `confirmed` are the mempool items
+        that were included in the chain by this peak, or None if that is not known (e.g. after a reorg). Tracked items
+        that are no longer in the mempool, and were not confirmed, count as not confirmed within any target, except
+        the `undetermined` ones, which may or may not have been included by this peak and are not counted at all.
+        """
+        if self._last_block is not None:
+            last_height, last_timestamp = self._last_block
+            if height > last_height and timestamp > last_timestamp:
+                seconds = float(timestamp - last_timestamp)
+                self.transaction_block_seconds = 0.95 * self.transaction_block_seconds + 0.05 * seconds
+        self._last_block = (height, timestamp)
+
+        for counts in self._confirmed:
+            for i in range(MAX_TARGET_BLOCKS):
+                counts[i] *= DECAY
+        for bucket in range(len(self._resolved)):
+            self._resolved[bucket] *= DECAY
+
+        for name in [name for name in self._tracked.keys() if name not in in_mempool]:
+            bucket, added_height = self._tracked.pop(name)
+            if confirmed is None or name in undetermined:
+                continue
+            self._resolved[bucket] += 1
+            if name in confirmed:
+                waited = max(1, height - added_height)
+                if waited <= MAX_TARGET_BLOCKS:
+                    self._confirmed[bucket][waited - 1] += 1
+
+    def target_blocks(self, target_seconds: int) -> int:
+        return max(1, min(MAX_TARGET_BLOCKS, int(target_seconds / self.transaction_block_seconds)))
+
+    def estimate_from_history(self, target_blocks: int) -> Optional[float]:
+        """
+        Returns the lowest fee rate bucket for which the transactions paying at least that much were (almost always)
+        confirmed within `target_blocks`, or None if there is not enough history.
+        """
+        target_blocks = max(1, min(MAX_TARGET_BLOCKS, target_blocks))
+        estimate: Optional[float] = None
+        confirmed = 0.0
+        resolved = 0.0
+        # group buckets, from the highest fee rate down, until there are enough samples to judge them
+        for bucket in reversed(range(len(FEE_RATE_BUCKETS))):
+            confirmed += sum(self._confirmed[bucket][:target_blocks])
+            resolved += self._resolved[bucket]
+            if resolved < MIN_SAMPLES:
+                continue
+            if confirmed / resolved < SUCCESS_THRESHOLD:
+                break
+            estimate = FEE_RATE_BUCKETS[bucket]
+            confirmed = 0.0
+            resolved = 0.0
+        return estimate
+
+    def estimate_from_mempool(self, fee_rate_index: FeeRateIndex, target_blocks: int, cost: int) -> float:
+        """
+        Returns the lowest fee rate bucket for which the transactions in the mempool paying more, plus a transaction
+        of `cost`, fit in `target_blocks` blocks.
+        """
+        capacity = target_blocks * self.block_cost_capacity
+        for fee_rate in FEE_RATE_BUCKETS:
+            if fee_rate_index.cost_above(fee_rate) + cost <= capacity:
+                return fee_rate
+        return FEE_RATE_BUCKETS[-1]
+
+    def estimate(self, fee_rate_index: FeeRateIndex, target_seconds: int, cost: int = 0) -> float:
+        target_blocks = self.target_blocks(target_seconds)
+        from_mempool = self.estimate_from_mempool(fee_rate_index, target_blocks, cost)
+        from_history = self.estimate_from_history(target_blocks)
+        return max(from_mempool, from_history or 0.0)
@@ -0,0 +1,163 @@
+import random
+from typing import Optional, Tuple
+
+from chives.types.blockchain_format.sized_bytes import bytes32
+
+# items are ordered by fee per cost, ties are broken by spend bundle name
+FeeRateKey = Tuple[float, bytes32]
+
+# the node priorities don't need to be reproducible, and should not disturb users of the global random generator
+_priorities = random.Random()
+
+
+class _Node:
+    __slots__ = ("key", "cost", "total_cost", "priority", "left", "right")
+
+    def __init__(self, key: FeeRateKey, cost: int):
+        self.key = key
+        self.cost = cost
+        self.total_cost = cost
+        self.priority = _priorities.random()
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+
+    def update(self) -> None:
+        self.total_cost = self.cost
+        if self.left is not None:
+            self.total_cost += self.left.total_cost
+        if self.right is not None:
+            self.total_cost += self.right.total_cost
+
+
+def _total(node: Optional[_Node]) -> int:
+    return 0 if node is None else node.total_cost
+
+
+def _split(node: Optional[_Node], key: FeeRateKey) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """
+    Splits the tree into the nodes with a key lower than `key`, and the rest.
+    """
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        node.update()
+        return node, right
+    left, node.left = _split(node.left, key)
+    node.update()
+    return left, node
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    """
+    Merges two trees, where all keys in `left` are lower than all keys in `right`.
+    """
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.update()
+        return left
+    right.left = _merge(left, right.left)
+    right.update()
+    return right
+
+
+class FeeRateIndex:
+    """
+    Keeps the cost of the mempool items ordered by fee per cost, in a treap where every node also holds the total
+    cost of its subtree. This answers cumulative cost queries (how much cost is below or above a certain fee rate)
+    in O(log n), instead of walking over all items.
+    """
+
+    def __init__(self) -> None:
+        self._root: Optional[_Node] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def total_cost(self) -> int:
+        return _total(self._root)
+
+    def add(self, key: FeeRateKey, cost: int) -> None:
+        new_node = _Node(key, cost)
+        # walk down to where the new node belongs by priority, every node on the way gets it in its subtree
+        parent: Optional[_Node] = None
+        node = self._root
+        while node is not None and node.priority > new_node.priority:
+            node.total_cost += cost
+            parent = node
+            node = node.left if key < node.key else node.right
+        new_node.left, new_node.right = _split(node, key)
+        new_node.update()
+        if parent is None:
+            self._root = new_node
+        elif key < parent.key:
+            parent.left = new_node
+        else:
+            parent.right = new_node
+        self._size += 1
+
+    def remove(self, key: FeeRateKey) -> None:
+        node = self._root
+        while node is not None and node.key != key:
+            node = node.left if key < node.key else node.right
+        if node is None:
+            raise KeyError(key)
+        cost = node.cost
+
+        parent: Optional[_Node] = None
+        node = self._root
+        assert node is not None
+        while node.key != key:
+            node.total_cost -= cost
+            parent = node
+            child = node.left if key < node.key else node.right
+            assert child is not None
+            node = child
+        replacement = _merge(node.left, node.right)
+        if parent is None:
+            self._root = replacement
+        elif parent.left is node:
+            parent.left = replacement
+        else:
+            parent.right = replacement
+        self._size -= 1
+
+    def lowest_fee_rate_freeing(self, cost: int) -> Optional[float]:
+        """
+        Returns the fee per cost of the item at which the cumulative cost of the items, from the lowest fee per cost
+        up, reaches `cost`. That is the fee rate to beat in order to free up `cost` by evicting items. Returns None if
+        all items together don't add up to `cost`.
+        """
+        if cost > self.total_cost:
+            return None
+        node = self._root
+        while node is not None:
+            left_cost = _total(node.left)
+            if cost <= left_cost:
+                node = node.left
+            elif cost <= left_cost + node.cost:
+                return node.key[0]
+            else:
+                cost -= left_cost + node.cost
+                node = node.right
+        return None
+
+    def cost_above(self, fee_per_cost: float) -> int:
+        """
+        Returns the total cost of the items with a fee per cost strictly higher than `fee_per_cost`.
+        """
+        total = 0
+        node = self._root
+        while node is not None:
+            if node.key[0] > fee_per_cost:
+                total += node.cost + _total(node.right)
+                node = node.left
+            else:
+                node = node.right
+        return total
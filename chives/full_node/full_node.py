@@ -8,7 +8,7 @@ import random
 import time
 import traceback
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
 
 import aiosqlite
 import sqlite3
@@ -25,6 +25,7 @@ from chives.consensus.difficulty_adjustment import get_next_sub_slot_iters_and_d
 from chives.consensus.make_sub_epoch_summary import next_sub_epoch_summary
 from chives.consensus.multiprocess_validation import PreValidationResult
 from chives.consensus.pot_iterations import calculate_sp_iters
+from chives.full_node.block_download import BlockDownloadScheduler
 from chives.full_node.block_store import BlockStore
 from chives.full_node.lock_queue import LockQueue, LockClient
 from chives.full_node.bundle_tools import detect_potential_template_generator
@@ -33,13 +34,14 @@ from chives.full_node.full_node_store import FullNodeStore, FullNodeStorePeakRes
 from chives.full_node.hint_store import HintStore
 from chives.full_node.mempool_manager import MempoolManager
 from chives.full_node.signage_point import SignagePoint
+from chives.full_node.speculative_validation import pre_validate_speculatively
+from chives.full_node.subscriptions import PeerSubscriptions
 from chives.full_node.sync_store import SyncStore
 from chives.full_node.weight_proof import WeightProofHandler
 from chives.protocols import farmer_protocol, full_node_protocol, timelord_protocol, wallet_protocol
 from chives.protocols.full_node_protocol import (
     RequestBlocks,
     RespondBlock,
-    RespondBlocks,
     RespondSignagePoint,
 )
 from chives.protocols.protocol_message_types import ProtocolMessageTypes
@@ -69,7 +71,9 @@ from chives.util.condition_tools import pkm_pairs
 from chives.util.config import PEER_DB_PATH_KEY_DEPRECATED, process_config_start_method
 from chives.util.db_wrapper import DBWrapper2
 from chives.util.errors import ConsensusError, Err, ValidationError
+from chives.util.generator_tools import get_block_header
 from chives.util.ints import uint8, uint32, uint64, uint128
+from chives.util.lru_cache import LRUCache
 from chives.util.path import mkdir, path_from_root
 from chives.util.safe_cancel_task import cancel_task_safe
 from chives.util.profiler import profile_task
@@ -77,6 +81,9 @@ from datetime import datetime
 from chives.util.db_synchronous import db_synchronous_on
 from chives.util.db_version import lookup_db_version, set_db_version_async
 
+# The number of recent blocks of which the header block, as served to wallets, is kept in memory
+HEADER_BLOCK_CACHE_SIZE = 1000
+
 
 class FullNode:
     block_store: BlockStore
@@ -127,6 +134,8 @@ class FullNode:
         self.full_node_store = FullNodeStore(self.constants)
         self.uncompact_task = None
         self.compact_vdf_requests: Set[bytes32] = set()
+        # header hash -> (height, serialized header block) of main chain blocks
+        self.header_block_cache = LRUCache(HEADER_BLOCK_CACHE_SIZE)
         self.log = logging.getLogger(name if name else __name__)
 
         # TODO: Logging isn't setup yet so the log entries related to parsing the
@@ -141,11 +150,9 @@ class FullNode:
 
         db_path_replaced: str = config["database_path"].replace("CHALLENGE", config["selected_network"])
         self.db_path = path_from_root(root_path, db_path_replaced)
-        self.coin_subscriptions: Dict[bytes32, Set[bytes32]] = {}  # Puzzle Hash : Set[Peer ID]
-        self.ph_subscriptions: Dict[bytes32, Set[bytes32]] = {}  # Puzzle Hash : Set[Peer ID]
-        self.peer_coin_ids: Dict[bytes32, Set[bytes32]] = {}  # Peer ID: Set[Coin ids]
-        self.peer_puzzle_hash: Dict[bytes32, Set[bytes32]] = {}  # Peer ID: Set[puzzle_hash]
-        self.peer_sub_counter: Dict[bytes32, int] = {}  # Peer ID: int (subscription count)
+        self.subscriptions = PeerSubscriptions()
+        # The last of the chained tasks which send messages to wallets, see queue_wallet_messages
+        self._wallet_messages_task: Optional[asyncio.Task] = None
         mkdir(self.db_path.parent)
         self._transaction_queue_task = None
 
@@ -210,8 +217,10 @@ class FullNode:
 
         self.block_store = await BlockStore.create(self.db_wrapper)
         self.sync_store = await SyncStore.create()
-        self.hint_store = await HintStore.create(self.db_wrapper)
-        self.coin_store = await CoinStore.create(self.db_wrapper)
+        self.hint_store = await HintStore.create(self.db_wrapper, use_filter=self.config.get("hint_filter", True))
+        self.coin_store = await CoinStore.create(
+            self.db_wrapper, cache_memory_budget=self.config.get("coin_record_cache_mb", 64) * 1024 * 1024
+        )
         self.log.info("Initializing blockchain from disk")
         start_time = time.time()
         reserved_cores = self.config.get("reserved_cores", 0)
@@ -228,11 +237,18 @@ class FullNode:
             multiprocessing_context=self.multiprocessing_context,
             single_threaded=single_threaded,
         )
+        mempool_validation_workers = self.config.get("mempool_validation_workers", 0)
+        if mempool_validation_workers <= 0:
+            cpu_count = multiprocessing.cpu_count()
+            if cpu_count > 61:
+                cpu_count = 61  # Windows Server 2016 has an issue https://bugs.python.org/issue26903
+            mempool_validation_workers = max(cpu_count - reserved_cores, 1)
         self.mempool_manager = MempoolManager(
             coin_store=self.coin_store,
             consensus_constants=self.constants,
             multiprocessing_context=self.multiprocessing_context,
             single_threaded=single_threaded,
+            validation_workers=mempool_validation_workers,
         )
 
         # Blocks are validated under high priority, and transactions under low priority. This guarantees blocks will
@@ -272,14 +288,14 @@ class FullNode:
                 f"time taken: {int(time_taken)}s"
             )
             async with self._blockchain_lock_high_priority:
-                pending_tx = await self.mempool_manager.new_peak(self.blockchain.get_peak(), [])
+                pending_tx = await self.mempool_manager.new_peak(self.blockchain.get_peak(), None)
             assert len(pending_tx) == 0  # no pending transactions when starting up
 
         peak: Optional[BlockRecord] = self.blockchain.get_peak()
         if peak is not None:
             full_peak = await self.blockchain.get_full_peak()
             mempool_new_peak_result, fns_peak_result = await self.peak_post_processing(
-                full_peak, peak, max(peak.height - 1, 0), None, []
+                full_peak, peak, max(peak.height - 1, 0), None, None
             )
             await self.peak_post_processing_2(
                 full_peak, peak, max(peak.height - 1, 0), None, ([], {}), mempool_new_peak_result, fns_peak_result
@@ -303,7 +319,9 @@ class FullNode:
     async def _handle_one_transaction(self, entry: TransactionQueueEntry):
         peer = entry.peer
         try:
-            inc_status, err = await self.respond_transaction(entry.transaction, entry.spend_name, peer, entry.test)
+            inc_status, err = await self.respond_transaction(
+                entry.transaction, entry.spend_name, peer, entry.test, entry.transaction_bytes
+            )
             self.transaction_responses.append((entry.spend_name, inc_status, err))
             if len(self.transaction_responses) > 50:
                 self.transaction_responses = self.transaction_responses[1:]
@@ -735,23 +753,7 @@ class FullNode:
 
     def remove_subscriptions(self, peer: ws.WSChivesConnection):
         # Remove all ph | coin id subscription for this peer
-        node_id = peer.peer_node_id
-        if node_id in self.peer_puzzle_hash:
-            puzzle_hashes = self.peer_puzzle_hash[node_id]
-            for ph in puzzle_hashes:
-                if ph in self.ph_subscriptions:
-                    if node_id in self.ph_subscriptions[ph]:
-                        self.ph_subscriptions[ph].remove(node_id)
-
-        if node_id in self.peer_coin_ids:
-            coin_ids = self.peer_coin_ids[node_id]
-            for coin_id in coin_ids:
-                if coin_id in self.coin_subscriptions:
-                    if node_id in self.coin_subscriptions[coin_id]:
-                        self.coin_subscriptions[coin_id].remove(node_id)
-
-        if peer.peer_node_id in self.peer_sub_counter:
-            self.peer_sub_counter.pop(peer.peer_node_id)
+        self.subscriptions.remove_peer(peer.peer_node_id)
 
     def _num_needed_peers(self) -> int:
         assert self.server is not None
@@ -777,6 +779,8 @@ class FullNode:
             self.uncompact_task.cancel()
         if self._transaction_queue_task is not None:
             self._transaction_queue_task.cancel()
+        if self._wallet_messages_task is not None:
+            self._wallet_messages_task.cancel()
         if hasattr(self, "_blockchain_lock_queue"):
             self._blockchain_lock_queue.close()
         cancel_task_safe(task=self._sync_task, log=self.log)
@@ -942,64 +946,88 @@ class FullNode:
         )
         batch_size = self.constants.MAX_BLOCK_COUNT_PER_REQUESTS
 
-        async def fetch_block_batches(batch_queue, peers_with_peak: List[ws.WSChivesConnection]):
+        async def fetch_block_batches(batch_queue):
+            # keeps several requests in flight across all peers with the peak, and queues the batches in height order
+            scheduler = BlockDownloadScheduler(
+                fork_point_height,
+                target_peak_sb_height,
+                batch_size,
+                lambda: self.get_peers_with_peak(peak_hash),
+                window=self.config.get("sync_block_requests_in_flight", 8),
+                max_in_flight_per_peer=self.config.get("sync_block_requests_per_peer", 2),
+                peers_changed=self.sync_store.peers_changed,
+            )
             try:
-                for start_height in range(fork_point_height, target_peak_sb_height, batch_size):
-                    end_height = min(target_peak_sb_height, start_height + batch_size)
-                    request = RequestBlocks(uint32(start_height), uint32(end_height), True)
-                    fetched = False
-                    for peer in random.sample(peers_with_peak, len(peers_with_peak)):
-                        if peer.closed:
-                            peers_with_peak.remove(peer)
-                            continue
-                        response = await peer.request_blocks(request, timeout=30)
-                        if response is None:
-                            await peer.close()
-                            peers_with_peak.remove(peer)
-                        elif isinstance(response, RespondBlocks):
-                            await batch_queue.put((peer, response.blocks))
-                            fetched = True
-                            break
-                    if fetched is False:
-                        self.log.error(f"failed fetching {start_height} to {end_height} from peers")
-                        await batch_queue.put(None)
-                        return
-                    if self.sync_store.peers_changed.is_set():
-                        peers_with_peak = self.get_peers_with_peak(peak_hash)
-                        self.sync_store.peers_changed.clear()
+                await scheduler.fetch(batch_queue)
             except Exception as e:
-                self.log.error(f"Exception fetching {start_height} to {end_height} from peer {e}")
-            finally:
-                # finished signal with None
-                await batch_queue.put(None)
+                self.log.error(f"Exception fetching blocks from peers {e}")
 
         async def validate_block_batches(batch_queue):
             advanced_peak = False
-            while True:
-                res = await batch_queue.get()
-                if res is None:
-                    self.log.debug("done fetching blocks")
-                    return
-                peer, blocks = res
-                start_height = blocks[0].height
-                end_height = blocks[-1].height
-                success, advanced_peak, fork_height, coin_states = await self.receive_block_batch(
-                    blocks, peer, None if advanced_peak else uint32(fork_point_height), summaries
-                )
-                if success is False:
-                    if peer in peers_with_peak:
-                        peers_with_peak.remove(peer)
-                    await peer.close(600)
-                    raise ValueError(f"Failed to validate block batch {start_height} to {end_height}")
-                self.log.info(f"Added blocks {start_height} to {end_height}")
-                peak = self.blockchain.get_peak()
-                if len(coin_states) > 0 and fork_height is not None:
-                    await self.update_wallets(peak.height, fork_height, peak.header_hash, coin_states)
-                await self.send_peak_to_wallets()
-                self.blockchain.clean_block_record(end_height - self.constants.BLOCKS_CACHE_SIZE)
+            pipelined = self.config.get("sync_pipelined_pre_validation", True)
+            # pre-validation of the next batch, running while the current batch is added to the chain
+            speculation: Optional[asyncio.Task] = None
+            res = await batch_queue.get()
+            try:
+                while res is not None:
+                    peer, blocks = res
+                    start_height = blocks[0].height
+                    end_height = blocks[-1].height
+                    pre_validated: Optional[Dict[bytes32, PreValidationResult]] = None
+                    if speculation is not None:
+                        pre_validated = await speculation
+                        speculation = None
+
+                    has_next = False
+                    if pipelined:
+                        try:
+                            next_res = batch_queue.get_nowait()
+                            has_next = True
+                        except asyncio.QueueEmpty:
+                            pass
+                    blocks_to_validate = self.blocks_to_validate(blocks)
+                    peak = self.blockchain.get_peak()
+                    if (
+                        has_next
+                        and next_res is not None
+                        and len(blocks_to_validate) > 0
+                        and peak is not None
+                        and blocks_to_validate[0].prev_header_hash == peak.header_hash
+                    ):
+                        if pre_validated is None:
+                            results = await self.pre_validate_block_batch(blocks_to_validate, summaries)
+                            pre_validated = {block.header_hash: r for block, r in zip(blocks_to_validate, results)}
+                        results = [pre_validated.get(block.header_hash) for block in blocks_to_validate]
+                        if all(r is not None and r.error is None for r in results):
+                            speculation = asyncio.create_task(
+                                self.pre_validate_next_block_batch(blocks_to_validate, results, next_res[1], summaries)
+                            )
+
+                    success, advanced_peak, fork_height, coin_states = await self.receive_block_batch(
+                        blocks, peer, None if advanced_peak else uint32(fork_point_height), summaries, pre_validated
+                    )
+                    if success is False:
+                        await peer.close(600)
+                        raise ValueError(f"Failed to validate block batch {start_height} to {end_height}")
+                    self.log.info(f"Added blocks {start_height} to {end_height}")
+                    # the mempool is only updated once the sync is done, without the coin changes of the batches
+                    self.mempool_manager.coin_changes_unknown()
+                    if speculation is not None and not self.speculation_applies(blocks):
+                        speculation.cancel()
+                        speculation = None
+                    peak = self.blockchain.get_peak()
+                    if len(coin_states) > 0 and fork_height is not None:
+                        await self.update_wallets(peak.height, fork_height, peak.header_hash, coin_states)
+                    self.queue_wallet_messages(self.send_peak_to_wallets())
+                    self.blockchain.clean_block_record(end_height - self.constants.BLOCKS_CACHE_SIZE)
+                    res = next_res if has_next else await batch_queue.get()
+            finally:
+                if speculation is not None:
+                    speculation.cancel()
+            self.log.debug("done fetching blocks")
 
         batch_queue: asyncio.Queue[Tuple[ws.WSChivesConnection, List[FullBlock]]] = asyncio.Queue(maxsize=buffer_size)
-        fetch_task = asyncio.Task(fetch_block_batches(batch_queue, peers_with_peak))
+        fetch_task = asyncio.Task(fetch_block_batches(batch_queue))
         validate_task = asyncio.Task(validate_block_batches(batch_queue))
         try:
             await asyncio.gather(fetch_task, validate_task)
@@ -1034,48 +1062,45 @@ class FullNode:
         peak_hash: bytes32,
         state_update: Tuple[List[CoinRecord], Dict[bytes, Dict[bytes32, CoinRecord]]],
     ):
-        changes_for_peer: Dict[bytes32, Set[CoinState]] = {}
-
+        """
+        Notifies the wallets of the changes to the coins and puzzle hashes they subscribed to. The changes for every
+        wallet are looked up right away, the messages are built and sent in the background (see
+        queue_wallet_messages), so processing the peak does not wait for them.
+        """
         states, hint_state = state_update
+        changes_for_peer: Dict[bytes32, Set[CoinState]] = self.subscriptions.changes_for_peers(states, hint_state)
+        if len(changes_for_peer) == 0:
+            return
+
+        async def send_updates() -> None:
+            for peer, changes in changes_for_peer.items():
+                ws_peer: Optional[ws.WSChivesConnection] = self.server.all_connections.get(peer)
+                if ws_peer is None:
+                    continue
+                state = CoinStateUpdate(height, fork_height, peak_hash, list(changes))
+                msg = make_msg(ProtocolMessageTypes.coin_state_update, state)
+                await ws_peer.send_message(msg)
+                # let other tasks run between the (possibly large) updates
+                await asyncio.sleep(0)
+
+        self.queue_wallet_messages(send_updates())
+
+    def queue_wallet_messages(self, send: Awaitable[Any]) -> None:
+        """
+        Runs `send` in the background, after all sends queued before it. Wallets get the coin state updates and new
+        peaks in the order in which the peaks were processed.
+        """
+        previous = self._wallet_messages_task
 
-        for coin_record in states:
-            if coin_record.name in self.coin_subscriptions:
-                subscribed_peers = self.coin_subscriptions[coin_record.name]
-                for peer in subscribed_peers:
-                    if peer not in changes_for_peer:
-                        changes_for_peer[peer] = set()
-                    changes_for_peer[peer].add(coin_record.coin_state)
-
-            if coin_record.coin.puzzle_hash in self.ph_subscriptions:
-                subscribed_peers = self.ph_subscriptions[coin_record.coin.puzzle_hash]
-                for peer in subscribed_peers:
-                    if peer not in changes_for_peer:
-                        changes_for_peer[peer] = set()
-                    changes_for_peer[peer].add(coin_record.coin_state)
-
-        # This is just a verification that the assumptions justifying the ignore below
-        # are valid.
-        hint: bytes
-        for hint, records in hint_state.items():
-            # While `hint` is typed as a `bytes`, and this is locally verified
-            # immediately above, if it has length 32 then it might match an entry in
-            # `self.ph_subscriptions`.  It is unclear if there is a more proper means
-            # of handling this situation.
-            subscribed_peers = self.ph_subscriptions.get(hint)  # type: ignore[call-overload]
-            if subscribed_peers is not None:
-                for peer in subscribed_peers:
-                    if peer not in changes_for_peer:
-                        changes_for_peer[peer] = set()
-                    for record in records.values():
-                        changes_for_peer[peer].add(record.coin_state)
-
-        for peer, changes in changes_for_peer.items():
-            if peer not in self.server.all_connections:
-                continue
-            ws_peer: ws.WSChivesConnection = self.server.all_connections[peer]
-            state = CoinStateUpdate(height, fork_height, peak_hash, list(changes))
-            msg = make_msg(ProtocolMessageTypes.coin_state_update, state)
-            await ws_peer.send_message(msg)
+        async def run() -> None:
+            if previous is not None:
+                await asyncio.wait([previous])
+            try:
+                await send
+            except Exception as e:
+                self.log.error(f"Exception sending messages to wallets: {e} {traceback.format_exc()}")
+
+        self._wallet_messages_task = asyncio.create_task(run())
 
     async def receive_block_batch(
         self,
@@ -1083,32 +1108,20 @@ class FullNode:
         peer: ws.WSChivesConnection,
         fork_point: Optional[uint32],
         wp_summaries: Optional[List[SubEpochSummary]] = None,
+        pre_validated: Optional[Dict[bytes32, PreValidationResult]] = None,
     ) -> Tuple[bool, bool, Optional[uint32], Tuple[List[CoinRecord], Dict[bytes, Dict[bytes32, CoinRecord]]]]:
         advanced_peak = False
         fork_height: Optional[uint32] = uint32(0)
 
-        blocks_to_validate: List[FullBlock] = []
-        for i, block in enumerate(all_blocks):
-            if not self.blockchain.contains_block(block.header_hash):
-                blocks_to_validate = all_blocks[i:]
-                break
+        blocks_to_validate = self.blocks_to_validate(all_blocks)
         if len(blocks_to_validate) == 0:
             return True, False, fork_height, ([], {})
 
-        # Validates signatures in multiprocessing since they take a while, and we don't have cached transactions
-        # for these blocks (unlike during normal operation where we validate one at a time)
         pre_validate_start = time.monotonic()
-        pre_validation_results: List[PreValidationResult] = await self.blockchain.pre_validate_blocks_multiprocessing(
-            blocks_to_validate, {}, wp_summaries=wp_summaries, validate_signatures=True
-        )
-        pre_validate_end = time.monotonic()
-        pre_validate_time = pre_validate_end - pre_validate_start
-
-        self.log.log(
-            logging.WARNING if pre_validate_time > 10 else logging.DEBUG,
-            f"Block pre-validation time: {pre_validate_end - pre_validate_start:0.2f} seconds "
-            f"({len(blocks_to_validate)} blocks, start height: {blocks_to_validate[0].height})",
-        )
+        if pre_validated is not None and all(block.header_hash in pre_validated for block in blocks_to_validate):
+            pre_validation_results = [pre_validated[block.header_hash] for block in blocks_to_validate]
+        else:
+            pre_validation_results = await self.pre_validate_block_batch(blocks_to_validate, wp_summaries)
         for i, block in enumerate(blocks_to_validate):
             if pre_validation_results[i].error is not None:
                 self.log.error(
@@ -1120,32 +1133,48 @@ class FullNode:
         all_coin_changes: Dict[bytes32, CoinRecord] = {}
         all_hint_changes: Dict[bytes, Dict[bytes32, CoinRecord]] = {}
 
-        for i, block in enumerate(blocks_to_validate):
-            assert pre_validation_results[i].required_iters is not None
-            result, error, fork_height, coin_changes = await self.blockchain.receive_block(
-                block, pre_validation_results[i], None if advanced_peak else fork_point
-            )
-            coin_record_list, hint_records = coin_changes
-
-            # Update all changes
-            for record in coin_record_list:
-                all_coin_changes[record.name] = record
-            for hint, list_of_records in hint_records.items():
-                if hint not in all_hint_changes:
-                    all_hint_changes[hint] = {}
-                for record in list_of_records.values():
-                    all_hint_changes[hint][record.name] = record
-
-            if result == ReceiveBlockResult.NEW_PEAK:
-                advanced_peak = True
-            elif result == ReceiveBlockResult.INVALID_BLOCK or result == ReceiveBlockResult.DISCONNECTED_BLOCK:
-                if error is not None:
-                    self.log.error(f"Error: {error}, Invalid block from peer: {peer.get_peer_logging()} ")
-                return False, advanced_peak, fork_height, ([], {})
-            block_record = self.blockchain.block_record(block.header_hash)
-            if block_record.sub_epoch_summary_included is not None:
-                if self.weight_proof_handler is not None:
-                    await self.weight_proof_handler.create_prev_sub_epoch_segments()
+        # All blocks of the batch are written in a single transaction, instead of committing (and syncing to disk)
+        # once per block. Each block still gets its own savepoint, so a failing block is rolled back on its own.
+        add_error: Optional[BaseException] = None
+        async with self.block_store.db_wrapper.write_db():
+            try:
+                for i, block in enumerate(blocks_to_validate):
+                    assert pre_validation_results[i].required_iters is not None
+                    result, error, fork_height, coin_changes = await self.blockchain.receive_block(
+                        block, pre_validation_results[i], None if advanced_peak else fork_point
+                    )
+                    coin_record_list, hint_records = coin_changes
+
+                    # Update all changes
+                    for record in coin_record_list:
+                        all_coin_changes[record.name] = record
+                    for hint, list_of_records in hint_records.items():
+                        if hint not in all_hint_changes:
+                            all_hint_changes[hint] = {}
+                        for record in list_of_records.values():
+                            all_hint_changes[hint][record.name] = record
+
+                    if result == ReceiveBlockResult.NEW_PEAK:
+                        advanced_peak = True
+                    elif result == ReceiveBlockResult.INVALID_BLOCK or result == ReceiveBlockResult.DISCONNECTED_BLOCK:
+                        if error is not None:
+                            self.log.error(f"Error: {error}, Invalid block from peer: {peer.get_peer_logging()} ")
+                        if advanced_peak:
+                            # the peak moved, but the caller won't pass on the coin changes
+                            self.mempool_manager.coin_changes_unknown()
+                        return False, advanced_peak, fork_height, ([], {})
+                    block_record = self.blockchain.block_record(block.header_hash)
+                    if block_record.sub_epoch_summary_included is not None:
+                        if self.weight_proof_handler is not None:
+                            await self.weight_proof_handler.create_prev_sub_epoch_segments()
+            except BaseException as e:
+                # the blocks added before the failure are already part of the in-memory state of the blockchain,
+                # so the transaction must be committed rather than rolled back
+                add_error = e
+                if advanced_peak:
+                    self.mempool_manager.coin_changes_unknown()
+        if add_error is not None:
+            raise add_error
         if advanced_peak:
             self._state_changed("new_peak")
             self.log.debug(
@@ -1154,6 +1183,80 @@ class FullNode:
             )
         return True, advanced_peak, fork_height, (list(all_coin_changes.values()), all_hint_changes)
 
+    def blocks_to_validate(self, all_blocks: List[FullBlock]) -> List[FullBlock]:
+        """
+        Returns the blocks of the batch, starting from the first one that is not in the blockchain yet.
+        """
+        for i, block in enumerate(all_blocks):
+            if not self.blockchain.contains_block(block.header_hash):
+                return all_blocks[i:]
+        return []
+
+    async def pre_validate_block_batch(
+        self, blocks_to_validate: List[FullBlock], wp_summaries: Optional[List[SubEpochSummary]] = None
+    ) -> List[PreValidationResult]:
+        # Validates signatures in multiprocessing since they take a while, and we don't have cached transactions
+        # for these blocks (unlike during normal operation where we validate one at a time)
+        pre_validate_start = time.monotonic()
+        pre_validation_results: List[PreValidationResult] = await self.blockchain.pre_validate_blocks_multiprocessing(
+            blocks_to_validate, {}, wp_summaries=wp_summaries, validate_signatures=True
+        )
+        pre_validate_end = time.monotonic()
+        pre_validate_time = pre_validate_end - pre_validate_start
+
+        self.log.log(
+            logging.WARNING if pre_validate_time > 10 else logging.DEBUG,
+            f"Block pre-validation time: {pre_validate_end - pre_validate_start:0.2f} seconds "
+            f"({len(blocks_to_validate)} blocks, start height: {blocks_to_validate[0].height})",
+        )
+        return pre_validation_results
+
+    def speculation_applies(self, pending_blocks: List[FullBlock]) -> bool:
+        """
+        Whether the pre-validation of the batch after `pending_blocks` (see pre_validate_next_block_batch) can be used,
+        once they were added. If they did not all become the main chain, the next batch was validated against the
+        wrong chain, and has to be pre-validated again.
+        """
+        peak = self.blockchain.get_peak()
+        return peak is not None and peak.header_hash == pending_blocks[-1].header_hash
+
+    async def pre_validate_next_block_batch(
+        self,
+        pending_blocks: List[FullBlock],
+        pending_results: List[PreValidationResult],
+        next_blocks: List[FullBlock],
+        wp_summaries: Optional[List[SubEpochSummary]] = None,
+    ) -> Optional[Dict[bytes32, PreValidationResult]]:
+        """
+        Pre-validates the next batch of a long sync while `pending_blocks` are still being added to the chain,
+        assuming they all end up in the main chain. Returns None if this did not work out, in which case the batch
+        is pre-validated again the regular way once it is its turn.
+        """
+        pending_hashes = {block.header_hash for block in pending_blocks}
+        next_blocks = [
+            block
+            for block in next_blocks
+            if block.header_hash not in pending_hashes and not self.blockchain.contains_block(block.header_hash)
+        ]
+        if len(next_blocks) == 0:
+            return None
+        try:
+            pre_validate_start = time.monotonic()
+            results = await pre_validate_speculatively(
+                self.blockchain, pending_blocks, pending_results, next_blocks, wp_summaries
+            )
+            self.log.debug(
+                f"Speculative block pre-validation time: {time.monotonic() - pre_validate_start:0.2f} seconds "
+                f"({len(next_blocks)} blocks, start height: {next_blocks[0].height})"
+            )
+        except Exception as e:
+            self.log.warning(f"Speculative pre-validation of blocks failed, will retry: {e}")
+            return None
+        if any(result.error is not None for result in results):
+            # let the regular path report the error, with the actual chain state
+            return None
+        return {block.header_hash: result for block, result in zip(next_blocks, results)}
+
     async def _finish_sync(self):
         """
         Finalize sync by setting sync mode to False, clearing all sync information, and adding any final
@@ -1173,7 +1276,7 @@ class FullNode:
             peak_fb: FullBlock = await self.blockchain.get_full_peak()
             if peak is not None:
                 mempool_new_peak_result, fns_peak_result = await self.peak_post_processing(
-                    peak_fb, peak, max(peak.height - 1, 0), None, []
+                    peak_fb, peak, max(peak.height - 1, 0), None, None
                 )
 
                 await self.peak_post_processing_2(
@@ -1264,11 +1367,12 @@ class FullNode:
         record: BlockRecord,
         fork_height: uint32,
         peer: Optional[ws.WSChivesConnection],
-        coin_changes: List[CoinRecord],
+        coin_changes: Optional[List[CoinRecord]],
     ):
         """
         Must be called under self.blockchain.lock. This updates the internal state of the full node with the
-        latest peak information. It also notifies peers about the new peak.
+        latest peak information. It also notifies peers about the new peak. coin_changes are the coin records
+        changed since the previous peak, or None if they are not known.
         """
         difficulty = self.blockchain.get_next_difficulty(record.header_hash, False)
         sub_slot_iters = self.blockchain.get_next_slot_iters(record.header_hash, False)
@@ -1288,6 +1392,13 @@ class FullNode:
             f"{len(block.transactions_generator_ref_list) if block.transactions_generator else 'No tx'}"
         )
 
+        cache_stats = self.coin_store.coin_record_cache.stats
+        self.log.debug(
+            f"Coin record cache: {len(self.coin_store.coin_record_cache)} records, "
+            f"hit rate: {cache_stats.hit_rate():.2%}, hits: {cache_stats.hits}, misses: {cache_stats.misses}, "
+            f"evictions: {cache_stats.evictions}"
+        )
+
         sub_slots = await self.blockchain.get_sp_and_ip_sub_slots(record.header_hash)
         assert sub_slots is not None
 
@@ -1300,6 +1411,11 @@ class FullNode:
             fork_hash: Optional[bytes32] = self.blockchain.height_to_hash(fork_height)
             assert fork_hash is not None
             fork_block = self.blockchain.block_record(fork_hash)
+            self.rollback_header_block_cache(fork_height)
+
+        if not self.sync_store.get_sync_mode():
+            header_block = await self.get_header_block(block)
+            self.header_block_cache.put(record.header_hash, (record.height, bytes(header_block)))
 
         fns_peak_result: FullNodeStorePeakResult = self.full_node_store.new_peak(
             record,
@@ -1352,6 +1468,25 @@ class FullNode:
                 self.full_node_store.previous_generator = generator_arg
         return mempool_new_peak_result, fns_peak_result
 
+    async def get_header_block(self, block: FullBlock) -> HeaderBlock:
+        """
+        Returns the header block of a main chain block, with the filter of its additions and removals, as it is sent
+        to wallets.
+        """
+        added_coins_records = await self.coin_store.get_coins_added_at_height(block.height)
+        removed_coins_records = await self.coin_store.get_coins_removed_at_height(block.height)
+        added_coins = [record.coin for record in added_coins_records if not record.coinbase]
+        removal_names = [record.coin.name() for record in removed_coins_records]
+        return get_block_header(block, added_coins, removal_names)
+
+    def rollback_header_block_cache(self, fork_height: uint32) -> None:
+        """
+        Drops the cached header blocks above `fork_height`, these blocks are no longer in the main chain.
+        """
+        for header_hash, (height, _) in list(self.header_block_cache.cache.items()):
+            if height > fork_height:
+                self.header_block_cache.remove(header_hash)
+
     async def peak_post_processing_2(
         self,
         block: FullBlock,
@@ -1429,7 +1564,7 @@ class FullNode:
             ),
         )
         await self.update_wallets(record.height, fork_height, record.header_hash, coin_changes)
-        await self.server.send_to_all([msg], NodeType.WALLET)
+        self.queue_wallet_messages(self.server.send_to_all([msg], NodeType.WALLET))
         self._state_changed("new_peak")
 
     async def respond_block(
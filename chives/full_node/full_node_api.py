@@ -333,39 +333,23 @@ class FullNodeAPI:
                 msg = make_msg(ProtocolMessageTypes.reject_blocks, reject)
                 return msg
 
+        blocks_bytes: Optional[List[bytes]] = await self._main_chain_block_bytes(
+            uint32(request.start_height), uint32(request.end_height)
+        )
+        if blocks_bytes is None:
+            reject = RejectBlocks(request.start_height, request.end_height)
+            return make_msg(ProtocolMessageTypes.reject_blocks, reject)
+
         if not request.include_transaction_block:
             blocks: List[FullBlock] = []
-            for i in range(request.start_height, request.end_height + 1):
-                header_hash_i: Optional[bytes32] = self.full_node.blockchain.height_to_hash(uint32(i))
-                if header_hash_i is None:
-                    reject = RejectBlocks(request.start_height, request.end_height)
-                    return make_msg(ProtocolMessageTypes.reject_blocks, reject)
-
-                block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(header_hash_i)
-                if block is None:
-                    reject = RejectBlocks(request.start_height, request.end_height)
-                    return make_msg(ProtocolMessageTypes.reject_blocks, reject)
-                block = dataclasses.replace(block, transactions_generator=None)
+            for block_bytes in blocks_bytes:
+                block = dataclasses.replace(FullBlock.from_bytes(block_bytes), transactions_generator=None)
                 blocks.append(block)
             msg = make_msg(
                 ProtocolMessageTypes.respond_blocks,
                 full_node_protocol.RespondBlocks(request.start_height, request.end_height, blocks),
             )
         else:
-            blocks_bytes: List[bytes] = []
-            for i in range(request.start_height, request.end_height + 1):
-                header_hash_i = self.full_node.blockchain.height_to_hash(uint32(i))
-                if header_hash_i is None:
-                    reject = RejectBlocks(request.start_height, request.end_height)
-                    return make_msg(ProtocolMessageTypes.reject_blocks, reject)
-                block_bytes: Optional[bytes] = await self.full_node.block_store.get_full_block_bytes(header_hash_i)
-                if block_bytes is None:
-                    reject = RejectBlocks(request.start_height, request.end_height)
-                    msg = make_msg(ProtocolMessageTypes.reject_blocks, reject)
-                    return msg
-
-                blocks_bytes.append(block_bytes)
-
             respond_blocks_manually_streamed: bytes = (
                 bytes(uint32(request.start_height))
                 + bytes(uint32(request.end_height))
@@ -377,6 +361,24 @@ class FullNodeAPI:
 
         return msg
 
+    async def _main_chain_block_bytes(self, start_height: uint32, end_height: uint32) -> Optional[List[bytes]]:
+        """
+        Returns the serialized main chain blocks from `start_height` up to and including `end_height`, read with a
+        single range query, or None if any of them is not in the main chain (anymore).
+        """
+        for _ in range(2):
+            blocks = await self.full_node.block_store.get_full_block_bytes_in_range(start_height, end_height)
+            by_height: Dict[uint32, bytes] = {
+                height: block_bytes
+                for height, header_hash, block_bytes in blocks
+                if self.full_node.blockchain.height_to_hash(height) == header_hash
+            }
+            if len(by_height) == end_height - start_height + 1:
+                return [by_height[uint32(height)] for height in range(start_height, end_height + 1)]
+            # the range may have been cached just before a reorg was committed
+            self.full_node.block_store.rollback_cache_range(start_height, end_height)
+        return None
+
     @api_request
     async def reject_block(self, request: full_node_protocol.RejectBlock):
         self.log.debug(f"reject_block {request.height}")
@@ -1322,29 +1324,42 @@ class FullNodeAPI:
         if request.end_height < request.start_height or request.end_height - request.start_height > 32:
             return None
 
-        header_hashes: List[bytes32] = []
+        # Recent blocks are served straight from the serialized header blocks in the cache
+        header_blocks_bytes: List[bytes] = []
         for i in range(request.start_height, request.end_height + 1):
             header_hash: Optional[bytes32] = self.full_node.blockchain.height_to_hash(uint32(i))
-            if header_hash is None:
+            cached: Optional[Tuple[uint32, bytes]] = (
+                None if header_hash is None else self.full_node.header_block_cache.get(header_hash)
+            )
+            if cached is None:
+                break
+            header_blocks_bytes.append(cached[1])
+
+        if len(header_blocks_bytes) != request.end_height - request.start_height + 1:
+            blocks_bytes: Optional[List[bytes]] = await self._main_chain_block_bytes(
+                uint32(request.start_height), uint32(request.end_height)
+            )
+            if blocks_bytes is None:
                 reject = RejectHeaderBlocks(request.start_height, request.end_height)
                 msg = make_msg(ProtocolMessageTypes.reject_header_blocks, reject)
                 return msg
-            header_hashes.append(header_hash)
-
-        blocks: List[FullBlock] = await self.full_node.block_store.get_blocks_by_hash(header_hashes)
-        header_blocks = []
-        for block in blocks:
-            added_coins_records = await self.full_node.coin_store.get_coins_added_at_height(block.height)
-            removed_coins_records = await self.full_node.coin_store.get_coins_removed_at_height(block.height)
-            added_coins = [record.coin for record in added_coins_records if not record.coinbase]
-            removal_names = [record.coin.name() for record in removed_coins_records]
-            header_block = get_block_header(block, added_coins, removal_names)
-            header_blocks.append(header_block)
 
-        msg = make_msg(
-            ProtocolMessageTypes.respond_header_blocks,
-            wallet_protocol.RespondHeaderBlocks(request.start_height, request.end_height, header_blocks),
+            header_blocks_bytes = []
+            for block_bytes in blocks_bytes:
+                block = FullBlock.from_bytes(block_bytes)
+                header_block_bytes = bytes(await self.full_node.get_header_block(block))
+                if self.full_node.blockchain.height_to_hash(block.height) == block.header_hash:
+                    # Not cached if the block left the main chain while its coins were looked up
+                    self.full_node.header_block_cache.put(block.header_hash, (block.height, header_block_bytes))
+                header_blocks_bytes.append(header_block_bytes)
+
+        respond_header_blocks_manually_streamed: bytes = (
+            bytes(uint32(request.start_height))
+            + bytes(uint32(request.end_height))
+            + len(header_blocks_bytes).to_bytes(4, "big", signed=False)
+            + b"".join(header_blocks_bytes)
         )
+        msg = make_msg(ProtocolMessageTypes.respond_header_blocks, respond_header_blocks_manually_streamed)
         return msg
 
     @api_request
@@ -1401,27 +1416,11 @@ class FullNodeAPI:
     async def register_interest_in_puzzle_hash(
         self, request: wallet_protocol.RegisterForPhUpdates, peer: ws.WSChivesConnection
     ):
-        if peer.peer_node_id not in self.full_node.peer_puzzle_hash:
-            self.full_node.peer_puzzle_hash[peer.peer_node_id] = set()
-
-        if peer.peer_node_id not in self.full_node.peer_sub_counter:
-            self.full_node.peer_sub_counter[peer.peer_node_id] = 0
+        hint_coin_ids = await self.full_node.hint_store.get_coin_ids_multi(request.puzzle_hashes)
 
-        hint_coin_ids = []
         # Add peer to the "Subscribed" dictionary
         max_items = self.full_node.config.get("max_subscribe_items", 200000)
-        for puzzle_hash in request.puzzle_hashes:
-            ph_hint_coins = await self.full_node.hint_store.get_coin_ids(puzzle_hash)
-            hint_coin_ids.extend(ph_hint_coins)
-            if puzzle_hash not in self.full_node.ph_subscriptions:
-                self.full_node.ph_subscriptions[puzzle_hash] = set()
-            if (
-                peer.peer_node_id not in self.full_node.ph_subscriptions[puzzle_hash]
-                and self.full_node.peer_sub_counter[peer.peer_node_id] < max_items
-            ):
-                self.full_node.ph_subscriptions[puzzle_hash].add(peer.peer_node_id)
-                self.full_node.peer_puzzle_hash[peer.peer_node_id].add(puzzle_hash)
-                self.full_node.peer_sub_counter[peer.peer_node_id] += 1
+        self.full_node.subscriptions.add_puzzle_hashes(peer.peer_node_id, request.puzzle_hashes, max_items)
 
         # Send all coins with requested puzzle hash that have been created after the specified height
         states: List[CoinState] = await self.full_node.coin_store.get_coin_states_by_puzzle_hashes(
@@ -1443,22 +1442,8 @@ class FullNodeAPI:
     async def register_interest_in_coin(
         self, request: wallet_protocol.RegisterForCoinUpdates, peer: ws.WSChivesConnection
     ):
-        if peer.peer_node_id not in self.full_node.peer_coin_ids:
-            self.full_node.peer_coin_ids[peer.peer_node_id] = set()
-
-        if peer.peer_node_id not in self.full_node.peer_sub_counter:
-            self.full_node.peer_sub_counter[peer.peer_node_id] = 0
         max_items = self.full_node.config.get("max_subscribe_items", 200000)
-        for coin_id in request.coin_ids:
-            if coin_id not in self.full_node.coin_subscriptions:
-                self.full_node.coin_subscriptions[coin_id] = set()
-            if (
-                peer.peer_node_id not in self.full_node.coin_subscriptions[coin_id]
-                and self.full_node.peer_sub_counter[peer.peer_node_id] < max_items
-            ):
-                self.full_node.coin_subscriptions[coin_id].add(peer.peer_node_id)
-                self.full_node.peer_coin_ids[peer.peer_node_id].add(coin_id)
-                self.full_node.peer_sub_counter[peer.peer_node_id] += 1
+        self.full_node.subscriptions.add_coin_ids(peer.peer_node_id, request.coin_ids, max_items)
 
         states: List[CoinState] = await self.full_node.coin_store.get_coin_states_by_ids(
             include_spent_coins=True, coin_ids=request.coin_ids, min_height=request.min_height
@@ -1,18 +1,29 @@
-from typing import List, Tuple
+from typing import Iterable, List, Optional, Tuple
 from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.util.bloom_filter import BloomFilter
+from chives.util.chunks import chunks
 from chives.util.db_wrapper import DBWrapper2
 import logging
+import time
 
 log = logging.getLogger(__name__)
 
+MAX_SQLITE_PARAMETERS = 900
+
+# The hint filter is sized for at least this many hints, or twice the number of hints in the database
+MIN_HINT_FILTER_CAPACITY = 1000000
+
 
 class HintStore:
     db_wrapper: DBWrapper2
+    # All hints in the database, lookups of hints that are not in it skip the database. None if disabled
+    hint_filter: Optional[BloomFilter]
 
     @classmethod
-    async def create(cls, db_wrapper: DBWrapper2):
+    async def create(cls, db_wrapper: DBWrapper2, use_filter: bool = False):
         self = cls()
         self.db_wrapper = db_wrapper
+        self.hint_filter = None
 
         async with self.db_wrapper.write_db() as conn:
             if self.db_wrapper.db_version == 2:
@@ -22,9 +33,21 @@ class HintStore:
                     "CREATE TABLE IF NOT EXISTS hints(id INTEGER PRIMARY KEY AUTOINCREMENT, coin_id blob, hint blob)"
                 )
             await conn.execute("CREATE INDEX IF NOT EXISTS hint_index on hints(hint)")
+
+        if use_filter:
+            start = time.monotonic()
+            hint_filter = BloomFilter(capacity=max(MIN_HINT_FILTER_CAPACITY, 2 * await self.count_hints()))
+            async with self.db_wrapper.read_db() as conn:
+                async with conn.execute("SELECT DISTINCT hint from hints") as cursor:
+                    async for row in cursor:
+                        hint_filter.add(row[0])
+            self.hint_filter = hint_filter
+            log.info(f"Loaded {len(hint_filter)} hints into the hint filter in {time.monotonic() - start:.2f} seconds")
         return self
 
     async def get_coin_ids(self, hint: bytes) -> List[bytes32]:
+        if self.hint_filter is not None and hint not in self.hint_filter:
+            return []
         async with self.db_wrapper.read_db() as conn:
             cursor = await conn.execute("SELECT coin_id from hints WHERE hint=?", (hint,))
             rows = await cursor.fetchall()
@@ -34,7 +57,29 @@ class HintStore:
             coin_ids.append(row[0])
         return coin_ids
 
+    async def get_coin_ids_multi(self, hints: Iterable[bytes]) -> List[bytes32]:
+        """
+        Returns the coin ids hinted with any of the hints, looked up with one query per batch of hints.
+        """
+        hint_filter = self.hint_filter
+        hints_to_query = [hint for hint in hints if hint_filter is None or hint in hint_filter]
+        coin_ids: List[bytes32] = []
+        if len(hints_to_query) == 0:
+            return coin_ids
+        async with self.db_wrapper.read_db() as conn:
+            for batch in chunks(hints_to_query, MAX_SQLITE_PARAMETERS):
+                async with conn.execute(
+                    f'SELECT coin_id from hints WHERE hint in ({"?," * (len(batch) - 1)}?)', batch
+                ) as cursor:
+                    for row in await cursor.fetchall():
+                        coin_ids.append(row[0])
+        return coin_ids
+
     async def add_hints(self, coin_hint_list: List[Tuple[bytes32, bytes]]) -> None:
+        if self.hint_filter is not None:
+            # added before they are written, so a hint is never missing from the filter while it's in the database
+            for _, hint in coin_hint_list:
+                self.hint_filter.add(hint)
         async with self.db_wrapper.write_db() as conn:
             if self.db_wrapper.db_version == 2:
                 cursor = await conn.executemany(
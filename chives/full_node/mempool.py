@@ -2,6 +2,7 @@ from typing import Dict, List
 
 from sortedcontainers import SortedDict
 
+from chives.full_node.fee_rate_index import FeeRateIndex
 from chives.types.blockchain_format.coin import Coin
 from chives.types.blockchain_format.sized_bytes import bytes32
 from chives.types.mempool_item import MempoolItem
@@ -15,6 +16,8 @@ class Mempool:
         self.removals: Dict[bytes32, MempoolItem] = {}
         self.max_size_in_cost: int = max_size_in_cost
         self.total_mempool_cost: int = 0
+        # cumulative cost of the spends by fee per cost
+        self.fee_rate_index = FeeRateIndex()
 
     def get_min_fee_rate(self, cost: int) -> float:
         """
@@ -22,18 +25,15 @@ class Mempool:
         """
 
         if self.at_full_capacity(cost):
-            current_cost = self.total_mempool_cost
-
-            # Iterates through all spends in increasing fee per cost
-            for fee_per_cost, spends_with_fpc in self.sorted_spends.items():
-                for spend_name, item in spends_with_fpc.items():
-                    current_cost -= item.cost
-                    # Removing one at a time, until our transaction of size cost fits
-                    if current_cost + cost <= self.max_size_in_cost:
-                        return fee_per_cost
-            raise ValueError(
-                f"Transaction with cost {cost} does not fit in mempool of max cost {self.max_size_in_cost}"
+            # The spends with the lowest fee per cost that have to be removed for our transaction of size cost to fit
+            fee_per_cost = self.fee_rate_index.lowest_fee_rate_freeing(
+                self.total_mempool_cost + cost - self.max_size_in_cost
             )
+            if fee_per_cost is None:
+                raise ValueError(
+                    f"Transaction with cost {cost} does not fit in mempool of max cost {self.max_size_in_cost}"
+                )
+            return fee_per_cost
         else:
             return 0
 
@@ -52,6 +52,7 @@ class Mempool:
         dic = self.sorted_spends[item.fee_per_cost]
         if len(dic.values()) == 0:
             del self.sorted_spends[item.fee_per_cost]
+        self.fee_rate_index.remove((item.fee_per_cost, item.name))
         self.total_mempool_cost -= item.cost
         assert self.total_mempool_cost >= 0
 
@@ -66,7 +67,7 @@ class Mempool:
         while self.at_full_capacity(item.cost):
             # Val is Dict[hash, MempoolItem]
             fee_per_cost, val = self.sorted_spends.peekitem(index=0)
-            to_remove = list(val.values())[0]
+            to_remove = next(iter(val.values()))
             self.remove_from_pool(to_remove)
 
         self.spends[item.name] = item
@@ -81,6 +82,7 @@ class Mempool:
             self.additions[add.name()] = item
         for coin in item.removals:
             self.removals[coin.name()] = item
+        self.fee_rate_index.add((item.fee_per_cost, item.name), item.cost)
         self.total_mempool_cost += item.cost
 
     def at_full_capacity(self, cost: int) -> bool:
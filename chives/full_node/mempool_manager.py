@@ -1,12 +1,13 @@
 import asyncio
 import collections
 import logging
+import math
 from concurrent.futures import Executor
 from multiprocessing.context import BaseContext
 import time
 from concurrent.futures.process import ProcessPoolExecutor
 from chives.util.inline_executor import InlineExecutor
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from blspy import GTElement
 from chiabip158 import PyBIP158
 
@@ -16,6 +17,7 @@ from chives.consensus.constants import ConsensusConstants
 from chives.consensus.cost_calculator import NPCResult
 from chives.full_node.bundle_tools import simple_solution_generator
 from chives.full_node.coin_store import CoinStore
+from chives.full_node.fee_estimator import FeeEstimator
 from chives.full_node.mempool import Mempool
 from chives.full_node.mempool_check_conditions import get_name_puzzle_conditions
 from chives.full_node.pending_tx_cache import PendingTxCache
@@ -37,6 +39,10 @@ from chives.full_node.mempool_check_conditions import mempool_check_time_locks
 
 log = logging.getLogger(__name__)
 
+# The maximum number of transactions sent to a validation worker at once. Transactions are only batched when all
+# workers are busy, so this bounds the latency a transaction can pick up from waiting for the rest of its batch.
+MAX_VALIDATION_BATCH_SIZE = 16
+
 
 def validate_clvm_and_signature(
     spend_bundle_bytes: bytes, max_cost: int, cost_per_byte: int, additional_data: bytes
@@ -77,6 +83,18 @@ def validate_clvm_and_signature(
     return None, bytes(result), new_cache_entries
 
 
+def validate_clvm_and_signature_batch(
+    spend_bundles_bytes: List[bytes], max_cost: int, cost_per_byte: int, additional_data: bytes
+) -> List[Tuple[Optional[Err], bytes, Dict[bytes, bytes]]]:
+    """
+    Validates multiple spendbundles in one round-trip to a worker process, see validate_clvm_and_signature.
+    """
+    return [
+        validate_clvm_and_signature(spend_bundle_bytes, max_cost, cost_per_byte, additional_data)
+        for spend_bundle_bytes in spend_bundles_bytes
+    ]
+
+
 class MempoolManager:
     pool: Executor
 
@@ -87,6 +105,7 @@ class MempoolManager:
         multiprocessing_context: Optional[BaseContext] = None,
         *,
         single_threaded: bool = False,
+        validation_workers: int = 2,
     ):
         self.constants: ConsensusConstants = consensus_constants
 
@@ -109,19 +128,34 @@ class MempoolManager:
         self.seen_cache_size = 10000
         if single_threaded:
             self.pool = InlineExecutor()
+            self.validation_workers = 1
         else:
+            self.validation_workers = max(validation_workers, 1)
             self.pool = ProcessPoolExecutor(
-                max_workers=2,
+                max_workers=self.validation_workers,
                 mp_context=multiprocessing_context,
                 initializer=setproctitle,
                 initargs=(f"{getproctitle()}_worker",),
             )
 
+        # Transactions waiting for a validation worker. All concurrent pre_validate_spendbundle calls share this
+        # queue, whenever a worker is idle it takes the next batch of them.
+        self._pending_validations: List[
+            Tuple[bytes, "asyncio.Future[Tuple[Optional[Err], bytes, Dict[bytes, bytes]]]"]
+        ] = []
+        self._validation_batches_in_flight = 0
+
         # The mempool will correspond to a certain peak
         self.peak: Optional[BlockRecord] = None
         self.mempool: Mempool = Mempool(self.mempool_max_total_cost)
 
-    def shut_down(self):
+        self.fee_estimator = FeeEstimator(int(self.limit_factor * self.constants.MAX_BLOCK_COST_CLVM))
+
+        # Coin changes of the peaks that were not transaction blocks, since the last peak of the mempool. None if
+        # some of them are unknown, in which case the mempool has to be rebuilt from scratch on the next peak.
+        self._pending_coin_changes: Optional[Dict[bytes32, CoinRecord]] = {}
+
+    def shut_down(self) -> None:
         self.pool.shutdown(wait=True)
 
     async def create_bundle_from_mempool(
@@ -264,14 +298,12 @@ class MempoolManager:
         if new_spend_bytes is None:
             new_spend_bytes = bytes(new_spend)
 
-        err, cached_result_bytes, new_cache_entries = await asyncio.get_running_loop().run_in_executor(
-            self.pool,
-            validate_clvm_and_signature,
-            new_spend_bytes,
-            int(self.limit_factor * self.constants.MAX_BLOCK_COST_CLVM),
-            self.constants.COST_PER_BYTE,
-            self.constants.AGG_SIG_ME_ADDITIONAL_DATA,
+        result: "asyncio.Future[Tuple[Optional[Err], bytes, Dict[bytes, bytes]]]" = (
+            asyncio.get_running_loop().create_future()
         )
+        self._pending_validations.append((new_spend_bytes, result))
+        self._dispatch_validations()
+        err, cached_result_bytes, new_cache_entries = await result
 
         if err is not None:
             raise ValidationError(err)
@@ -282,6 +314,46 @@ class MempoolManager:
         log.debug(f"pre_validate_spendbundle took {end_time - start_time:0.4f} seconds for {spend_name}")
         return ret
 
+    def _dispatch_validations(self) -> None:
+        """
+        Hands the pending validations to the idle workers. When there are more pending transactions than idle
+        workers, they are split evenly between the idle workers, so a burst is validated in parallel, with one
+        round-trip per worker.
+        """
+        while len(self._pending_validations) > 0 and self._validation_batches_in_flight < self.validation_workers:
+            idle_workers = self.validation_workers - self._validation_batches_in_flight
+            batch_size = min(MAX_VALIDATION_BATCH_SIZE, math.ceil(len(self._pending_validations) / idle_workers))
+            batch = self._pending_validations[:batch_size]
+            del self._pending_validations[:batch_size]
+            self._validation_batches_in_flight += 1
+            asyncio.create_task(self._validate_batch(batch))
+
+    async def _validate_batch(
+        self, batch: List[Tuple[bytes, "asyncio.Future[Tuple[Optional[Err], bytes, Dict[bytes, bytes]]]"]]
+    ) -> None:
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.pool,
+                validate_clvm_and_signature_batch,
+                [spend_bundle_bytes for spend_bundle_bytes, _ in batch],
+                int(self.limit_factor * self.constants.MAX_BLOCK_COST_CLVM),
+                self.constants.COST_PER_BYTE,
+                self.constants.AGG_SIG_ME_ADDITIONAL_DATA,
+            )
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for _, future in batch:
+                if not future.done():
+                    future.cancel()
+            self._validation_batches_in_flight -= 1
+            self._dispatch_validations()
+
     async def add_spendbundle(
         self,
         new_spend: SpendBundle,
@@ -356,8 +428,12 @@ class MempoolManager:
 
         removal_record_dict: Dict[bytes32, CoinRecord] = {}
         removal_amount: int = 0
+        # look up all spent coins at once, most of them are expected to be served by the coin record cache
+        removal_records: Dict[bytes32, CoinRecord] = {
+            record.name: record for record in await self.coin_store.get_coin_records_by_names(True, removal_names)
+        }
         for name in removal_names:
-            removal_record = await self.coin_store.get_coin_record(name)
+            removal_record = removal_records.get(name)
             if removal_record is None and name not in additions_dict:
                 return None, MempoolInclusionStatus.FAILED, Err.UNKNOWN_UNSPENT
             elif name in additions_dict:
@@ -468,6 +544,7 @@ class MempoolManager:
 
         new_item = MempoolItem(new_spend, uint64(fees), npc_result, cost, spend_name, additions, removals, program)
         self.mempool.add_to_pool(new_item)
+        self.fee_estimator.add_item(spend_name, new_item.fee_per_cost, self.peak.height)
         now = time.time()
         log.log(
             logging.DEBUG,
@@ -514,41 +591,64 @@ class MempoolManager:
         return None
 
     async def new_peak(
-        self, new_peak: Optional[BlockRecord], coin_changes: List[CoinRecord]
+        self, new_peak: Optional[BlockRecord], coin_changes: Optional[List[CoinRecord]]
     ) -> List[Tuple[SpendBundle, NPCResult, bytes32]]:
         """
         Called when a new peak is available, we try to recreate a mempool for the new tip.
+        `coin_changes` are the coin records that changed since the previous peak, or None if they are not known.
         """
         if new_peak is None:
             return []
+        if coin_changes is None:
+            self._pending_coin_changes = None
+        elif self._pending_coin_changes is not None:
+            for coin_record in coin_changes:
+                self._pending_coin_changes[coin_record.name] = coin_record
         if new_peak.is_transaction_block is False:
             return []
         if self.peak == new_peak:
             return []
         assert new_peak.timestamp is not None
 
-        use_optimization: bool = self.peak is not None and new_peak.prev_transaction_block_hash == self.peak.header_hash
+        old_peak = self.peak
+        changes = self._pending_coin_changes
+        self._pending_coin_changes = {}
         self.peak = new_peak
-
-        if use_optimization:
+        # the items that were included in the new peak, if we know
+        confirmed: Optional[Set[bytes32]] = None
+        # the items that left the mempool with the new peak, but may or may not have been included in it
+        undetermined: Set[bytes32] = set()
+
+        if (
+            old_peak is not None
+            and changes is not None
+            and new_peak.prev_transaction_block_hash == old_peak.header_hash
+        ):
             # We don't reinitialize a mempool, just kick removed items
-            for coin_record in coin_changes:
+            confirmed = set()
+            for coin_record in changes.values():
                 if coin_record.name in self.mempool.removals:
                     item = self.mempool.removals[coin_record.name]
                     self.mempool.remove_from_pool(item)
                     self.remove_seen(item.spend_bundle_name)
+                    # The item was included in the block if its additions were created, rather than removed by a
+                    # conflicting spend of the same coin. An item without additions can't be told apart from a
+                    # conflicting spend
+                    if len(item.additions) == 0:
+                        undetermined.add(item.name)
+                    elif all(addition.name() in changes for addition in item.additions):
+                        confirmed.add(item.name)
+        elif old_peak is not None and changes is not None and self.time_locks_still_hold(old_peak, new_peak):
+            # A reorg. Only the items spending coins that were changed by it need to be checked again, every other
+            # item spends the same coins, with the same coin records, as before
+            await self.recheck_items_spending(changes.keys())
         else:
             old_pool = self.mempool
             self.mempool = Mempool(self.mempool_max_total_cost)
-            for item in old_pool.spends.values():
-                _, result, _ = await self.add_spendbundle(
-                    item.spend_bundle, item.npc_result, item.spend_bundle_name, item.program
-                )
-                # If the spend bundle was confirmed or conflicting (can no longer be in mempool), it won't be
-                # successfully added to the new mempool. In this case, remove it from seen, so in the case of a reorg,
-                # it can be resubmitted
-                if result != MempoolInclusionStatus.SUCCESS:
-                    self.remove_seen(item.spend_bundle_name)
+            await self.readd_items(old_pool.spends.values())
+        self.fee_estimator.new_block(
+            new_peak.height, new_peak.timestamp, confirmed, self.mempool.spends.keys(), undetermined
+        )
 
         potential_txs = self.potential_cache.drain()
         txs_added = []
@@ -564,6 +664,50 @@ class MempoolManager:
         )
         return txs_added
 
+    def coin_changes_unknown(self) -> None:
+        """
+        Called when the peak changed without passing the coin changes to new_peak. The mempool will be rebuilt from
+        scratch on the next new peak.
+        """
+        self._pending_coin_changes = None
+
+    @staticmethod
+    def time_locks_still_hold(old_peak: BlockRecord, new_peak: BlockRecord) -> bool:
+        """
+        All time locks are lower bounds on the height and timestamp of the peak, so the ones that were satisfied at
+        `old_peak` are still satisfied at `new_peak` if its height and timestamp are not lower.
+        """
+        assert old_peak.timestamp is not None and new_peak.timestamp is not None
+        old_height = old_peak.prev_transaction_block_height if not old_peak.is_transaction_block else old_peak.height
+        new_height = new_peak.prev_transaction_block_height if not new_peak.is_transaction_block else new_peak.height
+        return new_height >= old_height and new_peak.timestamp >= old_peak.timestamp
+
+    async def recheck_items_spending(self, coin_ids: Iterable[bytes32]) -> None:
+        """
+        Takes the items spending any of `coin_ids` out of the mempool, and adds them back if they are still valid.
+        The cached NPC results are reused, so the puzzles are not run again.
+        """
+        items: Dict[bytes32, MempoolItem] = {}
+        for coin_id in coin_ids:
+            item = self.mempool.removals.get(coin_id)
+            if item is not None:
+                items[item.name] = item
+        for item in items.values():
+            self.mempool.remove_from_pool(item)
+        await self.readd_items(items.values())
+        log.info(f"Re-checked {len(items)} mempool items after reorg to height {self.peak.height if self.peak else 0}")
+
+    async def readd_items(self, items: Iterable[MempoolItem]) -> None:
+        for item in items:
+            _, result, _ = await self.add_spendbundle(
+                item.spend_bundle, item.npc_result, item.spend_bundle_name, item.program
+            )
+            # If the spend bundle was confirmed or conflicting (can no longer be in mempool), it won't be
+            # successfully added to the new mempool. In this case, remove it from seen, so in the case of a reorg,
+            # it can be resubmitted
+            if result != MempoolInclusionStatus.SUCCESS:
+                self.remove_seen(item.spend_bundle_name)
+
     async def get_items_not_in_filter(self, mempool_filter: PyBIP158, limit: int = 100) -> List[MempoolItem]:
         items: List[MempoolItem] = []
         counter = 0
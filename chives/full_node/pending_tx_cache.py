@@ -26,7 +26,7 @@ class PendingTxCache:
         self._cache_cost += item.cost
 
         while self._cache_cost > self._cache_max_total_cost:
-            first_in = list(self._txs.keys())[0]
+            first_in = next(iter(self._txs.keys()))
             self._cache_cost -= self._txs[first_in].cost
             self._txs.pop(first_in)
 
@@ -0,0 +1,175 @@
+from typing import Dict, List, Optional
+
+from chives.consensus.block_record import BlockRecord
+from chives.consensus.blockchain import Blockchain
+from chives.consensus.blockchain_interface import BlockchainInterface
+from chives.consensus.full_block_to_block_record import block_to_block_record
+from chives.consensus.multiprocess_validation import PreValidationResult, pre_validate_blocks_multiprocessing
+from chives.types.block_protocol import BlockInfo
+from chives.types.blockchain_format.program import SerializedProgram
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.types.blockchain_format.sub_epoch_summary import SubEpochSummary
+from chives.types.full_block import FullBlock
+from chives.types.generator_types import BlockGenerator
+from chives.util.errors import Err
+from chives.util.ints import uint32, uint64
+
+
+class SpeculativeBlockRecords(BlockchainInterface):
+    """
+    A read-mostly view of the blockchain, extended with block records for blocks that passed pre-validation but
+    have not been added to the chain yet. It assumes those blocks will become the new peak, in order. This lets us
+    pre-validate the next batch of blocks while the current one is still being added to the chain. Nothing in here
+    modifies the underlying blockchain; records added through add_block_record only live in this view.
+    """
+
+    def __init__(self, blockchain: Blockchain, pending_blocks: List[FullBlock]):
+        self._blockchain = blockchain
+        self._records: Dict[bytes32, BlockRecord] = {}
+        self._height_to_hash: Dict[uint32, bytes32] = {}
+        self._sub_epoch_summaries: Dict[uint32, SubEpochSummary] = {}
+        self._pending_blocks: Dict[bytes32, FullBlock] = {block.header_hash: block for block in pending_blocks}
+        self._peak: Optional[BlockRecord] = None
+
+    def add_pending_block(self, block: FullBlock, required_iters: uint64) -> None:
+        """
+        Adds the record of a block that will extend the speculative peak, computed like receive_block does.
+        """
+        block_record = block_to_block_record(self._blockchain.constants, self, required_iters, block, None)
+        self._records[block_record.header_hash] = block_record
+        self._height_to_hash[block_record.height] = block_record.header_hash
+        if block_record.sub_epoch_summary_included is not None:
+            self._sub_epoch_summaries[block_record.height] = block_record.sub_epoch_summary_included
+        self._peak = block_record
+
+    def get_peak(self) -> Optional[BlockRecord]:
+        if self._peak is not None:
+            return self._peak
+        return self._blockchain.get_peak()
+
+    def get_peak_height(self) -> Optional[uint32]:
+        peak = self.get_peak()
+        return None if peak is None else peak.height
+
+    def block_record(self, header_hash: bytes32) -> BlockRecord:
+        if header_hash in self._records:
+            return self._records[header_hash]
+        return self._blockchain.block_record(header_hash)
+
+    def contains_block(self, header_hash: bytes32) -> bool:
+        return header_hash in self._records or self._blockchain.contains_block(header_hash)
+
+    def height_to_hash(self, height: uint32) -> Optional[bytes32]:
+        if height in self._height_to_hash:
+            return self._height_to_hash[height]
+        return self._blockchain.height_to_hash(height)
+
+    def contains_height(self, height: uint32) -> bool:
+        return height in self._height_to_hash or self._blockchain.contains_height(height)
+
+    def height_to_block_record(self, height: uint32) -> BlockRecord:
+        header_hash = self.height_to_hash(height)
+        if header_hash is None:
+            raise ValueError(f"Height is not in blockchain: {height}")
+        return self.block_record(header_hash)
+
+    def get_ses_heights(self) -> List[uint32]:
+        return sorted(set(self._blockchain.get_ses_heights()) | set(self._sub_epoch_summaries.keys()))
+
+    def get_ses(self, height: uint32) -> SubEpochSummary:
+        if height in self._sub_epoch_summaries:
+            return self._sub_epoch_summaries[height]
+        return self._blockchain.get_ses(height)
+
+    def add_block_record(self, block_record: BlockRecord) -> None:
+        self._records[block_record.header_hash] = block_record
+
+    def remove_block_record(self, header_hash: bytes32) -> None:
+        del self._records[header_hash]
+
+    async def get_block_generator(
+        self, block: BlockInfo, additional_blocks: Optional[Dict[bytes32, FullBlock]] = None
+    ) -> Optional[BlockGenerator]:
+        """
+        Resolves the generator references of `block` through this view. The pending blocks are not committed to the
+        database yet (they may be added in a transaction that is still open), so the generators of the blocks the
+        block builds on are taken from the blocks themselves, and only the older ones are read from the database.
+        """
+        ref_list = block.transactions_generator_ref_list
+        if block.transactions_generator is None:
+            assert len(ref_list) == 0
+            return None
+        if len(ref_list) == 0:
+            return BlockGenerator(block.transactions_generator, [], [])
+
+        blocks = dict(self._pending_blocks)
+        if additional_blocks is not None:
+            blocks.update(additional_blocks)
+        unstored: Dict[uint32, FullBlock] = {}
+        prev_hash = block.prev_header_hash
+        while prev_hash in blocks:
+            prev = blocks[prev_hash]
+            unstored[prev.height] = prev
+            prev_hash = prev.prev_header_hash
+        prev_record = self._blockchain.try_block_record(prev_hash)
+        if prev_record is None or self._blockchain.height_to_hash(prev_record.height) != prev_hash:
+            # not built on the main chain, which is the regular reorg case
+            return await self._blockchain.get_block_generator(block, blocks)
+
+        stored_heights = [height for height in ref_list if height not in unstored]
+        stored: Dict[uint32, SerializedProgram] = {}
+        block_store = self._blockchain.block_store
+        if block_store.db_wrapper.db_version == 2:
+            stored = dict(zip(stored_heights, await block_store.get_generators_at(stored_heights)))
+        else:
+            for height in stored_heights:
+                header_hash = self._blockchain.height_to_hash(height)
+                generator = None if header_hash is None else await block_store.get_generator(header_hash)
+                if generator is None:
+                    raise ValueError(Err.GENERATOR_REF_HAS_NO_GENERATOR)
+                stored[height] = generator
+
+        result: List[SerializedProgram] = []
+        for height in ref_list:
+            if height in unstored:
+                generator = unstored[height].transactions_generator
+                if generator is None:
+                    raise ValueError(Err.GENERATOR_REF_HAS_NO_GENERATOR)
+                result.append(generator)
+            else:
+                result.append(stored[height])
+        return BlockGenerator(block.transactions_generator, result, [])
+
+
+async def pre_validate_speculatively(
+    blockchain: Blockchain,
+    pending_blocks: List[FullBlock],
+    pending_results: List[PreValidationResult],
+    blocks: List[FullBlock],
+    wp_summaries: Optional[List[SubEpochSummary]] = None,
+) -> List[PreValidationResult]:
+    """
+    Pre-validates `blocks` assuming that `pending_blocks` (which passed pre-validation with `pending_results`) are
+    added to the chain first, and all become part of the main chain. The caller is responsible for only using the
+    results if that turned out to be true.
+    """
+    block_records = SpeculativeBlockRecords(blockchain, pending_blocks)
+    for block, result in zip(pending_blocks, pending_results):
+        assert result.required_iters is not None
+        if not blockchain.contains_block(block.header_hash):
+            block_records.add_pending_block(block, result.required_iters)
+
+    return await pre_validate_blocks_multiprocessing(
+        blockchain.constants,
+        blockchain.constants_json,
+        block_records,
+        blocks,
+        blockchain.pool,
+        True,
+        {},
+        block_records.get_block_generator,
+        4,
+        wp_summaries,
+        validate_signatures=True,
+        workers=blockchain.validation_workers,
+    )
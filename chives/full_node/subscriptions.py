@@ -0,0 +1,129 @@
+from typing import Dict, Iterable, List, Mapping, Optional, Set
+
+from chives.protocols.wallet_protocol import CoinState
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.types.coin_record import CoinRecord
+
+
+class PeerSubscriptions:
+    """
+    The puzzle hashes and coin ids that peers (light wallets) subscribed to. Every subscribed peer gets a small slot
+    number, and every subscribed item maps to the bit mask of the slots of its subscribers. Most items have a single
+    subscriber, for which an int is a lot smaller than a set of peer ids. The items of every peer are kept as well, so
+    all subscriptions of a peer are removed at once when it disconnects.
+    """
+
+    def __init__(self) -> None:
+        self._slots: Dict[bytes32, int] = {}  # Peer ID : slot
+        self._peer_ids: List[Optional[bytes32]] = []  # slot : Peer ID, None for free slots
+        self._ph_subscriptions: Dict[bytes32, int] = {}  # Puzzle Hash : bit mask of slots
+        self._coin_subscriptions: Dict[bytes32, int] = {}  # Coin ID : bit mask of slots
+        self._peer_puzzle_hashes: Dict[bytes32, Set[bytes32]] = {}  # Peer ID : Set[Puzzle Hash]
+        self._peer_coin_ids: Dict[bytes32, Set[bytes32]] = {}  # Peer ID : Set[Coin ID]
+
+    def _slot(self, peer_id: bytes32) -> int:
+        slot = self._slots.get(peer_id)
+        if slot is None:
+            try:
+                slot = self._peer_ids.index(None)
+            except ValueError:
+                slot = len(self._peer_ids)
+                self._peer_ids.append(None)
+            self._peer_ids[slot] = peer_id
+            self._slots[peer_id] = slot
+        return slot
+
+    def _peers(self, mask: int) -> List[bytes32]:
+        peers: List[bytes32] = []
+        while mask != 0:
+            lowest = mask & -mask
+            peer_id = self._peer_ids[lowest.bit_length() - 1]
+            assert peer_id is not None
+            peers.append(peer_id)
+            mask ^= lowest
+        return peers
+
+    def subscription_count(self, peer_id: bytes32) -> int:
+        return len(self._peer_puzzle_hashes.get(peer_id, ())) + len(self._peer_coin_ids.get(peer_id, ()))
+
+    def _add(
+        self,
+        index: Dict[bytes32, int],
+        peer_items: Dict[bytes32, Set[bytes32]],
+        peer_id: bytes32,
+        items: Iterable[bytes32],
+        max_items: int,
+    ) -> None:
+        bit = 1 << self._slot(peer_id)
+        subscribed = peer_items.setdefault(peer_id, set())
+        count = self.subscription_count(peer_id)
+        for item in items:
+            if count >= max_items:
+                break
+            if item not in subscribed:
+                subscribed.add(item)
+                index[item] = index.get(item, 0) | bit
+                count += 1
+
+    def add_puzzle_hashes(self, peer_id: bytes32, puzzle_hashes: Iterable[bytes32], max_items: int) -> None:
+        """
+        Subscribes the peer to the puzzle hashes, as long as it has fewer than `max_items` subscriptions in total.
+        """
+        self._add(self._ph_subscriptions, self._peer_puzzle_hashes, peer_id, puzzle_hashes, max_items)
+
+    def add_coin_ids(self, peer_id: bytes32, coin_ids: Iterable[bytes32], max_items: int) -> None:
+        """
+        Subscribes the peer to the coin ids, as long as it has fewer than `max_items` subscriptions in total.
+        """
+        self._add(self._coin_subscriptions, self._peer_coin_ids, peer_id, coin_ids, max_items)
+
+    def remove_peer(self, peer_id: bytes32) -> None:
+        slot = self._slots.pop(peer_id, None)
+        if slot is None:
+            return
+        bit = 1 << slot
+        for index, items in [
+            (self._ph_subscriptions, self._peer_puzzle_hashes.pop(peer_id, set())),
+            (self._coin_subscriptions, self._peer_coin_ids.pop(peer_id, set())),
+        ]:
+            for item in items:
+                mask = index.get(item, 0) & ~bit
+                if mask == 0:
+                    index.pop(item, None)
+                else:
+                    index[item] = mask
+        self._peer_ids[slot] = None
+
+    def peers_for_puzzle_hash(self, puzzle_hash: bytes32) -> List[bytes32]:
+        return self._peers(self._ph_subscriptions.get(puzzle_hash, 0))
+
+    def peers_for_coin_id(self, coin_id: bytes32) -> List[bytes32]:
+        return self._peers(self._coin_subscriptions.get(coin_id, 0))
+
+    def changes_for_peers(
+        self, coin_records: Iterable[CoinRecord], hint_records: Mapping[bytes, Mapping[bytes32, CoinRecord]]
+    ) -> Dict[bytes32, Set[CoinState]]:
+        """
+        Returns the coin states each peer has to be notified of: the changed coin records of the coins and puzzle
+        hashes it subscribed to, and of the coins hinted to the puzzle hashes it subscribed to. The records are
+        grouped by the set of their subscribers first, so every record is only looked at once.
+        """
+        changes_for_mask: Dict[int, List[CoinRecord]] = {}
+        for coin_record in coin_records:
+            mask = self._coin_subscriptions.get(coin_record.name, 0) | self._ph_subscriptions.get(
+                coin_record.coin.puzzle_hash, 0
+            )
+            if mask != 0:
+                changes_for_mask.setdefault(mask, []).append(coin_record)
+        for hint, records in hint_records.items():
+            # hints which are not 32 bytes long can't match a puzzle hash
+            mask = self._ph_subscriptions.get(hint, 0)  # type: ignore[call-overload]
+            if mask != 0:
+                changes_for_mask.setdefault(mask, []).extend(records.values())
+
+        changes_for_peer: Dict[bytes32, Set[CoinState]] = {}
+        for mask, changed_records in changes_for_mask.items():
+            coin_states = [record.coin_state for record in changed_records]
+            for peer_id in self._peers(mask):
+                changes_for_peer.setdefault(peer_id, set()).update(coin_states)
+        return changes_for_peer
@@ -0,0 +1,140 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# Upper bounds (in seconds) of the lookup latency histogram buckets, the last bucket holds everything above
+LATENCY_BUCKETS: List[float] = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0]
+
+
+class LookupKind(IntEnum):
+    """
+    The kinds of plot lookups, a lower value is served first. Full proofs are only looked up for qualities which
+    are good enough, so they are the ones that win blocks and must not wait behind the quality lookups of other plots.
+    """
+
+    full_proof = 0
+    qualities = 1
+
+
+class LatencyHistogram:
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def add(self, seconds: float) -> None:
+        bucket = 0
+        while bucket < len(LATENCY_BUCKETS) and seconds > LATENCY_BUCKETS[bucket]:
+            bucket += 1
+        self.counts[bucket] += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {
+            "buckets": LATENCY_BUCKETS,
+            "counts": list(self.counts),
+            "count": sum(self.counts),
+            "total_seconds": self.total_seconds,
+            "max_seconds": self.max_seconds,
+        }
+
+
+# (kind, sequence number, function, arguments, future), the sequence number keeps the order within a kind
+_Job = Tuple[int, int, Optional[Callable[..., Any]], Tuple[Any, ...], Optional["Future[Any]"]]
+
+
+class _DiskQueue:
+    """
+    The lookups of the plots on one device, served by a fixed number of threads in order of their kind.
+    """
+
+    def __init__(self, device: int, threads: int):
+        self.device = device
+        self.jobs: "queue.PriorityQueue[_Job]" = queue.PriorityQueue()
+        self.histograms: Dict[LookupKind, LatencyHistogram] = {kind: LatencyHistogram() for kind in LookupKind}
+        self.lock = threading.Lock()
+        self.threads = [
+            threading.Thread(target=self._run, name=f"harvester_disk_{device}_{i}", daemon=True) for i in range(threads)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def _run(self) -> None:
+        while True:
+            kind, _, function, args, future = self.jobs.get()
+            if function is None or future is None:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            start = time.monotonic()
+            try:
+                result = function(*args)
+            except BaseException as e:  # lgtm[py/catch-base-exception]
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finally:
+                with self.lock:
+                    self.histograms[LookupKind(kind)].add(time.monotonic() - start)
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "device": self.device,
+                "queued": self.jobs.qsize(),
+                "latency": {kind.name: histogram.to_json_dict() for kind, histogram in self.histograms.items()},
+            }
+
+
+class DiskScheduler:
+    """
+    Runs the blocking plot lookups with a separate, bounded set of threads for every device (`st_dev` of the plot
+    file). A slow or spun down disk only holds up the lookups of its own plots, instead of occupying the threads
+    all other disks need too.
+    """
+
+    def __init__(self, threads_per_disk: int):
+        self.threads_per_disk = max(threads_per_disk, 1)
+        self._disks: Dict[int, _DiskQueue] = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._shut_down = False
+
+    def submit(self, device: int, kind: LookupKind, function: Callable[..., Any], *args: Any) -> "Future[Any]":
+        future: "Future[Any]" = Future()
+        with self._lock:
+            if self._shut_down:
+                raise RuntimeError("disk scheduler shutting down")
+            disk = self._disks.get(device)
+            if disk is None:
+                disk = _DiskQueue(device, self.threads_per_disk)
+                self._disks[device] = disk
+                log.debug(f"Started {self.threads_per_disk} lookup threads for device {device}")
+            disk.jobs.put((int(kind), next(self._sequence), function, args, future))
+        return future
+
+    def get_disk_stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            disks = list(self._disks.values())
+        return [disk.to_json_dict() for disk in disks]
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            self._shut_down = True
+            disks = list(self._disks.values())
+        for disk in disks:
+            # the stop markers sort after all lookups that are already queued
+            for _ in disk.threads:
+                disk.jobs.put((len(LookupKind), next(self._sequence), None, (), None))
+        if wait:
+            for disk in disks:
+                for thread in disk.threads:
+                    thread.join()
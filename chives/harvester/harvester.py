@@ -1,13 +1,12 @@
 import asyncio
-import concurrent
 import dataclasses
 import logging
-from concurrent.futures.thread import ThreadPoolExecutor
 from pathlib import Path
 from typing import Callable, Dict, List, Optional, Tuple
 
 import chives.server.ws_connection as ws  # lgtm [py/import-and-import-from]
 from chives.consensus.constants import ConsensusConstants
+from chives.harvester.disk_scheduler import DiskScheduler
 from chives.plot_sync.sender import Sender
 from chives.plotting.manager import PlotManager
 from chives.plotting.util import (
@@ -29,7 +28,7 @@ class Harvester:
     plot_sync_sender: Sender
     root_path: Path
     _is_shutdown: bool
-    executor: ThreadPoolExecutor
+    disk_scheduler: DiskScheduler
     state_changed_callback: Optional[Callable]
     cached_challenges: List
     constants: ConsensusConstants
@@ -57,7 +56,16 @@ class Harvester:
         )
         self.plot_sync_sender = Sender(self.plot_manager)
         self._is_shutdown = False
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=config["num_threads"])
+        threads_per_disk: int = config.get("num_threads_per_disk", 8)
+        if "num_threads_per_disk" not in config and "num_threads" in config:
+            # `num_threads` was the size of the one thread pool shared by all disks, it only lowers the default
+            threads_per_disk = min(threads_per_disk, config["num_threads"])
+            self.log.warning(
+                "`harvester.num_threads` is deprecated. Consider replacing it with `harvester.num_threads_per_disk`, "
+                f"the number of lookup threads for every disk. Using {threads_per_disk} threads per disk for now. "
+                "See `initial-config.yaml`."
+            )
+        self.disk_scheduler = DiskScheduler(threads_per_disk=threads_per_disk)
         self.state_changed_callback = None
         self.server = None
         self.constants = constants
@@ -71,7 +79,7 @@ class Harvester:
 
     def _close(self):
         self._is_shutdown = True
-        self.executor.shutdown(wait=True)
+        self.disk_scheduler.shutdown(wait=True)
         self.plot_manager.stop_refreshing()
         self.plot_manager.reset()
         self.plot_sync_sender.stop()
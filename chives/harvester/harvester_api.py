@@ -6,6 +6,7 @@ from typing import Callable, List, Tuple
 from blspy import AugSchemeMPL, G2Element, G1Element
 
 from chives.consensus.pot_iterations import calculate_iterations_quality, calculate_sp_interval_iters
+from chives.harvester.disk_scheduler import LookupKind
 from chives.harvester.harvester import Harvester
 from chives.plotting.util import PlotInfo, parse_plot_info
 from chives.protocols import harvester_protocol
@@ -71,11 +72,11 @@ class HarvesterAPI:
         start = time.time()
         assert len(new_challenge.challenge_hash) == 32
 
-        loop = asyncio.get_running_loop()
+        disk_scheduler = self.harvester.disk_scheduler
 
-        def blocking_lookup(filename: Path, plot_info: PlotInfo) -> List[Tuple[bytes32, ProofOfSpace]]:
-            # Uses the DiskProver object to lookup qualities. This is a blocking call,
-            # so it should be run in a thread pool.
+        async def lookup_proofs(filename: Path, plot_info: PlotInfo) -> List[Tuple[bytes32, ProofOfSpace]]:
+            # Uses the DiskProver object to lookup qualities, and the full proofs of the good ones. These are
+            # blocking calls, so they are run by the lookup threads of the disk the plot is on.
             try:
                 plot_id = plot_info.prover.get_id()
                 sp_challenge_hash = ProofOfSpace.calculate_pos_challenge(
@@ -84,7 +85,14 @@ class HarvesterAPI:
                     new_challenge.sp_hash,
                 )
                 try:
-                    quality_strings = plot_info.prover.get_qualities_for_challenge(sp_challenge_hash)
+                    quality_strings = await asyncio.wrap_future(
+                        disk_scheduler.submit(
+                            plot_info.device,
+                            LookupKind.qualities,
+                            plot_info.prover.get_qualities_for_challenge,
+                            sp_challenge_hash,
+                        )
+                    )
                 except Exception as e:
                     self.harvester.log.error(f"Error using prover object {e}")
                     self.harvester.log.error(
@@ -120,8 +128,15 @@ class HarvesterAPI:
                             # Found a very good proof of space! will fetch the whole proof from disk,
                             # then send to farmer
                             try:
-                                proof_xs = plot_info.prover.get_full_proof(
-                                    sp_challenge_hash, index, self.harvester.parallel_read
+                                proof_xs = await asyncio.wrap_future(
+                                    disk_scheduler.submit(
+                                        plot_info.device,
+                                        LookupKind.full_proof,
+                                        plot_info.prover.get_full_proof,
+                                        sp_challenge_hash,
+                                        index,
+                                        self.harvester.parallel_read,
+                                    )
                                 )
                             except Exception as e:
                                 self.harvester.log.error(f"Exception fetching full proof for {filename}. {e}")
@@ -152,13 +167,11 @@ class HarvesterAPI:
         async def lookup_challenge(
             filename: Path, plot_info: PlotInfo
         ) -> Tuple[Path, List[harvester_protocol.NewProofOfSpace]]:
-            # Executes a DiskProverLookup in a thread pool, and returns responses
+            # Executes the lookups on the disk of the plot, and returns responses
             all_responses: List[harvester_protocol.NewProofOfSpace] = []
             if self.harvester._is_shutdown:
                 return filename, []
-            proofs_of_space_and_q: List[Tuple[bytes32, ProofOfSpace]] = await loop.run_in_executor(
-                self.harvester.executor, blocking_lookup, filename, plot_info
-            )
+            proofs_of_space_and_q: List[Tuple[bytes32, ProofOfSpace]] = await lookup_proofs(filename, plot_info)
             for quality_str, proof_of_space in proofs_of_space_and_q:
                 all_responses.append(
                     harvester_protocol.NewProofOfSpace(
@@ -171,22 +184,21 @@ class HarvesterAPI:
                 )
             return filename, all_responses
 
-        awaitables = []
-        passed = 0
-        total = 0
+        # Passes the plot filter (does not check sp filter yet though, since we have not reached sp)
+        # This is being executed at the beginning of the slot
         with self.harvester.plot_manager:
-            for try_plot_filename, try_plot_info in self.harvester.plot_manager.plots.items():
-                # Passes the plot filter (does not check sp filter yet though, since we have not reached sp)
-                # This is being executed at the beginning of the slot
-                total += 1
-                if ProofOfSpace.passes_plot_filter(
-                    self.harvester.constants,
-                    try_plot_info.prover.get_id(),
-                    new_challenge.challenge_hash,
-                    new_challenge.sp_hash,
-                ):
-                    passed += 1
-                    awaitables.append(lookup_challenge(try_plot_filename, try_plot_info))
+            plot_filter_index = self.harvester.plot_manager.get_plot_filter_index()
+        passing_plots = plot_filter_index.passing_plots(
+            self.harvester.constants.NUMBER_ZERO_BITS_PLOT_FILTER,
+            new_challenge.challenge_hash,
+            new_challenge.sp_hash,
+        )
+        awaitables = [
+            lookup_challenge(plot_filter_index.paths[index], plot_filter_index.plot_infos[index])
+            for index in passing_plots
+        ]
+        passed = len(passing_plots)
+        total = len(plot_filter_index)
 
         # Concurrently executes all lookups on disk, to take advantage of multiple disk parallelism
         total_proofs_found = 0
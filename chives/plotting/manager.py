@@ -11,6 +11,7 @@ from blspy import G1Element
 from chiapos import DiskProver
 
 from chives.consensus.pos_quality import UI_ACTUAL_SPACE_CONSTANT_FACTOR, _expected_plot_size
+from chives.plotting.plot_filter_index import PlotFilterIndex
 from chives.plotting.util import (
     PlotInfo,
     PlotRefreshResult,
@@ -128,6 +129,7 @@ class PlotManager:
     refresh_parameter: PlotsRefreshParameter
     log: Any
     _lock: threading.Lock
+    _plot_filter_index: Optional[PlotFilterIndex]
     _refresh_thread: Optional[threading.Thread]
     _refreshing_enabled: bool
     _refresh_callback: Callable
@@ -156,6 +158,7 @@ class PlotManager:
         self.refresh_parameter = refresh_parameter
         self.log = logging.getLogger(__name__)
         self._lock = threading.Lock()
+        self._plot_filter_index = None
         self._refresh_thread = None
         self._refreshing_enabled = False
         self._refresh_callback = refresh_callback  # type: ignore
@@ -171,6 +174,7 @@ class PlotManager:
         with self:
             self.last_refresh_time = time.time()
             self.plots.clear()
+            self._plot_filter_index = None
             self.plot_filename_paths.clear()
             self.failed_to_open_filenames.clear()
             self.no_key_filenames.clear()
@@ -193,6 +197,15 @@ class PlotManager:
         with self:
             return len(self.plots)
 
+    def get_plot_filter_index(self) -> PlotFilterIndex:
+        """
+        Returns a snapshot of the plots for the plot filter, which is rebuilt after the plots changed. Must be called
+        with the lock held.
+        """
+        if self._plot_filter_index is None:
+            self._plot_filter_index = PlotFilterIndex(self.plots)
+        return self._plot_filter_index
+
     def get_duplicates(self):
         result = []
         for plot_filename, paths_entry in self.plot_filename_paths.items():
@@ -259,6 +272,7 @@ class PlotManager:
                         with self:
                             if loaded_plot in self.plots:
                                 del self.plots[loaded_plot]
+                                self._plot_filter_index = None
                         total_result.removed.append(loaded_plot)
                         # No need to check the duplicates here since we drop the whole entry
                         continue
@@ -432,6 +446,7 @@ class PlotManager:
                     cache_entry.plot_public_key,
                     stat_info.st_size,
                     stat_info.st_mtime,
+                    stat_info.st_dev,
                 )
 
                 with counter_lock:
@@ -454,6 +469,7 @@ class PlotManager:
                 if new_plot is not None:
                     plots_refreshed[Path(new_plot.prover.get_filename())] = new_plot
             self.plots.update(plots_refreshed)
+            self._plot_filter_index = None
 
         result.duration = time.time() - start_time
 
@@ -0,0 +1,43 @@
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, List
+
+from chives.plotting.util import PlotInfo
+from chives.types.blockchain_format.sized_bytes import bytes32
+
+
+class PlotFilterIndex:
+    """
+    A snapshot of the plots of a `PlotManager`, with the ids of all plots in one contiguous buffer. Applying the plot
+    filter for a signage point is a single sweep over that buffer, without calling into the provers and without
+    holding the plot manager lock. See `ProofOfSpace.passes_plot_filter` for the filter itself.
+    """
+
+    paths: List[Path]
+    plot_infos: List[PlotInfo]
+    plot_ids: bytes
+
+    def __init__(self, plots: Dict[Path, PlotInfo]):
+        self.paths = list(plots.keys())
+        self.plot_infos = list(plots.values())
+        self.plot_ids = b"".join(plot_info.prover.get_id() for plot_info in self.plot_infos)
+
+    def __len__(self) -> int:
+        return len(self.plot_infos)
+
+    def passing_plots(self, number_zero_bits: int, challenge_hash: bytes32, signage_point: bytes32) -> List[int]:
+        """
+        Returns the indexes (into `paths` and `plot_infos`) of the plots which pass the plot filter.
+        """
+        if number_zero_bits <= 0:
+            return list(range(len(self.plot_infos)))
+        # A filter hash passes if its first `number_zero_bits` bits are zero, which is the case if and only if it
+        # compares lower than this prefix
+        prefix_length = (number_zero_bits + 7) // 8
+        limit = (1 << (prefix_length * 8 - number_zero_bits)).to_bytes(prefix_length, "big")
+        suffix = challenge_hash + signage_point
+        plot_ids = self.plot_ids
+        offsets = zip(range(0, len(plot_ids), 32), range(32, len(plot_ids) + 32, 32))
+        return [
+            index for index, (start, end) in enumerate(offsets) if sha256(plot_ids[start:end] + suffix).digest() < limit
+        ]
@@ -30,6 +30,8 @@ class PlotInfo:
     plot_public_key: G1Element
     file_size: int
     time_modified: float
+    # the device (st_dev) the plot file is stored on
+    device: int = 0
 
 
 class PlotRefreshEvents(Enum):
@@ -14,7 +14,8 @@ from chives.types.blockchain_format.program import Program, SerializedProgram
 from chives.types.blockchain_format.sized_bytes import bytes32
 from chives.types.coin_spend import CoinSpend
 from chives.wallet.puzzles.load_clvm import load_clvm
-from chives.wallet.puzzles.singleton_top_layer import puzzle_for_singleton
+from chives.wallet.puzzles.singleton_top_layer import puzzle_for_singleton, puzzle_hash_for_singleton
+from chives.wallet.util.curry_and_treehash import calculate_hash_of_quoted_mod_hash, curry_and_treehash, shatree_atom
 
 from chives.util.ints import uint32, uint64
 
@@ -34,6 +35,9 @@ SINGLETON_LAUNCHER_HASH = SINGLETON_LAUNCHER.get_tree_hash()
 SINGLETON_MOD_HASH = POOL_OUTER_MOD_HASH
 
 SINGLETON_MOD_HASH_HASH = Program.to(SINGLETON_MOD_HASH).get_tree_hash()
+SINGLETON_LAUNCHER_HASH_HASH = shatree_atom(SINGLETON_LAUNCHER_HASH)
+QUOTED_POOL_WAITING_ROOM_HASH = calculate_hash_of_quoted_mod_hash(POOL_WAITING_ROOM_HASH)
+QUOTED_P2_SINGLETON_HASH = calculate_hash_of_quoted_mod_hash(P2_SINGLETON_HASH)
 
 
 def create_waiting_room_inner_puzzle(
@@ -52,6 +56,30 @@ def create_waiting_room_inner_puzzle(
     )
 
 
+def create_waiting_room_inner_puzzle_hash(
+    target_puzzle_hash: bytes32,
+    relative_lock_height: uint32,
+    owner_pubkey: G1Element,
+    launcher_id: bytes32,
+    genesis_challenge: bytes32,
+    delay_time: uint64,
+    delay_ph: bytes32,
+) -> bytes32:
+    """
+    Same as `create_waiting_room_inner_puzzle(...).get_tree_hash()`, without building and hashing the curried puzzle.
+    """
+    pool_reward_prefix = bytes32(genesis_challenge[:16] + b"\x00" * 16)
+    p2_singleton_puzzle_hash: bytes32 = launcher_id_to_p2_puzzle_hash(launcher_id, delay_time, delay_ph)
+    return curry_and_treehash(
+        QUOTED_POOL_WAITING_ROOM_HASH,
+        shatree_atom(target_puzzle_hash),
+        shatree_atom(p2_singleton_puzzle_hash),
+        shatree_atom(bytes(owner_pubkey)),
+        shatree_atom(pool_reward_prefix),
+        shatree_atom(int_to_bytes(relative_lock_height)),
+    )
+
+
 def create_pooling_inner_puzzle(
     target_puzzle_hash: bytes,
     pool_waiting_room_inner_hash: bytes32,
@@ -76,6 +104,10 @@ def create_full_puzzle(inner_puzzle: Program, launcher_id: bytes32) -> Program:
     return puzzle_for_singleton(launcher_id, inner_puzzle)
 
 
+def create_full_puzzle_hash(inner_puzzle_hash: bytes32, launcher_id: bytes32) -> bytes32:
+    return puzzle_hash_for_singleton(launcher_id, inner_puzzle_hash)
+
+
 def create_p2_singleton_puzzle(
     singleton_mod_hash: bytes,
     launcher_id: bytes32,
@@ -89,9 +121,15 @@ def create_p2_singleton_puzzle(
 
 
 def launcher_id_to_p2_puzzle_hash(launcher_id: bytes32, seconds_delay: uint64, delayed_puzzle_hash: bytes32) -> bytes32:
-    return create_p2_singleton_puzzle(
-        SINGLETON_MOD_HASH, launcher_id, int_to_bytes(seconds_delay), delayed_puzzle_hash
-    ).get_tree_hash()
+    # the tree hash of `create_p2_singleton_puzzle(SINGLETON_MOD_HASH, launcher_id, seconds_delay, delayed_puzzle_hash)`
+    return curry_and_treehash(
+        QUOTED_P2_SINGLETON_HASH,
+        SINGLETON_MOD_HASH_HASH,
+        shatree_atom(launcher_id),
+        SINGLETON_LAUNCHER_HASH_HASH,
+        shatree_atom(int_to_bytes(seconds_delay)),
+        shatree_atom(delayed_puzzle_hash),
+    )
 
 
 def get_delayed_puz_info_from_launcher_spend(coinsol: CoinSpend) -> Tuple[uint64, bytes32]:
@@ -407,21 +445,29 @@ def solution_to_pool_state(full_spend: CoinSpend) -> Optional[PoolState]:
 def pool_state_to_inner_puzzle(
     pool_state: PoolState, launcher_id: bytes32, genesis_challenge: bytes32, delay_time: uint64, delay_ph: bytes32
 ) -> Program:
-    escaping_inner_puzzle: Program = create_waiting_room_inner_puzzle(
-        pool_state.target_puzzle_hash,
-        pool_state.relative_lock_height,
-        pool_state.owner_pubkey,
-        launcher_id,
-        genesis_challenge,
-        delay_time,
-        delay_ph,
-    )
     if pool_state.state in [LEAVING_POOL, SELF_POOLING]:
-        return escaping_inner_puzzle
+        return create_waiting_room_inner_puzzle(
+            pool_state.target_puzzle_hash,
+            pool_state.relative_lock_height,
+            pool_state.owner_pubkey,
+            launcher_id,
+            genesis_challenge,
+            delay_time,
+            delay_ph,
+        )
     else:
+        escaping_inner_puzzle_hash: bytes32 = create_waiting_room_inner_puzzle_hash(
+            pool_state.target_puzzle_hash,
+            pool_state.relative_lock_height,
+            pool_state.owner_pubkey,
+            launcher_id,
+            genesis_challenge,
+            delay_time,
+            delay_ph,
+        )
         return create_pooling_inner_puzzle(
             pool_state.target_puzzle_hash,
-            escaping_inner_puzzle.get_tree_hash(),
+            escaping_inner_puzzle_hash,
             pool_state.owner_pubkey,
             launcher_id,
             genesis_challenge,
@@ -28,6 +28,7 @@ from chives.types.spend_bundle import SpendBundle
 from chives.pools.pool_puzzles import (
     create_waiting_room_inner_puzzle,
     create_full_puzzle,
+    create_full_puzzle_hash,
     SINGLETON_LAUNCHER,
     create_pooling_inner_puzzle,
     solution_to_pool_state,
@@ -664,9 +665,7 @@ class PoolWallet:
             puzzle = self_pooling_inner_puzzle
         else:
             raise ValueError("Invalid initial state")
-        full_pooling_puzzle: Program = create_full_puzzle(puzzle, launcher_id=launcher_coin.name())
-
-        puzzle_hash: bytes32 = full_pooling_puzzle.get_tree_hash()
+        puzzle_hash: bytes32 = create_full_puzzle_hash(puzzle.get_tree_hash(), launcher_id=launcher_coin.name())
         pool_state_bytes = Program.to([("p", bytes(initial_target_state)), ("t", delay_time), ("h", delay_ph)])
         announcement_set: Set[Announcement] = set()
         announcement_message = Program.to([puzzle_hash, amount, pool_state_bytes]).get_tree_hash()
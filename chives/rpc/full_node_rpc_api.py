@@ -1,9 +1,11 @@
-from typing import Any, Callable, Dict, List, Optional
+from bisect import bisect_right
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
 
 from chives.consensus.block_record import BlockRecord
 from chives.consensus.pos_quality import UI_ACTUAL_SPACE_CONSTANT_FACTOR
 from chives.full_node.full_node import FullNode
 from chives.full_node.mempool_check_conditions import get_puzzle_and_solution_for_coin
+from chives.rpc.util import EncodedJSON
 from chives.types.blockchain_format.program import Program, SerializedProgram
 from chives.types.blockchain_format.sized_bytes import bytes32
 from chives.types.coin_record import CoinRecord
@@ -15,20 +17,50 @@ from chives.types.spend_bundle import SpendBundle
 from chives.types.unfinished_header_block import UnfinishedHeaderBlock
 from chives.util.byte_types import hexstr_to_bytes
 from chives.util.ints import uint32, uint64, uint128
+from chives.util.json_util import dict_to_json_str
 from chives.util.log_exceptions import log_exceptions
+from chives.util.lru_cache import SizedLRUCache
 from chives.util.ws_message import WsRpcMessage, create_payload_dict
 
 
+# The number of heights of which get_blocks reads the blocks from the database at a time
+GET_BLOCKS_BATCH_HEIGHTS = 100
+
+# The total length of the rendered JSON of blocks that get_blocks keeps. The JSON of a block with a large transactions
+# generator is larger than BLOCK_JSON_CACHE_MAX_BLOCK_SIZE, and is rendered again every time instead
+BLOCK_JSON_CACHE_SIZE = 32 * 1024 * 1024
+BLOCK_JSON_CACHE_MAX_BLOCK_SIZE = 1024 * 1024
+
+# The number of coin records read from the database at a time, when all coin records of a request are streamed
+COIN_RECORDS_STREAM_PAGE_SIZE = 1000
+
+_Cursor = TypeVar("_Cursor")
+
+
 def coin_record_dict_backwards_compat(coin_record: Dict[str, Any]):
     coin_record["spent"] = coin_record["spent_block_index"] > 0
     return coin_record
 
 
+def puzzle_hash_cursor_to_str(cursor: Tuple[bytes32, int]) -> str:
+    return (cursor[0] + cursor[1].to_bytes(8, "big", signed=True)).hex()
+
+
+def puzzle_hash_cursor_from_str(cursor: str) -> Tuple[bytes32, int]:
+    cursor_bytes = hexstr_to_bytes(cursor)
+    if len(cursor_bytes) != 40:
+        raise ValueError(f"Invalid cursor {cursor}")
+    return bytes32(cursor_bytes[:32]), int.from_bytes(cursor_bytes[32:], "big", signed=True)
+
+
 class FullNodeRpcApi:
     def __init__(self, service: FullNode):
         self.service = service
         self.service_name = "chives_full_node"
         self.cached_blockchain_state: Optional[Dict] = None
+        # header hash -> the block, encoded as JSON. A block that is compactified later keeps its JSON with the
+        # uncompact proofs, which are just as valid
+        self.block_json_cache = SizedLRUCache(BLOCK_JSON_CACHE_SIZE, BLOCK_JSON_CACHE_MAX_BLOCK_SIZE)
 
     def get_routes(self) -> Dict[str, Callable]:
         return {
@@ -61,6 +93,7 @@ class FullNodeRpcApi:
             "/get_all_mempool_tx_ids": self.get_all_mempool_tx_ids,
             "/get_all_mempool_items": self.get_all_mempool_items,
             "/get_mempool_item_by_tx_id": self.get_mempool_item_by_tx_id,
+            "/get_fee_estimate": self.get_fee_estimate,
         }
 
     async def _state_changed(self, change: str, change_data: Dict[str, Any] = None) -> List[WsRpcMessage]:
@@ -319,6 +352,12 @@ class FullNodeRpcApi:
         return {"block": block}
 
     async def get_blocks(self, request: Dict) -> Optional[Dict]:
+        """
+        Streams the blocks with heights from "start" up to "end", reading them from the database a batch of heights
+        at a time. With "format": "bytes", every block is returned as its header hash, height and serialized bytes,
+        without parsing it. Otherwise ("format": "json") every block is returned as JSON, which is rendered once per
+        block and cached.
+        """
         if "start" not in request:
             raise ValueError("No start in request")
         if "end" not in request:
@@ -329,24 +368,56 @@ class FullNodeRpcApi:
         exclude_reorged = False
         if "exclude_reorged" in request:
             exclude_reorged = request["exclude_reorged"]
+        block_format = request.get("format", "json")
+        if block_format not in ("json", "bytes"):
+            raise ValueError(f"Invalid format {block_format}")
 
         start = int(request["start"])
         end = int(request["end"])
         block_range = []
         for a in range(start, end):
             block_range.append(uint32(a))
-        blocks: List[FullBlock] = await self.service.block_store.get_full_blocks_at(block_range)
-        json_blocks = []
-        for block in blocks:
-            hh: bytes32 = block.header_hash
-            if exclude_reorged and self.service.blockchain.height_to_hash(block.height) != hh:
-                # Don't include forked (reorged) blocks
-                continue
-            json = block.to_json_dict()
-            if not exclude_hh:
-                json["header_hash"] = hh.hex()
-            json_blocks.append(json)
-        return {"blocks": json_blocks}
+        batches: List[List[uint32]] = []
+        for first in range(0, len(block_range), GET_BLOCKS_BATCH_HEIGHTS):
+            last = first + GET_BLOCKS_BATCH_HEIGHTS
+            batches.append(block_range[first:last])
+        block_store = self.service.block_store
+
+        def included(height: uint32, hh: bytes32) -> bool:
+            # Don't include forked (reorged) blocks, if requested
+            return not exclude_reorged or self.service.blockchain.height_to_hash(height) == hh
+
+        async def stream_bytes() -> AsyncIterator[Dict[str, Any]]:
+            for heights in batches:
+                for height, hh, block_bytes in await block_store.get_full_block_bytes_at(heights):
+                    if included(height, hh):
+                        yield {"header_hash": hh, "height": height, "block": block_bytes}
+
+        async def stream_json() -> AsyncIterator[EncodedJSON]:
+            for heights in batches:
+                header_hashes = [
+                    (h, hh) for h, hh in await block_store.get_header_hashes_at(heights) if included(h, hh)
+                ]
+                rendered: Dict[bytes32, str] = {}
+                for _, hh in header_hashes:
+                    cached: Optional[str] = self.block_json_cache.get(hh)
+                    if cached is not None:
+                        rendered[hh] = cached
+                missing = {hh: h for h, hh in header_hashes if hh not in rendered}
+                for _, hh, block_bytes in await block_store.get_full_block_bytes_at(sorted(set(missing.values()))):
+                    if hh in missing:
+                        rendered[hh] = dict_to_json_str(FullBlock.from_bytes(block_bytes).to_json_dict())
+                        self.block_json_cache.put(hh, rendered[hh])
+                for _, hh in header_hashes:
+                    json_block = rendered.get(hh)
+                    if json_block is None:
+                        # rolled back in the meantime
+                        continue
+                    if not exclude_hh:
+                        json_block = f'{{"header_hash": "{hh.hex()}", {json_block[1:]}'
+                    yield EncodedJSON(json_block)
+
+        return {"blocks": stream_bytes() if block_format == "bytes" else stream_json()}
 
     async def get_block_count_metrics(self, request: Dict):
         compact_blocks = 0
@@ -488,46 +559,77 @@ class FullNodeRpcApi:
         )
         return {"space": uint128(int(network_space_bytes_estimate))}
 
-    async def get_coin_records_by_puzzle_hash(self, request: Dict) -> Optional[Dict]:
+    async def _coin_records_response(
+        self,
+        request: Dict,
+        get_page: Callable[[int, Optional[_Cursor]], Awaitable[Tuple[List[CoinRecord], Optional[_Cursor]]]],
+        cursor_to_str: Callable[[_Cursor], str],
+        cursor_from_str: Callable[[str], _Cursor],
+    ) -> Dict:
         """
-        Retrieves the coins for a given puzzlehash, by default returns unspent coins.
+        With "max_items" in the request, returns one page of coin records, and the "next_cursor" to pass as "cursor"
+        to get the next page (None after the last page). Otherwise all coin records (after "cursor", if given) are
+        streamed, reading them from the database one page at a time.
         """
-        if "puzzle_hash" not in request:
-            raise ValueError("Puzzle hash not in request")
-        kwargs: Dict[str, Any] = {"include_spent_coins": False, "puzzle_hash": hexstr_to_bytes(request["puzzle_hash"])}
-        if "start_height" in request:
-            kwargs["start_height"] = uint32(request["start_height"])
-        if "end_height" in request:
-            kwargs["end_height"] = uint32(request["end_height"])
+        cursor: Optional[_Cursor] = None
+        if request.get("cursor") is not None:
+            cursor = cursor_from_str(request["cursor"])
+
+        if "max_items" in request:
+            max_items = int(request["max_items"])
+            if max_items <= 0:
+                raise ValueError("max_items must be positive")
+            coin_records, next_cursor = await get_page(max_items, cursor)
+            return {
+                "coin_records": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in coin_records],
+                "next_cursor": None if next_cursor is None else cursor_to_str(next_cursor),
+            }
 
-        if "include_spent_coins" in request:
-            kwargs["include_spent_coins"] = request["include_spent_coins"]
+        async def stream(cursor: Optional[_Cursor]) -> AsyncIterator[Dict[str, Any]]:
+            while True:
+                coin_records, cursor = await get_page(COIN_RECORDS_STREAM_PAGE_SIZE, cursor)
+                for cr in coin_records:
+                    yield coin_record_dict_backwards_compat(cr.to_json_dict())
+                if cursor is None:
+                    return
+
+        return {"coin_records": stream(cursor)}
+
+    async def _coin_records_by_puzzle_hashes(self, request: Dict, puzzle_hashes: List[bytes32]) -> Dict:
+        include_spent_coins: bool = request.get("include_spent_coins", False)
+        start_height = uint32(request.get("start_height", 0))
+        end_height = uint32(request.get("end_height", (2 ** 32) - 1))
+        coin_store = self.service.blockchain.coin_store
+
+        async def get_page(
+            max_items: int, last_id: Optional[Tuple[bytes32, int]]
+        ) -> Tuple[List[CoinRecord], Optional[Tuple[bytes32, int]]]:
+            return await coin_store.get_coin_records_by_puzzle_hashes_paginated(
+                include_spent_coins, puzzle_hashes, max_items, last_id, start_height, end_height
+            )
 
-        coin_records = await self.service.blockchain.coin_store.get_coin_records_by_puzzle_hash(**kwargs)
+        return await self._coin_records_response(
+            request, get_page, puzzle_hash_cursor_to_str, puzzle_hash_cursor_from_str
+        )
 
-        return {"coin_records": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in coin_records]}
+    async def get_coin_records_by_puzzle_hash(self, request: Dict) -> Optional[Dict]:
+        """
+        Retrieves the coins for a given puzzlehash, by default returns unspent coins. Supports pagination with
+        "max_items" and "cursor", see _coin_records_response.
+        """
+        if "puzzle_hash" not in request:
+            raise ValueError("Puzzle hash not in request")
+        return await self._coin_records_by_puzzle_hashes(request, [bytes32.from_hexstr(request["puzzle_hash"])])
 
     async def get_coin_records_by_puzzle_hashes(self, request: Dict) -> Optional[Dict]:
         """
-        Retrieves the coins for a given puzzlehash, by default returns unspent coins.
+        Retrieves the coins for a given puzzlehash, by default returns unspent coins. Supports pagination with
+        "max_items" and "cursor", see _coin_records_response.
         """
         if "puzzle_hashes" not in request:
             raise ValueError("Puzzle hashes not in request")
-        kwargs: Dict[str, Any] = {
-            "include_spent_coins": False,
-            "puzzle_hashes": [hexstr_to_bytes(ph) for ph in request["puzzle_hashes"]],
-        }
-        if "start_height" in request:
-            kwargs["start_height"] = uint32(request["start_height"])
-        if "end_height" in request:
-            kwargs["end_height"] = uint32(request["end_height"])
-
-        if "include_spent_coins" in request:
-            kwargs["include_spent_coins"] = request["include_spent_coins"]
-
-        coin_records = await self.service.blockchain.coin_store.get_coin_records_by_puzzle_hashes(**kwargs)
-
-        return {"coin_records": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in coin_records]}
+        puzzle_hashes = [bytes32.from_hexstr(ph) for ph in request["puzzle_hashes"]]
+        return await self._coin_records_by_puzzle_hashes(request, puzzle_hashes)
 
     async def get_coin_record_by_name(self, request: Dict) -> Optional[Dict]:
         """
@@ -589,7 +691,8 @@ class FullNodeRpcApi:
 
     async def get_coin_records_by_hint(self, request: Dict) -> Optional[Dict]:
         """
-        Retrieves coins by hint, by default returns unspent coins.
+        Retrieves coins by hint, by default returns unspent coins. Supports pagination with "max_items" and "cursor",
+        see _coin_records_response. The coins are ordered by name.
         """
         if "hint" not in request:
             raise ValueError("Hint not in request")
@@ -597,24 +700,29 @@ class FullNodeRpcApi:
         if self.service.hint_store is None:
             return {"coin_records": []}
 
-        names: List[bytes32] = await self.service.hint_store.get_coin_ids(bytes32.from_hexstr(request["hint"]))
-
-        kwargs: Dict[str, Any] = {
-            "include_spent_coins": False,
-            "names": names,
-        }
-
-        if "start_height" in request:
-            kwargs["start_height"] = uint32(request["start_height"])
-        if "end_height" in request:
-            kwargs["end_height"] = uint32(request["end_height"])
-
-        if "include_spent_coins" in request:
-            kwargs["include_spent_coins"] = request["include_spent_coins"]
-
-        coin_records = await self.service.blockchain.coin_store.get_coin_records_by_names(**kwargs)
+        names: List[bytes32] = sorted(await self.service.hint_store.get_coin_ids(bytes32.from_hexstr(request["hint"])))
+        include_spent_coins: bool = request.get("include_spent_coins", False)
+        start_height = uint32(request.get("start_height", 0))
+        end_height = uint32(request.get("end_height", (2 ** 32) - 1))
+        coin_store = self.service.blockchain.coin_store
+
+        async def get_page(max_items: int, last_name: Optional[bytes32]) -> Tuple[List[CoinRecord], Optional[bytes32]]:
+            start = 0 if last_name is None else bisect_right(names, last_name)
+            coin_records: List[CoinRecord] = []
+            while start < len(names) and len(coin_records) < max_items:
+                end = start + max_items
+                found = await coin_store.get_coin_records_by_names(
+                    include_spent_coins, names[start:end], start_height, end_height
+                )
+                found.sort(key=lambda cr: cr.name)
+                missing = max_items - len(coin_records)
+                coin_records.extend(found[:missing])
+                start = end
+            if len(coin_records) < max_items:
+                return coin_records, None
+            return coin_records, coin_records[-1].name
 
-        return {"coin_records": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in coin_records]}
+        return await self._coin_records_response(request, get_page, bytes32.hex, bytes32.from_hexstr)
 
     async def push_tx(self, request: Dict) -> Optional[Dict]:
         if "spend_bundle" not in request:
@@ -707,3 +815,35 @@ class FullNodeRpcApi:
             raise ValueError(f"Tx id 0x{tx_id.hex()} not in the mempool")
 
         return {"mempool_item": item}
+
+    async def get_fee_estimate(self, request: Dict) -> Optional[Dict]:
+        """
+        Returns the estimated fee per cost for a transaction (of `cost`, optional) to be included in a block within
+        each of the `target_times` (in seconds).
+        """
+        if "target_times" not in request:
+            raise ValueError("No target_times in request")
+        target_times: List[int] = [int(t) for t in request["target_times"]]
+        if any(t <= 0 for t in target_times):
+            raise ValueError("target_times must be positive")
+        cost = int(request.get("cost", 0))
+        if cost < 0:
+            raise ValueError("cost must not be negative")
+
+        mempool_manager = self.service.mempool_manager
+        mempool = mempool_manager.mempool
+        fee_estimator = mempool_manager.fee_estimator
+        estimates = [fee_estimator.estimate(mempool.fee_rate_index, t, cost) for t in target_times]
+        if cost <= mempool.max_size_in_cost:
+            current_fee_rate: Optional[float] = mempool.get_min_fee_rate(cost)
+        else:
+            current_fee_rate = None
+        return {
+            "estimates": estimates,
+            "target_times": target_times,
+            "current_fee_rate": current_fee_rate,
+            "mempool_size": mempool.total_mempool_cost,
+            "mempool_max_size": mempool.max_size_in_cost,
+            "transaction_block_seconds": fee_estimator.transaction_block_seconds,
+            "peak_height": None if mempool_manager.peak is None else mempool_manager.peak.height,
+        }
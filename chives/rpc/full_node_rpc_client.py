@@ -47,6 +47,17 @@ class FullNodeRpcClient(RpcClient):
         )
         return [FullBlock.from_json_dict(block) for block in response["blocks"]]
 
+    async def get_blocks_bytes(
+        self, start: int, end: int, exclude_reorged: bool = False
+    ) -> List[Tuple[uint32, bytes32, bytes]]:
+        response = await self.fetch(
+            "get_blocks", {"start": start, "end": end, "exclude_reorged": exclude_reorged, "format": "bytes"}
+        )
+        return [
+            (uint32(block["height"]), bytes32(hexstr_to_bytes(block["header_hash"])), hexstr_to_bytes(block["block"]))
+            for block in response["blocks"]
+        ]
+
     async def get_block_record_by_height(self, height) -> Optional[BlockRecord]:
         try:
             response = await self.fetch("get_block_record_by_height", {"height": height})
@@ -177,6 +188,64 @@ class FullNodeRpcClient(RpcClient):
         response = await self.fetch("get_coin_records_by_hint", d)
         return [CoinRecord.from_json_dict(coin_record_dict_backwards_compat(coin)) for coin in response["coin_records"]]
 
+    async def get_coin_records_by_puzzle_hashes_paginated(
+        self,
+        puzzle_hashes: List[bytes32],
+        max_items: int,
+        cursor: Optional[str] = None,
+        include_spent_coins: bool = True,
+        start_height: Optional[int] = None,
+        end_height: Optional[int] = None,
+    ) -> Tuple[List[CoinRecord], Optional[str]]:
+        """
+        Returns a page of coin records, and the cursor to pass in order to get the next page (None after the last one).
+        """
+        d: Dict[str, Any] = {
+            "puzzle_hashes": [ph.hex() for ph in puzzle_hashes],
+            "include_spent_coins": include_spent_coins,
+            "max_items": max_items,
+            "cursor": cursor,
+        }
+        if start_height is not None:
+            d["start_height"] = start_height
+        if end_height is not None:
+            d["end_height"] = end_height
+
+        response = await self.fetch("get_coin_records_by_puzzle_hashes", d)
+        coin_records = [
+            CoinRecord.from_json_dict(coin_record_dict_backwards_compat(c)) for c in response["coin_records"]
+        ]
+        return coin_records, response["next_cursor"]
+
+    async def get_coin_records_by_hint_paginated(
+        self,
+        hint: bytes32,
+        max_items: int,
+        cursor: Optional[str] = None,
+        include_spent_coins: bool = True,
+        start_height: Optional[int] = None,
+        end_height: Optional[int] = None,
+    ) -> Tuple[List[CoinRecord], Optional[str]]:
+        """
+        Returns a page of coin records, and the cursor to pass in order to get the next page (None after the last one).
+        """
+        d: Dict[str, Any] = {
+            "hint": hint.hex(),
+            "include_spent_coins": include_spent_coins,
+            "max_items": max_items,
+            "cursor": cursor,
+        }
+        if start_height is not None:
+            d["start_height"] = start_height
+        if end_height is not None:
+            d["end_height"] = end_height
+
+        response = await self.fetch("get_coin_records_by_hint", d)
+        coin_records = [
+            CoinRecord.from_json_dict(coin_record_dict_backwards_compat(c)) for c in response["coin_records"]
+        ]
+        return coin_records, response["next_cursor"]
+
     async def get_additions_and_removals(self, header_hash: bytes32) -> Tuple[List[CoinRecord], List[CoinRecord]]:
         try:
             response = await self.fetch("get_additions_and_removals", {"header_hash": header_hash.hex()})
@@ -228,6 +297,9 @@ class FullNodeRpcClient(RpcClient):
         except Exception:
             return None
 
+    async def get_fee_estimate(self, target_times: List[int], cost: int = 0) -> Dict[str, Any]:
+        return await self.fetch("get_fee_estimate", {"target_times": target_times, "cost": cost})
+
     async def get_recent_signage_point_or_eos(
         self, sp_hash: Optional[bytes32], challenge_hash: Optional[bytes32]
     ) -> Optional[Any]:
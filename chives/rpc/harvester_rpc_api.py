@@ -17,6 +17,7 @@ class HarvesterRpcApi:
             "/add_plot_directory": self.add_plot_directory,
             "/get_plot_directories": self.get_plot_directories,
             "/remove_plot_directory": self.remove_plot_directory,
+            "/get_disk_stats": self.get_disk_stats,
         }
 
     async def _state_changed(self, change: str) -> List[WsRpcMessage]:
@@ -59,3 +60,10 @@ class HarvesterRpcApi:
         if await self.service.remove_plot_directory(directory_name):
             return {}
         raise ValueError(f"Did not remove plot directory {directory_name}")
+
+    async def get_disk_stats(self, request: Dict) -> Dict:
+        """
+        Returns, for every disk with plots that were looked up, the number of queued lookups and the latency
+        histograms of the quality and full proof lookups.
+        """
+        return {"disks": self.service.disk_scheduler.get_disk_stats()}
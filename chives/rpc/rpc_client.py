@@ -58,6 +58,9 @@ class RpcClient:
             connection["node_id"] = hexstr_to_bytes(connection["node_id"])
         return response["connections"]
 
+    async def get_message_metrics(self) -> Dict:
+        return await self.fetch("get_message_metrics", {})
+
     async def open_connection(self, host: str, port: int) -> Dict:
         return await self.fetch("open_connection", {"host": host, "port": int(port)})
 
@@ -7,7 +7,8 @@ from typing import Any, Callable, Dict, List, Optional
 
 from aiohttp import ClientConnectorError, ClientSession, ClientWebSocketResponse, WSMsgType, web
 
-from chives.rpc.util import wrap_http_handler
+from chives.rpc.util import collect_streamed, is_streamed, wrap_http_handler
+from chives.server.message_metrics import metrics_to_prometheus
 from chives.server.outbound_message import NodeType
 from chives.server.server import ssl_context_for_client, ssl_context_for_server
 from chives.types.peer_info import PeerInfo
@@ -90,6 +91,7 @@ class RpcServer:
         return {
             **self.rpc_api.get_routes(),
             "/get_connections": self.get_connections,
+            "/get_message_metrics": self.get_message_metrics,
             "/open_connection": self.open_connection,
             "/close_connection": self.close_connection,
             "/stop_node": self.stop_node,
@@ -159,6 +161,15 @@ class RpcServer:
             ]
         return {"connections": con_info}
 
+    async def get_message_metrics(self, request: Dict) -> Dict:
+        if self.rpc_api.service.server is None:
+            raise ValueError("Global connections is not set")
+        return self.rpc_api.service.server.get_message_metrics()
+
+    async def prometheus_metrics(self, request: web.Request) -> web.Response:
+        metrics = await self.get_message_metrics({})
+        return web.Response(text=metrics_to_prometheus(metrics), content_type="text/plain")
+
     async def open_connection(self, request: Dict):
         host = request["host"]
         port = request["port"]
@@ -216,7 +227,11 @@ class RpcServer:
             return await f(data)
         f = getattr(self.rpc_api, command, None)
         if f is not None:
-            return await f(data)
+            response = await f(data)
+            if is_streamed(response):
+                # websocket messages can't be streamed
+                return await collect_streamed(response)
+            return response
 
         raise ValueError(f"unknown_command {command}")
 
@@ -317,6 +332,8 @@ async def start_rpc_server(
     rpc_server = RpcServer(rpc_api, rpc_api.service_name, stop_cb, root_path, net_config)
     rpc_server.rpc_api.service._set_state_changed_callback(rpc_server.state_changed)
     app.add_routes([web.post(route, wrap_http_handler(func)) for (route, func) in rpc_server.get_routes().items()])
+    if net_config.get("prometheus_message_metrics", False):
+        app.add_routes([web.get("/metrics", rpc_server.prometheus_metrics)])
     if connect_to_daemon:
         daemon_connection = asyncio.create_task(rpc_server.connect_to_daemon(self_hostname, daemon_port))
     runner = web.AppRunner(app, access_log=None)
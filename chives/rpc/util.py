@@ -1,16 +1,89 @@
+import json
 import logging
 import traceback
-from typing import Callable
+from collections.abc import AsyncIterator
+from typing import Any, Callable, Dict, List
 
 import aiohttp
+from aiohttp import web
 
-from chives.util.json_util import obj_to_response
+from chives.util.json_util import dict_to_json_str, obj_to_response
 
 log = logging.getLogger(__name__)
 
+# The number of items of a streamed list that are encoded and written at once
+STREAM_CHUNK_ITEMS = 1000
+
+
+class EncodedJSON(str):
+    """
+    An item of a streamed list which is already encoded as JSON, it is written as is.
+    """
+
+
+def encode_item(item: Any) -> str:
+    return item if isinstance(item, EncodedJSON) else dict_to_json_str(item)
+
+
+def is_streamed(res_object: Any) -> bool:
+    return isinstance(res_object, dict) and any(isinstance(value, AsyncIterator) for value in res_object.values())
+
+
+async def collect_streamed(res_object: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Replaces the streamed lists of a response with regular lists, for the transports which can't stream.
+    """
+    for key, value in res_object.items():
+        if isinstance(value, AsyncIterator):
+            res_object[key] = [json.loads(item) if isinstance(item, EncodedJSON) else item async for item in value]
+    return res_object
+
+
+async def stream_response(request: web.Request, res_object: Dict[str, Any]) -> web.StreamResponse:
+    """
+    Writes a response of which some values are async iterators (streamed lists). The items of these lists are encoded
+    and sent in chunks as they are produced, so the whole list never needs to be in memory. The remaining values are
+    written after the lists. If producing the lists fails, "success" is false and "error" is set, like for any other
+    failed request, although the lists may already have been sent in part.
+    """
+    response = web.StreamResponse(headers={"Content-Type": "application/json"})
+    await response.prepare(request)
+    remaining = {key: value for key, value in res_object.items() if not isinstance(value, AsyncIterator)}
+    await response.write(b"{")
+    for key, items in res_object.items():
+        if not isinstance(items, AsyncIterator):
+            continue
+        await response.write(f"{dict_to_json_str(key)}: [".encode())
+        chunk: List[str] = []
+        first = True
+        failed = False
+        try:
+            async for item in items:
+                chunk.append(encode_item(item))
+                if len(chunk) >= STREAM_CHUNK_ITEMS:
+                    await response.write(("" if first else ", ").encode() + ", ".join(chunk).encode())
+                    first = False
+                    chunk = []
+        except Exception as e:
+            tb = traceback.format_exc()
+            log.warning(f"Error while streaming response: {tb}")
+            remaining = {"success": False, "error": f"{e.args[0] if len(e.args) > 0 else e}"}
+            failed = True
+        if len(chunk) > 0:
+            await response.write(("" if first else ", ").encode() + ", ".join(chunk).encode())
+        await response.write(b"], ")
+        if failed:
+            break
+    if "success" not in remaining:
+        remaining["success"] = True
+    # the remaining values, without the opening brace, which was already written
+    await response.write(dict_to_json_str(remaining)[1:].encode())
+    await response.write_eof()
+    return response
+
 
 def wrap_http_handler(f) -> Callable:
-    async def inner(request) -> aiohttp.web.Response:
+    async def inner(request) -> aiohttp.web.StreamResponse:
         request_data = await request.json()
         try:
             res_object = await f(request_data)
@@ -26,6 +99,8 @@ def wrap_http_handler(f) -> Callable:
             else:
                 res_object = {"success": False, "error": f"{e}"}
 
+        if is_streamed(res_object):
+            return await stream_response(request, res_object)
         return obj_to_response(res_object)
 
     return inner
@@ -0,0 +1,135 @@
+from collections import deque
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, Optional, Set, Tuple
+
+from chives.protocols.protocol_message_types import ProtocolMessageTypes as pmt
+from chives.server.outbound_message import Message
+from chives.server.outbound_queue import MESSAGE_PRIORITIES, MessagePriority
+
+
+class ApiTaskClass(IntEnum):
+    # Block and signage point propagation, farming and timelord messages
+    CONSENSUS = 0
+    # Everything that isn't classified
+    DEFAULT = 1
+    # Light wallet queries and subscriptions
+    WALLET = 2
+    # Mempool gossip
+    TRANSACTION = 3
+    # Serving syncing peers, peer lists and compact proofs
+    SYNC = 4
+
+
+# Messages are classified like in the outbound queue (see MESSAGE_PRIORITIES), so consensus, mempool and sync messages
+# are the same in both directions
+_CLASS_FOR_PRIORITY: Dict[MessagePriority, ApiTaskClass] = {
+    MessagePriority.CONSENSUS: ApiTaskClass.CONSENSUS,
+    MessagePriority.DEFAULT: ApiTaskClass.DEFAULT,
+    MessagePriority.TRANSACTION: ApiTaskClass.TRANSACTION,
+    MessagePriority.BULK: ApiTaskClass.SYNC,
+}
+
+API_TASK_CLASSES: Dict[pmt, ApiTaskClass] = {
+    **{message_type: _CLASS_FOR_PRIORITY[priority] for message_type, priority in MESSAGE_PRIORITIES.items()},
+    # wallet -> full_node, the responses are sent with the default priority to keep their order
+    pmt.send_transaction: ApiTaskClass.WALLET,
+    pmt.request_puzzle_solution: ApiTaskClass.WALLET,
+    pmt.request_block_header: ApiTaskClass.WALLET,
+    pmt.request_removals: ApiTaskClass.WALLET,
+    pmt.request_additions: ApiTaskClass.WALLET,
+    pmt.request_header_blocks: ApiTaskClass.WALLET,
+    pmt.register_interest_in_puzzle_hash: ApiTaskClass.WALLET,
+    pmt.register_interest_in_coin: ApiTaskClass.WALLET,
+    pmt.request_children: ApiTaskClass.WALLET,
+    pmt.request_ses_hashes: ApiTaskClass.WALLET,
+    # requests of syncing peers and peer lists, which are answered with bulk messages
+    pmt.request_blocks: ApiTaskClass.SYNC,
+    pmt.request_proof_of_weight: ApiTaskClass.SYNC,
+    pmt.request_peers: ApiTaskClass.SYNC,
+    pmt.request_peers_introducer: ApiTaskClass.SYNC,
+}
+
+# Unsolicited gossip, which can be dropped when too many messages of its class are waiting. Nobody waits for an answer
+# to these, and the information is sent again by other peers. Requests are never dropped, since the peer would wait
+# for the answer until its request times out.
+SHEDDABLE_MESSAGES: Set[pmt] = {
+    pmt.new_transaction,
+    pmt.new_compact_vdf,
+    pmt.respond_peers,
+}
+
+# The classes by the raw message type, which is what a Message has
+_CLASS_FOR_TYPE: Dict[int, ApiTaskClass] = {
+    message_type.value: api_task_class for message_type, api_task_class in API_TASK_CLASSES.items()
+}
+_SHEDDABLE_TYPES: Set[int] = {message_type.value for message_type in SHEDDABLE_MESSAGES}
+
+# The number of API tasks of a class that run concurrently, and the number of messages that wait for one of them to
+# finish before further sheddable messages of the class are dropped. None is unlimited. Consensus messages are never
+# held back, and neither are unclassified messages, which might not be handled by a full node.
+API_TASK_LIMITS: Dict[ApiTaskClass, Tuple[Optional[int], Optional[int]]] = {
+    ApiTaskClass.CONSENSUS: (None, None),
+    ApiTaskClass.DEFAULT: (None, None),
+    ApiTaskClass.WALLET: (100, None),
+    ApiTaskClass.TRANSACTION: (100, 1000),
+    ApiTaskClass.SYNC: (20, 200),
+}
+
+
+def api_task_class(message: Message) -> ApiTaskClass:
+    return _CLASS_FOR_TYPE.get(message.type, ApiTaskClass.DEFAULT)
+
+
+class ApiTaskScheduler:
+    """
+    Limits the number of API tasks of every class (see API_TASK_LIMITS), so a flood of transactions or sync requests
+    doesn't compete with consensus messages for the event loop, the blockchain lock and the database. Messages over
+    the limit of their class wait in a queue. Once the queue is full, further sheddable messages (see
+    SHEDDABLE_MESSAGES) are dropped, while requests are still queued. `start_task` is called with the message and the
+    connection when the task of a message can start, and `task_done` has to be called when it finished.
+    """
+
+    def __init__(
+        self,
+        start_task: Callable[[Message, Any], None],
+        limits: Dict[ApiTaskClass, Tuple[Optional[int], Optional[int]]] = API_TASK_LIMITS,
+    ) -> None:
+        self.start_task = start_task
+        self.limits = limits
+        self._running: Dict[ApiTaskClass, int] = {task_class: 0 for task_class in ApiTaskClass}
+        self._queued: Dict[ApiTaskClass, Deque[Tuple[Message, Any]]] = {
+            task_class: deque() for task_class in ApiTaskClass
+        }
+
+    def submit(self, message: Message, connection: Any) -> bool:
+        """
+        Starts or queues the task of the message. Returns False if the message was dropped.
+        """
+        task_class = api_task_class(message)
+        max_running, max_queued = self.limits[task_class]
+        if max_running is None or self._running[task_class] < max_running:
+            self._running[task_class] += 1
+            self.start_task(message, connection)
+            return True
+        queue = self._queued[task_class]
+        if max_queued is not None and len(queue) >= max_queued and message.type in _SHEDDABLE_TYPES:
+            return False
+        queue.append((message, connection))
+        return True
+
+    def task_done(self, message: Message) -> None:
+        task_class = api_task_class(message)
+        queue = self._queued[task_class]
+        while len(queue) > 0:
+            next_message, connection = queue.popleft()
+            # The messages of peers that disconnected in the meantime are not handled anymore
+            if not connection.closed:
+                self.start_task(next_message, connection)
+                return
+        self._running[task_class] -= 1
+
+    def task_counts(self) -> Dict[str, Dict[str, int]]:
+        return {
+            task_class.name.lower(): {"running": self._running[task_class], "queued": len(self._queued[task_class])}
+            for task_class in ApiTaskClass
+        }
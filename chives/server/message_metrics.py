@@ -0,0 +1,182 @@
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Dict, List
+from typing import Counter as typing_Counter
+
+from chives.protocols.protocol_message_types import ProtocolMessageTypes
+
+# The upper bounds (in seconds) of the buckets of the handler latency histograms
+LATENCY_BUCKETS: List[float] = [0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+
+def message_type_name(message_type: int) -> str:
+    try:
+        return ProtocolMessageTypes(message_type).name
+    except ValueError:
+        return f"unknown_{message_type}"
+
+
+class LatencyHistogram:
+    def __init__(self) -> None:
+        self.bucket_counts: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)  # the last bucket has no upper bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.bucket_counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        # Cumulative counts, like Prometheus histograms: every bucket counts the observations up to its bound
+        buckets: Dict[str, int] = {}
+        cumulative = 0
+        for bound, count in zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], self.bucket_counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {"count": self.count, "sum": self.total, "max": self.max, "buckets": buckets}
+
+
+class MessageMetrics:
+    """
+    Statistics of the messages of all connections of a server, by message type: the messages and bytes received and
+    sent, the messages rejected by the rate limiters, the messages dropped because too many of their kind were waiting
+    for an API handler, and the number of running API handlers and their latencies.
+    """
+
+    def __init__(self) -> None:
+        self.received: typing_Counter[int] = Counter()
+        self.bytes_received: typing_Counter[int] = Counter()
+        self.sent: typing_Counter[int] = Counter()
+        self.bytes_sent: typing_Counter[int] = Counter()
+        self.rate_limited_inbound: typing_Counter[int] = Counter()
+        self.rate_limited_outbound: typing_Counter[int] = Counter()
+        self.dropped: typing_Counter[int] = Counter()
+        self.in_flight: typing_Counter[int] = Counter()
+        self.handler_errors: typing_Counter[int] = Counter()
+        self.handler_latency: Dict[int, LatencyHistogram] = {}
+
+    def message_received(self, message_type: int, size: int) -> None:
+        self.received[message_type] += 1
+        self.bytes_received[message_type] += size
+
+    def message_sent(self, message_type: int, size: int) -> None:
+        self.sent[message_type] += 1
+        self.bytes_sent[message_type] += size
+
+    def rate_limited(self, message_type: int, incoming: bool) -> None:
+        if incoming:
+            self.rate_limited_inbound[message_type] += 1
+        else:
+            self.rate_limited_outbound[message_type] += 1
+
+    def message_dropped(self, message_type: int) -> None:
+        self.dropped[message_type] += 1
+
+    def handler_started(self, message_type: int) -> None:
+        self.in_flight[message_type] += 1
+
+    def handler_done(self, message_type: int, seconds: float, failed: bool) -> None:
+        self.in_flight[message_type] -= 1
+        if failed:
+            self.handler_errors[message_type] += 1
+        histogram = self.handler_latency.get(message_type)
+        if histogram is None:
+            histogram = LatencyHistogram()
+            self.handler_latency[message_type] = histogram
+        histogram.observe(seconds)
+
+    def in_flight_by_name(self) -> List[Any]:
+        return [(message_type_name(t), n) for t, n in sorted(self.in_flight.items()) if n != 0]
+
+    def to_json_dict(self) -> Dict[str, Dict[str, Any]]:
+        message_types = (
+            set(self.received)
+            | set(self.sent)
+            | set(self.rate_limited_inbound)
+            | set(self.rate_limited_outbound)
+            | set(self.dropped)
+            | set(self.in_flight)
+        )
+        result: Dict[str, Dict[str, Any]] = {}
+        for message_type in sorted(message_types):
+            histogram = self.handler_latency.get(message_type)
+            result[message_type_name(message_type)] = {
+                "received": self.received[message_type],
+                "bytes_received": self.bytes_received[message_type],
+                "sent": self.sent[message_type],
+                "bytes_sent": self.bytes_sent[message_type],
+                "rate_limited_inbound": self.rate_limited_inbound[message_type],
+                "rate_limited_outbound": self.rate_limited_outbound[message_type],
+                "dropped": self.dropped[message_type],
+                "in_flight": self.in_flight[message_type],
+                "handler_errors": self.handler_errors[message_type],
+                "handler_latency": None if histogram is None else histogram.to_json_dict(),
+            }
+        return result
+
+
+def _labels(**labels: Any) -> str:
+    escaped = [
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    ]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def metrics_to_prometheus(metrics: Dict[str, Any]) -> str:
+    """
+    Formats the metrics of ChivesServer.get_message_metrics in the Prometheus text exposition format.
+    """
+    lines: List[str] = []
+
+    def family(name: str, metric_type: str, description: str) -> None:
+        lines.append(f"# HELP chives_{name} {description}")
+        lines.append(f"# TYPE chives_{name} {metric_type}")
+
+    counters = [
+        ("received", "messages_received_total", "Messages received"),
+        ("bytes_received", "message_bytes_received_total", "Bytes of the messages received"),
+        ("sent", "messages_sent_total", "Messages sent"),
+        ("bytes_sent", "message_bytes_sent_total", "Bytes of the messages sent"),
+        ("rate_limited_inbound", "messages_rate_limited_inbound_total", "Received messages over the rate limits"),
+        ("rate_limited_outbound", "messages_rate_limited_outbound_total", "Messages held back by the rate limits"),
+        ("dropped", "messages_dropped_total", "Received messages dropped because too many were waiting"),
+        ("handler_errors", "message_handler_errors_total", "API handlers that failed or timed out"),
+    ]
+    message_types: Dict[str, Dict[str, Any]] = metrics["message_types"]
+    for key, name, description in counters:
+        family(name, "counter", description)
+        for message_type, values in message_types.items():
+            lines.append(f"chives_{name}{_labels(message_type=message_type)} {values[key]}")
+
+    family("message_handlers_in_flight", "gauge", "API handlers running")
+    for message_type, values in message_types.items():
+        lines.append(f"chives_message_handlers_in_flight{_labels(message_type=message_type)} {values['in_flight']}")
+
+    family("message_handler_seconds", "histogram", "Time taken by the API handlers")
+    for message_type, values in message_types.items():
+        histogram = values["handler_latency"]
+        if histogram is None:
+            continue
+        for bound, count in histogram["buckets"].items():
+            lines.append(f"chives_message_handler_seconds_bucket{_labels(message_type=message_type, le=bound)} {count}")
+        lines.append(f"chives_message_handler_seconds_sum{_labels(message_type=message_type)} {histogram['sum']}")
+        lines.append(f"chives_message_handler_seconds_count{_labels(message_type=message_type)} {histogram['count']}")
+
+    family("incoming_queue_size", "gauge", "Received messages waiting for an API handler")
+    lines.append(f"chives_incoming_queue_size {metrics['incoming_queue_size']}")
+
+    for key, description in [("running", "API handlers running"), ("queued", "Messages waiting for an API handler")]:
+        family(f"api_tasks_{key}", "gauge", f"{description}, by class of message")
+        for task_class, counts in metrics["api_tasks"].items():
+            lines.append(f"chives_api_tasks_{key}{_labels(task_class=task_class)} {counts[key]}")
+
+    family("outgoing_queue_size", "gauge", "Messages waiting to be sent, by connection and priority")
+    for connection in metrics["connections"]:
+        for priority, size in connection["outgoing_queue_size"].items():
+            labels = _labels(node_id=connection["node_id"], peer_host=connection["peer_host"], priority=priority)
+            lines.append(f"chives_outgoing_queue_size{labels} {size}")
+    return "\n".join(lines) + "\n"
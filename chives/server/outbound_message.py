@@ -42,4 +42,4 @@ class Message(Streamable):
 
 
 def make_msg(msg_type: ProtocolMessageTypes, data: Any) -> Message:
-    return Message(uint8(msg_type.value), None, bytes(data))
+    return Message.construct_unchecked(uint8(msg_type.value), None, bytes(data))
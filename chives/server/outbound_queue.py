@@ -0,0 +1,129 @@
+import asyncio
+from collections import deque
+from enum import IntEnum
+from typing import Deque, Dict, Optional, Tuple
+
+from chives.protocols.protocol_message_types import ProtocolMessageTypes as pmt
+from chives.server.outbound_message import Message
+
+
+class MessagePriority(IntEnum):
+    # Block and signage point propagation, and farming. Late messages cost blocks.
+    CONSENSUS = 0
+    # Everything that isn't classified, e.g. the wallet protocol, which relies on the order of its messages
+    DEFAULT = 1
+    # Mempool gossip
+    TRANSACTION = 2
+    # Large responses for syncing peers, peer lists and compact proofs, nobody is waiting for them to farm
+    BULK = 3
+
+
+MESSAGE_PRIORITIES: Dict[pmt, MessagePriority] = {
+    # full_node -> full_node block propagation
+    pmt.new_peak: MessagePriority.CONSENSUS,
+    pmt.new_unfinished_block: MessagePriority.CONSENSUS,
+    pmt.request_unfinished_block: MessagePriority.CONSENSUS,
+    pmt.respond_unfinished_block: MessagePriority.CONSENSUS,
+    pmt.request_block: MessagePriority.CONSENSUS,
+    pmt.respond_block: MessagePriority.CONSENSUS,
+    pmt.reject_block: MessagePriority.CONSENSUS,
+    pmt.new_signage_point_or_end_of_sub_slot: MessagePriority.CONSENSUS,
+    pmt.request_signage_point_or_end_of_sub_slot: MessagePriority.CONSENSUS,
+    pmt.respond_signage_point: MessagePriority.CONSENSUS,
+    pmt.respond_end_of_sub_slot: MessagePriority.CONSENSUS,
+    # farming
+    pmt.new_signage_point: MessagePriority.CONSENSUS,
+    pmt.new_signage_point_harvester: MessagePriority.CONSENSUS,
+    pmt.new_proof_of_space: MessagePriority.CONSENSUS,
+    pmt.request_signatures: MessagePriority.CONSENSUS,
+    pmt.respond_signatures: MessagePriority.CONSENSUS,
+    pmt.declare_proof_of_space: MessagePriority.CONSENSUS,
+    pmt.request_signed_values: MessagePriority.CONSENSUS,
+    pmt.signed_values: MessagePriority.CONSENSUS,
+    # timelord
+    pmt.new_peak_timelord: MessagePriority.CONSENSUS,
+    pmt.new_unfinished_block_timelord: MessagePriority.CONSENSUS,
+    pmt.new_infusion_point_vdf: MessagePriority.CONSENSUS,
+    pmt.new_signage_point_vdf: MessagePriority.CONSENSUS,
+    pmt.new_end_of_sub_slot_vdf: MessagePriority.CONSENSUS,
+    # mempool
+    pmt.new_transaction: MessagePriority.TRANSACTION,
+    pmt.request_transaction: MessagePriority.TRANSACTION,
+    pmt.respond_transaction: MessagePriority.TRANSACTION,
+    pmt.request_mempool_transactions: MessagePriority.TRANSACTION,
+    # syncing, peer discovery and compact proofs
+    pmt.respond_blocks: MessagePriority.BULK,
+    pmt.respond_proof_of_weight: MessagePriority.BULK,
+    pmt.respond_header_blocks: MessagePriority.BULK,
+    pmt.respond_peers: MessagePriority.BULK,
+    pmt.respond_peers_introducer: MessagePriority.BULK,
+    pmt.new_compact_vdf: MessagePriority.BULK,
+    pmt.request_compact_vdf: MessagePriority.BULK,
+    pmt.respond_compact_vdf: MessagePriority.BULK,
+    pmt.request_compact_proof_of_time: MessagePriority.BULK,
+    pmt.respond_compact_proof_of_time: MessagePriority.BULK,
+}
+
+# The priorities by the raw message type, which is what a Message has
+_PRIORITY_FOR_TYPE: Dict[int, MessagePriority] = {
+    message_type.value: priority for message_type, priority in MESSAGE_PRIORITIES.items()
+}
+
+
+# The number of messages of a higher priority that can be sent ahead of a waiting message, before the queue of that
+# message gets a turn. Without it, a steady stream of mempool gossip would hold back the responses to syncing peers and
+# wallets until their requests time out. Consensus messages are always sent first, and don't count.
+MAX_PASSED_OVER = 10
+
+
+def message_priority(message: Message) -> MessagePriority:
+    return _PRIORITY_FOR_TYPE.get(message.type, MessagePriority.DEFAULT)
+
+
+class OutboundQueue:
+    """
+    The messages waiting to be sent to a peer. Messages of a higher priority are sent first, messages of the same
+    priority in the order they were queued. A queue that was passed over MAX_PASSED_OVER times gets the next turn, so
+    lower priorities are not starved. A message can be queued together with its encoding, so a broadcast message is
+    only encoded once for all peers.
+    """
+
+    def __init__(self) -> None:
+        self._queues: Dict[MessagePriority, Deque[Tuple[Message, Optional[bytes]]]] = {
+            priority: deque() for priority in sorted(MessagePriority)
+        }
+        self._passed_over: Dict[MessagePriority, int] = {priority: 0 for priority in MessagePriority}
+        self._not_empty = asyncio.Event()
+
+    def put(self, message: Message, encoded: Optional[bytes] = None) -> None:
+        self._queues[message_priority(message)].append((message, encoded))
+        self._not_empty.set()
+
+    def _next_priority(self) -> Optional[MessagePriority]:
+        waiting = [priority for priority, queue in self._queues.items() if len(queue) > 0]
+        if len(waiting) == 0:
+            return None
+        if waiting[0] == MessagePriority.CONSENSUS:
+            return waiting[0]
+        chosen = next((p for p in waiting if self._passed_over[p] >= MAX_PASSED_OVER), waiting[0])
+        for priority in MessagePriority:
+            if priority == chosen or priority not in waiting:
+                self._passed_over[priority] = 0
+            else:
+                self._passed_over[priority] += 1
+        return chosen
+
+    async def get(self) -> Tuple[Message, bytes]:
+        while True:
+            priority = self._next_priority()
+            if priority is not None:
+                message, encoded = self._queues[priority].popleft()
+                return message, bytes(message) if encoded is None else encoded
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+    def qsize(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def qsize_by_priority(self) -> Dict[MessagePriority, int]:
+        return {priority: len(queue) for priority, queue in self._queues.items()}
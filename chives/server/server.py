@@ -3,13 +3,10 @@ import logging
 import ssl
 import time
 import traceback
-from collections import Counter
 from ipaddress import IPv4Network, IPv6Address, IPv6Network, ip_address, ip_network
 from pathlib import Path
 from secrets import token_bytes
-from typing import Any, Callable
-from typing import Counter as typing_Counter
-from typing import Dict, List, Optional, Set, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 
 from aiohttp import ClientSession, ClientTimeout, ServerDisconnectedError, WSCloseCode, client_exceptions, web
 from aiohttp.web_app import Application
@@ -22,7 +19,9 @@ from chives.protocols.protocol_message_types import ProtocolMessageTypes
 from chives.protocols.protocol_state_machine import message_requires_reply
 from chives.protocols.protocol_timing import API_EXCEPTION_BAN_SECONDS, INVALID_PROTOCOL_BAN_SECONDS
 from chives.protocols.shared_protocol import protocol_version
+from chives.server.api_task_scheduler import ApiTaskScheduler
 from chives.server.introducer_peers import IntroducerPeers
+from chives.server.message_metrics import MessageMetrics, message_type_name
 from chives.server.outbound_message import Message, NodeType
 from chives.server.ssl_context import private_ssl_paths, public_ssl_paths
 from chives.server.ws_connection import WSChivesConnection
@@ -151,6 +150,7 @@ class ChivesServer:
         self.config = config
         self.on_connect: Optional[Callable] = None
         self.incoming_messages: asyncio.Queue = asyncio.Queue()
+        self.metrics = MessageMetrics()
         self.shut_down_event = asyncio.Event()
 
         if self._local_type is NodeType.INTRODUCER:
@@ -177,6 +177,7 @@ class ChivesServer:
         self.app_shut_down_task: Optional[asyncio.Task] = None
         self.received_message_callback: Optional[Callable] = None
         self.api_tasks: Dict[bytes32, asyncio.Task] = {}
+        self.api_task_scheduler = ApiTaskScheduler(self._start_api_task)
         self.execute_tasks: Set[bytes32] = set()
 
         self.tasks_from_peer: Dict[bytes32, Set[bytes32]] = {}
@@ -303,6 +304,7 @@ class ChivesServer:
                 self._inbound_rate_limit_percent,
                 self._outbound_rate_limit_percent,
                 close_event,
+                metrics=self.metrics,
             )
             handshake = await connection.perform_handshake(
                 self._network_id,
@@ -457,6 +459,7 @@ class ChivesServer:
                 self._inbound_rate_limit_percent,
                 self._outbound_rate_limit_percent,
                 session=session,
+                metrics=self.metrics,
             )
             handshake = await connection.perform_handshake(
                 self._network_id,
@@ -542,104 +545,122 @@ class ChivesServer:
             task = self.api_tasks[task_id]
             task.cancel()
 
+    async def _api_call(self, full_message: Message, connection: WSChivesConnection, task_id: bytes32) -> None:
+        start_time = time.time()
+        message_type = ""
+        started = False
+        failed = False
+        try:
+            if self.received_message_callback is not None:
+                await self.received_message_callback(connection)
+            connection.log.debug(
+                f"<- {ProtocolMessageTypes(full_message.type).name} from peer "
+                f"{connection.peer_node_id} {connection.peer_host}"
+            )
+            message_type = ProtocolMessageTypes(full_message.type).name
+            self.metrics.handler_started(full_message.type)
+            started = True
+
+            f = getattr(self.api, message_type, None)
+            if len(self.metrics.in_flight) % 100 == 0:
+                self.log.debug(f"Message types: {self.metrics.in_flight_by_name()}")
+
+            if f is None:
+                self.log.error(f"Non existing function: {message_type}")
+                raise ProtocolError(Err.INVALID_PROTOCOL_MESSAGE, [message_type])
+
+            if not hasattr(f, "api_function"):
+                self.log.error(f"Peer trying to call non api function {message_type}")
+                raise ProtocolError(Err.INVALID_PROTOCOL_MESSAGE, [message_type])
+
+            # If api is not ready ignore the request
+            if hasattr(self.api, "api_ready"):
+                if self.api.api_ready is False:
+                    return None
+
+            timeout: Optional[int] = 600
+            if hasattr(f, "execute_task"):
+                # Don't timeout on methods with execute_task decorator, these need to run fully
+                self.execute_tasks.add(task_id)
+                timeout = None
+
+            if hasattr(f, "peer_required"):
+                coroutine = f(full_message.data, connection)
+            else:
+                coroutine = f(full_message.data)
+
+            async def wrapped_coroutine() -> Optional[Message]:
+                try:
+                    result = await coroutine
+                    return result
+                except asyncio.CancelledError:
+                    pass
+                except Exception as e:
+                    tb = traceback.format_exc()
+                    connection.log.error(f"Exception: {e}, {connection.get_peer_logging()}. {tb}")
+                    raise e
+                return None
+
+            response: Optional[Message] = await asyncio.wait_for(wrapped_coroutine(), timeout=timeout)
+            connection.log.debug(
+                f"Time taken to process {message_type} from {connection.peer_node_id} is "
+                f"{time.time() - start_time} seconds"
+            )
+
+            if response is not None:
+                response_message = Message.construct_unchecked(response.type, full_message.id, response.data)
+                await connection.send_message(response_message)
+        except TimeoutError:
+            failed = True
+            connection.log.error(f"Timeout error for: {message_type}")
+        except Exception as e:
+            failed = True
+            if self.connection_close_task is None:
+                tb = traceback.format_exc()
+                connection.log.error(
+                    f"Exception: {e} {type(e)}, closing connection {connection.get_peer_logging()}. {tb}"
+                )
+            else:
+                connection.log.debug(f"Exception: {e} while closing connection")
+            # TODO: actually throw one of the errors from errors.py and pass this to close
+            await connection.close(self.api_exception_ban_seconds, WSCloseCode.PROTOCOL_ERROR, Err.UNKNOWN)
+        finally:
+            if started:
+                self.metrics.handler_done(full_message.type, time.time() - start_time, failed)
+            if task_id in self.api_tasks:
+                self.api_tasks.pop(task_id)
+            if task_id in self.tasks_from_peer[connection.peer_node_id]:
+                self.tasks_from_peer[connection.peer_node_id].remove(task_id)
+            if task_id in self.execute_tasks:
+                self.execute_tasks.remove(task_id)
+
+    def _start_api_task(self, full_message: Message, connection: WSChivesConnection) -> None:
+        task_id: bytes32 = bytes32(token_bytes(32))
+        api_task = asyncio.create_task(self._api_call(full_message, connection, task_id))
+        # A done callback, unlike a finally in _api_call, also runs for tasks that are cancelled before they started
+        api_task.add_done_callback(lambda _: self.api_task_scheduler.task_done(full_message))
+        self.api_tasks[task_id] = api_task
+        if connection.peer_node_id not in self.tasks_from_peer:
+            self.tasks_from_peer[connection.peer_node_id] = set()
+        self.tasks_from_peer[connection.peer_node_id].add(task_id)
+
     async def incoming_api_task(self) -> None:
         self.tasks = set()
-        message_types: typing_Counter[str] = Counter()  # Used for debugging information.
         while True:
             payload_inc, connection_inc = await self.incoming_messages.get()
             if payload_inc is None or connection_inc is None:
                 continue
+            if not self.api_task_scheduler.submit(payload_inc, connection_inc):
+                self.metrics.message_dropped(payload_inc.type)
+                connection_inc.log.debug(
+                    f"Dropping {message_type_name(payload_inc.type)} from {connection_inc.get_peer_logging()}, "
+                    f"too many messages of its kind are waiting"
+                )
 
-            async def api_call(full_message: Message, connection: WSChivesConnection, task_id):
-                nonlocal message_types
-                start_time = time.time()
-                message_type = ""
-                try:
-                    if self.received_message_callback is not None:
-                        await self.received_message_callback(connection)
-                    connection.log.debug(
-                        f"<- {ProtocolMessageTypes(full_message.type).name} from peer "
-                        f"{connection.peer_node_id} {connection.peer_host}"
-                    )
-                    message_type = ProtocolMessageTypes(full_message.type).name
-                    message_types[message_type] += 1
-
-                    f = getattr(self.api, message_type, None)
-                    if len(message_types) % 100 == 0:
-                        self.log.debug(f"Message types: {[(m, n) for m, n in sorted(message_types.items()) if n != 0]}")
-
-                    if f is None:
-                        self.log.error(f"Non existing function: {message_type}")
-                        raise ProtocolError(Err.INVALID_PROTOCOL_MESSAGE, [message_type])
-
-                    if not hasattr(f, "api_function"):
-                        self.log.error(f"Peer trying to call non api function {message_type}")
-                        raise ProtocolError(Err.INVALID_PROTOCOL_MESSAGE, [message_type])
-
-                    # If api is not ready ignore the request
-                    if hasattr(self.api, "api_ready"):
-                        if self.api.api_ready is False:
-                            return None
-
-                    timeout: Optional[int] = 600
-                    if hasattr(f, "execute_task"):
-                        # Don't timeout on methods with execute_task decorator, these need to run fully
-                        self.execute_tasks.add(task_id)
-                        timeout = None
-
-                    if hasattr(f, "peer_required"):
-                        coroutine = f(full_message.data, connection)
-                    else:
-                        coroutine = f(full_message.data)
-
-                    async def wrapped_coroutine() -> Optional[Message]:
-                        try:
-                            result = await coroutine
-                            return result
-                        except asyncio.CancelledError:
-                            pass
-                        except Exception as e:
-                            tb = traceback.format_exc()
-                            connection.log.error(f"Exception: {e}, {connection.get_peer_logging()}. {tb}")
-                            raise e
-                        return None
-
-                    response: Optional[Message] = await asyncio.wait_for(wrapped_coroutine(), timeout=timeout)
-                    connection.log.debug(
-                        f"Time taken to process {message_type} from {connection.peer_node_id} is "
-                        f"{time.time() - start_time} seconds"
-                    )
-
-                    if response is not None:
-                        response_message = Message(response.type, full_message.id, response.data)
-                        await connection.send_message(response_message)
-                except TimeoutError:
-                    connection.log.error(f"Timeout error for: {message_type}")
-                except Exception as e:
-                    if self.connection_close_task is None:
-                        tb = traceback.format_exc()
-                        connection.log.error(
-                            f"Exception: {e} {type(e)}, closing connection {connection.get_peer_logging()}. {tb}"
-                        )
-                    else:
-                        connection.log.debug(f"Exception: {e} while closing connection")
-                    # TODO: actually throw one of the errors from errors.py and pass this to close
-                    await connection.close(self.api_exception_ban_seconds, WSCloseCode.PROTOCOL_ERROR, Err.UNKNOWN)
-                finally:
-                    message_types[message_type] -= 1
-                    if task_id in self.api_tasks:
-                        self.api_tasks.pop(task_id)
-                    if task_id in self.tasks_from_peer[connection.peer_node_id]:
-                        self.tasks_from_peer[connection.peer_node_id].remove(task_id)
-                    if task_id in self.execute_tasks:
-                        self.execute_tasks.remove(task_id)
-
-            task_id: bytes32 = bytes32(token_bytes(32))
-            api_task = asyncio.create_task(api_call(payload_inc, connection_inc, task_id))
-            self.api_tasks[task_id] = api_task
-            if connection_inc.peer_node_id not in self.tasks_from_peer:
-                self.tasks_from_peer[connection_inc.peer_node_id] = set()
-            self.tasks_from_peer[connection_inc.peer_node_id].add(task_id)
+    @staticmethod
+    def _encode_messages(messages: List[Message]) -> List[Tuple[Message, bytes]]:
+        # A message sent to many peers is encoded once, and all connections send the same bytes
+        return [(message, bytes(message)) for message in messages]
 
     async def send_to_others(
         self,
@@ -647,12 +668,13 @@ class ChivesServer:
         node_type: NodeType,
         origin_peer: WSChivesConnection,
     ):
+        encoded_messages = self._encode_messages(messages)
         for node_id, connection in self.all_connections.items():
             if node_id == origin_peer.peer_node_id:
                 continue
             if connection.connection_type is node_type:
-                for message in messages:
-                    await connection.send_message(message)
+                for message, encoded in encoded_messages:
+                    await connection.send_message(message, encoded)
 
     async def validate_broadcast_message_type(self, messages: List[Message], node_type: NodeType):
         for message in messages:
@@ -670,17 +692,19 @@ class ChivesServer:
 
     async def send_to_all(self, messages: List[Message], node_type: NodeType):
         await self.validate_broadcast_message_type(messages, node_type)
+        encoded_messages = self._encode_messages(messages)
         for _, connection in self.all_connections.items():
             if connection.connection_type is node_type:
-                for message in messages:
-                    await connection.send_message(message)
+                for message, encoded in encoded_messages:
+                    await connection.send_message(message, encoded)
 
     async def send_to_all_except(self, messages: List[Message], node_type: NodeType, exclude: bytes32):
         await self.validate_broadcast_message_type(messages, node_type)
+        encoded_messages = self._encode_messages(messages)
         for _, connection in self.all_connections.items():
             if connection.connection_type is node_type and connection.peer_node_id != exclude:
-                for message in messages:
-                    await connection.send_message(message)
+                for message, encoded in encoded_messages:
+                    await connection.send_message(message, encoded)
 
     async def send_to_specific(self, messages: List[Message], node_id: bytes32):
         if node_id in self.all_connections:
@@ -688,6 +712,35 @@ class ChivesServer:
             for message in messages:
                 await connection.send_message(message)
 
+    def get_message_metrics(self) -> Dict[str, Any]:
+        """
+        Returns the message statistics by message type (see MessageMetrics), the number of received messages waiting
+        for an API handler, the running and queued API tasks by class (see ApiTaskScheduler), and the number of
+        messages waiting to be sent to every peer.
+        """
+        connections = []
+        for connection in self.all_connections.values():
+            connections.append(
+                {
+                    "node_id": connection.peer_node_id.hex(),
+                    "peer_host": connection.peer_host,
+                    "peer_port": connection.peer_port,
+                    "type": connection.connection_type,
+                    "bytes_read": connection.bytes_read,
+                    "bytes_written": connection.bytes_written,
+                    "outgoing_queue_size": {
+                        priority.name.lower(): size
+                        for priority, size in connection.outgoing_queue.qsize_by_priority().items()
+                    },
+                }
+            )
+        return {
+            "message_types": self.metrics.to_json_dict(),
+            "incoming_queue_size": self.incoming_messages.qsize(),
+            "api_tasks": self.api_task_scheduler.task_counts(),
+            "connections": connections,
+        }
+
     def get_outgoing_connections(self) -> List[WSChivesConnection]:
         result = []
         for _, connection in self.all_connections.items():
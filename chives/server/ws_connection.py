@@ -12,7 +12,9 @@ from chives.protocols.protocol_message_types import ProtocolMessageTypes
 from chives.protocols.protocol_state_machine import message_response_ok
 from chives.protocols.protocol_timing import INTERNAL_PROTOCOL_ERROR_BAN_SECONDS
 from chives.protocols.shared_protocol import Capability, Handshake
+from chives.server.message_metrics import MessageMetrics
 from chives.server.outbound_message import Message, NodeType, make_msg
+from chives.server.outbound_queue import OutboundQueue
 from chives.server.rate_limits import RateLimiter
 from chives.types.peer_info import PeerInfo
 from chives.util.errors import Err, ProtocolError
@@ -48,6 +50,7 @@ class WSChivesConnection:
         outbound_rate_limit_percent: int,
         close_event=None,
         session=None,
+        metrics: Optional[MessageMetrics] = None,
     ):
         # Local properties
         self.ws: Any = ws
@@ -77,10 +80,12 @@ class WSChivesConnection:
         self.bytes_read = 0
         self.bytes_written = 0
         self.last_message_time: float = 0
+        # Usually shared by all connections of the server
+        self.metrics: MessageMetrics = metrics if metrics is not None else MessageMetrics()
 
         # Messaging
         self.incoming_queue: asyncio.Queue = incoming_queue
-        self.outgoing_queue: asyncio.Queue = asyncio.Queue()
+        self.outgoing_queue: OutboundQueue = OutboundQueue()
 
         self.inbound_task: Optional[asyncio.Task] = None
         self.outbound_task: Optional[asyncio.Task] = None
@@ -244,9 +249,8 @@ class WSChivesConnection:
     async def outbound_handler(self):
         try:
             while not self.closed:
-                msg = await self.outgoing_queue.get()
-                if msg is not None:
-                    await self._send_message(msg)
+                msg, encoded = await self.outgoing_queue.get()
+                await self._send_message(msg, encoded)
         except asyncio.CancelledError:
             pass
         except BrokenPipeError as e:
@@ -278,11 +282,14 @@ class WSChivesConnection:
             self.log.error(f"Exception: {e}")
             self.log.error(f"Exception Stack: {error_stack}")
 
-    async def send_message(self, message: Message) -> bool:
-        """Send message sends a message with no tracking / callback."""
+    async def send_message(self, message: Message, encoded: Optional[bytes] = None) -> bool:
+        """
+        Send message sends a message with no tracking / callback. `encoded` is bytes(message), if the caller already
+        has it (e.g. because the message is sent to many peers).
+        """
         if self.closed:
             return False
-        await self.outgoing_queue.put(message)
+        self.outgoing_queue.put(message, encoded)
         return True
 
     def __getattr__(self, attr_name: str):
@@ -344,10 +351,10 @@ class WSChivesConnection:
                 uint16(self.request_nonce + 1) if self.request_nonce != (2 ** 16 - 1) else uint16(2 ** 15)
             )
 
-        message = Message(message_no_id.type, request_id, message_no_id.data)
+        message = Message.construct_unchecked(message_no_id.type, request_id, message_no_id.data)
         assert message.id is not None
         self.pending_requests[message.id] = event
-        await self.outgoing_queue.put(message)
+        self.outgoing_queue.put(message)
 
         # Either the result is available below or not, no need to detect the timeout error
         with contextlib.suppress(asyncio.TimeoutError):
@@ -367,21 +374,23 @@ class WSChivesConnection:
         if self.closed:
             return None
         for message in messages:
-            await self.outgoing_queue.put(message)
+            self.outgoing_queue.put(message)
 
-    async def _wait_and_retry(self, msg: Message, queue: asyncio.Queue):
+    async def _wait_and_retry(self, msg: Message, encoded: bytes):
         try:
             await asyncio.sleep(1)
-            await queue.put(msg)
+            self.outgoing_queue.put(msg, encoded)
         except Exception as e:
             self.log.debug(f"Exception {e} while waiting to retry sending rate limited message")
             return None
 
-    async def _send_message(self, message: Message):
-        encoded: bytes = bytes(message)
+    async def _send_message(self, message: Message, encoded: Optional[bytes] = None):
+        if encoded is None:
+            encoded = bytes(message)
         size = len(encoded)
         assert len(encoded) < (2 ** (LENGTH_BYTES * 8))
         if not self.outbound_rate_limiter.process_msg_and_check(message):
+            self.metrics.rate_limited(message.type, incoming=False)
             if not is_localhost(self.peer_host):
                 self.log.debug(
                     f"Rate limiting ourselves. message type: {ProtocolMessageTypes(message.type).name}, "
@@ -390,7 +399,7 @@ class WSChivesConnection:
 
                 # TODO: fix this special case. This function has rate limits which are too low.
                 if ProtocolMessageTypes(message.type) != ProtocolMessageTypes.respond_peers:
-                    asyncio.create_task(self._wait_and_retry(message, self.outgoing_queue))
+                    asyncio.create_task(self._wait_and_retry(message, encoded))
 
                 return None
             else:
@@ -402,6 +411,7 @@ class WSChivesConnection:
         await self.ws.send_bytes(encoded)
         self.log.debug(f"-> {ProtocolMessageTypes(message.type).name} to peer {self.peer_host} {self.peer_node_id}")
         self.bytes_written += size
+        self.metrics.message_sent(message.type, size)
 
     async def _read_one_message(self) -> Optional[Message]:
         try:
@@ -443,12 +453,14 @@ class WSChivesConnection:
             data = message.data
             full_message_loaded: Message = Message.from_bytes(data)
             self.bytes_read += len(data)
+            self.metrics.message_received(full_message_loaded.type, len(data))
             self.last_message_time = time.time()
             try:
                 message_type = ProtocolMessageTypes(full_message_loaded.type).name
             except Exception:
                 message_type = "Unknown"
             if not self.inbound_rate_limiter.process_msg_and_check(full_message_loaded):
+                self.metrics.rate_limited(full_message_loaded.type, incoming=True)
                 if self.local_type == NodeType.FULL_NODE and not is_localhost(self.peer_host):
                     self.log.error(
                         f"Peer has been rate limited and will be disconnected: {self.peer_host}, "
@@ -38,4 +38,4 @@ class CoinRecord(Streamable):
         confirmed_height: Optional[uint32] = self.confirmed_block_index
         if self.confirmed_block_index == 0 and self.timestamp == 0:
             confirmed_height = None
-        return CoinState(self.coin, spent_h, confirmed_height)
+        return CoinState.construct_unchecked(self.coin, spent_h, confirmed_height)
@@ -0,0 +1,55 @@
+import math
+from hashlib import blake2b
+from typing import List
+
+
+class _FixedBloomFilter:
+    def __init__(self, capacity: int, false_positive_rate: float):
+        self.capacity = capacity
+        self.count = 0
+        self.num_bits = max(8, int(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: bytes) -> List[int]:
+        # double hashing (Kirsch-Mitzenmacher), two 64 bit hashes give all the positions
+        digest = blake2b(item, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item: bytes) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: bytes) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BloomFilter:
+    """
+    A set of bytes that can answer "definitely not present" without storing the items, with about
+    `false_positive_rate` false positives. Once the items outgrow the capacity, another filter of twice the capacity
+    is started (a scalable bloom filter), so the false positive rate stays bounded without rebuilding. Items can't be
+    removed.
+    """
+
+    def __init__(self, capacity: int = 100000, false_positive_rate: float = 0.01):
+        self.false_positive_rate = false_positive_rate
+        self._filters: List[_FixedBloomFilter] = [_FixedBloomFilter(max(capacity, 1), false_positive_rate)]
+
+    def add(self, item: bytes) -> None:
+        current = self._filters[-1]
+        if current.count >= current.capacity:
+            # later filters are tighter, so the false positive rate of all filters together converges
+            current = _FixedBloomFilter(2 * current.capacity, self.false_positive_rate / 2 ** len(self._filters))
+            self._filters.append(current)
+        current.add(item)
+
+    def __contains__(self, item: bytes) -> bool:
+        return any(item in bloom_filter for bloom_filter in self._filters)
+
+    def __len__(self) -> int:
+        return sum(bloom_filter.count for bloom_filter in self._filters)
@@ -102,8 +102,18 @@ class DBWrapper2:
                 await self._write_connection.execute(f"ROLLBACK TO {name}")
                 raise
             finally:
-                self._current_writer = None
-                await self._write_connection.execute(f"RELEASE {name}")
+                # the writer is only cleared once the transaction is committed, see writer_in_other_task()
+                try:
+                    await self._write_connection.execute(f"RELEASE {name}")
+                finally:
+                    self._current_writer = None
+
+    def writer_in_other_task(self) -> bool:
+        """
+        Returns True if another task has a write transaction open. Reads of the current task don't see the changes
+        of that transaction until it's committed.
+        """
+        return self._current_writer is not None and self._current_writer != asyncio.current_task()
 
     @contextlib.asynccontextmanager
     async def read_db(self) -> AsyncIterator[aiosqlite.Connection]:
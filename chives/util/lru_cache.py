@@ -1,5 +1,5 @@
 from collections import OrderedDict
-from typing import Any, Optional
+from typing import Any, Optional, Sized
 
 
 class LRUCache:
@@ -22,3 +22,37 @@ class LRUCache:
 
     def remove(self, key: Any) -> None:
         self.cache.pop(key)
+
+
+class SizedLRUCache:
+    """
+    An LRU cache of strings or bytes, bounded by the total length of the values rather than their number. Values
+    longer than `max_value_size` are not cached, so a single one can't evict everything else.
+    """
+
+    def __init__(self, max_size: int, max_value_size: int):
+        self.cache: "OrderedDict[Any, Sized]" = OrderedDict()
+        self.max_size = max_size
+        self.max_value_size = max_value_size
+        self.size = 0
+
+    def get(self, key: Any) -> Optional[Any]:
+        if key not in self.cache:
+            return None
+        self.cache.move_to_end(key)
+        return self.cache[key]
+
+    def put(self, key: Any, value: Sized) -> None:
+        self.remove(key)
+        if len(value) > self.max_value_size:
+            return
+        self.cache[key] = value
+        self.size += len(value)
+        while self.size > self.max_size:
+            _, evicted = self.cache.popitem(last=False)
+            self.size -= len(evicted)
+
+    def remove(self, key: Any) -> None:
+        value = self.cache.pop(key, None)
+        if value is not None:
+            self.size -= len(value)
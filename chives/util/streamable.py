@@ -3,6 +3,7 @@ from __future__ import annotations
 import dataclasses
 import io
 import pprint
+import struct
 import sys
 from enum import Enum
 from typing import (
@@ -10,7 +11,6 @@ from typing import (
     BinaryIO,
     Callable,
     Dict,
-    Iterator,
     List,
     Optional,
     Tuple,
@@ -25,9 +25,10 @@ from blspy import G1Element, G2Element, PrivateKey
 from typing_extensions import Literal
 
 from chives.types.blockchain_format.sized_bytes import bytes32
-from chives.util.byte_types import hexstr_to_bytes
+from chives.util.byte_types import SizedBytes, hexstr_to_bytes
 from chives.util.hash import std_hash
 from chives.util.ints import int64, int512, uint32, uint64, uint128
+from chives.util.struct_stream import StructStream
 
 if sys.version_info < (3, 8):
 
@@ -76,10 +77,8 @@ ParseFunctionType = Callable[[BinaryIO], object]
 StreamFunctionType = Callable[[object, BinaryIO], None]
 
 
-# Caches to store the fields and (de)serialization methods for all available streamable classes.
+# Cache to store the fields of all available streamable classes.
 FIELDS_FOR_STREAMABLE_CLASS: Dict[Type[object], Dict[str, Type[object]]] = {}
-STREAM_FUNCTIONS_FOR_STREAMABLE_CLASS: Dict[Type[object], List[StreamFunctionType]] = {}
-PARSE_FUNCTIONS_FOR_STREAMABLE_CLASS: Dict[Type[object], List[ParseFunctionType]] = {}
 
 
 def is_type_List(f_type: object) -> bool:
@@ -295,10 +294,237 @@ def stream_byte_convertible(item: object, f: BinaryIO) -> None:
     f.write(getattr(item, "__bytes__")())
 
 
+# Generated code: the streamable decorator generates a parse and a stream function for every class, which read and
+# write all fields (and the items of their lists, optionals and tuples) inline, instead of calling a closure for every
+# field and every layer of its type.
+_ZERO = b"\x00"
+_ONE = b"\x01"
+_pack_uint32 = struct.Struct("!L").pack
+
+
+class _CodeWriter:
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+        self.namespace: Dict[str, Any] = {
+            "_ZERO": _ZERO,
+            "_ONE": _ONE,
+            "_pack_uint32": _pack_uint32,
+            "_from_bytes": int.from_bytes,
+            "_int_new": int.__new__,
+            "_bytes_new": bytes.__new__,
+            "_object_new": object.__new__,
+        }
+        self.variable_count = 0
+
+    def line(self, indent: int, code: str) -> None:
+        self.lines.append("    " * indent + code)
+
+    def variable(self) -> str:
+        self.variable_count += 1
+        return f"v{self.variable_count}"
+
+    def constant(self, value: Any) -> str:
+        name = f"c{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    def compile(self, name: str, cls: Type[Any]) -> Callable[..., Any]:
+        source = "\n".join(self.lines)
+        exec(compile(source, f"<streamable {cls.__module__}.{cls.__qualname__}.{name}>", "exec"), self.namespace)
+        function: Callable[..., Any] = self.namespace[name]
+        return function
+
+
+def _is_plain_struct_stream(f_type: Type[Any]) -> bool:
+    # sized ints which read and write exactly what their struct format says
+    return (
+        isinstance(f_type, type)
+        and issubclass(f_type, StructStream)
+        and getattr(f_type.parse, "__func__", None) is getattr(StructStream.parse, "__func__", None)
+        and f_type.stream is StructStream.stream
+        and f_type.__new__ is StructStream.__new__
+    )
+
+
+def _is_plain_sized_bytes(f_type: Type[Any]) -> bool:
+    return (
+        isinstance(f_type, type)
+        and issubclass(f_type, SizedBytes)
+        and getattr(f_type.parse, "__func__", None) is getattr(SizedBytes.parse, "__func__", None)
+        and f_type.stream is SizedBytes.stream
+        and f_type.__new__ is SizedBytes.__new__
+    )
+
+
+def _write_read(w: _CodeWriter, indent: int, target: str, size: str) -> None:
+    w.line(indent, f"{target} = read({size})")
+    w.line(indent, f"assert len({target}) == {size}")
+
+
+def _write_parse(w: _CodeWriter, f_type: Type[Any], target: str, indent: int) -> None:
+    """
+    Writes the code that parses a value of type `f_type` from the stream `f` into the variable `target`.
+    """
+    if f_type is bool:
+        data = w.variable()
+        _write_read(w, indent, data, "1")
+        w.line(indent, f"if {data} == _ZERO:")
+        w.line(indent + 1, f"{target} = False")
+        w.line(indent, f"elif {data} == _ONE:")
+        w.line(indent + 1, f"{target} = True")
+        w.line(indent, "else:")
+        w.line(indent + 1, 'raise ValueError("Bool byte must be 0 or 1")')
+    elif is_type_SpecificOptional(f_type):
+        data = w.variable()
+        _write_read(w, indent, data, "1")
+        w.line(indent, f"if {data} == _ZERO:")
+        w.line(indent + 1, f"{target} = None")
+        w.line(indent, f"elif {data} == _ONE:")
+        _write_parse(w, get_args(f_type)[0], target, indent + 1)
+        w.line(indent, "else:")
+        w.line(indent + 1, 'raise ValueError("Optional must be 0 or 1")')
+    elif hasattr(f_type, "parse"):
+        if _is_plain_struct_stream(f_type) or f_type is uint128:
+            byte_count = 16 if f_type is uint128 else struct.calcsize(f_type.PACK)
+            signed = f_type is not uint128 and f_type.PACK[-1].islower()
+            data = w.variable()
+            _write_read(w, indent, data, str(byte_count))
+            w.line(indent, f'{target} = _int_new({w.constant(f_type)}, _from_bytes({data}, "big", signed={signed}))')
+        elif _is_plain_sized_bytes(f_type):
+            _write_read(w, indent, target, str(f_type._size))
+            w.line(indent, f"{target} = _bytes_new({w.constant(f_type)}, {target})")
+        else:
+            w.line(indent, f"{target} = {w.constant(f_type)}.parse(f)")
+    elif f_type == bytes:
+        data = w.variable()
+        _write_read(w, indent, data, "4")
+        size = w.variable()
+        w.line(indent, f'{size} = _from_bytes({data}, "big")')
+        _write_read(w, indent, target, size)
+    elif is_type_List(f_type):
+        inner_type = get_args(f_type)[0]
+        data = w.variable()
+        _write_read(w, indent, data, "4")
+        count = w.variable()
+        w.line(indent, f'{count} = _from_bytes({data}, "big")')
+        if _is_plain_sized_bytes(inner_type):
+            # all items at once
+            item_size = inner_type._size
+            items_data = w.variable()
+            _write_read(w, indent, items_data, f"{count} * {item_size}")
+            w.line(
+                indent,
+                f"{target} = [_bytes_new({w.constant(inner_type)}, {items_data}[i:i + {item_size}]) "
+                f"for i in range(0, {count} * {item_size}, {item_size})]",
+            )
+        else:
+            item = w.variable()
+            w.line(indent, f"{target} = []")
+            w.line(indent, f"for _ in range({count}):")
+            _write_parse(w, inner_type, item, indent + 1)
+            w.line(indent + 1, f"{target}.append({item})")
+    elif is_type_Tuple(f_type):
+        items = []
+        for inner_type in get_args(f_type):
+            item = w.variable()
+            _write_parse(w, inner_type, item, indent)
+            items.append(item)
+        w.line(indent, f"{target} = ({''.join(item + ', ' for item in items)})")
+    elif hasattr(f_type, "from_bytes") and f_type.__name__ in size_hints:
+        data = w.variable()
+        _write_read(w, indent, data, str(size_hints[f_type.__name__]))
+        w.line(indent, f"{target} = {w.constant(f_type)}.from_bytes({data})")
+    elif f_type is str:
+        data = w.variable()
+        _write_read(w, indent, data, "4")
+        size = w.variable()
+        w.line(indent, f'{size} = _from_bytes({data}, "big")')
+        _write_read(w, indent, target, size)
+        w.line(indent, f'{target} = {target}.decode("utf-8")')
+    else:
+        raise NotImplementedError(f"Type {f_type} does not have parse")
+
+
+def _write_stream(w: _CodeWriter, f_type: Type[Any], value: str, indent: int) -> None:
+    """
+    Writes the code that streams the variable `value` of type `f_type` into the stream `f`.
+    """
+    if is_type_SpecificOptional(f_type):
+        w.line(indent, f"if {value} is None:")
+        w.line(indent + 1, "write(_ZERO)")
+        w.line(indent, "else:")
+        w.line(indent + 1, "write(_ONE)")
+        _write_stream(w, get_args(f_type)[0], value, indent + 1)
+    elif f_type == bytes:
+        w.line(indent, f"write(_pack_uint32(len({value})))")
+        w.line(indent, f"write({value})")
+    elif hasattr(f_type, "stream"):
+        if _is_plain_struct_stream(f_type):
+            w.line(indent, f"write({w.constant(struct.Struct(f_type.PACK).pack)}({value}))")
+        elif _is_plain_sized_bytes(f_type):
+            w.line(indent, f"write({value})")
+        else:
+            w.line(indent, f"{value}.stream(f)")
+    elif hasattr(f_type, "__bytes__"):
+        w.line(indent, f"write({value}.__bytes__())")
+    elif is_type_List(f_type):
+        item = w.variable()
+        w.line(indent, f"write(_pack_uint32(len({value})))")
+        w.line(indent, f"for {item} in {value}:")
+        _write_stream(w, get_args(f_type)[0], item, indent + 1)
+    elif is_type_Tuple(f_type):
+        inner_types = get_args(f_type)
+        w.line(indent, f"assert len({value}) == {len(inner_types)}")
+        for index, inner_type in enumerate(inner_types):
+            item = w.variable()
+            w.line(indent, f"{item} = {value}[{index}]")
+            _write_stream(w, inner_type, item, indent)
+    elif f_type is str:
+        data = w.variable()
+        w.line(indent, f'{data} = {value}.encode("utf-8")')
+        w.line(indent, f"write(_pack_uint32(len({data})))")
+        w.line(indent, f"write({data})")
+    elif f_type is bool:
+        w.line(indent, f"write(_ONE if {value} else _ZERO)")
+    else:
+        raise NotImplementedError(f"can't stream {f_type}")
+
+
+def generate_parse_function(cls: Type[Any], fields: Dict[str, Type[Any]]) -> Callable[[Any, BinaryIO], Any]:
+    w = _CodeWriter()
+    w.line(0, "def parse(cls, f):")
+    w.line(1, "read = f.read")
+    values = []
+    for f_type in fields.values():
+        value = w.variable()
+        _write_parse(w, f_type, value, 1)
+        values.append(value)
+    # Create the object without calling __init__() to avoid unnecessary post-init checks
+    w.line(1, "obj = _object_new(cls)")
+    w.line(1, "d = obj.__dict__")
+    for f_name, value in zip(fields, values):
+        w.line(1, f"d[{f_name!r}] = {value}")
+    w.line(1, "return obj")
+    return w.compile("parse", cls)
+
+
+def generate_stream_function(cls: Type[Any], fields: Dict[str, Type[Any]]) -> Callable[[Any, BinaryIO], None]:
+    w = _CodeWriter()
+    w.line(0, "def stream(self, f):")
+    w.line(1, "write = f.write")
+    w.line(1, "d = self.__dict__")
+    for f_name, f_type in fields.items():
+        value = w.variable()
+        w.line(1, f"{value} = d[{f_name!r}]")
+        _write_stream(w, f_type, value, 1)
+    w.line(1, "return None")
+    return w.compile("stream", cls)
+
+
 def streamable(cls: Type[_T_Streamable]) -> Type[_T_Streamable]:
     """
-    This decorator forces correct streamable protocol syntax/usage and populates the caches for types hints and
-    (de)serialization methods for all members of the class. The correct usage is:
+    This decorator forces correct streamable protocol syntax/usage, populates the cache for types hints of all members
+    of the class and generates its parse and stream methods. The correct usage is:
 
     @streamable
     @dataclass(frozen=True)
@@ -330,8 +556,6 @@ def streamable(cls: Type[_T_Streamable]) -> Type[_T_Streamable]:
     if not issubclass(cls, Streamable):
         raise DefinitionError(f"Streamable inheritance required. {correct_usage_string}")
 
-    stream_functions = []
-    parse_functions = []
     try:
         hints = get_type_hints(cls)
         fields = {field.name: hints.get(field.name, field.type) for field in dataclasses.fields(cls)}
@@ -340,12 +564,11 @@ def streamable(cls: Type[_T_Streamable]) -> Type[_T_Streamable]:
 
     FIELDS_FOR_STREAMABLE_CLASS[cls] = fields
 
-    for _, f_type in fields.items():
-        stream_functions.append(cls.function_to_stream_one_item(f_type))
-        parse_functions.append(cls.function_to_parse_one_item(f_type))
-
-    STREAM_FUNCTIONS_FOR_STREAMABLE_CLASS[cls] = stream_functions
-    PARSE_FUNCTIONS_FOR_STREAMABLE_CLASS[cls] = parse_functions
+    # Both are generated first, so a type that can't be parsed or streamed leaves the class untouched
+    parse_function = generate_parse_function(cls, fields)
+    stream_function = generate_stream_function(cls, fields)
+    setattr(cls, "parse", classmethod(parse_function))
+    setattr(cls, "stream", stream_function)
     return cls
 
 
@@ -449,96 +672,27 @@ class Streamable:
                 # Throws a TypeError because we cannot call isinstance for subscripted generics like Optional[int]
                 object.__setattr__(self, f_name, self.post_init_parse(data[f_name], f_name, f_type))
 
-    @classmethod
-    def function_to_parse_one_item(cls, f_type: Type[Any]) -> ParseFunctionType:
-        """
-        This function returns a function taking one argument `f: BinaryIO` that parses
-        and returns a value of the given type.
-        """
-        inner_type: Type[Any]
-        if f_type is bool:
-            return parse_bool
-        if is_type_SpecificOptional(f_type):
-            inner_type = get_args(f_type)[0]
-            parse_inner_type_f = cls.function_to_parse_one_item(inner_type)
-            return lambda f: parse_optional(f, parse_inner_type_f)
-        if hasattr(f_type, "parse"):
-            # Ignoring for now as the proper solution isn't obvious
-            return f_type.parse  # type: ignore[no-any-return]
-        if f_type == bytes:
-            return parse_bytes
-        if is_type_List(f_type):
-            inner_type = get_args(f_type)[0]
-            parse_inner_type_f = cls.function_to_parse_one_item(inner_type)
-            return lambda f: parse_list(f, parse_inner_type_f)
-        if is_type_Tuple(f_type):
-            inner_types = get_args(f_type)
-            list_parse_inner_type_f = [cls.function_to_parse_one_item(_) for _ in inner_types]
-            return lambda f: parse_tuple(f, list_parse_inner_type_f)
-        if hasattr(f_type, "from_bytes") and f_type.__name__ in size_hints:
-            bytes_to_read = size_hints[f_type.__name__]
-            return lambda f: parse_size_hints(f, f_type, bytes_to_read)
-        if f_type is str:
-            return parse_str
-        raise NotImplementedError(f"Type {f_type} does not have parse")
-
     @classmethod
     def parse(cls: Type[_T_Streamable], f: BinaryIO) -> _T_Streamable:
-        # Create the object without calling __init__() to avoid unnecessary post-init checks in strictdataclass
-        obj: _T_Streamable = object.__new__(cls)
-        fields: Iterator[str] = iter(FIELDS_FOR_STREAMABLE_CLASS.get(cls, {}))
-        values: Iterator[object] = (parse_f(f) for parse_f in PARSE_FUNCTIONS_FOR_STREAMABLE_CLASS[cls])
-        for field, value in zip(fields, values):
-            object.__setattr__(obj, field, value)
-
-        # Use -1 as a sentinel value as it's not currently serializable
-        if next(fields, -1) != -1:
-            raise ValueError("Failed to parse incomplete Streamable object")
-        if next(values, -1) != -1:
-            raise ValueError("Failed to parse unknown data in Streamable object")
-        return obj
-
-    @classmethod
-    def function_to_stream_one_item(cls, f_type: Type[Any]) -> StreamFunctionType:
-        inner_type: Type[Any]
-        if is_type_SpecificOptional(f_type):
-            inner_type = get_args(f_type)[0]
-            stream_inner_type_func = cls.function_to_stream_one_item(inner_type)
-            return lambda item, f: stream_optional(stream_inner_type_func, item, f)
-        elif f_type == bytes:
-            return stream_bytes
-        elif hasattr(f_type, "stream"):
-            return stream_streamable
-        elif hasattr(f_type, "__bytes__"):
-            return stream_byte_convertible
-        elif is_type_List(f_type):
-            inner_type = get_args(f_type)[0]
-            stream_inner_type_func = cls.function_to_stream_one_item(inner_type)
-            return lambda item, f: stream_list(stream_inner_type_func, item, f)
-        elif is_type_Tuple(f_type):
-            inner_types = get_args(f_type)
-            stream_inner_type_funcs = []
-            for i in range(len(inner_types)):
-                stream_inner_type_funcs.append(cls.function_to_stream_one_item(inner_types[i]))
-            return lambda item, f: stream_tuple(stream_inner_type_funcs, item, f)
-        elif f_type is str:
-            return stream_str
-        elif f_type is bool:
-            return stream_bool
-        else:
-            raise NotImplementedError(f"can't stream {f_type}")
+        # Replaced for every class by the streamable decorator, see generate_parse_function
+        raise NotImplementedError(f"{cls.__name__} is missing the streamable decorator")
 
     def stream(self, f: BinaryIO) -> None:
-        self_type = type(self)
-        try:
-            fields = FIELDS_FOR_STREAMABLE_CLASS[self_type]
-            functions = STREAM_FUNCTIONS_FOR_STREAMABLE_CLASS[self_type]
-        except Exception:
-            fields = {}
-            functions = []
+        # Replaced for every class by the streamable decorator, see generate_stream_function
+        raise NotImplementedError(f"{type(self).__name__} is missing the streamable decorator")
 
-        for field, stream_func in zip(fields, functions):
-            stream_func(getattr(self, field), f)
+    @classmethod
+    def construct_unchecked(cls: Type[_T_Streamable], *args: Any, **kwargs: Any) -> _T_Streamable:
+        """
+        Creates an object like the constructor, but without the checks and conversions of `__post_init__`. Only for
+        values that are known to have the right types already, e.g. the fields of another streamable object. All
+        fields have to be passed.
+        """
+        obj: _T_Streamable = object.__new__(cls)
+        data = obj.__dict__
+        data.update(zip(FIELDS_FOR_STREAMABLE_CLASS[cls], args))
+        data.update(kwargs)
+        return obj
 
     def get_hash(self) -> bytes32:
         return bytes32(std_hash(bytes(self)))
@@ -553,7 +707,7 @@ class Streamable:
     def __bytes__(self: Any) -> bytes:
         f = io.BytesIO()
         self.stream(f)
-        return bytes(f.getvalue())
+        return f.getvalue()
 
     def __str__(self: Any) -> str:
         return pp.pformat(recurse_jsonify(dataclasses.asdict(self)))
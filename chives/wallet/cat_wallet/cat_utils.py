@@ -11,9 +11,14 @@ from chives.types.spend_bundle import CoinSpend, SpendBundle
 from chives.util.condition_tools import conditions_dict_for_solution
 from chives.wallet.lineage_proof import LineageProof
 from chives.wallet.puzzles.cat_loader import CAT_MOD
+from chives.wallet.util.curry_and_treehash import calculate_hash_of_quoted_mod_hash, curry_and_treehash, shatree_atom
 
 NULL_SIGNATURE = G2Element()
 
+CAT_MOD_HASH = CAT_MOD.get_tree_hash()
+CAT_MOD_HASH_HASH = shatree_atom(CAT_MOD_HASH)
+QUOTED_CAT_MOD_HASH = calculate_hash_of_quoted_mod_hash(CAT_MOD_HASH)
+
 ANYONE_CAN_SPEND_PUZZLE = Program.to(1)  # simply return the conditions
 
 
@@ -45,7 +50,18 @@ def construct_cat_puzzle(mod_code: Program, limitations_program_hash: bytes32, i
     """
     Given an inner puzzle hash and tail hash calculate a puzzle program for a specific cc.
     """
-    return mod_code.curry(mod_code.get_tree_hash(), limitations_program_hash, inner_puzzle)
+    mod_hash = CAT_MOD_HASH if mod_code is CAT_MOD else mod_code.get_tree_hash()
+    return mod_code.curry(mod_hash, limitations_program_hash, inner_puzzle)
+
+
+def construct_cat_puzzle_hash(limitations_program_hash: bytes32, inner_puzzle_hash: bytes32) -> bytes32:
+    """
+    Same as `construct_cat_puzzle(CAT_MOD, limitations_program_hash, inner_puzzle).get_tree_hash()`, calculated from
+    the hash of the inner puzzle.
+    """
+    return curry_and_treehash(
+        QUOTED_CAT_MOD_HASH, CAT_MOD_HASH_HASH, shatree_atom(limitations_program_hash), inner_puzzle_hash
+    )
 
 
 def subtotals_for_deltas(deltas) -> List[int]:
@@ -63,6 +63,7 @@ from clvm.casts import int_from_bytes
 
 from chives.types.blockchain_format.program import Program
 from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.wallet.util.curry_and_treehash import calculate_hash_of_quoted_mod_hash, curry_and_treehash, shatree_atom
 
 from .load_clvm import load_clvm
 from .p2_conditions import puzzle_for_conditions
@@ -73,6 +74,9 @@ DEFAULT_HIDDEN_PUZZLE_HASH = DEFAULT_HIDDEN_PUZZLE.get_tree_hash()  # this puzzl
 
 MOD = load_clvm("p2_delegated_puzzle_or_hidden_puzzle.clvm")
 
+# the part of the standard puzzle hash which doesn't depend on the key
+QUOTED_MOD_HASH = calculate_hash_of_quoted_mod_hash(MOD.get_tree_hash())
+
 SYNTHETIC_MOD = load_clvm("calculate_synthetic_public_key.clvm")
 
 PublicKeyProgram = Union[bytes, Program]
@@ -88,8 +92,9 @@ def calculate_synthetic_offset(public_key: G1Element, hidden_puzzle_hash: bytes3
 
 
 def calculate_synthetic_public_key(public_key: G1Element, hidden_puzzle_hash: bytes32) -> G1Element:
-    r = SYNTHETIC_MOD.run([bytes(public_key), hidden_puzzle_hash])
-    return G1Element.from_bytes(r.as_atom())
+    # same as running SYNTHETIC_MOD, without the round trip through clvm
+    synthetic_offset = calculate_synthetic_offset(public_key, hidden_puzzle_hash)
+    return public_key + PrivateKey.from_bytes(synthetic_offset.to_bytes(32, "big")).get_g1()
 
 
 def calculate_synthetic_secret_key(secret_key: PrivateKey, hidden_puzzle_hash: bytes32) -> PrivateKey:
@@ -106,6 +111,10 @@ def puzzle_for_synthetic_public_key(synthetic_public_key: G1Element) -> Program:
     return MOD.curry(bytes(synthetic_public_key))
 
 
+def puzzle_hash_for_synthetic_public_key(synthetic_public_key: G1Element) -> bytes32:
+    return curry_and_treehash(QUOTED_MOD_HASH, shatree_atom(bytes(synthetic_public_key)))
+
+
 def puzzle_for_public_key_and_hidden_puzzle_hash(public_key: G1Element, hidden_puzzle_hash: bytes32) -> Program:
     synthetic_public_key = calculate_synthetic_public_key(public_key, hidden_puzzle_hash)
 
@@ -120,6 +129,14 @@ def puzzle_for_pk(public_key: G1Element) -> Program:
     return puzzle_for_public_key_and_hidden_puzzle_hash(public_key, DEFAULT_HIDDEN_PUZZLE_HASH)
 
 
+def puzzle_hash_for_pk(public_key: G1Element) -> bytes32:
+    """
+    Same as `puzzle_for_pk(public_key).get_tree_hash()`, without building and hashing the curried puzzle.
+    """
+    synthetic_public_key = calculate_synthetic_public_key(public_key, DEFAULT_HIDDEN_PUZZLE_HASH)
+    return puzzle_hash_for_synthetic_public_key(synthetic_public_key)
+
+
 def solution_for_delegated_puzzle(delegated_puzzle: Program, solution: Program) -> Program:
     return Program.to([[], delegated_puzzle, solution])
 
@@ -9,6 +9,12 @@ from chives.wallet.puzzles.load_clvm import load_clvm
 from chives.wallet.lineage_proof import LineageProof
 from chives.util.ints import uint64
 from chives.util.hash import std_hash
+from chives.wallet.util.curry_and_treehash import (
+    calculate_hash_of_quoted_mod_hash,
+    curry_and_treehash,
+    shatree_atom,
+    shatree_pair,
+)
 
 SINGLETON_MOD = load_clvm("singleton_top_layer.clvm")
 SINGLETON_MOD_HASH = SINGLETON_MOD.get_tree_hash()
@@ -16,6 +22,7 @@ P2_SINGLETON_MOD = load_clvm("p2_singleton.clvm")
 P2_SINGLETON_OR_DELAYED_MOD = load_clvm("p2_singleton_or_delayed_puzhash.clvm")
 SINGLETON_LAUNCHER = load_clvm("singleton_launcher.clvm")
 SINGLETON_LAUNCHER_HASH = SINGLETON_LAUNCHER.get_tree_hash()
+QUOTED_SINGLETON_MOD_HASH = calculate_hash_of_quoted_mod_hash(SINGLETON_MOD_HASH)
 ESCAPE_VALUE = -113
 MELT_CONDITION = [ConditionOpcode.CREATE_COIN, 0, ESCAPE_VALUE]
 
@@ -177,6 +184,7 @@ def remove_singleton_truth_wrapper(puzzle: Program) -> Program:
     inner_puzzle = puzzle.rest().first().rest()
     return inner_puzzle
 
+
 # Take standard coin and amount -> curried_singleton.get_tree_hash()
 # 得到curried_singleton.get_tree_hash(),通常用来代表NFT的所有权
 def launch_conditions_and_coinsol_return_curried_singleton(
@@ -192,9 +200,10 @@ def launch_conditions_and_coinsol_return_curried_singleton(
         (SINGLETON_MOD_HASH, (launcher_coin.name(), SINGLETON_LAUNCHER_HASH)),
         inner_puzzle,
     )
-    
+
     return curried_singleton.get_tree_hash()
-    
+
+
 # Take standard coin and amount -> launch conditions & launcher coin solution
 def launch_conditions_and_coinsol(
     coin: Coin,
@@ -273,6 +282,16 @@ def puzzle_for_singleton(launcher_id: bytes32, inner_puz: Program) -> Program:
     )
 
 
+# Return the puzzle hash of a singleton with specific ID and innerpuz, from the hash of the innerpuz
+def puzzle_hash_for_singleton(launcher_id: bytes32, inner_puzzle_hash: bytes32) -> bytes32:
+    # (SINGLETON_MOD_HASH . (launcher_id . SINGLETON_LAUNCHER_HASH))
+    singleton_struct_hash = shatree_pair(
+        shatree_atom(SINGLETON_MOD_HASH),
+        shatree_pair(shatree_atom(launcher_id), shatree_atom(SINGLETON_LAUNCHER_HASH)),
+    )
+    return curry_and_treehash(QUOTED_SINGLETON_MOD_HASH, singleton_struct_hash, inner_puzzle_hash)
+
+
 # Return a solution to spend a singleton
 def solution_for_singleton(
     lineage_proof: LineageProof,
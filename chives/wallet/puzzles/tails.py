@@ -9,7 +9,7 @@ from chives.wallet.lineage_proof import LineageProof
 from chives.wallet.puzzles.load_clvm import load_clvm
 from chives.wallet.cat_wallet.cat_utils import (
     CAT_MOD,
-    construct_cat_puzzle,
+    construct_cat_puzzle_hash,
     unsigned_spend_bundle_for_spendable_cats,
     SpendableCAT,
 )
@@ -75,7 +75,7 @@ class GenesisById(LimitationsProgram):
         await wallet.add_lineage(origin_id, LineageProof(), False)
         tail: Program = cls.construct([Program.to(origin_id)])
 
-        minted_cat_puzzle_hash: bytes32 = construct_cat_puzzle(CAT_MOD, tail.get_tree_hash(), cat_inner).get_tree_hash()
+        minted_cat_puzzle_hash: bytes32 = construct_cat_puzzle_hash(tail.get_tree_hash(), cat_inner.get_tree_hash())
 
         tx_record: TransactionRecord = await wallet.standard_wallet.generate_signed_transaction(
             amount, minted_cat_puzzle_hash, uint64(0), origin_id, coins
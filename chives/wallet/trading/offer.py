@@ -19,6 +19,7 @@ from chives.wallet.cat_wallet.cat_utils import (
     CAT_MOD,
     SpendableCAT,
     construct_cat_puzzle,
+    construct_cat_puzzle_hash,
     match_cat_puzzle,
     unsigned_spend_bundle_for_spendable_cats,
 )
@@ -27,6 +28,7 @@ from chives.wallet.puzzles.load_clvm import load_clvm
 from chives.wallet.payment import Payment
 
 OFFER_MOD = load_clvm("settlement_payments.clvm")
+OFFER_MOD_HASH = OFFER_MOD.get_tree_hash()
 ZERO_32 = bytes32([0] * 32)
 
 
@@ -51,7 +53,7 @@ class Offer:
 
     @staticmethod
     def ph():
-        return OFFER_MOD.get_tree_hash()
+        return OFFER_MOD_HASH
 
     @staticmethod
     def notarize_payments(
@@ -80,9 +82,9 @@ class Offer:
         announcements: List[Announcement] = []
         for tail, payments in notarized_payments.items():
             if tail is not None:
-                settlement_ph: bytes32 = construct_cat_puzzle(CAT_MOD, tail, OFFER_MOD).get_tree_hash()
+                settlement_ph: bytes32 = construct_cat_puzzle_hash(tail, OFFER_MOD_HASH)
             else:
-                settlement_ph = OFFER_MOD.get_tree_hash()
+                settlement_ph = OFFER_MOD_HASH
 
             msg: bytes32 = Program.to((payments[0].nonce, [p.as_condition_args() for p in payments])).get_tree_hash()
             announcements.append(Announcement(settlement_ph, msg))
@@ -119,10 +121,10 @@ class Offer:
             if matched:
                 _, tail_hash_program, _ = curried_args
                 tail_hash = bytes32(tail_hash_program.as_python())
-                offer_ph: bytes32 = construct_cat_puzzle(CAT_MOD, tail_hash, OFFER_MOD).get_tree_hash()
+                offer_ph: bytes32 = construct_cat_puzzle_hash(tail_hash, OFFER_MOD_HASH)
             else:
                 tail_hash = None
-                offer_ph = OFFER_MOD.get_tree_hash()
+                offer_ph = OFFER_MOD_HASH
 
             # Check if the puzzle_hash matches the hypothetical `settlement_payments` puzzle hash
             if addition.puzzle_hash == offer_ph:
@@ -0,0 +1,69 @@
+from hashlib import sha256
+from typing import Sequence
+
+from chives.types.blockchain_format.sized_bytes import bytes32
+
+# The tree hashes of the atoms that `Program.curry` puts around the mod and the curried arguments:
+# (a (q . mod) (c (q . arg1) (c (q . arg2) ... 1)))
+Q_KW = bytes.fromhex("01")
+A_KW = bytes.fromhex("02")
+C_KW = bytes.fromhex("04")
+ONE = bytes.fromhex("01")
+NULL = bytes.fromhex("")
+
+
+def shatree_atom(atom: bytes) -> bytes32:
+    s = sha256()
+    s.update(b"\1")
+    s.update(atom)
+    return bytes32(s.digest())
+
+
+def shatree_pair(left_hash: bytes32, right_hash: bytes32) -> bytes32:
+    s = sha256()
+    s.update(b"\2")
+    s.update(left_hash)
+    s.update(right_hash)
+    return bytes32(s.digest())
+
+
+Q_KW_TREEHASH = shatree_atom(Q_KW)
+A_KW_TREEHASH = shatree_atom(A_KW)
+C_KW_TREEHASH = shatree_atom(C_KW)
+ONE_TREEHASH = shatree_atom(ONE)
+NULL_TREEHASH = shatree_atom(NULL)
+
+
+def calculate_hash_of_quoted_mod_hash(mod_hash: bytes32) -> bytes32:
+    """
+    The tree hash of `(q . mod)`, the part of a curried puzzle that only depends on the mod. Compute it once per mod.
+    """
+    return shatree_pair(Q_KW_TREEHASH, mod_hash)
+
+
+def curried_values_tree_hash(hashed_arguments: Sequence[bytes32]) -> bytes32:
+    """
+    The tree hash of `(c (q . arg1) (c (q . arg2) ... 1))`, given the tree hashes of the arguments.
+    """
+    values_hash = ONE_TREEHASH
+    for argument_hash in reversed(hashed_arguments):
+        values_hash = shatree_pair(
+            C_KW_TREEHASH,
+            shatree_pair(
+                shatree_pair(Q_KW_TREEHASH, argument_hash),
+                shatree_pair(values_hash, NULL_TREEHASH),
+            ),
+        )
+    return values_hash
+
+
+def curry_and_treehash(hash_of_quoted_mod_hash: bytes32, *hashed_arguments: bytes32) -> bytes32:
+    """
+    The tree hash of `mod.curry(*arguments)`, without building and hashing the curried program. Atom arguments are
+    hashed with `shatree_atom`, program arguments are passed as their tree hash.
+    """
+    curried_values = curried_values_tree_hash(hashed_arguments)
+    return shatree_pair(
+        A_KW_TREEHASH,
+        shatree_pair(hash_of_quoted_mod_hash, shatree_pair(curried_values, NULL_TREEHASH)),
+    )
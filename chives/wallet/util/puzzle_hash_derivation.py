@@ -0,0 +1,76 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import List, Optional, Sequence, Tuple
+
+from blspy import AugSchemeMPL, G1Element, PrivateKey
+
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.util.chunks import chunks
+from chives.wallet.cat_wallet.cat_utils import construct_cat_puzzle_hash
+from chives.wallet.derive_keys import (
+    _derive_path,
+    master_sk_to_wallet_sk_intermediate,
+    master_sk_to_wallet_sk_unhardened_intermediate,
+)
+from chives.wallet.puzzles.p2_delegated_puzzle_or_hidden_puzzle import puzzle_hash_for_pk
+
+# index, hardened public key, hardened puzzle hash, unhardened public key, unhardened puzzle hash
+DerivedPuzzleHashes = Tuple[int, bytes, bytes32, bytes, bytes32]
+
+# Puzzle hashes are derived in chunks of this many indexes. Fewer indexes are derived in the wallet process, it's not
+# worth the round trip to a worker process.
+DERIVATION_CHUNK_SIZE = 100
+
+
+def hardened_public_keys(master_sk: PrivateKey, indexes: Sequence[int]) -> List[Tuple[int, bytes]]:
+    """
+    The hardened wallet public keys at `indexes`. They can only be derived from the private key, so this runs in the
+    wallet process, and only the public keys are sent to the worker processes.
+    """
+    intermediate = master_sk_to_wallet_sk_intermediate(master_sk)
+    return [(index, bytes(_derive_path(intermediate, [index]).get_g1())) for index in indexes]
+
+
+def derive_puzzle_hashes(
+    hardened_pks: Sequence[Tuple[int, bytes]], unhardened_intermediate_pk_bytes: bytes, tail_hash: Optional[bytes32]
+) -> List[DerivedPuzzleHashes]:
+    """
+    Derives the unhardened wallet public keys from the public intermediate key, and the puzzle hashes of the standard
+    puzzle for the hardened and unhardened public keys, or of the CAT puzzle around the standard puzzle if `tail_hash`
+    is given. Only takes and returns bytes, so it can run in a ProcessPoolExecutor.
+    """
+    unhardened_intermediate_pk = G1Element.from_bytes(unhardened_intermediate_pk_bytes)
+
+    def puzzle_hash(public_key: G1Element) -> bytes32:
+        if tail_hash is None:
+            return puzzle_hash_for_pk(public_key)
+        return construct_cat_puzzle_hash(tail_hash, puzzle_hash_for_pk(public_key))
+
+    results: List[DerivedPuzzleHashes] = []
+    for index, hardened_bytes in hardened_pks:
+        hardened = G1Element.from_bytes(hardened_bytes)
+        unhardened = AugSchemeMPL.derive_child_pk_unhardened(unhardened_intermediate_pk, index)
+        results.append((index, hardened_bytes, puzzle_hash(hardened), bytes(unhardened), puzzle_hash(unhardened)))
+    return results
+
+
+async def derive_puzzle_hashes_in_chunks(
+    executor: Executor, master_sk: PrivateKey, indexes: Sequence[int], tail_hash: Optional[bytes32] = None
+) -> List[DerivedPuzzleHashes]:
+    """
+    Derives the public keys and puzzle hashes at `indexes`, see `derive_puzzle_hashes`. More than
+    DERIVATION_CHUNK_SIZE indexes are split in chunks, which are hashed in parallel by `executor`.
+    """
+    hardened_pks = hardened_public_keys(master_sk, indexes)
+    unhardened_intermediate_pk_bytes = bytes(master_sk_to_wallet_sk_unhardened_intermediate(master_sk).get_g1())
+    if len(indexes) <= DERIVATION_CHUNK_SIZE:
+        return derive_puzzle_hashes(hardened_pks, unhardened_intermediate_pk_bytes, tail_hash)
+
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(
+        *(
+            loop.run_in_executor(executor, derive_puzzle_hashes, chunk, unhardened_intermediate_pk_bytes, tail_hash)
+            for chunk in chunks(hardened_pks, DERIVATION_CHUNK_SIZE)
+        )
+    )
+    return [derived for chunk_results in results for derived in chunk_results]
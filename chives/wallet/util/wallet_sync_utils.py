@@ -1,7 +1,8 @@
 import asyncio
 import logging
 import random
-from typing import List, Optional, Tuple, Union, Dict
+from collections import deque
+from typing import Any, AsyncGenerator, Callable, Coroutine, Deque, List, Optional, Tuple, Union, Dict
 
 from chives.consensus.constants import ConsensusConstants
 from chives.protocols import wallet_protocol
@@ -24,6 +25,7 @@ from chives.types.blockchain_format.coin import hash_coin_list, Coin
 from chives.types.blockchain_format.sized_bytes import bytes32
 from chives.types.full_block import FullBlock
 from chives.types.header_block import HeaderBlock
+from chives.util.chunks import chunks
 from chives.util.ints import uint32
 from chives.util.merkle_set import confirm_not_included_already_hashed, confirm_included_already_hashed, MerkleSet
 from chives.wallet.util.peer_request_cache import PeerRequestCache
@@ -79,6 +81,38 @@ async def subscribe_to_coin_updates(
     return all_coins_state.coin_states
 
 
+async def subscribe_in_chunks(
+    subscribe: Callable[[List[bytes32], WSChivesConnection, int], Coroutine[Any, Any, List[CoinState]]],
+    items: List[bytes32],
+    peer: WSChivesConnection,
+    min_height: int,
+    chunk_size: int,
+    max_in_flight: int,
+) -> AsyncGenerator[Tuple[List[bytes32], List[CoinState]], None]:
+    """
+    Subscribes to the items (with `subscribe_to_phs` or `subscribe_to_coin_updates`) in chunks, and yields every chunk
+    with its coin states, in order. Up to `max_in_flight` requests are sent ahead, while the caller processes the
+    responses, counting the responses which were received but not yet taken. Close the generator when stopping early,
+    that cancels the requests still in flight.
+    """
+    pending: Deque[Tuple[List[bytes32], "asyncio.Task[List[CoinState]]"]] = deque()
+    remaining = chunks(items, chunk_size)
+    try:
+        while True:
+            while len(pending) < max(max_in_flight, 1):
+                chunk: Optional[List[bytes32]] = next(remaining, None)
+                if chunk is None:
+                    break
+                pending.append((chunk, asyncio.create_task(subscribe(chunk, peer, min_height))))
+            if len(pending) == 0:
+                return
+            chunk, task = pending.popleft()
+            yield chunk, await task
+    finally:
+        for _, task in pending:
+            task.cancel()
+
+
 def validate_additions(
     coins: List[Tuple[bytes32, List[Coin]]],
     proofs: Optional[List[Tuple[bytes32, bytes, Optional[bytes]]]],
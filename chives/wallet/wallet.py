@@ -1,6 +1,6 @@
 import logging
 import time
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Iterator, List, Optional, Set
 
 from blspy import G1Element
 
@@ -64,15 +64,18 @@ class Wallet:
         self.cost_of_single_tx = None
         return self
 
+    async def _get_spendable_coins_by_amount(self, records=None) -> Iterator[WalletCoinRecord]:
+        if records is None:
+            return await self.wallet_state_manager.get_spendable_coins_for_wallet_by_amount(self.id())
+        spendable = await self.wallet_state_manager.get_spendable_coins_for_wallet(self.id(), records)
+        return iter(sorted(spendable, reverse=True, key=lambda record: record.coin.amount))
+
     async def get_max_send_amount(self, records=None):
-        spendable: List[WalletCoinRecord] = list(
-            await self.wallet_state_manager.get_spendable_coins_for_wallet(self.id(), records)
-        )
-        if len(spendable) == 0:
-            return 0
-        spendable.sort(reverse=True, key=lambda record: record.coin.amount)
         if self.cost_of_single_tx is None:
-            coin = spendable[0].coin
+            largest: Optional[WalletCoinRecord] = next(await self._get_spendable_coins_by_amount(records), None)
+            if largest is None:
+                return 0
+            coin = largest.coin
             tx = await self.generate_signed_transaction(
                 coin.amount, coin.puzzle_hash, coins={coin}, ignore_max_send_amount=True
             )
@@ -91,7 +94,7 @@ class Wallet:
         current_cost = 0
         total_amount = 0
         total_coin_count = 0
-        for record in spendable:
+        for record in await self._get_spendable_coins_by_amount(records):
             current_cost += self.cost_of_single_tx
             total_amount += record.coin.amount
             total_coin_count += 1
@@ -263,25 +266,14 @@ class Wallet:
             raise ValueError(error_msg)
 
         self.log.info(f"About to select coins for amount {amount}")
-        unspent: List[WalletCoinRecord] = list(
-            await self.wallet_state_manager.get_spendable_coins_for_wallet(self.id())
-        )
         sum_value = 0
         used_coins: Set = set()
 
-        # Use older coins first
-        unspent.sort(reverse=True, key=lambda r: r.coin.amount)
-
-        # Try to use coins from the store, if there isn't enough of "unused"
-        # coins use change coins that are not confirmed yet
-        unconfirmed_removals: Dict[bytes32, Coin] = await self.wallet_state_manager.unconfirmed_removals_for_wallet(
-            self.id()
-        )
-        for coinrecord in unspent:
+        # Use the largest coins first, the wallet keeps them in order so only the selected coins are looked at. Coins
+        # spent by unconfirmed transactions are already left out.
+        for coinrecord in await self.wallet_state_manager.get_spendable_coins_for_wallet_by_amount(self.id()):
             if sum_value >= amount and len(used_coins) > 0:
                 break
-            if coinrecord.coin.name() in unconfirmed_removals:
-                continue
             if coinrecord.coin in exclude:
                 continue
             sum_value += coinrecord.coin.amount
@@ -1,7 +1,8 @@
-from typing import Dict, List, Optional, Set
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 import aiosqlite
 import sqlite3
+from sortedcontainers import SortedList
 
 from chives.types.blockchain_format.coin import Coin
 from chives.types.blockchain_format.sized_bytes import bytes32
@@ -11,6 +12,40 @@ from chives.wallet.util.wallet_types import WalletType
 from chives.wallet.wallet_coin_record import WalletCoinRecord
 
 
+class UnspentCoinIndex:
+    """
+    The unspent coin records of a wallet, ordered by amount, and their total amount. Coin selection walks the coins
+    from the largest amount down and stops once it has enough, so it doesn't need to look at all coins of the wallet.
+    """
+
+    def __init__(self) -> None:
+        self.records: Dict[bytes32, WalletCoinRecord] = {}
+        self.total_amount: int = 0
+        self._by_amount: SortedList = SortedList()  # (amount, coin name)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def add(self, record: WalletCoinRecord) -> None:
+        name = record.name()
+        self.remove(name)
+        self.records[name] = record
+        self.total_amount += record.coin.amount
+        self._by_amount.add((record.coin.amount, name))
+
+    def remove(self, coin_name: bytes32) -> Optional[WalletCoinRecord]:
+        record = self.records.pop(coin_name, None)
+        if record is not None:
+            self.total_amount -= record.coin.amount
+            self._by_amount.remove((record.coin.amount, coin_name))
+        return record
+
+    def largest_first(self) -> Iterator[WalletCoinRecord]:
+        by_amount: Iterator[Tuple[uint64, bytes32]] = reversed(self._by_amount)
+        for _, coin_name in by_amount:
+            yield self.records[coin_name]
+
+
 class WalletCoinStore:
     """
     This object handles CoinRecords in DB used by wallet.
@@ -19,8 +54,8 @@ class WalletCoinStore:
     db_connection: aiosqlite.Connection
     # coin_record_cache keeps ALL coin records in memory. [record_name: record]
     coin_record_cache: Dict[bytes32, WalletCoinRecord]
-    # unspent_coin_wallet_cache keeps ALL unspent coin records for wallet in memory [wallet_id: [record_name: record]]
-    unspent_coin_wallet_cache: Dict[int, Dict[bytes32, WalletCoinRecord]]
+    # unspent_coin_wallet_cache keeps ALL unspent coin records for wallet in memory, ordered by amount
+    unspent_coin_wallet_cache: Dict[int, UnspentCoinIndex]
     db_wrapper: DBWrapper
 
     @classmethod
@@ -80,9 +115,14 @@ class WalletCoinStore:
             name = coin_record.name()
             self.coin_record_cache[name] = coin_record
             if coin_record.spent is False:
-                if coin_record.wallet_id not in self.unspent_coin_wallet_cache:
-                    self.unspent_coin_wallet_cache[coin_record.wallet_id] = {}
-                self.unspent_coin_wallet_cache[coin_record.wallet_id][name] = coin_record
+                self._unspent_coins(coin_record.wallet_id).add(coin_record)
+
+    def _unspent_coins(self, wallet_id: int) -> UnspentCoinIndex:
+        unspent_coins = self.unspent_coin_wallet_cache.get(wallet_id)
+        if unspent_coins is None:
+            unspent_coins = UnspentCoinIndex()
+            self.unspent_coin_wallet_cache[wallet_id] = unspent_coins
+        return unspent_coins
 
     async def get_multiple_coin_records(self, coin_names: List[bytes32]) -> List[WalletCoinRecord]:
         """Return WalletCoinRecord(s) that have a coin name in the specified list"""
@@ -102,16 +142,16 @@ class WalletCoinStore:
     async def add_coin_record(self, record: WalletCoinRecord) -> None:
         # update wallet cache
         name = record.name()
+        previous = self.coin_record_cache.get(name)
+        if previous is not None and previous.wallet_id != record.wallet_id:
+            if previous.wallet_id in self.unspent_coin_wallet_cache:
+                self.unspent_coin_wallet_cache[previous.wallet_id].remove(name)
         self.coin_record_cache[name] = record
-        if record.wallet_id in self.unspent_coin_wallet_cache:
-            if record.spent and name in self.unspent_coin_wallet_cache[record.wallet_id]:
-                self.unspent_coin_wallet_cache[record.wallet_id].pop(name)
-            if not record.spent:
-                self.unspent_coin_wallet_cache[record.wallet_id][name] = record
+        if record.spent:
+            if record.wallet_id in self.unspent_coin_wallet_cache:
+                self.unspent_coin_wallet_cache[record.wallet_id].remove(name)
         else:
-            if not record.spent:
-                self.unspent_coin_wallet_cache[record.wallet_id] = {}
-                self.unspent_coin_wallet_cache[record.wallet_id][name] = record
+            self._unspent_coins(record.wallet_id).add(record)
 
         cursor = await self.db_connection.execute(
             "INSERT OR REPLACE INTO coin_record VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
@@ -135,9 +175,7 @@ class WalletCoinStore:
         if coin_name in self.coin_record_cache:
             coin_record = self.coin_record_cache.pop(coin_name)
             if coin_record.wallet_id in self.unspent_coin_wallet_cache:
-                coin_cache = self.unspent_coin_wallet_cache[coin_record.wallet_id]
-                if coin_name in coin_cache:
-                    coin_cache.pop(coin_record.coin.name())
+                self.unspent_coin_wallet_cache[coin_record.wallet_id].remove(coin_name)
 
         c = await self.db_connection.execute("DELETE FROM coin_record WHERE coin_name=?", (coin_name.hex(),))
         await c.close()
@@ -215,11 +253,29 @@ class WalletCoinStore:
     async def get_unspent_coins_for_wallet(self, wallet_id: int) -> Set[WalletCoinRecord]:
         """Returns set of CoinRecords that have not been spent yet for a wallet."""
         if wallet_id in self.unspent_coin_wallet_cache:
-            wallet_coins: Dict[bytes32, WalletCoinRecord] = self.unspent_coin_wallet_cache[wallet_id]
-            return set(wallet_coins.values())
+            return set(self.unspent_coin_wallet_cache[wallet_id].records.values())
         else:
             return set()
 
+    def get_unspent_coins_for_wallet_by_amount(self, wallet_id: int) -> Iterator[WalletCoinRecord]:
+        """Returns the CoinRecords that have not been spent yet for a wallet, the largest amount first."""
+        if wallet_id in self.unspent_coin_wallet_cache:
+            return self.unspent_coin_wallet_cache[wallet_id].largest_first()
+        else:
+            return iter(())
+
+    def get_unspent_coin_for_wallet(self, wallet_id: int, coin_name: bytes32) -> Optional[WalletCoinRecord]:
+        """Returns the CoinRecord with the coin id if it's an unspent coin of the wallet."""
+        if wallet_id in self.unspent_coin_wallet_cache:
+            return self.unspent_coin_wallet_cache[wallet_id].records.get(coin_name)
+        return None
+
+    def get_unspent_balance_for_wallet(self, wallet_id: int) -> int:
+        """Returns the total amount of the coins that have not been spent yet for a wallet."""
+        if wallet_id in self.unspent_coin_wallet_cache:
+            return self.unspent_coin_wallet_cache[wallet_id].total_amount
+        return 0
+
     async def get_all_coins(self) -> Set[WalletCoinRecord]:
         """Returns set of all CoinRecords."""
         cursor = await self.db_connection.execute("SELECT * from coin_record")
@@ -282,17 +338,14 @@ class WalletCoinStore:
                     coin_record.wallet_id,
                 )
                 self.coin_record_cache[coin_record.coin.name()] = new_record
-                if coin_record.wallet_id in self.unspent_coin_wallet_cache:
-                    self.unspent_coin_wallet_cache[coin_record.wallet_id][coin_record.coin.name()] = new_record
+                self._unspent_coins(coin_record.wallet_id).add(new_record)
             if coin_record.confirmed_block_height > height:
                 delete_queue.append(coin_record)
 
         for coin_record in delete_queue:
             self.coin_record_cache.pop(coin_record.coin.name())
             if coin_record.wallet_id in self.unspent_coin_wallet_cache:
-                coin_cache = self.unspent_coin_wallet_cache[coin_record.wallet_id]
-                if coin_record.coin.name() in coin_cache:
-                    coin_cache.pop(coin_record.coin.name())
+                self.unspent_coin_wallet_cache[coin_record.wallet_id].remove(coin_record.coin.name())
 
         c1 = await self.db_connection.execute("DELETE FROM coin_record WHERE confirmed_height>?", (height,))
         await c1.close()
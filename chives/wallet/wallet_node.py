@@ -6,7 +6,7 @@ import time
 import traceback
 from asyncio import CancelledError
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from blspy import AugSchemeMPL, PrivateKey
 from packaging.version import Version
@@ -63,6 +63,7 @@ from chives.wallet.util.wallet_sync_utils import (
     last_change_height_cs,
     request_and_validate_additions,
     request_and_validate_removals,
+    subscribe_in_chunks,
     subscribe_to_coin_updates,
     subscribe_to_phs,
 )
@@ -536,18 +537,27 @@ class WalletNode:
         already_checked_ph: Set[bytes32] = set()
         continue_while: bool = True
         all_puzzle_hashes: List[bytes32] = await self.get_puzzle_hashes_to_subscribe()
+        # Several subscription requests are kept in flight, while the responses to the earlier ones are processed
+        max_in_flight: int = self.config.get("sync_requests_in_flight", 4)
         while continue_while:
             # Get all phs from puzzle store
-            ph_chunks: Iterator[List[bytes32]] = chunks(all_puzzle_hashes, 1000)
-            for chunk in ph_chunks:
-                ph_update_res: List[CoinState] = await subscribe_to_phs(
-                    [p for p in chunk if p not in already_checked_ph], full_node, 0
-                )
-                ph_update_res = list(filter(is_new_state_update, ph_update_res))
-                if not await self.receive_state_from_peer(ph_update_res, full_node, update_finished_height=True):
-                    # If something goes wrong, abort sync
-                    return
-                already_checked_ph.update(chunk)
+            ph_responses = subscribe_in_chunks(
+                subscribe_to_phs,
+                [p for p in all_puzzle_hashes if p not in already_checked_ph],
+                full_node,
+                0,
+                1000,
+                max_in_flight,
+            )
+            try:
+                async for chunk, ph_update_res in ph_responses:
+                    ph_update_res = list(filter(is_new_state_update, ph_update_res))
+                    if not await self.receive_state_from_peer(ph_update_res, full_node, update_finished_height=True):
+                        # If something goes wrong, abort sync
+                        return
+                    already_checked_ph.update(chunk)
+            finally:
+                await ph_responses.aclose()
 
             # Check if new puzzle hashed have been created
             await self.wallet_state_manager.create_more_puzzle_hashes()
@@ -565,14 +575,22 @@ class WalletNode:
         all_coin_ids: List[bytes32] = await self.get_coin_ids_to_subscribe(0)
         already_checked_coin_ids: Set[bytes32] = set()
         while continue_while:
-            one_k_chunks = chunks(all_coin_ids, 1000)
-            for chunk in one_k_chunks:
-                c_update_res: List[CoinState] = await subscribe_to_coin_updates(chunk, full_node, 0)
-
-                if not await self.receive_state_from_peer(c_update_res, full_node):
-                    # If something goes wrong, abort sync
-                    return
-                already_checked_coin_ids.update(chunk)
+            c_responses = subscribe_in_chunks(
+                subscribe_to_coin_updates,
+                all_coin_ids,
+                full_node,
+                0,
+                1000,
+                max_in_flight,
+            )
+            try:
+                async for chunk, c_update_res in c_responses:
+                    if not await self.receive_state_from_peer(c_update_res, full_node):
+                        # If something goes wrong, abort sync
+                        return
+                    already_checked_coin_ids.update(chunk)
+            finally:
+                await c_responses.aclose()
 
             all_coin_ids = await self.get_coin_ids_to_subscribe(0)
             continue_while = False
@@ -5,9 +5,10 @@ import multiprocessing
 import multiprocessing.context
 import time
 from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor
 from pathlib import Path
 from secrets import token_bytes
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
 
 import aiosqlite
 from blspy import G1Element, PrivateKey
@@ -29,20 +30,23 @@ from chives.util.byte_types import hexstr_to_bytes
 from chives.util.config import process_config_start_method
 from chives.util.db_wrapper import DBWrapper
 from chives.util.errors import Err
+from chives.util.inline_executor import InlineExecutor
 from chives.util.ints import uint32, uint64, uint128, uint8
 from chives.util.db_synchronous import db_synchronous_on
-from chives.wallet.cat_wallet.cat_utils import match_cat_puzzle, construct_cat_puzzle
+from chives.util.setproctitle import getproctitle, setproctitle
+from chives.wallet.cat_wallet.cat_utils import match_cat_puzzle, construct_cat_puzzle_hash
 from chives.wallet.cat_wallet.cat_wallet import CATWallet
 from chives.wallet.cat_wallet.cat_constants import DEFAULT_CATS
 from chives.wallet.derivation_record import DerivationRecord
 from chives.wallet.derive_keys import master_sk_to_wallet_sk, master_sk_to_wallet_sk_unhardened
 from chives.wallet.key_val_store import KeyValStore
-from chives.wallet.puzzles.cat_loader import CAT_MOD
+from chives.wallet.puzzles.p2_delegated_puzzle_or_hidden_puzzle import puzzle_hash_for_pk
 from chives.wallet.rl_wallet.rl_wallet import RLWallet
 from chives.wallet.settings.user_settings import UserSettings
 from chives.wallet.trade_manager import TradeManager
 from chives.wallet.transaction_record import TransactionRecord
 from chives.wallet.util.compute_hints import compute_coin_hints
+from chives.wallet.util.puzzle_hash_derivation import DerivedPuzzleHashes, derive_puzzle_hashes_in_chunks
 from chives.wallet.util.transaction_type import TransactionType
 from chives.wallet.util.wallet_sync_utils import last_change_height_cs
 from chives.wallet.util.wallet_types import WalletType
@@ -111,6 +115,7 @@ class WalletStateManager:
     wallet_node: Any
     pool_store: WalletPoolStore
     default_cats: Dict[str, Any]
+    derivation_executor: Optional[Executor]
 
     @staticmethod
     async def create(
@@ -162,6 +167,8 @@ class WalletStateManager:
             constants=self.constants,
             multiprocessing_context=self.multiprocessing_context,
         )
+        # started when it's first needed, most of the time only a few puzzle hashes are created at once
+        self.derivation_executor = None
         self.blockchain = await WalletBlockchain.create(self.basic_store, self.constants, self.weight_proof_handler)
 
         self.state_changed_callback = None
@@ -223,6 +230,33 @@ class WalletStateManager:
     def get_public_key_unhardened(self, index: uint32) -> G1Element:
         return master_sk_to_wallet_sk_unhardened(self.private_key, index).get_g1()
 
+    def _get_derivation_executor(self) -> Executor:
+        if self.derivation_executor is None:
+            num_workers = self.config.get("puzzle_hash_derivation_workers", 2)
+            if num_workers < 1:
+                self.derivation_executor = InlineExecutor()
+            else:
+                self.derivation_executor = ProcessPoolExecutor(
+                    max_workers=num_workers,
+                    mp_context=self.multiprocessing_context,
+                    initializer=setproctitle,
+                    initargs=(f"{getproctitle()}_worker",),
+                )
+                self.log.info(f"Started {num_workers} processes for puzzle hash derivation")
+        return self.derivation_executor
+
+    async def derive_puzzle_hashes(
+        self, start_index: int, end_index: int, tail_hash: Optional[bytes32] = None
+    ) -> List[DerivedPuzzleHashes]:
+        """
+        Derives the public keys and standard (or CAT, if `tail_hash` is given) puzzle hashes for the indexes from
+        `start_index` to `end_index` (exclusive), see `derive_puzzle_hashes_in_chunks`. Larger ranges are hashed in
+        parallel by worker processes, which only get the public keys.
+        """
+        return await derive_puzzle_hashes_in_chunks(
+            self._get_derivation_executor(), self.private_key, range(start_index, end_index), tail_hash
+        )
+
     async def get_keys(self, puzzle_hash: bytes32) -> Optional[Tuple[G1Element, PrivateKey]]:
         record = await self.puzzle_store.record_for_puzzle_hash(puzzle_hash)
         if record is None:
@@ -272,43 +306,74 @@ class WalletStateManager:
             else:
                 creating_msg = f"Creating puzzle hashes from {start_index} to {last_index} for wallet_id: {wallet_id}"
                 self.log.info(f"Start: {creating_msg}")
-                for index in range(start_index, last_index):
-                    if WalletType(target_wallet.type()) == WalletType.POOLING_WALLET:
-                        continue
-
-                    # Hardened
-                    pubkey: G1Element = self.get_public_key(uint32(index))
-                    puzzle: Program = target_wallet.puzzle_for_pk(bytes(pubkey))
-                    if puzzle is None:
-                        self.log.error(f"Unable to create puzzles with wallet {target_wallet}")
-                        break
-                    puzzlehash: bytes32 = puzzle.get_tree_hash()
-                    self.log.debug(f"Puzzle at index {index} wallet ID {wallet_id} puzzle hash {puzzlehash.hex()}")
-                    derivation_paths.append(
-                        DerivationRecord(
-                            uint32(index), puzzlehash, pubkey, target_wallet.type(), uint32(target_wallet.id()), True
+                wallet_type = WalletType(target_wallet.type())
+                if wallet_type in (WalletType.STANDARD_WALLET, WalletType.CAT):
+                    tail_hash: Optional[bytes32] = None
+                    if wallet_type == WalletType.CAT:
+                        tail_hash = target_wallet.cat_info.limitations_program_hash
+                    for index, pk, puzzlehash, pk_unhardened, puzzlehash_unhardened in await self.derive_puzzle_hashes(
+                        start_index, last_index, tail_hash
+                    ):
+                        derivation_paths.append(
+                            DerivationRecord(
+                                uint32(index),
+                                puzzlehash,
+                                G1Element.from_bytes(pk),
+                                target_wallet.type(),
+                                uint32(target_wallet.id()),
+                                True,
+                            )
                         )
-                    )
-                    # Unhardened
-                    pubkey_unhardened: G1Element = self.get_public_key_unhardened(uint32(index))
-                    puzzle_unhardened: Program = target_wallet.puzzle_for_pk(bytes(pubkey_unhardened))
-                    if puzzle_unhardened is None:
-                        self.log.error(f"Unable to create puzzles with wallet {target_wallet}")
-                        break
-                    puzzlehash_unhardened: bytes32 = puzzle_unhardened.get_tree_hash()
-                    self.log.debug(
-                        f"Puzzle at index {index} wallet ID {wallet_id} puzzle hash {puzzlehash_unhardened.hex()}"
-                    )
-                    derivation_paths.append(
-                        DerivationRecord(
-                            uint32(index),
-                            puzzlehash_unhardened,
-                            pubkey_unhardened,
-                            target_wallet.type(),
-                            uint32(target_wallet.id()),
-                            False,
+                        derivation_paths.append(
+                            DerivationRecord(
+                                uint32(index),
+                                puzzlehash_unhardened,
+                                G1Element.from_bytes(pk_unhardened),
+                                target_wallet.type(),
+                                uint32(target_wallet.id()),
+                                False,
+                            )
+                        )
+                elif wallet_type != WalletType.POOLING_WALLET:
+                    for index in range(start_index, last_index):
+                        # Hardened
+                        pubkey: G1Element = self.get_public_key(uint32(index))
+                        puzzle: Program = target_wallet.puzzle_for_pk(bytes(pubkey))
+                        if puzzle is None:
+                            self.log.error(f"Unable to create puzzles with wallet {target_wallet}")
+                            break
+                        puzzlehash = puzzle.get_tree_hash()
+                        self.log.debug(f"Puzzle at index {index} wallet ID {wallet_id} puzzle hash {puzzlehash.hex()}")
+                        derivation_paths.append(
+                            DerivationRecord(
+                                uint32(index),
+                                puzzlehash,
+                                pubkey,
+                                target_wallet.type(),
+                                uint32(target_wallet.id()),
+                                True,
+                            )
+                        )
+                        # Unhardened
+                        pubkey_unhardened: G1Element = self.get_public_key_unhardened(uint32(index))
+                        puzzle_unhardened: Program = target_wallet.puzzle_for_pk(bytes(pubkey_unhardened))
+                        if puzzle_unhardened is None:
+                            self.log.error(f"Unable to create puzzles with wallet {target_wallet}")
+                            break
+                        puzzlehash_unhardened = puzzle_unhardened.get_tree_hash()
+                        self.log.debug(
+                            f"Puzzle at index {index} wallet ID {wallet_id} puzzle hash {puzzlehash_unhardened.hex()}"
+                        )
+                        derivation_paths.append(
+                            DerivationRecord(
+                                uint32(index),
+                                puzzlehash_unhardened,
+                                pubkey_unhardened,
+                                target_wallet.type(),
+                                uint32(target_wallet.id()),
+                                False,
+                            )
                         )
-                    )
                 self.log.info(f"Done: {creating_msg}")
             await self.puzzle_store.add_derivation_paths(derivation_paths, in_transaction)
             await self.add_interested_puzzle_hashes(
@@ -455,6 +520,15 @@ class WalletStateManager:
         Returns the balance amount of all coins that are spendable.
         """
 
+        if unspent_records is None:
+            # the total of the unspent coins minus the ones which are not available, no need to look at all coins
+            balance = self.coin_store.get_unspent_balance_for_wallet(wallet_id)
+            for coin_name in await self.get_unavailable_coin_ids(wallet_id):
+                unavailable_record = self.coin_store.get_unspent_coin_for_wallet(wallet_id, coin_name)
+                if unavailable_record is not None:
+                    balance -= unavailable_record.coin.amount
+            return uint128(balance)
+
         spendable: Set[WalletCoinRecord] = await self.get_spendable_coins_for_wallet(wallet_id, unspent_records)
 
         spendable_amount: uint128 = uint128(0)
@@ -488,7 +562,7 @@ class WalletStateManager:
         """
         # lock only if unspent_coin_records is None
         if unspent_coin_records is None:
-            unspent_coin_records = await self.coin_store.get_unspent_coins_for_wallet(wallet_id)
+            return uint128(self.coin_store.get_unspent_balance_for_wallet(wallet_id))
         return uint128(sum(cr.coin.amount for cr in unspent_coin_records))
 
     async def get_unconfirmed_balance(
@@ -571,10 +645,9 @@ class WalletStateManager:
             if derivation_record is None:
                 self.log.info(f"Received state for the coin that doesn't belong to us {coin_state}")
             else:
-                our_inner_puzzle: Program = self.main_wallet.puzzle_for_pk(bytes(derivation_record.pubkey))
+                our_inner_puzzle_hash = puzzle_hash_for_pk(derivation_record.pubkey)
                 asset_id: bytes32 = bytes32(bytes(tail_hash)[1:])
-                cat_puzzle = construct_cat_puzzle(CAT_MOD, asset_id, our_inner_puzzle)
-                if cat_puzzle.get_tree_hash() != coin_state.coin.puzzle_hash:
+                if construct_cat_puzzle_hash(asset_id, our_inner_puzzle_hash) != coin_state.coin.puzzle_hash:
                     return None, None
                 if bytes(tail_hash).hex()[2:] in self.default_cats or self.config.get(
                     "automatically_add_unknown_cats", False
@@ -1120,6 +1193,9 @@ class WalletStateManager:
         await self.db_connection.close()
         if self.weight_proof_handler is not None:
             self.weight_proof_handler.cancel_weight_proof_tasks()
+        if self.derivation_executor is not None:
+            self.derivation_executor.shutdown(wait=True)
+            self.derivation_executor = None
 
     def unlink_db(self):
         Path(self.db_path).unlink()
@@ -1149,31 +1225,39 @@ class WalletStateManager:
             await self.create_more_puzzle_hashes(in_transaction=in_transaction)
         self.state_changed("wallet_created")
 
-    async def get_spendable_coins_for_wallet(self, wallet_id: int, records=None) -> Set[WalletCoinRecord]:
-        if records is None:
-            records = await self.coin_store.get_unspent_coins_for_wallet(wallet_id)
-
+    async def get_unavailable_coin_ids(self, wallet_id: int) -> Set[bytes32]:
+        """
+        Returns the ids of the coins that can't be spent right now, because they are spent by a transaction which is
+        not confirmed yet or locked by an offer. Only the ids which are unspent coins of the wallet matter, the others
+        are never looked up.
+        """
         # Coins that are currently part of a transaction
         unconfirmed_tx: List[TransactionRecord] = await self.tx_store.get_unconfirmed_for_wallet(wallet_id)
-        removal_dict: Dict[bytes32, Coin] = {}
-        for tx in unconfirmed_tx:
-            for coin in tx.removals:
-                # TODO, "if" might not be necessary once unconfirmed tx doesn't contain coins for other wallets
-                if await self.does_coin_belong_to_wallet(coin, wallet_id):
-                    removal_dict[coin.name()] = coin
+        unavailable: Set[bytes32] = {coin.name() for tx in unconfirmed_tx for coin in tx.removals}
 
         # Coins that are part of the trade
         offer_locked_coins: Dict[bytes32, WalletCoinRecord] = await self.trade_manager.get_locked_coins()
+        unavailable.update(offer_locked_coins.keys())
+        return unavailable
 
-        filtered = set()
-        for record in records:
-            if record.coin.name() in offer_locked_coins:
-                continue
-            if record.coin.name() in removal_dict:
-                continue
-            filtered.add(record)
+    async def get_spendable_coins_for_wallet(self, wallet_id: int, records=None) -> Set[WalletCoinRecord]:
+        if records is None:
+            records = await self.coin_store.get_unspent_coins_for_wallet(wallet_id)
 
-        return filtered
+        unavailable: Set[bytes32] = await self.get_unavailable_coin_ids(wallet_id)
+        return {record for record in records if record.coin.name() not in unavailable}
+
+    async def get_spendable_coins_for_wallet_by_amount(self, wallet_id: int) -> Iterator[WalletCoinRecord]:
+        """
+        Returns the spendable coins of the wallet, the largest amount first. The coins are only looked at while the
+        iterator is consumed, so it must be consumed before the coin store changes.
+        """
+        unavailable: Set[bytes32] = await self.get_unavailable_coin_ids(wallet_id)
+        return (
+            record
+            for record in self.coin_store.get_unspent_coins_for_wallet_by_amount(wallet_id)
+            if record.coin.name() not in unavailable
+        )
 
     async def create_action(
         self, name: str, wallet_id: int, wallet_type: int, callback: str, done: bool, data: str, in_transaction: bool
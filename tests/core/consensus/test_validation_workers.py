@@ -0,0 +1,100 @@
+import dataclasses
+
+from chives.consensus.block_record import BlockRecord
+from chives.consensus.default_constants import DEFAULT_CONSTANTS
+from chives.consensus.multiprocess_validation import ValidationWorkers, _get_worker_state
+from chives.types.blockchain_format.classgroup import ClassgroupElement
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.util.ints import uint8, uint32, uint64, uint128
+from chives.util.streamable import recurse_jsonify
+
+constants_json = recurse_jsonify(dataclasses.asdict(DEFAULT_CONSTANTS.replace(DIFFICULTY_STARTING=uint64(1234))))
+
+
+def block_record(height: int) -> BlockRecord:
+    return BlockRecord(
+        bytes32(height.to_bytes(32, "big")),
+        bytes32((height - 1).to_bytes(32, "big")),
+        uint32(height),
+        uint128(height),
+        uint128(height),
+        uint8(0),
+        ClassgroupElement.get_default_element(),
+        None,
+        bytes32([0] * 32),
+        bytes32([0] * 32),
+        uint64(1024),
+        bytes32([0] * 32),
+        bytes32([0] * 32),
+        bytes32([0] * 32),
+        uint64(1),
+        uint8(0),
+        False,
+        uint32(0),
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+    )
+
+
+class TestValidationWorkers:
+    def test_items_to_send(self) -> None:
+        workers = ValidationWorkers(constants_json)
+        records = {record.header_hash: record for record in [block_record(h) for h in range(1, 6)]}
+
+        constants_dict, blocks = workers.items_to_send(records)
+        assert constants_dict == constants_json
+        assert blocks == {bytes(hh): bytes(record) for hh, record in records.items()}
+
+        # only what not every worker has is sent
+        workers.batch_done(1, list(records.keys())[:3], [])
+        constants_dict, blocks = workers.items_to_send(records)
+        assert constants_dict is None
+        assert set(blocks.keys()) == {bytes(hh) for hh in list(records.keys())[3:]}
+
+        workers.batch_done(2, list(records.keys())[1:], [])
+        _, blocks = workers.items_to_send(records)
+        assert set(blocks.keys()) == {bytes(hh) for hh in [list(records.keys())[0]] + list(records.keys())[3:]}
+
+        # a worker that was missing an item doesn't have it
+        workers.batch_done(1, [], [list(records.keys())[1]])
+        _, blocks = workers.items_to_send(records)
+        assert bytes(list(records.keys())[1]) in blocks
+
+        constants_dict, blocks = workers.items_to_send(records, send_all=True)
+        assert constants_dict == constants_json
+        assert len(blocks) == len(records)
+
+    def test_forgets_old_items(self) -> None:
+        workers = ValidationWorkers(constants_json, max_known_items=3)
+        records = [block_record(h) for h in range(1, 6)]
+        workers.batch_done(1, [r.header_hash for r in records[:3]], [])
+        workers.batch_done(1, [r.header_hash for r in records[3:]], [])
+        _, blocks = workers.items_to_send({r.header_hash: r for r in records})
+        assert set(blocks.keys()) == {bytes(r.header_hash) for r in records[:3]}
+
+    def test_worker_state(self) -> None:
+        workers = ValidationWorkers(constants_json)
+        records = {record.header_hash: record for record in [block_record(h) for h in range(100, 103)]}
+        header_hashes = list(records.keys())
+
+        constants, blocks, missing = _get_worker_state(workers.constants_key, None, header_hashes, {})
+        assert constants is None
+        assert missing == [workers.constants_key] + header_hashes
+
+        constants_dict, pickled = workers.items_to_send(records)
+        constants, blocks, missing = _get_worker_state(workers.constants_key, constants_dict, header_hashes, pickled)
+        assert constants is not None and constants.DIFFICULTY_STARTING == 1234
+        assert blocks == records
+        assert missing == []
+
+        # the worker kept everything from the previous batch
+        constants, blocks, missing = _get_worker_state(workers.constants_key, None, header_hashes, {})
+        assert constants is not None
+        assert blocks == records
+        assert missing == []
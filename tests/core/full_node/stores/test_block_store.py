@@ -13,7 +13,7 @@ from chives.consensus.default_constants import DEFAULT_CONSTANTS
 from chives.full_node.block_store import BlockStore
 from chives.full_node.coin_store import CoinStore
 from chives.full_node.hint_store import HintStore
-from chives.util.ints import uint8
+from chives.util.ints import uint8, uint32
 from chives.types.blockchain_format.vdf import VDFProof
 from chives.types.blockchain_format.program import SerializedProgram
 from tests.blockchain.blockchain_test_utils import _validate_and_add_block
@@ -59,6 +59,13 @@ class TestBlockStore:
             assert len(await store.get_full_blocks_at([0])) == 1
             assert len(await store.get_full_blocks_at([100])) == 0
 
+            heights = [uint32(h) for h in [3, 1, 100]]
+            assert await store.get_header_hashes_at(heights) == [(b.height, b.header_hash) for b in blocks[1:4:2]]
+            assert await store.get_full_block_bytes_at(heights) == [
+                (b.height, b.header_hash, bytes(b)) for b in blocks[1:4:2]
+            ]
+            assert await store.get_full_block_bytes_at([]) == []
+
             # Get blocks
             block_record_records = await store.get_block_records_in_range(0, 0xFFFFFFFF)
             assert len(block_record_records) == len(blocks)
@@ -127,7 +134,16 @@ class TestBlockStore:
                         assert len(rows) == 1
                         assert rows[0][0]
 
+            blocks_bytes = await block_store.get_full_block_bytes_in_range(uint32(2), uint32(7))
+            assert blocks_bytes == [(b.height, b.header_hash, bytes(b)) for b in blocks[2:8]]
+            assert await block_store.get_full_block_bytes_in_range(uint32(2), uint32(7)) is blocks_bytes
+            # incomplete ranges are not cached
+            assert len(await block_store.get_full_block_bytes_in_range(uint32(8), uint32(12))) == 2
+            assert block_store.range_cache.get((uint32(8), uint32(12))) is None
+
             await block_store.rollback(5)
+            assert block_store.range_cache.get((uint32(2), uint32(7))) is None
+            assert len(await block_store.get_full_block_bytes_in_range(uint32(2), uint32(7))) == 4
 
             count = 0
             async with db_wrapper.read_db() as conn:
@@ -0,0 +1,81 @@
+from chives.full_node.coin_record_cache import COIN_RECORD_CACHE_ENTRY_BYTES, CoinRecordCache
+from chives.types.blockchain_format.coin import Coin
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.types.coin_record import CoinRecord
+from chives.util.ints import uint32, uint64
+
+
+def make_record(index: int, confirmed: int, spent: int = 0) -> CoinRecord:
+    coin = Coin(bytes32(index.to_bytes(32, "big")), bytes32([0] * 32), uint64(index))
+    return CoinRecord(coin, uint32(confirmed), uint32(spent), False, uint64(1000 + confirmed))
+
+
+class TestCoinRecordCache:
+    def test_lru_and_stats(self) -> None:
+        cache = CoinRecordCache(2)
+        r1, r2, r3 = make_record(1, 1), make_record(2, 2), make_record(3, 3)
+        cache.put(r1.name, r1)
+        cache.put(r2.name, r2)
+        assert cache.get(r1.name) == r1
+        # r2 is now the least recently used
+        cache.put(r3.name, r3)
+        assert cache.get(r2.name) is None
+        assert cache.get(r3.name) == r3
+        assert cache.peek(r2.name) is None
+
+        found, missing = cache.get_many([r1.name, r2.name, r3.name])
+        assert found == {r1.name: r1, r3.name: r3}
+        assert missing == [r2.name]
+        assert (cache.stats.hits, cache.stats.misses, cache.stats.evictions) == (4, 2, 1)
+        assert cache.stats.hit_rate() == 4 / 6
+
+    def test_zero_capacity(self) -> None:
+        cache = CoinRecordCache(0)
+        record = make_record(1, 1)
+        cache.put(record.name, record)
+        assert len(cache) == 0
+        assert cache.get(record.name) is None
+
+    def test_memory_budget(self) -> None:
+        assert CoinRecordCache.from_memory_budget(100 * COIN_RECORD_CACHE_ENTRY_BYTES).capacity == 100
+        assert CoinRecordCache.from_memory_budget(0).capacity == 0
+
+    def test_rollback(self) -> None:
+        cache = CoinRecordCache(100)
+        old_unspent = make_record(1, 5)
+        old_spent_before = make_record(2, 5, 8)
+        old_spent_after = make_record(3, 5, 12)
+        new_unspent = make_record(4, 11)
+        new_spent = make_record(5, 11, 12)
+        for record in [old_unspent, old_spent_before, old_spent_after, new_unspent, new_spent]:
+            cache.put(record.name, record)
+
+        cache.rollback(10)
+        assert len(cache) == 3
+        assert cache.peek(old_unspent.name) == old_unspent
+        assert cache.peek(old_spent_before.name) == old_spent_before
+        assert cache.peek(new_unspent.name) is None
+        assert cache.peek(new_spent.name) is None
+        unspent = cache.peek(old_spent_after.name)
+        assert unspent is not None
+        assert unspent.spent_block_index == 0
+        assert unspent.confirmed_block_index == 5
+
+        # the height index follows the updated records
+        cache.rollback(6)
+        assert cache.peek(old_spent_before.name) == make_record(2, 5)
+        cache.rollback(4)
+        assert len(cache) == 0
+
+    def test_put_read(self) -> None:
+        cache = CoinRecordCache(100)
+        r1, r2, r3 = make_record(1, 1), make_record(2, 2), make_record(3, 3)
+        generation = cache.generation
+        cache.put_read(r1.name, r1, generation)
+        assert cache.peek(r1.name) == r1
+        cache.put_read(r2.name, r2, None)
+        assert cache.peek(r2.name) is None
+        # a write while the record was read makes the record stale
+        cache.new_generation()
+        cache.put_read(r3.name, r3, generation)
+        assert cache.peek(r3.name) is None
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import List, Optional, Set, Tuple
 
@@ -414,3 +415,149 @@ class TestCoinStoreWithBlocks:
             assert len(await coin_store.get_coin_states_by_ids(True, coins, 300)) == 302
             assert len(await coin_store.get_coin_states_by_ids(True, coins, 603)) == 0
             assert len(await coin_store.get_coin_states_by_ids(True, bad_coins, 0)) == 0
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cache_size", [0, 10, 100000])
+    async def test_ephemeral_coins(self, cache_size: uint32, db_version):
+        async with DBConnection(db_version) as db_wrapper:
+            coin_store = await CoinStore.create(db_wrapper, cache_size=uint32(cache_size))
+            reward_coins = {Coin(std_hash(b"reward" + bytes([i])), std_hash(b"1"), uint64(100)) for i in range(2)}
+            parent = Coin(std_hash(b"parent"), std_hash(b"2"), uint64(200))
+            await coin_store.new_block(uint32(1), uint64(1000), reward_coins, [parent], [])
+
+            # a coin created and spent in the same block, next to a regular spend and a regular addition
+            ephemeral = Coin(parent.name(), std_hash(b"3"), uint64(150))
+            child = Coin(ephemeral.name(), std_hash(b"4"), uint64(150))
+            reward_coins_2 = {Coin(std_hash(b"reward2" + bytes([i])), std_hash(b"1"), uint64(100)) for i in range(2)}
+            added = await coin_store.new_block(
+                uint32(2), uint64(2000), reward_coins_2, [ephemeral, child], [parent.name(), ephemeral.name()]
+            )
+            assert {r.name for r in added} == {c.name() for c in [ephemeral, child, *reward_coins_2]}
+
+            for coin, spent_index in [(parent, 2), (ephemeral, 2), (child, 0)]:
+                record = await coin_store.get_coin_record(coin.name())
+                assert record is not None
+                assert record.spent_block_index == spent_index
+                assert record.confirmed_block_index == (1 if coin == parent else 2)
+
+            assert {r.name for r in await coin_store.get_coins_removed_at_height(uint32(2))} == {
+                parent.name(),
+                ephemeral.name(),
+            }
+
+            await coin_store.rollback_to_block(1)
+            assert await coin_store.get_coin_record(ephemeral.name()) is None
+            record = await coin_store.get_coin_record(parent.name())
+            assert record is not None and not record.spent
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cache_size", [0, 2, 100000])
+    async def test_cached_batch_lookups(self, cache_size: uint32, db_version):
+        async with DBConnection(db_version) as db_wrapper:
+            coin_store = await CoinStore.create(db_wrapper, cache_size=uint32(cache_size))
+            coins = [Coin(std_hash(bytes([i])), std_hash(b"1"), uint64(i)) for i in range(1, 5)]
+            rewards_1 = {Coin(std_hash(b"reward1" + bytes([i])), std_hash(b"1"), uint64(100)) for i in range(2)}
+            rewards_2 = {Coin(std_hash(b"reward2" + bytes([i])), std_hash(b"1"), uint64(100)) for i in range(2)}
+            await coin_store.new_block(uint32(1), uint64(1000), rewards_1, coins[:3], [])
+            await coin_store.new_block(uint32(2), uint64(2000), rewards_2, coins[3:], [coins[0].name()])
+            names = [c.name() for c in coins] + [std_hash(b"unknown")]
+
+            # the second round is served (partially) from the cache, and must return the same results
+            for _ in range(2):
+                records = await coin_store.get_coin_records_by_names(True, names)
+                assert sorted(r.coin.amount for r in records) == [1, 2, 3, 4]
+                records = await coin_store.get_coin_records_by_names(False, names)
+                assert sorted(r.coin.amount for r in records) == [2, 3, 4]
+                records = await coin_store.get_coin_records_by_names(True, names, uint32(2))
+                assert sorted(r.coin.amount for r in records) == [4]
+                states = await coin_store.get_coin_states_by_ids(True, names, uint32(2))
+                assert sorted(s.coin.amount for s in states) == [1, 4]
+                states = await coin_store.get_coin_states_by_ids(False, names)
+                assert sorted(s.coin.amount for s in states) == [2, 3, 4]
+
+            if cache_size > 0:
+                assert coin_store.coin_record_cache.stats.hits > 0
+
+            await coin_store.rollback_to_block(1)
+            records = await coin_store.get_coin_records_by_names(True, names)
+            assert sorted((r.coin.amount, r.spent) for r in records) == [(1, False), (2, False), (3, False)]
+
+    @pytest.mark.asyncio
+    async def test_no_caching_during_other_write(self, db_version):
+        async with DBConnection(db_version) as db_wrapper:
+            coin_store = await CoinStore.create(db_wrapper, cache_size=uint32(100))
+            coin = Coin(std_hash(b"1"), std_hash(b"1"), uint64(1))
+            rewards_1 = {Coin(std_hash(b"reward1" + bytes([i])), std_hash(b"1"), uint64(100)) for i in range(2)}
+            rewards_2 = {Coin(std_hash(b"reward2" + bytes([i])), std_hash(b"1"), uint64(100)) for i in range(2)}
+            await coin_store.new_block(uint32(1), uint64(1000), rewards_1, [coin], [])
+            coin_store.clear_cache()
+
+            spent = asyncio.Event()
+            read_done = asyncio.Event()
+
+            async def spend_in_transaction() -> None:
+                async with db_wrapper.write_db():
+                    await coin_store.new_block(uint32(2), uint64(2000), rewards_2, [], [coin.name()])
+                    spent.set()
+                    await read_done.wait()
+
+            writer = asyncio.create_task(spend_in_transaction())
+            await spent.wait()
+            # the spend isn't committed yet, so other tasks still read the coin as unspent, but must not cache it
+            records = await coin_store.get_coin_records_by_names(True, [coin.name()])
+            assert [r.spent for r in records] == [False]
+            states = await coin_store.get_coin_states_by_ids(True, [coin.name()])
+            assert [s.spent_height for s in states] == [None]
+            assert coin_store.coin_record_cache.peek(coin.name()) is None
+            read_done.set()
+            await writer
+
+            record = await coin_store.get_coin_record(coin.name())
+            assert record is not None and record.spent_block_index == 2
+
+    @pytest.mark.asyncio
+    async def test_paginated_puzzle_hash_lookups(self, db_version):
+        async with DBConnection(db_version) as db_wrapper:
+            coin_store = await CoinStore.create(db_wrapper)
+            puzzle_hashes = [std_hash(b"ph" + bytes([i])) for i in range(3)]
+            # 10 coins per puzzle hash in each of 3 blocks, every third coin is spent in the next block
+            previous: List[Coin] = []
+            for height in range(1, 4):
+                coins = [
+                    Coin(std_hash(bytes([height, i])), puzzle_hashes[i % 3], uint64(height * 1000 + i))
+                    for i in range(30)
+                ]
+                spent = [c.name() for c in previous if c.amount % 3 == 0]
+                rewards = {
+                    Coin(std_hash(b"reward" + bytes([height, i])), std_hash(b"farmer"), uint64(1)) for i in range(2)
+                }
+                await coin_store.new_block(uint32(height), uint64(height * 1000), rewards, coins, spent)
+                previous = coins
+
+            for include_spent_coins in [True, False]:
+                for max_items in [1, 7, 30, 1000]:
+                    for start_height in [0, 2]:
+                        expected = await coin_store.get_coin_records_by_puzzle_hashes(
+                            include_spent_coins, puzzle_hashes[:2], uint32(start_height)
+                        )
+                        found: List[CoinRecord] = []
+                        last_id = None
+                        while True:
+                            page, last_id = await coin_store.get_coin_records_by_puzzle_hashes_paginated(
+                                include_spent_coins, puzzle_hashes[:2], max_items, last_id, uint32(start_height)
+                            )
+                            assert len(page) <= max_items
+                            found.extend(page)
+                            if last_id is None:
+                                break
+                            assert len(page) == max_items
+                        assert len(found) == len(expected)
+                        assert set(found) == set(expected)
+                        # ordered by puzzle hash, and by the order they were added in
+                        assert [r.coin.puzzle_hash for r in found] == sorted(r.coin.puzzle_hash for r in found)
+                        for ph in puzzle_hashes[:2]:
+                            amounts = [r.coin.amount for r in found if r.coin.puzzle_hash == ph]
+                            assert amounts == sorted(amounts)
+
+            with pytest.raises(ValueError):
+                await coin_store.get_coin_records_by_puzzle_hashes_paginated(True, puzzle_hashes, 0)
@@ -160,3 +160,33 @@ class TestHintStore:
 
             count = await hint_store.count_hints()
             assert count == 2
+
+    @pytest.mark.asyncio
+    async def test_get_coin_ids_multi(self, db_version):
+        hint_0 = 32 * b"\0"
+        hint_1 = 32 * b"\1"
+        not_existing_hint = 32 * b"\3"
+        coin_id_0 = 32 * b"\4"
+        coin_id_1 = 32 * b"\5"
+        coin_id_2 = 32 * b"\6"
+        for use_filter in [False, True]:
+            async with DBConnection(db_version) as db_wrapper:
+                hint_store = await HintStore.create(db_wrapper, use_filter=use_filter)
+                await hint_store.add_hints([(coin_id_0, hint_0), (coin_id_1, hint_0), (coin_id_2, hint_1)])
+
+                assert sorted(await hint_store.get_coin_ids_multi([hint_0, not_existing_hint, hint_1])) == [
+                    coin_id_0,
+                    coin_id_1,
+                    coin_id_2,
+                ]
+                assert await hint_store.get_coin_ids_multi([not_existing_hint]) == []
+                assert await hint_store.get_coin_ids_multi([]) == []
+                many_hints = [i.to_bytes(32, "big") for i in range(2000)]
+                assert sorted(await hint_store.get_coin_ids_multi(many_hints)) == [coin_id_0, coin_id_1]
+
+                # the filter of a new store is loaded from the database
+                hint_store = await HintStore.create(db_wrapper, use_filter=True)
+                assert hint_store.hint_filter is not None
+                assert hint_0 in hint_store.hint_filter
+                assert sorted(await hint_store.get_coin_ids(hint_0)) == [coin_id_0, coin_id_1]
+                assert await hint_store.get_coin_ids(not_existing_hint) == []
@@ -0,0 +1,104 @@
+import asyncio
+from typing import Any, List, Optional
+
+import pytest
+
+from chives.full_node.block_download import BlockDownloadScheduler
+from chives.protocols.full_node_protocol import RequestBlocks, RespondBlocks
+from chives.util.hash import std_hash
+
+
+class FakeBlock:
+    def __init__(self, height: int):
+        self.height = height
+
+
+def respond_blocks(start: int, end: int) -> RespondBlocks:
+    # skip the streamable type checks, the scheduler never looks inside the blocks
+    response = object.__new__(RespondBlocks)
+    object.__setattr__(response, "start_height", start)
+    object.__setattr__(response, "end_height", end)
+    object.__setattr__(response, "blocks", [FakeBlock(h) for h in range(start, end + 1)])
+    return response
+
+
+class FakePeer:
+    def __init__(self, index: int, delay: float = 0.0, fail: bool = False):
+        self.peer_node_id = std_hash(bytes([index]))
+        self.delay = delay
+        self.fail = fail
+        self.closed = False
+        self.requests: List[RequestBlocks] = []
+
+    async def request_blocks(self, request: RequestBlocks, timeout: int) -> Optional[RespondBlocks]:
+        self.requests.append(request)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            return None
+        return respond_blocks(request.start_height, request.end_height)
+
+    async def close(self, ban_time: int = 0) -> None:
+        self.closed = True
+
+
+async def drain(batch_queue: "asyncio.Queue[Any]") -> List[int]:
+    starts: List[int] = []
+    while True:
+        res = await batch_queue.get()
+        if res is None:
+            return starts
+        starts.append(res[1][0].height)
+
+
+class TestBlockDownloadScheduler:
+    @pytest.mark.asyncio
+    async def test_in_order_across_peers(self) -> None:
+        # the first peer is slow, so its batches arrive after the ones requested later from the fast peers
+        peers = [FakePeer(0, delay=0.05), FakePeer(1, delay=0.001), FakePeer(2, delay=0.01)]
+        scheduler = BlockDownloadScheduler(10, 105, 10, lambda: peers, window=6)
+        batch_queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=2)
+        fetched, starts = await asyncio.gather(scheduler.fetch(batch_queue), drain(batch_queue))
+        assert fetched is True
+        assert starts == list(range(10, 105, 10))
+        assert all(len(p.requests) > 0 for p in peers)
+        assert all(stats.in_flight == 0 for stats in scheduler.peer_stats.values())
+
+    @pytest.mark.asyncio
+    async def test_failed_peer_is_replaced(self) -> None:
+        bad_peer = FakePeer(0, fail=True)
+        good_peer = FakePeer(1)
+        scheduler = BlockDownloadScheduler(0, 50, 10, lambda: [bad_peer, good_peer], window=4)
+        batch_queue: "asyncio.Queue[Any]" = asyncio.Queue()
+        fetched, starts = await asyncio.gather(scheduler.fetch(batch_queue), drain(batch_queue))
+        assert fetched is True
+        assert starts == [0, 10, 20, 30, 40]
+        assert bad_peer.closed
+        assert scheduler.peer_stats[bad_peer.peer_node_id].failures > 0
+
+    @pytest.mark.asyncio
+    async def test_all_peers_fail(self) -> None:
+        peers = [FakePeer(0, fail=True), FakePeer(1, fail=True)]
+        scheduler = BlockDownloadScheduler(0, 50, 10, lambda: peers)
+        batch_queue: "asyncio.Queue[Any]" = asyncio.Queue()
+        fetched, starts = await asyncio.gather(scheduler.fetch(batch_queue), drain(batch_queue))
+        assert fetched is False
+        assert starts == []
+
+    @pytest.mark.asyncio
+    async def test_slow_head_is_rerequested(self) -> None:
+        slow_peer = FakePeer(0, delay=5)
+        fast_peer = FakePeer(1)
+        peers = [slow_peer]
+        peers_changed = asyncio.Event()
+        scheduler = BlockDownloadScheduler(
+            0, 10, 10, lambda: peers, slow_request_seconds=0.1, peers_changed=peers_changed
+        )
+        batch_queue: "asyncio.Queue[Any]" = asyncio.Queue()
+        fetch_task = asyncio.create_task(scheduler.fetch(batch_queue))
+        await asyncio.sleep(0.05)
+        # a faster peer shows up while the only range is stuck on the slow one
+        peers.append(fast_peer)
+        peers_changed.set()
+        assert await asyncio.wait_for(drain(batch_queue), timeout=3) == [0]
+        assert await fetch_task is True
+        assert len(fast_peer.requests) == 1
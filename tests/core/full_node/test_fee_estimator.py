@@ -0,0 +1,78 @@
+from chives.full_node.fee_estimator import (
+    DEFAULT_TRANSACTION_BLOCK_SECONDS,
+    FEE_RATE_BUCKETS,
+    FeeEstimator,
+    fee_rate_bucket,
+)
+from chives.full_node.fee_rate_index import FeeRateIndex
+from chives.util.hash import std_hash
+from chives.util.ints import uint32, uint64
+
+
+class TestFeeEstimator:
+    def test_fee_rate_bucket(self) -> None:
+        assert fee_rate_bucket(0) == 0
+        assert fee_rate_bucket(0.5) == 0
+        assert fee_rate_bucket(1.0) == 1
+        for fee_rate in [1.5, 10, 1234.5]:
+            bucket = fee_rate_bucket(fee_rate)
+            assert FEE_RATE_BUCKETS[bucket] <= fee_rate < FEE_RATE_BUCKETS[bucket + 1]
+        assert fee_rate_bucket(1e100) == len(FEE_RATE_BUCKETS) - 1
+
+    def test_estimate_from_mempool(self) -> None:
+        estimator = FeeEstimator(block_cost_capacity=1000)
+        index = FeeRateIndex()
+        assert estimator.estimate(index, 60) == 0
+
+        # 2000 cost of transactions paying 10, and 1500 cost paying 100
+        for i in range(20):
+            index.add((10.0, std_hash(bytes([i]))), 100)
+        for i in range(15):
+            index.add((100.0, std_hash(bytes([100 + i]))), 100)
+        # a transaction has to pay more than the ones that would not fit in the blocks until the target
+        assert estimator.estimate_from_mempool(index, 1, 0) == FEE_RATE_BUCKETS[fee_rate_bucket(100) + 1]
+        assert estimator.estimate_from_mempool(index, 2, 0) == FEE_RATE_BUCKETS[fee_rate_bucket(10) + 1]
+        assert estimator.estimate_from_mempool(index, 4, 0) == 0
+        # a big transaction does not fit next to all of them
+        assert estimator.estimate_from_mempool(index, 4, 600) == FEE_RATE_BUCKETS[fee_rate_bucket(10) + 1]
+
+    def test_estimate_from_history(self) -> None:
+        estimator = FeeEstimator(block_cost_capacity=1000)
+        assert estimator.estimate_from_history(1) is None
+
+        timestamp = 1000
+        height = 1
+        for block in range(30):
+            # high fee transactions are confirmed in the next block, low fee ones after 5 blocks
+            high = std_hash(b"high" + bytes([block]))
+            low = std_hash(b"low" + bytes([block]))
+            estimator.add_item(high, 50, uint32(height))
+            estimator.add_item(low, 2, uint32(height))
+            for waited in range(1, 6):
+                confirmed = [high] if waited == 1 else [low] if waited == 5 else []
+                in_mempool = [] if waited == 5 else [low]
+                estimator.new_block(uint32(height + waited), uint64(timestamp + 60 * waited), confirmed, in_mempool)
+            height += 5
+            timestamp += 300
+
+        assert estimator.estimate_from_history(1) == FEE_RATE_BUCKETS[fee_rate_bucket(50)]
+        assert estimator.estimate_from_history(5) == FEE_RATE_BUCKETS[fee_rate_bucket(2)]
+        # the block time is measured, 60 seconds
+        assert DEFAULT_TRANSACTION_BLOCK_SECONDS < estimator.transaction_block_seconds <= 60
+        assert estimator.target_blocks(600) >= 10
+
+    def test_unknown_confirmations_are_ignored(self) -> None:
+        estimator = FeeEstimator(block_cost_capacity=1000)
+        for i in range(10):
+            estimator.add_item(std_hash(bytes([i])), 50, uint32(1))
+        estimator.new_block(uint32(2), uint64(1000), None, [])
+        assert estimator.estimate_from_history(1) is None
+
+    def test_undetermined_items_are_ignored(self) -> None:
+        estimator = FeeEstimator(block_cost_capacity=1000)
+        for i in range(10):
+            estimator.add_item(std_hash(bytes([i])), 50, uint32(1))
+        estimator.new_block(uint32(2), uint64(1000), [], [], [std_hash(bytes([i])) for i in range(10)])
+        assert estimator._tracked == {}
+        assert estimator._resolved[fee_rate_bucket(50)] == 0
+        assert estimator.estimate_from_history(1) is None
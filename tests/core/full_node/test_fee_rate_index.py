@@ -0,0 +1,92 @@
+import random
+from typing import Dict, List
+
+import pytest
+from blspy import G2Element
+
+from chives.consensus.cost_calculator import NPCResult
+from chives.full_node.fee_rate_index import FeeRateIndex, FeeRateKey
+from chives.full_node.mempool import Mempool
+from chives.types.blockchain_format.program import SerializedProgram
+from chives.types.mempool_item import MempoolItem
+from chives.types.spend_bundle import SpendBundle
+from chives.util.hash import std_hash
+from chives.util.ints import uint64
+
+
+def make_item(rng: random.Random, index: int) -> MempoolItem:
+    cost = uint64(rng.randint(1, 100) * 1000)
+    # few distinct fee rates, so there are plenty of ties
+    fee = uint64(rng.randint(0, 5) * cost)
+    return MempoolItem(
+        SpendBundle([], G2Element()),
+        fee,
+        NPCResult(None, None, cost),
+        cost,
+        std_hash(index.to_bytes(4, "big")),
+        [],
+        [],
+        SerializedProgram.from_bytes(b"\x80"),
+    )
+
+
+def min_fee_rate_reference(mempool: Mempool, cost: int) -> float:
+    # walks the spends in increasing fee per cost, like get_min_fee_rate used to
+    if not mempool.at_full_capacity(cost):
+        return 0
+    current_cost = mempool.total_mempool_cost
+    for fee_per_cost, spends_with_fpc in mempool.sorted_spends.items():
+        for item in spends_with_fpc.values():
+            current_cost -= item.cost
+            if current_cost + cost <= mempool.max_size_in_cost:
+                return float(fee_per_cost)
+    raise ValueError("does not fit")
+
+
+class TestFeeRateIndex:
+    def test_against_reference(self) -> None:
+        rng = random.Random(1337)
+        index = FeeRateIndex()
+        costs: Dict[FeeRateKey, int] = {}
+        for i in range(2000):
+            if len(costs) > 0 and rng.random() < 0.4:
+                key = rng.choice(list(costs.keys()))
+                index.remove(key)
+                costs.pop(key)
+            else:
+                key = (float(rng.randint(0, 20)), std_hash(i.to_bytes(4, "big")))
+                cost = rng.randint(1, 1000)
+                index.add(key, cost)
+                costs[key] = cost
+            assert len(index) == len(costs)
+            assert index.total_cost == sum(costs.values())
+
+            ordered: List[FeeRateKey] = sorted(costs.keys())
+            target = rng.randint(1, index.total_cost + 10)
+            expected = None
+            cumulative = 0
+            for k in ordered:
+                cumulative += costs[k]
+                if cumulative >= target:
+                    expected = k[0]
+                    break
+            assert index.lowest_fee_rate_freeing(target) == expected
+
+            threshold = rng.randint(0, 20) - 0.5
+            assert index.cost_above(threshold) == sum(c for k, c in costs.items() if k[0] > threshold)
+
+        with pytest.raises(KeyError):
+            index.remove((1000.0, std_hash(b"missing")))
+
+    def test_mempool_min_fee_rate(self) -> None:
+        rng = random.Random(42)
+        mempool = Mempool(5000000)
+        for i in range(500):
+            mempool.add_to_pool(make_item(rng, i))
+            for cost in [0, 1000, 50000, 1000000, 4000000]:
+                assert mempool.get_min_fee_rate(cost) == min_fee_rate_reference(mempool, cost)
+            if rng.random() < 0.2:
+                mempool.remove_from_pool(rng.choice(list(mempool.spends.values())))
+        assert mempool.fee_rate_index.total_cost == mempool.total_mempool_cost
+        with pytest.raises(ValueError):
+            mempool.get_min_fee_rate(5000001)
@@ -0,0 +1,117 @@
+import dataclasses
+from itertools import islice
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+
+from chives.consensus.default_constants import DEFAULT_CONSTANTS
+from chives.full_node.full_node import FullNode
+from chives.full_node.full_node_api import FullNodeAPI
+from chives.util.generator_tools import get_block_header
+from chives.protocols.protocol_message_types import ProtocolMessageTypes
+from chives.protocols.wallet_protocol import RequestHeaderBlocks, RespondHeaderBlocks
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.types.full_block import FullBlock
+from chives.types.header_block import HeaderBlock
+from chives.util.hash import std_hash
+from chives.util.ints import uint32
+from tests.util.test_full_block_utils import get_full_blocks
+
+
+def with_height(block: FullBlock, height: int, seed: int) -> FullBlock:
+    # the header hash is the hash of the foliage, make it unique
+    return dataclasses.replace(
+        block,
+        reward_chain_block=dataclasses.replace(block.reward_chain_block, height=uint32(height)),
+        foliage=dataclasses.replace(block.foliage, reward_block_hash=std_hash(bytes(uint32(seed)))),
+    )
+
+
+def make_blocks(count: int) -> List[FullBlock]:
+    full_blocks = islice(get_full_blocks(), count)  # type: ignore[no-untyped-call]
+    return [with_height(block, height, height) for height, block in enumerate(full_blocks)]
+
+
+def header_block(block: FullBlock) -> HeaderBlock:
+    return get_block_header(block, [], [])
+
+
+class FakeBlockchain:
+    def __init__(self, blocks: List[FullBlock]) -> None:
+        self.main_chain: Dict[uint32, bytes32] = {block.height: block.header_hash for block in blocks}
+
+    def height_to_hash(self, height: uint32) -> Optional[bytes32]:
+        return self.main_chain.get(height)
+
+
+class TestHeaderBlockCache:
+    def test_rollback(self, tmp_path: Path) -> None:
+        full_node = FullNode(
+            {"database_path": "db/blockchain.sqlite", "selected_network": "testnet"}, tmp_path, DEFAULT_CONSTANTS
+        )
+        for height in range(10):
+            full_node.header_block_cache.put(std_hash(bytes([height])), (uint32(height), bytes([height])))
+
+        full_node.rollback_header_block_cache(uint32(6))
+        for height in range(10):
+            cached = full_node.header_block_cache.get(std_hash(bytes([height])))
+            assert cached == (None if height > 6 else (height, bytes([height])))
+
+    @pytest.mark.asyncio
+    async def test_request_header_blocks(self, tmp_path: Path) -> None:
+        full_node = FullNode(
+            {"database_path": "db/blockchain.sqlite", "selected_network": "testnet"}, tmp_path, DEFAULT_CONSTANTS
+        )
+        api = FullNodeAPI(full_node)
+        blocks = make_blocks(4)
+        blockchain = FakeBlockchain(blocks)
+        full_node.blockchain = blockchain  # type: ignore[assignment]
+        block_lookups: List[int] = []
+
+        async def main_chain_block_bytes(start_height: uint32, end_height: uint32) -> Optional[List[bytes]]:
+            block_lookups.append(start_height)
+            if any(blockchain.height_to_hash(uint32(h)) is None for h in range(start_height, end_height + 1)):
+                return None
+            return [bytes(block) for block in blocks[start_height:][: end_height - start_height + 1]]
+
+        async def get_header_block(block: FullBlock) -> HeaderBlock:
+            return header_block(block)
+
+        api._main_chain_block_bytes = main_chain_block_bytes  # type: ignore[assignment]
+        full_node.get_header_block = get_header_block  # type: ignore[assignment]
+
+        async def request(start: int, end: int) -> bytes:
+            msg = await api.request_header_blocks(RequestHeaderBlocks(uint32(start), uint32(end)))
+            assert msg is not None and msg.type == ProtocolMessageTypes.respond_header_blocks.value
+            return bytes(msg.data)
+
+        def expected(start: int, end: int) -> bytes:
+            return bytes(
+                RespondHeaderBlocks(
+                    uint32(start), uint32(end), [header_block(b) for b in blocks[start:][: end - start + 1]]
+                )
+            )
+
+        # cache miss, the blocks are read and the header blocks cached
+        assert await request(0, 3) == expected(0, 3)
+        assert block_lookups == [0]
+        for block in blocks:
+            assert full_node.header_block_cache.get(block.header_hash) == (block.height, bytes(header_block(block)))
+
+        # served from the cache, the hand streamed response must be the same as the streamable
+        assert await request(1, 2) == expected(1, 2)
+        assert block_lookups == [0]
+
+        # a reorg replaced the block at height 2, the cached header block of the old one must not be served
+        reorg_block = with_height(blocks[2], 2, 100)
+        blocks[2] = reorg_block
+        blockchain.main_chain[uint32(2)] = reorg_block.header_hash
+        assert await request(1, 3) == expected(1, 3)
+        assert block_lookups == [0, 1]
+        assert full_node.header_block_cache.get(reorg_block.header_hash) == (2, bytes(header_block(reorg_block)))
+
+        # the blocks are not in the main chain any more when they are read, the request is rejected
+        del blockchain.main_chain[uint32(3)]
+        msg = await api.request_header_blocks(RequestHeaderBlocks(uint32(3), uint32(3)))
+        assert msg is not None and msg.type == ProtocolMessageTypes.reject_header_blocks.value
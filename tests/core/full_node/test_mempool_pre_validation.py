@@ -0,0 +1,68 @@
+import asyncio
+from concurrent.futures import Future
+from typing import Any, Callable, List, TypeVar
+
+import pytest
+from blspy import G2Element
+
+from chives.full_node.mempool_manager import MAX_VALIDATION_BATCH_SIZE, MempoolManager
+from chives.types.spend_bundle import SpendBundle
+from chives.util.inline_executor import InlineExecutor
+from tests.setup_nodes import test_constants
+
+_T = TypeVar("_T")
+
+
+class RecordingExecutor(InlineExecutor):
+    def __init__(self) -> None:
+        self.batch_sizes: List[int] = []
+
+    def submit(self, fn: Callable[..., _T], *args: Any, **kwargs: Any) -> "Future[_T]":  # type: ignore
+        self.batch_sizes.append(len(args[0]))
+        return super().submit(fn, *args, **kwargs)
+
+
+class FailingExecutor(InlineExecutor):
+    def submit(self, fn: Callable[..., _T], *args: Any, **kwargs: Any) -> "Future[_T]":  # type: ignore
+        raise RuntimeError("worker died")
+
+
+def make_manager(workers: int) -> MempoolManager:
+    # the validation does not touch the coin store
+    manager = MempoolManager(None, test_constants, single_threaded=True)  # type: ignore[arg-type]
+    manager.validation_workers = workers
+    return manager
+
+
+class TestMempoolPreValidation:
+    @pytest.mark.asyncio
+    async def test_burst_is_batched(self) -> None:
+        manager = make_manager(2)
+        executor = RecordingExecutor()
+        manager.pool = executor
+        spend_bundle = SpendBundle([], G2Element())
+        count = 2 + 2 * MAX_VALIDATION_BATCH_SIZE + 1
+        results = await asyncio.gather(
+            *[manager.pre_validate_spendbundle(spend_bundle, None, spend_bundle.name()) for _ in range(count)]
+        )
+        assert len(results) == count
+        assert all(result.error is None for result in results)
+        # the first transactions find idle workers, the rest waits for them and is split between them
+        assert executor.batch_sizes[:2] == [1, 1]
+        assert sum(executor.batch_sizes) == count
+        assert max(executor.batch_sizes) == MAX_VALIDATION_BATCH_SIZE
+        assert len(executor.batch_sizes) < count
+        assert manager._validation_batches_in_flight == 0
+        assert manager._pending_validations == []
+
+    @pytest.mark.asyncio
+    async def test_worker_failure(self) -> None:
+        manager = make_manager(2)
+        manager.pool = FailingExecutor()
+        spend_bundle = SpendBundle([], G2Element())
+        results = await asyncio.gather(
+            *[manager.pre_validate_spendbundle(spend_bundle, None, spend_bundle.name()) for _ in range(5)],
+            return_exceptions=True,
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert manager._validation_batches_in_flight == 0
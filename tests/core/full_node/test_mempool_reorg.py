@@ -0,0 +1,136 @@
+import dataclasses
+from typing import Iterable, List, Optional, cast
+
+import pytest
+
+from chives.consensus.block_record import BlockRecord
+from chives.full_node.coin_store import CoinStore
+from chives.full_node.fee_estimator import fee_rate_bucket
+from chives.full_node.mempool_manager import MempoolManager
+from chives.types.blockchain_format.coin import Coin
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.types.coin_record import CoinRecord
+from chives.types.mempool_item import MempoolItem
+from chives.util.hash import std_hash
+from chives.util.ints import uint32, uint64
+from tests.setup_nodes import test_constants
+from tests.util.db_connection import DBConnection
+
+
+@dataclasses.dataclass
+class FakePeak:
+    header_hash: bytes32
+    prev_transaction_block_hash: Optional[bytes32]
+    height: uint32
+    timestamp: uint64
+    is_transaction_block: bool = True
+    prev_transaction_block_height: uint32 = uint32(0)
+
+
+def make_peak(name: bytes, prev: Optional["FakePeak"], height: int, timestamp: int) -> BlockRecord:
+    prev_hash = None if prev is None else prev.header_hash
+    return cast(BlockRecord, FakePeak(std_hash(name), prev_hash, uint32(height), uint64(timestamp)))
+
+
+def coin_record(index: int) -> CoinRecord:
+    coin = Coin(std_hash(bytes([index])), std_hash(b"ph"), uint64(index))
+    return CoinRecord(coin, uint32(1), uint32(0), False, uint64(1))
+
+
+@dataclasses.dataclass
+class FakeItem:
+    name: bytes32
+    additions: List[Coin]
+    removals: List[Coin]
+    spend_bundle_name: bytes32 = bytes32([0] * 32)
+    cost: uint64 = uint64(1)
+    fee_per_cost: float = 1.0
+
+
+class RecordingMempoolManager(MempoolManager):
+    rechecked: Optional[List[bytes32]] = None
+    rebuilt: bool = False
+
+    async def recheck_items_spending(self, coin_ids: Iterable[bytes32]) -> None:
+        self.rechecked = list(coin_ids)
+
+    async def readd_items(self, items: Iterable[MempoolItem]) -> None:
+        self.rebuilt = True
+
+
+class TestMempoolReorg:
+    @pytest.mark.asyncio
+    async def test_reorg_rechecks_changed_coins(self) -> None:
+        async with DBConnection(2) as db_wrapper:
+            coin_store = await CoinStore.create(db_wrapper)
+            manager = RecordingMempoolManager(coin_store, test_constants, single_threaded=True)
+            try:
+                genesis = make_peak(b"0", None, 10, 100)
+                await manager.new_peak(genesis, [])
+                assert manager.rebuilt
+
+                # a heavier fork that does not build on our peak, the changes of a non transaction block are kept
+                manager.rebuilt = False
+                non_tx = dataclasses.replace(cast(FakePeak, make_peak(b"1", None, 11, 90)), is_transaction_block=False)
+                await manager.new_peak(cast(BlockRecord, non_tx), [coin_record(1)])
+                assert manager.rechecked is None
+                fork = make_peak(b"2", None, 12, 110)
+                await manager.new_peak(fork, [coin_record(2)])
+                assert manager.rechecked is not None
+                assert set(manager.rechecked) == {coin_record(1).name, coin_record(2).name}
+                assert not manager.rebuilt
+
+                # a fork with a lower height may break time locks, so the mempool is rebuilt
+                manager.rechecked = None
+                await manager.new_peak(make_peak(b"3", None, 11, 120), [coin_record(3)])
+                assert manager.rebuilt and manager.rechecked is None
+
+                # so is a peak for which the coin changes are not known
+                manager.rebuilt = False
+                manager.coin_changes_unknown()
+                await manager.new_peak(make_peak(b"4", None, 13, 130), [coin_record(4)])
+                assert manager.rebuilt and manager.rechecked is None
+            finally:
+                manager.shut_down()
+
+    @pytest.mark.asyncio
+    async def test_confirmed_items(self) -> None:
+        async with DBConnection(2) as db_wrapper:
+            coin_store = await CoinStore.create(db_wrapper)
+            manager = RecordingMempoolManager(coin_store, test_constants, single_threaded=True)
+            try:
+                genesis = make_peak(b"0", None, 10, 100)
+                await manager.new_peak(genesis, [])
+                spend = FakeItem(std_hash(b"spend"), [coin_record(3).coin], [coin_record(1).coin], fee_per_cost=1.0)
+                conflicting = FakeItem(
+                    std_hash(b"conflicting"), [coin_record(4).coin], [coin_record(5).coin], fee_per_cost=10.0
+                )
+                # e.g. a melt, which is included if the block spent its coin, as would a conflicting spend
+                no_additions = FakeItem(std_hash(b"no additions"), [], [coin_record(2).coin], fee_per_cost=100.0)
+                estimator = manager.fee_estimator
+                for item in [spend, conflicting, no_additions]:
+                    manager.mempool.add_to_pool(cast(MempoolItem, item))
+                    estimator.add_item(item.name, item.fee_per_cost, genesis.height)
+
+                peak = make_peak(b"1", cast(FakePeak, genesis), 11, 110)
+                await manager.new_peak(peak, [coin_record(i) for i in [1, 2, 3, 5]])
+                assert estimator._tracked == {}
+                # confirmed in the next block
+                assert estimator._resolved[fee_rate_bucket(1.0)] == 1
+                assert estimator._confirmed[fee_rate_bucket(1.0)][0] == 1
+                # not confirmed
+                assert estimator._resolved[fee_rate_bucket(10.0)] == 1
+                assert sum(estimator._confirmed[fee_rate_bucket(10.0)]) == 0
+                # not counted either way
+                assert estimator._resolved[fee_rate_bucket(100.0)] == 0
+                assert sum(estimator._confirmed[fee_rate_bucket(100.0)]) == 0
+                assert manager.mempool.spends == {}
+            finally:
+                manager.shut_down()
+
+    def test_time_locks_still_hold(self) -> None:
+        old = make_peak(b"0", None, 10, 100)
+        assert MempoolManager.time_locks_still_hold(old, make_peak(b"1", None, 10, 100))
+        assert MempoolManager.time_locks_still_hold(old, make_peak(b"1", None, 11, 101))
+        assert not MempoolManager.time_locks_still_hold(old, make_peak(b"1", None, 9, 101))
+        assert not MempoolManager.time_locks_still_hold(old, make_peak(b"1", None, 11, 99))
@@ -0,0 +1,257 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, List, Optional
+
+import pytest
+
+from chives.consensus.default_constants import DEFAULT_CONSTANTS
+from chives.consensus.multiprocess_validation import PreValidationResult
+from chives.full_node import full_node as full_node_module
+from chives.full_node.full_node import FullNode
+from chives.full_node import speculative_validation
+from chives.full_node.speculative_validation import SpeculativeBlockRecords
+from chives.types.blockchain_format.program import Program, SerializedProgram
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.types.blockchain_format.sub_epoch_summary import SubEpochSummary
+from chives.types.generator_types import BlockGenerator
+from chives.util.errors import Err
+from chives.util.hash import std_hash
+from chives.util.ints import uint8, uint16, uint32, uint64
+
+
+def generator(height: int) -> SerializedProgram:
+    return SerializedProgram.from_program(Program.to(height))
+
+
+@dataclass
+class FakeBlock:
+    height: uint32
+    transactions_generator: Optional[SerializedProgram] = None
+    transactions_generator_ref_list: List[uint32] = field(default_factory=list)
+
+    @property
+    def header_hash(self) -> bytes32:
+        return std_hash(b"block" + bytes(self.height))
+
+    @property
+    def prev_header_hash(self) -> bytes32:
+        return std_hash(b"block" + bytes(uint32(self.height - 1)))
+
+
+@dataclass
+class FakeRecord:
+    height: uint32
+    sub_epoch_summary_included: Optional[SubEpochSummary] = None
+
+    @property
+    def header_hash(self) -> bytes32:
+        return FakeBlock(self.height).header_hash
+
+
+@dataclass
+class FakeDBWrapper:
+    db_version: int
+
+
+class FakeBlockStore:
+    def __init__(self, db_version: int, heights: List[int]) -> None:
+        self.db_wrapper = FakeDBWrapper(db_version)
+        self.generators = {FakeBlock(uint32(h)).header_hash: generator(h) for h in heights}
+        self.lookups: List[Any] = []
+
+    async def get_generators_at(self, heights: List[uint32]) -> List[SerializedProgram]:
+        self.lookups.extend(heights)
+        return [generator(h) for h in heights]
+
+    async def get_generator(self, header_hash: bytes32) -> Optional[SerializedProgram]:
+        self.lookups.append(header_hash)
+        return self.generators.get(header_hash)
+
+
+class FakeBlockchain:
+    """
+    A chain of blocks at heights 0 to `peak_height`, in the main chain and committed to the database
+    """
+
+    def __init__(self, peak_height: int, db_version: int = 2) -> None:
+        self.heights = {FakeBlock(uint32(h)).header_hash: uint32(h) for h in range(peak_height + 1)}
+        self.constants = DEFAULT_CONSTANTS
+        self.peak_height = peak_height
+        self.block_store = FakeBlockStore(db_version, list(range(peak_height + 1)))
+        self.fallbacks = 0
+
+    def try_block_record(self, header_hash: bytes32) -> Optional[FakeRecord]:
+        height = self.heights.get(header_hash)
+        return None if height is None else FakeRecord(height)
+
+    def contains_block(self, header_hash: bytes32) -> bool:
+        return header_hash in self.heights
+
+    def block_record(self, header_hash: bytes32) -> FakeRecord:
+        return FakeRecord(self.heights[header_hash])
+
+    def contains_height(self, height: uint32) -> bool:
+        return height <= self.peak_height
+
+    def get_ses_heights(self) -> List[uint32]:
+        return [uint32(5)]
+
+    def height_to_hash(self, height: uint32) -> Optional[bytes32]:
+        return FakeBlock(height).header_hash if height <= self.peak_height else None
+
+    def get_peak(self) -> Optional[FakeRecord]:
+        return FakeRecord(uint32(self.peak_height))
+
+    async def get_block_generator(self, block: Any, additional_blocks: Any = None) -> Optional[BlockGenerator]:
+        self.fallbacks += 1
+        return None
+
+
+class TestSpeculativeBlockRecords:
+    def test_pending_blocks(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        ses = SubEpochSummary(bytes32([1] * 32), bytes32([2] * 32), uint8(0), None, None)
+
+        def to_block_record(constants: Any, view: Any, required_iters: Any, block: FakeBlock, _: Any) -> FakeRecord:
+            # the records of the earlier pending blocks are visible through the view
+            assert view.contains_block(block.prev_header_hash)
+            return FakeRecord(block.height, ses if block.height == 11 else None)
+
+        monkeypatch.setattr(speculative_validation, "block_to_block_record", to_block_record)
+        blockchain = FakeBlockchain(9)
+        pending = [FakeBlock(uint32(h)) for h in range(10, 13)]
+        view = SpeculativeBlockRecords(blockchain, pending)  # type: ignore[arg-type]
+        assert view.get_peak_height() == 9
+        for block in pending:
+            view.add_pending_block(block, uint64(1))  # type: ignore[arg-type]
+
+        assert view.get_peak_height() == 12
+        assert view.height_to_hash(uint32(11)) == pending[1].header_hash
+        assert view.height_to_hash(uint32(4)) == FakeBlock(uint32(4)).header_hash
+        assert view.contains_height(uint32(12)) and not view.contains_height(uint32(13))
+        assert view.height_to_block_record(uint32(10)).height == 10
+        assert view.get_ses_heights() == [5, 11]
+        assert view.get_ses(uint32(11)) == ses
+        # nothing is added to the blockchain itself
+        assert not blockchain.contains_block(pending[0].header_hash)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("db_version", [1, 2])
+    async def test_generator_refs_into_pending_blocks(self, db_version: int) -> None:
+        blockchain = FakeBlockchain(9, db_version)
+        pending = [FakeBlock(uint32(h), generator(h)) for h in range(10, 15)]
+        view = SpeculativeBlockRecords(blockchain, pending)  # type: ignore[arg-type]
+        refs = [uint32(3), uint32(11), uint32(9), uint32(14)]
+        block = FakeBlock(uint32(15), generator(15), refs)
+
+        block_generator = await view.get_block_generator(block)
+        assert block_generator is not None
+        assert block_generator.program == generator(15)
+        assert block_generator.generator_refs == [generator(h) for h in refs]
+        # the pending blocks are not looked up in the database, they may not be committed yet
+        if db_version == 2:
+            assert blockchain.block_store.lookups == [3, 9]
+        else:
+            assert blockchain.block_store.lookups == [
+                FakeBlock(uint32(3)).header_hash,
+                FakeBlock(uint32(9)).header_hash,
+            ]
+        assert blockchain.fallbacks == 0
+
+    @pytest.mark.asyncio
+    async def test_generator_refs_in_next_batch(self) -> None:
+        blockchain = FakeBlockchain(9)
+        pending = [FakeBlock(uint32(10), generator(10))]
+        view = SpeculativeBlockRecords(blockchain, pending)  # type: ignore[arg-type]
+        # refs to earlier blocks of the batch that is being pre-validated come with the additional blocks
+        earlier = FakeBlock(uint32(11), generator(11))
+        block = FakeBlock(uint32(12), generator(12), [uint32(10), uint32(11)])
+        block_generator = await view.get_block_generator(
+            block, {earlier.header_hash: earlier}  # type: ignore[dict-item]
+        )
+        assert block_generator is not None
+        assert block_generator.generator_refs == [generator(10), generator(11)]
+        assert blockchain.block_store.lookups == []
+
+    @pytest.mark.asyncio
+    async def test_ref_without_generator(self) -> None:
+        view = SpeculativeBlockRecords(FakeBlockchain(9), [FakeBlock(uint32(10))])  # type: ignore[arg-type, list-item]
+        block = FakeBlock(uint32(11), generator(11), [uint32(10)])
+        with pytest.raises(ValueError, match=str(Err.GENERATOR_REF_HAS_NO_GENERATOR)):
+            await view.get_block_generator(block)
+
+    @pytest.mark.asyncio
+    async def test_not_on_main_chain(self) -> None:
+        blockchain = FakeBlockchain(9)
+        # the pending blocks build on a block the chain doesn't know
+        orphan = FakeBlock(uint32(20), generator(20))
+        view = SpeculativeBlockRecords(blockchain, [orphan])  # type: ignore[arg-type, list-item]
+        block = FakeBlock(uint32(21), generator(21), [uint32(3)])
+        assert await view.get_block_generator(block) is None
+        assert blockchain.fallbacks == 1
+
+    @pytest.mark.asyncio
+    async def test_no_refs(self) -> None:
+        view = SpeculativeBlockRecords(FakeBlockchain(9), [])  # type: ignore[arg-type]
+        assert await view.get_block_generator(FakeBlock(uint32(10))) is None
+        block_generator = await view.get_block_generator(FakeBlock(uint32(10), generator(10)))
+        assert block_generator == BlockGenerator(generator(10), [], [])
+
+
+def make_full_node(tmp_path: Path, blockchain: FakeBlockchain) -> FullNode:
+    full_node = FullNode(
+        {"database_path": "db/blockchain.sqlite", "selected_network": "testnet"}, tmp_path, DEFAULT_CONSTANTS
+    )
+    full_node.blockchain = blockchain  # type: ignore[assignment]
+    return full_node
+
+
+def result() -> PreValidationResult:
+    return PreValidationResult(None, uint64(1), None, False)
+
+
+class TestPreValidateNextBlockBatch:
+    @pytest.mark.asyncio
+    async def test_success(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        full_node = make_full_node(tmp_path, FakeBlockchain(9))
+        pending = [FakeBlock(uint32(h)) for h in range(10, 12)]
+        next_blocks = [FakeBlock(uint32(h)) for h in range(11, 14)]
+
+        async def pre_validate(blockchain: Any, pending_blocks: Any, results: Any, blocks: Any, wp: Any) -> Any:
+            # blocks of the pending batch are not validated again
+            assert [b.height for b in blocks] == [12, 13]
+            return [result() for _ in blocks]
+
+        monkeypatch.setattr(full_node_module, "pre_validate_speculatively", pre_validate)
+        pre_validated = await full_node.pre_validate_next_block_batch(
+            pending, [result(), result()], next_blocks  # type: ignore[arg-type]
+        )
+        assert pre_validated == {block.header_hash: result() for block in next_blocks[1:]}
+
+    @pytest.mark.asyncio
+    async def test_fallback(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        full_node = make_full_node(tmp_path, FakeBlockchain(9))
+        pending = [FakeBlock(uint32(10))]
+        next_blocks = [FakeBlock(uint32(11))]
+
+        async def failing(*args: Any) -> Any:
+            raise ValueError(Err.GENERATOR_REF_HAS_NO_GENERATOR)
+
+        async def invalid(*args: Any) -> Any:
+            return [PreValidationResult(uint16(Err.INVALID_BLOCK_SOLUTION.value), None, None, False)]
+
+        for pre_validate in [failing, invalid]:
+            monkeypatch.setattr(full_node_module, "pre_validate_speculatively", pre_validate)
+            # the next batch is pre-validated the regular way when it's its turn
+            pre_validated = await full_node.pre_validate_next_block_batch(
+                pending, [result()], next_blocks  # type: ignore[arg-type]
+            )
+            assert pre_validated is None
+
+    def test_speculation_applies(self, tmp_path: Path) -> None:
+        blockchain = FakeBlockchain(11)
+        full_node = make_full_node(tmp_path, blockchain)
+        pending = [FakeBlock(uint32(h)) for h in range(10, 12)]
+        assert full_node.speculation_applies(pending)  # type: ignore[arg-type]
+        # the batch did not all become the main chain, e.g. a block was invalid or a heavier chain was added first
+        blockchain.peak_height = 10
+        assert not full_node.speculation_applies(pending)  # type: ignore[arg-type]
@@ -0,0 +1,66 @@
+from chives.full_node.subscriptions import PeerSubscriptions
+from chives.types.blockchain_format.coin import Coin
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.types.coin_record import CoinRecord
+from chives.util.hash import std_hash
+from chives.util.ints import uint32, uint64
+
+
+def peer(i: int) -> bytes32:
+    return std_hash(b"peer" + bytes([i]))
+
+
+def puzzle_hash(i: int) -> bytes32:
+    return std_hash(b"ph" + bytes([i]))
+
+
+def coin_record(i: int, spent_height: int = 0) -> CoinRecord:
+    coin = Coin(std_hash(b"parent" + bytes([i])), puzzle_hash(i), uint64(i))
+    return CoinRecord(coin, uint32(1), uint32(spent_height), False, uint64(0))
+
+
+class TestPeerSubscriptions:
+    def test_add_and_remove(self) -> None:
+        subscriptions = PeerSubscriptions()
+        subscriptions.add_puzzle_hashes(peer(1), [puzzle_hash(1), puzzle_hash(2)], 10)
+        subscriptions.add_puzzle_hashes(peer(2), [puzzle_hash(2)], 10)
+        subscriptions.add_coin_ids(peer(2), [coin_record(3).name], 10)
+        assert subscriptions.subscription_count(peer(1)) == 2
+        assert subscriptions.subscription_count(peer(2)) == 2
+        assert subscriptions.peers_for_puzzle_hash(puzzle_hash(1)) == [peer(1)]
+        assert set(subscriptions.peers_for_puzzle_hash(puzzle_hash(2))) == {peer(1), peer(2)}
+        assert subscriptions.peers_for_coin_id(coin_record(3).name) == [peer(2)]
+
+        subscriptions.remove_peer(peer(1))
+        assert subscriptions.subscription_count(peer(1)) == 0
+        assert subscriptions.peers_for_puzzle_hash(puzzle_hash(1)) == []
+        assert subscriptions.peers_for_puzzle_hash(puzzle_hash(2)) == [peer(2)]
+        subscriptions.remove_peer(peer(1))
+
+        # the slot of the removed peer is reused
+        subscriptions.add_puzzle_hashes(peer(3), [puzzle_hash(2)], 10)
+        assert set(subscriptions.peers_for_puzzle_hash(puzzle_hash(2))) == {peer(2), peer(3)}
+
+    def test_max_items(self) -> None:
+        subscriptions = PeerSubscriptions()
+        subscriptions.add_puzzle_hashes(peer(1), [puzzle_hash(i) for i in range(3)], 5)
+        # subscribing twice does not count
+        subscriptions.add_puzzle_hashes(peer(1), [puzzle_hash(i) for i in range(3)], 5)
+        subscriptions.add_coin_ids(peer(1), [coin_record(i).name for i in range(3)], 5)
+        assert subscriptions.subscription_count(peer(1)) == 5
+        assert subscriptions.peers_for_coin_id(coin_record(1).name) == [peer(1)]
+        assert subscriptions.peers_for_coin_id(coin_record(2).name) == []
+
+    def test_changes_for_peers(self) -> None:
+        subscriptions = PeerSubscriptions()
+        subscriptions.add_puzzle_hashes(peer(1), [puzzle_hash(1), puzzle_hash(9)], 10)
+        subscriptions.add_coin_ids(peer(2), [coin_record(1).name, coin_record(2).name], 10)
+        hinted = coin_record(5)
+        changes = subscriptions.changes_for_peers(
+            [coin_record(1, 2), coin_record(2), coin_record(3)], {puzzle_hash(9): {hinted.name: hinted}, b"short": {}}
+        )
+        assert changes == {
+            peer(1): {coin_record(1, 2).coin_state, hinted.coin_state},
+            peer(2): {coin_record(1, 2).coin_state, coin_record(2).coin_state},
+        }
+        assert subscriptions.changes_for_peers([coin_record(3)], {}) == {}
@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from chives.protocols.protocol_message_types import ProtocolMessageTypes
+from chives.server.api_task_scheduler import ApiTaskClass, ApiTaskScheduler, api_task_class
+from chives.server.outbound_message import Message, make_msg
+
+
+@dataclass
+class FakeConnection:
+    closed: bool = False
+
+
+class TestApiTaskScheduler:
+    def test_api_task_class(self) -> None:
+        assert api_task_class(make_msg(ProtocolMessageTypes.new_peak, b"")) == ApiTaskClass.CONSENSUS
+        assert api_task_class(make_msg(ProtocolMessageTypes.new_transaction, b"")) == ApiTaskClass.TRANSACTION
+        assert api_task_class(make_msg(ProtocolMessageTypes.request_blocks, b"")) == ApiTaskClass.SYNC
+        assert api_task_class(make_msg(ProtocolMessageTypes.respond_compact_vdf, b"")) == ApiTaskClass.SYNC
+        assert api_task_class(make_msg(ProtocolMessageTypes.register_interest_in_coin, b"")) == ApiTaskClass.WALLET
+        assert api_task_class(make_msg(ProtocolMessageTypes.plot_sync_start, b"")) == ApiTaskClass.DEFAULT
+
+    def test_limits(self) -> None:
+        started: List[Message] = []
+        limits: Dict[ApiTaskClass, Tuple[Optional[int], Optional[int]]] = {
+            task_class: (None, None) for task_class in ApiTaskClass
+        }
+        limits[ApiTaskClass.TRANSACTION] = (2, 2)
+        scheduler = ApiTaskScheduler(lambda message, connection: started.append(message), limits)
+        connection = FakeConnection()
+
+        transactions = [make_msg(ProtocolMessageTypes.new_transaction, bytes([i])) for i in range(5)]
+        assert [scheduler.submit(message, connection) for message in transactions] == [True, True, True, True, False]
+        assert started == transactions[:2]
+        assert scheduler.task_counts()["transaction"] == {"running": 2, "queued": 2}
+
+        # other classes are not held back
+        peaks = [make_msg(ProtocolMessageTypes.new_peak, bytes([i])) for i in range(10)]
+        for message in peaks:
+            assert scheduler.submit(message, connection)
+        assert started == transactions[:2] + peaks
+
+        # a finished task starts the next message of its class
+        scheduler.task_done(transactions[0])
+        assert started[-1] == transactions[2]
+        assert scheduler.task_counts()["transaction"] == {"running": 2, "queued": 1}
+        scheduler.task_done(transactions[1])
+        scheduler.task_done(transactions[2])
+        scheduler.task_done(transactions[3])
+        assert started[-1] == transactions[3]
+        assert scheduler.task_counts()["transaction"] == {"running": 0, "queued": 0}
+
+    def test_requests_not_dropped(self) -> None:
+        started: List[Message] = []
+        limits: Dict[ApiTaskClass, Tuple[Optional[int], Optional[int]]] = {
+            task_class: (None, None) for task_class in ApiTaskClass
+        }
+        limits[ApiTaskClass.SYNC] = (1, 1)
+        scheduler = ApiTaskScheduler(lambda message, connection: started.append(message), limits)
+        connection = FakeConnection()
+
+        gossip = [make_msg(ProtocolMessageTypes.new_compact_vdf, bytes([i])) for i in range(3)]
+        assert [scheduler.submit(message, connection) for message in gossip] == [True, True, False]
+        # the queue is full, but requests are queued anyway, since the peer waits for the response
+        requests = [make_msg(ProtocolMessageTypes.request_blocks, bytes([i])) for i in range(3)]
+        assert all(scheduler.submit(message, connection) for message in requests)
+        assert scheduler.task_counts()["sync"] == {"running": 1, "queued": 4}
+        for message in gossip[:2] + requests:
+            scheduler.task_done(message)
+        assert started == gossip[:2] + requests
+
+    def test_closed_connection(self) -> None:
+        started: List[Message] = []
+        limits: Dict[ApiTaskClass, Tuple[Optional[int], Optional[int]]] = {
+            task_class: (1, None) for task_class in ApiTaskClass
+        }
+        scheduler = ApiTaskScheduler(lambda message, connection: started.append(message), limits)
+        open_connection = FakeConnection()
+        closed_connection = FakeConnection()
+
+        requests = [make_msg(ProtocolMessageTypes.request_blocks, bytes([i])) for i in range(3)]
+        scheduler.submit(requests[0], open_connection)
+        scheduler.submit(requests[1], closed_connection)
+        scheduler.submit(requests[2], open_connection)
+        closed_connection.closed = True
+
+        # the message of the peer that disconnected is skipped
+        scheduler.task_done(requests[0])
+        assert started == [requests[0], requests[2]]
+        scheduler.task_done(requests[2])
+        assert scheduler.task_counts()["sync"] == {"running": 0, "queued": 0}
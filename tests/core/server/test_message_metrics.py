@@ -0,0 +1,76 @@
+from chives.protocols.protocol_message_types import ProtocolMessageTypes
+from chives.server.message_metrics import MessageMetrics, message_type_name, metrics_to_prometheus
+
+new_peak = ProtocolMessageTypes.new_peak.value
+new_transaction = ProtocolMessageTypes.new_transaction.value
+
+
+class TestMessageMetrics:
+    def test_counters(self) -> None:
+        metrics = MessageMetrics()
+        metrics.message_received(new_peak, 100)
+        metrics.message_received(new_peak, 50)
+        metrics.message_sent(new_transaction, 10)
+        metrics.rate_limited(new_transaction, incoming=False)
+        metrics.rate_limited(new_peak, incoming=True)
+        metrics.message_dropped(new_transaction)
+
+        result = metrics.to_json_dict()
+        assert result["new_peak"]["received"] == 2
+        assert result["new_peak"]["bytes_received"] == 150
+        assert result["new_peak"]["rate_limited_inbound"] == 1
+        assert result["new_transaction"]["sent"] == 1
+        assert result["new_transaction"]["bytes_sent"] == 10
+        assert result["new_transaction"]["rate_limited_outbound"] == 1
+        assert result["new_transaction"]["dropped"] == 1
+        assert result["new_transaction"]["handler_latency"] is None
+
+    def test_handler_latency(self) -> None:
+        metrics = MessageMetrics()
+        metrics.handler_started(new_peak)
+        metrics.handler_started(new_peak)
+        assert metrics.in_flight_by_name() == [("new_peak", 2)]
+        metrics.handler_done(new_peak, 0.002, False)
+        metrics.handler_done(new_peak, 100, True)
+        assert metrics.in_flight_by_name() == []
+
+        result = metrics.to_json_dict()["new_peak"]
+        assert result["in_flight"] == 0
+        assert result["handler_errors"] == 1
+        latency = result["handler_latency"]
+        assert latency["count"] == 2
+        assert latency["max"] == 100
+        assert latency["buckets"]["0.001"] == 0
+        assert latency["buckets"]["0.005"] == 1
+        assert latency["buckets"]["60"] == 1
+        assert latency["buckets"]["+Inf"] == 2
+
+    def test_unknown_message_type(self) -> None:
+        assert message_type_name(new_peak) == "new_peak"
+        assert message_type_name(255) == "unknown_255"
+
+    def test_prometheus(self) -> None:
+        metrics = MessageMetrics()
+        metrics.message_received(new_peak, 100)
+        metrics.handler_started(new_peak)
+        metrics.handler_done(new_peak, 0.5, False)
+        text = metrics_to_prometheus(
+            {
+                "message_types": metrics.to_json_dict(),
+                "incoming_queue_size": 3,
+                "api_tasks": {"transaction": {"running": 100, "queued": 5}},
+                "connections": [
+                    {"node_id": "ab", "peer_host": "127.0.0.1", "outgoing_queue_size": {"consensus": 1, "bulk": 0}}
+                ],
+            }
+        )
+        lines = text.splitlines()
+        assert "# TYPE chives_messages_received_total counter" in lines
+        assert 'chives_messages_received_total{message_type="new_peak"} 1' in lines
+        assert 'chives_message_bytes_received_total{message_type="new_peak"} 100' in lines
+        assert 'chives_message_handler_seconds_bucket{message_type="new_peak",le="0.25"} 0' in lines
+        assert 'chives_message_handler_seconds_bucket{message_type="new_peak",le="0.5"} 1' in lines
+        assert 'chives_message_handler_seconds_count{message_type="new_peak"} 1' in lines
+        assert "chives_incoming_queue_size 3" in lines
+        assert 'chives_api_tasks_queued{task_class="transaction"} 5' in lines
+        assert 'chives_outgoing_queue_size{node_id="ab",peer_host="127.0.0.1",priority="consensus"} 1' in lines
@@ -0,0 +1,65 @@
+import pytest
+
+from chives.protocols.protocol_message_types import ProtocolMessageTypes
+from chives.server.outbound_message import make_msg
+from chives.server.outbound_queue import MAX_PASSED_OVER, MessagePriority, OutboundQueue, message_priority
+
+
+class TestOutboundQueue:
+    def test_message_priority(self) -> None:
+        assert message_priority(make_msg(ProtocolMessageTypes.new_peak, b"")) == MessagePriority.CONSENSUS
+        assert message_priority(make_msg(ProtocolMessageTypes.new_transaction, b"")) == MessagePriority.TRANSACTION
+        assert message_priority(make_msg(ProtocolMessageTypes.respond_peers, b"")) == MessagePriority.BULK
+        assert message_priority(make_msg(ProtocolMessageTypes.coin_state_update, b"")) == MessagePriority.DEFAULT
+
+    @pytest.mark.asyncio
+    async def test_priority_order(self) -> None:
+        queue = OutboundQueue()
+        peers = [make_msg(ProtocolMessageTypes.respond_peers, bytes([i])) for i in range(3)]
+        transactions = [make_msg(ProtocolMessageTypes.new_transaction, bytes([i])) for i in range(3)]
+        peak = make_msg(ProtocolMessageTypes.new_peak, b"peak")
+        wallet = make_msg(ProtocolMessageTypes.new_peak_wallet, b"wallet")
+        for message in peers + transactions + [wallet, peak]:
+            queue.put(message)
+        assert queue.qsize() == 8
+        assert queue.qsize_by_priority() == {
+            MessagePriority.CONSENSUS: 1,
+            MessagePriority.DEFAULT: 1,
+            MessagePriority.TRANSACTION: 3,
+            MessagePriority.BULK: 3,
+        }
+
+        sent = [(await queue.get())[0] for _ in range(8)]
+        assert sent == [peak, wallet] + transactions + peers
+        assert queue.qsize() == 0
+
+    @pytest.mark.asyncio
+    async def test_no_starvation(self) -> None:
+        queue = OutboundQueue()
+        blocks = [make_msg(ProtocolMessageTypes.respond_blocks, bytes([i])) for i in range(2)]
+        transactions = [make_msg(ProtocolMessageTypes.new_transaction, bytes([i])) for i in range(30)]
+        for message in blocks + transactions:
+            queue.put(message)
+
+        sent = [(await queue.get())[0] for _ in range(MAX_PASSED_OVER + 1)]
+        assert sent == transactions[:MAX_PASSED_OVER] + blocks[:1]
+        sent = [(await queue.get())[0] for _ in range(MAX_PASSED_OVER + 1)]
+        assert sent == transactions[MAX_PASSED_OVER:][:MAX_PASSED_OVER] + blocks[1:]
+
+        # consensus messages are never held back
+        peaks = [make_msg(ProtocolMessageTypes.new_peak, bytes([i])) for i in range(MAX_PASSED_OVER + 5)]
+        queue.put(blocks[0])
+        for message in peaks:
+            queue.put(message)
+        sent = [(await queue.get())[0] for _ in range(len(peaks))]
+        assert sent == peaks
+
+    @pytest.mark.asyncio
+    async def test_encoded(self) -> None:
+        queue = OutboundQueue()
+        message = make_msg(ProtocolMessageTypes.new_peak, b"peak")
+        queue.put(message)
+        assert await queue.get() == (message, bytes(message))
+        # an already encoded message isn't encoded again
+        queue.put(message, b"encoded")
+        assert await queue.get() == (message, b"encoded")
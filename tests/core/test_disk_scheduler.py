@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from chives.consensus.default_constants import DEFAULT_CONSTANTS
+from chives.harvester.disk_scheduler import LATENCY_BUCKETS, DiskScheduler, LatencyHistogram, LookupKind
+from chives.harvester.harvester import Harvester
+
+
+class TestDiskScheduler:
+    def test_latency_histogram(self) -> None:
+        histogram = LatencyHistogram()
+        for seconds in [0.001, 0.01, 0.02, 3.0, 100.0]:
+            histogram.add(seconds)
+        stats = histogram.to_json_dict()
+        assert stats["buckets"] == LATENCY_BUCKETS
+        assert stats["count"] == 5
+        assert stats["counts"][0] == 2
+        assert stats["counts"][1] == 1
+        assert stats["counts"][LATENCY_BUCKETS.index(5.0)] == 1
+        assert stats["counts"][-1] == 1
+        assert stats["max_seconds"] == 100.0
+
+    @pytest.mark.asyncio
+    async def test_slow_disk_does_not_block_others(self) -> None:
+        scheduler = DiskScheduler(threads_per_disk=2)
+        release = threading.Event()
+        try:
+            # every thread of disk 1 is stuck
+            stuck = [scheduler.submit(1, LookupKind.qualities, release.wait) for _ in range(4)]
+            start = time.monotonic()
+            results = await asyncio.gather(
+                *[asyncio.wrap_future(scheduler.submit(2, LookupKind.qualities, lambda i=i: i)) for i in range(10)]
+            )
+            assert results == list(range(10))
+            assert time.monotonic() - start < 5
+            assert not any(future.done() for future in stuck)
+        finally:
+            release.set()
+            scheduler.shutdown(wait=True)
+        assert all(future.result() for future in stuck)
+
+        stats = {disk["device"]: disk for disk in scheduler.get_disk_stats()}
+        assert stats[1]["latency"]["qualities"]["count"] == 4
+        assert stats[2]["latency"]["qualities"]["count"] == 10
+        assert stats[2]["latency"]["full_proof"]["count"] == 0
+        assert stats[2]["queued"] == 0
+
+    def test_full_proofs_first(self) -> None:
+        scheduler = DiskScheduler(threads_per_disk=1)
+        release = threading.Event()
+        order: List[str] = []
+        try:
+            blocker = scheduler.submit(1, LookupKind.qualities, release.wait)
+            # queued while the only thread is busy
+            futures = [scheduler.submit(1, LookupKind.qualities, order.append, f"quality {i}") for i in range(3)]
+            futures.append(scheduler.submit(1, LookupKind.full_proof, order.append, "full proof"))
+            release.set()
+            blocker.result()
+            for future in futures:
+                future.result()
+        finally:
+            scheduler.shutdown(wait=True)
+        assert order == ["full proof", "quality 0", "quality 1", "quality 2"]
+        with pytest.raises(RuntimeError):
+            scheduler.submit(1, LookupKind.qualities, order.append, "too late")
+
+    def test_exceptions_are_passed_on(self) -> None:
+        scheduler = DiskScheduler(threads_per_disk=1)
+        try:
+            future = scheduler.submit(1, LookupKind.full_proof, int, "not a number")
+            with pytest.raises(ValueError):
+                future.result()
+        finally:
+            scheduler.shutdown(wait=True)
+
+    @pytest.mark.parametrize(
+        "config, threads_per_disk",
+        [
+            ({}, 8),
+            ({"num_threads_per_disk": 4}, 4),
+            ({"num_threads": 60}, 8),
+            ({"num_threads": 4}, 4),
+            ({"num_threads_per_disk": 4, "num_threads": 60}, 4),
+            ({"num_threads_per_disk": 16, "num_threads": 4}, 16),
+        ],
+    )
+    def test_harvester_config(self, tmp_path: Path, config: Dict[str, int], threads_per_disk: int) -> None:
+        # the legacy `num_threads` was shared by all disks, it can only lower the number of threads per disk
+        harvester = Harvester(tmp_path, config, DEFAULT_CONSTANTS)
+        try:
+            assert harvester.disk_scheduler.threads_per_disk == threads_per_disk
+        finally:
+            harvester.disk_scheduler.shutdown()
@@ -1,5 +1,5 @@
 # flake8: noqa: F811, F401
-from typing import List
+from typing import List, Optional
 
 import pytest
 from blspy import AugSchemeMPL
@@ -11,6 +11,7 @@ from chives.rpc.full_node_rpc_api import FullNodeRpcApi
 from chives.rpc.full_node_rpc_client import FullNodeRpcClient
 from chives.rpc.rpc_server import NodeType, start_rpc_server
 from chives.simulator.simulator_protocol import FarmNewBlockProtocol, ReorgProtocol
+from chives.types.coin_record import CoinRecord
 from chives.types.full_block import FullBlock
 from chives.types.spend_bundle import SpendBundle
 from chives.types.unfinished_block import UnfinishedBlock
@@ -173,6 +174,13 @@ class TestRpc:
             )
             assert (await client.get_coin_record_by_name(coin.name())) is None
 
+            fee_estimate = await client.get_fee_estimate([60, 600], 1000000)
+            assert fee_estimate["target_times"] == [60, 600]
+            # the mempool is almost empty, there is room for everything
+            assert fee_estimate["estimates"] == [0, 0]
+            assert fee_estimate["current_fee_rate"] == 0
+            assert fee_estimate["mempool_size"] > 0
+
             await full_node_api_1.farm_new_transaction_block(FarmNewBlockProtocol(ph_2))
 
             assert (await client.get_coin_record_by_name(coin.name())).coin == coin
@@ -180,6 +188,14 @@ class TestRpc:
             assert len(await client.get_coin_records_by_puzzle_hash(ph_receiver)) == 1
             assert len(list(filter(lambda cr: not cr.spent, (await client.get_coin_records_by_puzzle_hash(ph))))) == 3
             assert len(await client.get_coin_records_by_puzzle_hashes([ph_receiver, ph])) == 5
+            paginated: List[CoinRecord] = []
+            cursor: Optional[str] = None
+            while True:
+                page, cursor = await client.get_coin_records_by_puzzle_hashes_paginated([ph_receiver, ph], 2, cursor)
+                paginated.extend(page)
+                if cursor is None:
+                    break
+            assert set(paginated) == set(await client.get_coin_records_by_puzzle_hashes([ph_receiver, ph]))
             assert len(await client.get_coin_records_by_puzzle_hash(ph, False)) == 3
             assert len(await client.get_coin_records_by_puzzle_hash(ph, True)) == 4
 
@@ -257,6 +273,13 @@ class TestRpc:
             assert blocks[2].header_hash == new_blocks[2].header_hash
             assert blocks[3].header_hash != new_blocks[3].header_hash
 
+            # the serialized blocks, and the JSON rendered from the cache, are the same blocks
+            assert await client.get_blocks(0, 5, exclude_reorged=True) == new_blocks
+            blocks_bytes = await client.get_blocks_bytes(0, 5, exclude_reorged=True)
+            assert [FullBlock.from_bytes(block_bytes) for _, _, block_bytes in blocks_bytes] == new_blocks
+            assert [(height, hh) for height, hh, _ in blocks_bytes] == [(b.height, b.header_hash) for b in new_blocks]
+            assert len(await client.get_blocks_bytes(0, 5)) == 7
+
         finally:
             # Checks that the RPC manages to stop the node
             client.close()
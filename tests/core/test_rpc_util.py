@@ -0,0 +1,82 @@
+import json
+from typing import Any, AsyncIterator, Dict
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from chives.rpc.util import STREAM_CHUNK_ITEMS, EncodedJSON, collect_streamed, wrap_http_handler
+
+
+async def numbers(count: int, fail: bool = False) -> AsyncIterator[Dict[str, Any]]:
+    for i in range(count):
+        yield {"number": i, "hex": bytes([i % 256])}
+    if fail:
+        raise ValueError("no more numbers")
+
+
+async def streamed(request: Dict[str, Any]) -> Dict[str, Any]:
+    return {"numbers": numbers(request["count"], request.get("fail", False)), "count": request["count"]}
+
+
+async def encoded_numbers(count: int) -> AsyncIterator[Any]:
+    for i in range(count):
+        yield EncodedJSON(f'{{"number": {i}}}') if i % 2 == 0 else {"number": i}
+
+
+async def encoded(request: Dict[str, Any]) -> Dict[str, Any]:
+    return {"numbers": encoded_numbers(request["count"])}
+
+
+async def regular(request: Dict[str, Any]) -> Dict[str, Any]:
+    return {"numbers": [i for i in range(request["count"])]}
+
+
+class TestRpcStreaming:
+    @pytest.mark.asyncio
+    async def test_streamed_response(self) -> None:
+        app = web.Application()
+        app.add_routes(
+            [
+                web.post("/streamed", wrap_http_handler(streamed)),
+                web.post("/encoded", wrap_http_handler(encoded)),
+                web.post("/regular", wrap_http_handler(regular)),
+            ]
+        )
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = runner.addresses[0][:2]
+        try:
+            async with aiohttp.ClientSession() as session:
+                for count in [0, 1, STREAM_CHUNK_ITEMS, 2 * STREAM_CHUNK_ITEMS + 5]:
+                    async with session.post(f"http://{host}:{port}/streamed", json={"count": count}) as response:
+                        assert response.headers["Content-Type"] == "application/json"
+                        result = json.loads(await response.text())
+                    assert result["success"] is True
+                    assert result["count"] == count
+                    assert [n["number"] for n in result["numbers"]] == list(range(count))
+                    assert result["numbers"][:1] == [{"number": 0, "hex": "0x00"}][:count]
+
+                async with session.post(f"http://{host}:{port}/streamed", json={"count": 10, "fail": True}) as response:
+                    result = json.loads(await response.text())
+                assert result == {"success": False, "error": "no more numbers", "numbers": result["numbers"]}
+                assert len(result["numbers"]) == 10
+
+                async with session.post(f"http://{host}:{port}/encoded", json={"count": 5}) as response:
+                    result = json.loads(await response.text())
+                assert result == {"numbers": [{"number": i} for i in range(5)], "success": True}
+
+                async with session.post(f"http://{host}:{port}/regular", json={"count": 3}) as response:
+                    assert await response.json() == {"numbers": [0, 1, 2], "success": True}
+        finally:
+            await runner.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_collect_streamed(self) -> None:
+        result = await collect_streamed(await streamed({"count": 3}))
+        assert result["numbers"] == [{"number": i, "hex": bytes([i])} for i in range(3)]
+        assert result["count"] == 3
+        result = await collect_streamed(await encoded({"count": 3}))
+        assert result["numbers"] == [{"number": i} for i in range(3)]
@@ -1,6 +1,6 @@
 import unittest
 
-from chives.util.lru_cache import LRUCache
+from chives.util.lru_cache import LRUCache, SizedLRUCache
 
 
 class TestLRUCache(unittest.TestCase):
@@ -52,3 +52,36 @@ class TestLRUCache(unittest.TestCase):
         assert len(cache.cache) == 5
         assert cache.get(b"0") is None
         assert cache.get(b"1") == 1
+
+    def test_sized_lru_cache(self):
+        cache = SizedLRUCache(10, 5)
+
+        cache.put(b"0", "abcd")
+        cache.put(b"1", "abc")
+        assert cache.size == 7
+        # replacing a value updates the size
+        cache.put(b"1", "ab")
+        assert cache.size == 6
+        # too large to be cached
+        cache.put(b"2", "abcdef")
+        assert cache.get(b"2") is None
+        assert cache.size == 6
+
+        assert cache.get(b"0") == "abcd"
+        # the least recently used values are evicted until the new one fits
+        cache.put(b"3", "abcde")
+        assert cache.get(b"1") is None
+        assert cache.get(b"0") == "abcd"
+        assert cache.get(b"3") == "abcde"
+        assert cache.size == 9
+        cache.put(b"4", "ab")
+        assert cache.get(b"0") is None
+        assert cache.size == 7
+
+        cache.remove(b"3")
+        cache.remove(b"3")
+        assert cache.size == 2
+        # a value that is too large replaces a cached one
+        cache.put(b"4", "abcdef")
+        assert cache.get(b"4") is None
+        assert cache.size == 0
@@ -15,7 +15,7 @@ from chives.types.blockchain_format.program import Program
 from chives.types.blockchain_format.sized_bytes import bytes32
 from chives.types.full_block import FullBlock
 from chives.types.weight_proof import SubEpochChallengeSegment
-from chives.util.ints import uint8, uint32, uint64
+from chives.util.ints import int8, int512, uint8, uint32, uint64, uint128
 from chives.util.streamable import (
     DefinitionError,
     Streamable,
@@ -609,3 +609,59 @@ def test_streamable_inheritance_missing() -> None:
         @dataclass(frozen=True)
         class StreamableInheritanceMissing:  # type: ignore[type-var]
             pass
+
+
+@streamable
+@dataclass(frozen=True)
+class GeneratedCodeTestClass(Streamable):
+    a: int8
+    b: uint128
+    c: int512
+    d: List[bytes32]
+    e: Tuple[uint8, str, bool]
+    f: Optional[List[Optional[uint64]]]
+    g: bytes
+    h: Program
+    i: Coin
+
+
+def test_generated_round_trip() -> None:
+    item = GeneratedCodeTestClass(
+        int8(-5),
+        uint128(2 ** 128 - 1),
+        int512(-(2 ** 400)),
+        [bytes32([i] * 32) for i in range(3)],
+        (uint8(7), "chives", True),
+        [uint64(1), None, uint64(2 ** 64 - 1)],
+        b"\x01\x02\x03",
+        Program.to([1, 2, 3]),
+        Coin(bytes32([4] * 32), bytes32([5] * 32), uint64(6)),
+    )
+    assert GeneratedCodeTestClass.from_bytes(bytes(item)) == item
+    empty = GeneratedCodeTestClass(
+        int8(0), uint128(0), int512(0), [], (uint8(0), "", False), None, b"", Program.to(0), item.i
+    )
+    assert GeneratedCodeTestClass.from_bytes(bytes(empty)) == empty
+
+    # the bulk read of the hashes has to fail on a truncated list
+    with raises(AssertionError):
+        GeneratedCodeTestClass.parse(io.BytesIO(bytes(item)[:120]))
+
+
+def test_construct_unchecked() -> None:
+    coin = Coin(bytes32([4] * 32), bytes32([5] * 32), uint64(6))
+    item = RespondRemovals(uint32(1), bytes32([1] * 32), [(coin.name(), coin)], None)
+    unchecked = RespondRemovals.construct_unchecked(uint32(1), bytes32([1] * 32), [(coin.name(), coin)], proofs=None)
+    assert unchecked == item
+    assert bytes(unchecked) == bytes(item)
+    # nothing is converted, the values are taken as they are
+    assert type(RespondRemovals.construct_unchecked(1, bytes32([1] * 32), [], None).height) is int
+
+
+def test_decorator_missing() -> None:
+    @dataclass(frozen=True)
+    class DecoratorMissing(Streamable):
+        a: uint32
+
+    with raises(NotImplementedError):
+        DecoratorMissing.from_bytes(bytes(uint32(1)))
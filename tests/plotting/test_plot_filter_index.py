@@ -0,0 +1,58 @@
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict
+
+from blspy import G1Element
+
+from chives.consensus.default_constants import DEFAULT_CONSTANTS
+from chives.plotting.plot_filter_index import PlotFilterIndex
+from chives.plotting.util import PlotInfo
+from chives.types.blockchain_format.proof_of_space import ProofOfSpace
+from chives.types.blockchain_format.sized_bytes import bytes32
+
+
+@dataclass
+class FakeProver:
+    plot_id: bytes32
+
+    def get_id(self) -> bytes32:
+        return self.plot_id
+
+
+def random_bytes32(rng: random.Random) -> bytes32:
+    return bytes32(rng.getrandbits(256).to_bytes(32, "big"))
+
+
+def make_plots(rng: random.Random, count: int) -> Dict[Path, PlotInfo]:
+    return {
+        Path(f"plot-{i}.plot"): PlotInfo(FakeProver(random_bytes32(rng)), None, None, G1Element(), 0, 0)
+        for i in range(count)
+    }
+
+
+def test_matches_passes_plot_filter() -> None:
+    rng = random.Random(1234)
+    plots = make_plots(rng, 3000)
+    index = PlotFilterIndex(plots)
+    assert len(index) == len(plots)
+    assert index.paths == list(plots.keys())
+    for number_zero_bits in [1, 3, 8, 9, 12]:
+        constants = DEFAULT_CONSTANTS.replace(NUMBER_ZERO_BITS_PLOT_FILTER=number_zero_bits)
+        for _ in range(3):
+            challenge_hash = random_bytes32(rng)
+            sp_hash = random_bytes32(rng)
+            expected = [
+                i
+                for i, plot_info in enumerate(plots.values())
+                if ProofOfSpace.passes_plot_filter(constants, plot_info.prover.get_id(), challenge_hash, sp_hash)
+            ]
+            assert index.passing_plots(number_zero_bits, challenge_hash, sp_hash) == expected
+            assert len(expected) < len(plots)
+    assert index.passing_plots(0, random_bytes32(rng), random_bytes32(rng)) == list(range(len(plots)))
+
+
+def test_empty() -> None:
+    index = PlotFilterIndex({})
+    assert len(index) == 0
+    assert index.passing_plots(9, bytes32(b"\0" * 32), bytes32(b"\0" * 32)) == []
@@ -0,0 +1,21 @@
+from chives.util.bloom_filter import BloomFilter
+from chives.util.hash import std_hash
+
+
+class TestBloomFilter:
+    def test_no_false_negatives(self) -> None:
+        bloom_filter = BloomFilter(capacity=100)
+        items = [std_hash(i.to_bytes(4, "big")) for i in range(1000)]
+        for item in items:
+            bloom_filter.add(item)
+        # the filter grew past its capacity, without losing any item
+        assert len(bloom_filter) == 1000
+        assert all(item in bloom_filter for item in items)
+
+    def test_false_positive_rate(self) -> None:
+        bloom_filter = BloomFilter(capacity=10000, false_positive_rate=0.01)
+        for i in range(10000):
+            bloom_filter.add(std_hash(i.to_bytes(4, "big")))
+        false_positives = sum(std_hash(b"missing" + i.to_bytes(4, "big")) in bloom_filter for i in range(10000))
+        assert false_positives < 200
+        assert b"" not in BloomFilter()
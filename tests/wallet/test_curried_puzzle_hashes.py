@@ -0,0 +1,59 @@
+from blspy import AugSchemeMPL
+
+from chives.pools.pool_puzzles import (
+    SINGLETON_MOD_HASH,
+    create_full_puzzle,
+    create_full_puzzle_hash,
+    create_p2_singleton_puzzle,
+    create_waiting_room_inner_puzzle,
+    create_waiting_room_inner_puzzle_hash,
+    launcher_id_to_p2_puzzle_hash,
+)
+from chives.types.blockchain_format.program import Program
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.util.ints import uint32, uint64
+from chives.wallet.cat_wallet.cat_utils import CAT_MOD, construct_cat_puzzle, construct_cat_puzzle_hash
+from chives.wallet.puzzles.p2_delegated_puzzle_or_hidden_puzzle import puzzle_for_pk
+from chives.wallet.puzzles.singleton_top_layer import puzzle_for_singleton, puzzle_hash_for_singleton
+from chives.wallet.trading.offer import OFFER_MOD
+
+LAUNCHER_ID = bytes32([3] * 32)
+INNER_PUZZLE = puzzle_for_pk(AugSchemeMPL.key_gen(bytes([5] * 32)).get_g1())
+
+
+class TestCurriedPuzzleHashes:
+    def test_cat_puzzle_hash(self) -> None:
+        tail_hash = bytes32([4] * 32)
+        for inner_puzzle in [INNER_PUZZLE, OFFER_MOD, Program.to(1)]:
+            assert construct_cat_puzzle_hash(tail_hash, inner_puzzle.get_tree_hash()) == (
+                construct_cat_puzzle(CAT_MOD, tail_hash, inner_puzzle).get_tree_hash()
+            )
+
+    def test_singleton_puzzle_hash(self) -> None:
+        assert puzzle_hash_for_singleton(LAUNCHER_ID, INNER_PUZZLE.get_tree_hash()) == (
+            puzzle_for_singleton(LAUNCHER_ID, INNER_PUZZLE).get_tree_hash()
+        )
+        assert create_full_puzzle_hash(INNER_PUZZLE.get_tree_hash(), LAUNCHER_ID) == (
+            create_full_puzzle(INNER_PUZZLE, LAUNCHER_ID).get_tree_hash()
+        )
+
+    def test_pool_puzzle_hashes(self) -> None:
+        delayed_puzzle_hash = bytes32([6] * 32)
+        for seconds_delay in [uint64(0), uint64(1), uint64(604800)]:
+            assert launcher_id_to_p2_puzzle_hash(LAUNCHER_ID, seconds_delay, delayed_puzzle_hash) == (
+                create_p2_singleton_puzzle(
+                    SINGLETON_MOD_HASH, LAUNCHER_ID, seconds_delay, delayed_puzzle_hash
+                ).get_tree_hash()
+            )
+            args = (
+                bytes32([7] * 32),
+                uint32(1000),
+                AugSchemeMPL.key_gen(bytes([8] * 32)).get_g1(),
+                LAUNCHER_ID,
+                bytes32([9] * 32),
+                seconds_delay,
+                delayed_puzzle_hash,
+            )
+            assert create_waiting_room_inner_puzzle_hash(*args) == (
+                create_waiting_room_inner_puzzle(*args).get_tree_hash()
+            )
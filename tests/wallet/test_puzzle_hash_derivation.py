@@ -0,0 +1,122 @@
+import pickle
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, List, TypeVar
+
+import pytest
+from blspy import AugSchemeMPL, G1Element
+
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.wallet.cat_wallet.cat_utils import construct_cat_puzzle
+from chives.util.inline_executor import InlineExecutor
+from chives.util.ints import uint32
+from chives.wallet.derive_keys import (
+    master_sk_to_wallet_sk,
+    master_sk_to_wallet_sk_intermediate,
+    master_sk_to_wallet_sk_unhardened,
+    master_sk_to_wallet_sk_unhardened_intermediate,
+)
+from chives.wallet.puzzles.cat_loader import CAT_MOD
+from chives.wallet.puzzles.p2_delegated_puzzle_or_hidden_puzzle import (
+    DEFAULT_HIDDEN_PUZZLE_HASH,
+    MOD,
+    SYNTHETIC_MOD,
+    calculate_synthetic_public_key,
+    puzzle_for_pk,
+    puzzle_hash_for_pk,
+    puzzle_hash_for_synthetic_public_key,
+)
+from chives.wallet.util.curry_and_treehash import calculate_hash_of_quoted_mod_hash, curry_and_treehash, shatree_atom
+from chives.wallet.util.puzzle_hash_derivation import (
+    DERIVATION_CHUNK_SIZE,
+    derive_puzzle_hashes,
+    derive_puzzle_hashes_in_chunks,
+    hardened_public_keys,
+)
+
+MASTER_SK = AugSchemeMPL.key_gen(bytes([7] * 32))
+
+_T = TypeVar("_T")
+
+
+class RecordingExecutor(InlineExecutor):
+    def __init__(self) -> None:
+        self.calls: List[bytes] = []
+
+    def submit(self, fn: Callable[..., _T], *args: Any, **kwargs: Any) -> "Future[_T]":  # type: ignore
+        # what a ProcessPoolExecutor would send to the worker
+        self.calls.append(pickle.dumps((args, kwargs)))
+        return super().submit(fn, *args, **kwargs)
+
+
+class TestPuzzleHashDerivation:
+    def test_curry_and_treehash(self) -> None:
+        quoted_mod_hash = calculate_hash_of_quoted_mod_hash(MOD.get_tree_hash())
+        assert curry_and_treehash(quoted_mod_hash) == MOD.curry().get_tree_hash()
+        args = [b"\x01" * 48, bytes32([2] * 32), b""]
+        assert curry_and_treehash(quoted_mod_hash, *[shatree_atom(arg) for arg in args]) == (
+            MOD.curry(*args).get_tree_hash()
+        )
+
+    def test_synthetic_public_key(self) -> None:
+        for index in range(10):
+            public_key = master_sk_to_wallet_sk_unhardened(MASTER_SK, uint32(index)).get_g1()
+            for hidden_puzzle_hash in [DEFAULT_HIDDEN_PUZZLE_HASH, bytes32([index] * 32)]:
+                synthetic_public_key = SYNTHETIC_MOD.run([bytes(public_key), hidden_puzzle_hash]).as_atom()
+                assert calculate_synthetic_public_key(public_key, hidden_puzzle_hash) == G1Element.from_bytes(
+                    synthetic_public_key
+                )
+
+    def test_standard_puzzle_hash(self) -> None:
+        public_key = master_sk_to_wallet_sk(MASTER_SK, uint32(3)).get_g1()
+        assert puzzle_hash_for_pk(public_key) == puzzle_for_pk(public_key).get_tree_hash()
+        assert puzzle_hash_for_synthetic_public_key(public_key) == MOD.curry(bytes(public_key)).get_tree_hash()
+
+    def test_derive_puzzle_hashes(self) -> None:
+        unhardened_intermediate_pk = bytes(master_sk_to_wallet_sk_unhardened_intermediate(MASTER_SK).get_g1())
+        derived = derive_puzzle_hashes(hardened_public_keys(MASTER_SK, range(5, 9)), unhardened_intermediate_pk, None)
+        assert [index for index, *_ in derived] == [5, 6, 7, 8]
+        for index, pk, puzzle_hash, pk_unhardened, puzzle_hash_unhardened in derived:
+            hardened = master_sk_to_wallet_sk(MASTER_SK, uint32(index)).get_g1()
+            unhardened = master_sk_to_wallet_sk_unhardened(MASTER_SK, uint32(index)).get_g1()
+            assert pk == bytes(hardened)
+            assert pk_unhardened == bytes(unhardened)
+            assert puzzle_hash == puzzle_for_pk(hardened).get_tree_hash()
+            assert puzzle_hash_unhardened == puzzle_for_pk(unhardened).get_tree_hash()
+
+    def test_derive_cat_puzzle_hashes(self) -> None:
+        tail_hash = bytes32([9] * 32)
+        unhardened_intermediate_pk = bytes(master_sk_to_wallet_sk_unhardened_intermediate(MASTER_SK).get_g1())
+        [(index, pk, puzzle_hash, pk_unhardened, puzzle_hash_unhardened)] = derive_puzzle_hashes(
+            hardened_public_keys(MASTER_SK, [2]), unhardened_intermediate_pk, tail_hash
+        )
+        hardened = master_sk_to_wallet_sk(MASTER_SK, uint32(2)).get_g1()
+        unhardened = master_sk_to_wallet_sk_unhardened(MASTER_SK, uint32(2)).get_g1()
+        assert puzzle_hash == construct_cat_puzzle(CAT_MOD, tail_hash, puzzle_for_pk(hardened)).get_tree_hash()
+        assert puzzle_hash_unhardened == (
+            construct_cat_puzzle(CAT_MOD, tail_hash, puzzle_for_pk(unhardened)).get_tree_hash()
+        )
+
+    @pytest.mark.asyncio
+    async def test_derive_in_worker_processes(self) -> None:
+        indexes = range(DERIVATION_CHUNK_SIZE * 2 + 5)
+        expected = await derive_puzzle_hashes_in_chunks(InlineExecutor(), MASTER_SK, indexes[:3])
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            derived = await derive_puzzle_hashes_in_chunks(executor, MASTER_SK, indexes)
+        assert [index for index, *_ in derived] == list(indexes)
+        assert derived[:3] == expected
+        for index, pk, puzzle_hash, pk_unhardened, puzzle_hash_unhardened in derived[-3:]:
+            assert pk == bytes(master_sk_to_wallet_sk(MASTER_SK, uint32(index)).get_g1())
+            assert pk_unhardened == bytes(master_sk_to_wallet_sk_unhardened(MASTER_SK, uint32(index)).get_g1())
+
+    @pytest.mark.asyncio
+    async def test_no_private_keys_sent_to_workers(self) -> None:
+        executor = RecordingExecutor()
+        await derive_puzzle_hashes_in_chunks(executor, MASTER_SK, range(DERIVATION_CHUNK_SIZE + 1))
+        assert len(executor.calls) == 2
+        secrets = [
+            bytes(MASTER_SK),
+            bytes(master_sk_to_wallet_sk_intermediate(MASTER_SK)),
+            bytes(master_sk_to_wallet_sk_unhardened_intermediate(MASTER_SK)),
+        ]
+        for call in executor.calls:
+            assert not any(secret in call for secret in secrets)
@@ -0,0 +1,56 @@
+import asyncio
+from typing import Any, List
+
+import pytest
+
+from chives.protocols.wallet_protocol import CoinState
+from chives.types.blockchain_format.coin import Coin
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.util.hash import std_hash
+from chives.util.ints import uint32, uint64
+from chives.wallet.util.wallet_sync_utils import subscribe_in_chunks
+
+
+class FakeSubscriptions:
+    def __init__(self, first_seconds: float, seconds: float) -> None:
+        # the time to answer the first chunk, and all others
+        self.first_seconds = first_seconds
+        self.seconds = seconds
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests: List[List[bytes32]] = []
+
+    async def subscribe(self, items: List[bytes32], peer: Any, min_height: int) -> List[CoinState]:
+        self.requests.append(items)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.first_seconds if len(self.requests) == 1 else self.seconds)
+        self.in_flight -= 1
+        return [CoinState(Coin(item, item, uint64(1)), None, uint32(1)) for item in items]
+
+
+class TestSubscribeInChunks:
+    @pytest.mark.asyncio
+    async def test_order_and_concurrency(self) -> None:
+        fake = FakeSubscriptions(0.05, 0.01)
+        items = [std_hash(bytes([i])) for i in range(25)]
+        received = []
+        async for chunk, states in subscribe_in_chunks(fake.subscribe, items, None, 0, 10, 2):  # type: ignore
+            assert [state.coin.parent_coin_info for state in states] == chunk
+            received.extend(chunk)
+        assert received == items
+        assert len(fake.requests) == 3
+        assert fake.max_in_flight == 2
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_requests(self) -> None:
+        fake = FakeSubscriptions(0, 10)
+        items = [std_hash(bytes([i])) for i in range(100)]
+        responses = subscribe_in_chunks(fake.subscribe, items, None, 0, 10, 4)  # type: ignore
+        async for chunk, states in responses:
+            break
+        await responses.aclose()
+        await asyncio.sleep(0.1)
+        # the first chunk was taken, the next 3 were in flight and are cancelled
+        assert len(fake.requests) == 4
+        assert fake.in_flight == 3
@@ -0,0 +1,76 @@
+from pathlib import Path
+from secrets import token_bytes
+
+import aiosqlite
+import pytest
+
+from chives.types.blockchain_format.coin import Coin
+from chives.types.blockchain_format.sized_bytes import bytes32
+from chives.util.db_wrapper import DBWrapper
+from chives.util.ints import uint32, uint64
+from chives.wallet.util.wallet_types import WalletType
+from chives.wallet.wallet_coin_record import WalletCoinRecord
+from chives.wallet.wallet_coin_store import WalletCoinStore
+
+
+def make_record(amount: int, confirmed_height: int, wallet_id: int = 1) -> WalletCoinRecord:
+    coin = Coin(bytes32(token_bytes(32)), bytes32(token_bytes(32)), uint64(amount))
+    return WalletCoinRecord(
+        coin, uint32(confirmed_height), uint32(0), False, False, WalletType.STANDARD_WALLET, wallet_id
+    )
+
+
+class TestWalletCoinStore:
+    @pytest.mark.asyncio
+    async def test_unspent_coins_by_amount(self) -> None:
+        db_filename = Path("wallet_coin_store_test.db")
+
+        if db_filename.exists():
+            db_filename.unlink()
+
+        db_connection = await aiosqlite.connect(db_filename)
+        db_wrapper = DBWrapper(db_connection)
+        store = await WalletCoinStore.create(db_wrapper)
+        try:
+            assert list(store.get_unspent_coins_for_wallet_by_amount(1)) == []
+            assert store.get_unspent_balance_for_wallet(1) == 0
+
+            records = [make_record(amount, height) for height, amount in enumerate([5, 300, 1, 300, 42], 1)]
+            for record in records:
+                await store.add_coin_record(record)
+            other_wallet = make_record(1000, 1, wallet_id=2)
+            await store.add_coin_record(other_wallet)
+
+            by_amount = list(store.get_unspent_coins_for_wallet_by_amount(1))
+            assert [record.coin.amount for record in by_amount] == [300, 300, 42, 5, 1]
+            assert set(by_amount) == await store.get_unspent_coins_for_wallet(1)
+            assert store.get_unspent_balance_for_wallet(1) == 648
+            assert store.get_unspent_balance_for_wallet(2) == 1000
+            assert store.get_unspent_coin_for_wallet(1, records[4].name()) == records[4]
+            assert store.get_unspent_coin_for_wallet(1, other_wallet.name()) is None
+
+            # replacing a record doesn't count it twice
+            await store.add_coin_record(records[4])
+            assert store.get_unspent_balance_for_wallet(1) == 648
+
+            await store.set_spent(records[1].name(), uint32(10))
+            await store.set_spent(records[4].name(), uint32(11))
+            await store.delete_coin_record(records[0].name())
+            by_amount = list(store.get_unspent_coins_for_wallet_by_amount(1))
+            assert by_amount == [records[3], records[2]]
+            assert store.get_unspent_balance_for_wallet(1) == 301
+            assert store.get_unspent_coin_for_wallet(1, records[1].name()) is None
+
+            # the coin spent at 11 is unspent again, the coin confirmed at 5 is gone
+            await store.rollback_to_block(4)
+            by_amount = list(store.get_unspent_coins_for_wallet_by_amount(1))
+            assert [record.coin.amount for record in by_amount] == [300, 300, 1]
+            assert store.get_unspent_balance_for_wallet(1) == 601
+
+            # the cache rebuilt from the database is the same
+            await store.rebuild_wallet_cache()
+            assert [record.coin.amount for record in store.get_unspent_coins_for_wallet_by_amount(1)] == [300, 300, 1]
+            assert store.get_unspent_balance_for_wallet(1) == 601
+        finally:
+            await db_connection.close()
+            db_filename.unlink()